@@ -16,19 +16,46 @@ class RMSConfig(PluginConfig):
     author = 'NetBox RMS Team'
     author_email = 'admin@example.com'
     base_url = 'rms'
-    min_version = '4.0.0'
+    min_version = '4.2.0'
     max_version = '4.99'
     
     # 默认设置
     default_settings = {
         'enable_external_resource_validation': True,
+        # 外部资源校验：接口地址（为空时按本地 NetBox 数据校验）、认证令牌、自定义客户端类导入路径
+        'external_validation_url': '',
+        'external_validation_token': '',
+        'external_validation_client': '',
+        # 外部资源校验：请求超时（秒）、并发请求数、答复缓存时间（秒）
+        'external_validation_timeout': 10,
+        'external_validation_workers': 16,
+        'external_validation_cache_ttl': 300,
         'auto_fill_change_order': True,
+        # 外发事件：接收接口地址（为空时不记录）、认证令牌、请求超时（秒）
+        'outbound_events_url': '',
+        'outbound_events_token': '',
+        'outbound_events_timeout': 10,
+        # 外发事件：合并窗口（秒）、每批事件数、最大投递次数
+        'outbound_events_window': 60,
+        'outbound_events_batch_size': 100,
+        'outbound_events_max_attempts': 10,
+        # 仪表盘等统计结果的缓存时间（秒）
+        'cache_timeout': 300,
+        # 每条光缆段的波道数（C 波段 50GHz 间隔）
+        'wavelength_channels': 80,
+        # 资源快照、执行反馈版本：每隔多少个版本保存一次完整内容
+        'revision_checkpoint_interval': 20,
     }
     
     def ready(self) -> None:
-        """插件就绪时注册信号处理器"""
+        """插件就绪时生成 JSON 数据校验器，注册信号处理器、事件处理器、仪表盘小部件和后台任务"""
         super().ready()
+        from . import schemas
+        schemas.load()
         from . import signals  # noqa: F401
+        from . import handlers  # noqa: F401
+        from . import widgets  # noqa: F401
+        from . import jobs  # noqa: F401
 
 
 config = RMSConfig
@@ -0,0 +1,148 @@
+"""
+NetBox RMS 统计分析
+
+业务周期（申请 -> 核查结果 / 任务完成 / 起租）的分位数统计。
+分位数由 PostgreSQL 的 percentile_cont 有序集聚合在数据库内计算，
+一次 GROUP BY 查询即可得到所有分组的全部指标。
+"""
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db.models import Aggregate, Count, DurationField, ExpressionWrapper, F, Q, QuerySet
+from django.db.models.functions import TruncDate
+
+# 默认统计的分位数（百分位）
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class PercentileCont(Aggregate):
+    """
+    连续分位数聚合 (PostgreSQL percentile_cont)
+
+    用法：
+        PercentileCont(F('duration'), fraction=0.9)
+    """
+
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+
+    def __init__(self, expression, fraction: float, **extra: Any) -> None:
+        fraction = float(fraction)
+        if not 0 <= fraction <= 1:
+            raise ValueError('fraction 必须在 0 到 1 之间')
+        extra.setdefault('output_field', DurationField())
+        super().__init__(expression, fraction=repr(fraction), **extra)
+
+
+def _days(value: Optional[datetime.timedelta]) -> Optional[float]:
+    """将时长转换为天数（保留两位小数）"""
+    if value is None:
+        return None
+    return round(value.total_seconds() / 86400, 2)
+
+
+def cycle_time_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    周期指标定义：指标名 -> {'expression': 时长表达式, 'filter': 样本过滤条件, 'per': 统计单位}
+
+    所有时长均以工单申请日期为起点，按天计算。核查、起租属于工单（per='order'，每个工单计一次），
+    任务完成属于任务（per='task'）。
+    """
+    apply_date = F('service_order__apply_date')
+    return {
+        'check': {
+            'expression': ExpressionWrapper(
+                TruncDate('service_order__check_result_obj__check_result_at') - apply_date,
+                output_field=DurationField(),
+            ),
+            'filter': Q(service_order__check_result_obj__check_result_at__isnull=False),
+            'per': 'order',
+        },
+        'completion': {
+            'expression': ExpressionWrapper(
+                TruncDate('completed_at') - apply_date,
+                output_field=DurationField(),
+            ),
+            'filter': Q(completed_at__isnull=False),
+            'per': 'task',
+        },
+        'billing': {
+            'expression': ExpressionWrapper(
+                F('service_order__billing_start_date') - apply_date,
+                output_field=DurationField(),
+            ),
+            'filter': Q(service_order__billing_start_date__isnull=False),
+            'per': 'order',
+        },
+    }
+
+
+def _aggregates(metrics: Dict[str, Dict[str, Any]], percentiles: Sequence[int]) -> Dict[str, Aggregate]:
+    aggregates: Dict[str, Aggregate] = {}
+    for name, metric in metrics.items():
+        aggregates[f'{name}_count'] = Count('pk', filter=metric['filter'])
+        for p in percentiles:
+            aggregates[f'{name}_p{p}'] = PercentileCont(
+                metric['expression'],
+                fraction=p / 100,
+                filter=metric['filter'],
+            )
+    return aggregates
+
+
+def cycle_time_stats(
+    queryset: QuerySet,
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+    group_by: Iterable[str] = ('execution_department', 'service_order__check_type'),
+) -> List[Dict[str, Any]]:
+    """
+    按分组计算业务周期分位数
+
+    任务指标按查询集中的全部任务统计；工单指标在每个分组内每个工单只取一个任务
+    （DISTINCT ON 工单），多任务工单不重复计入。
+
+    Args:
+        queryset: TaskDetail 查询集（已按权限和过滤条件限定）
+        percentiles: 需要计算的百分位，如 (50, 90, 99)
+        group_by: 分组字段
+
+    Returns:
+        每个分组一条记录：分组字段值、任务数、工单数，以及各指标的样本数与分位数（天）
+    """
+    group_by = list(group_by)
+    metrics = cycle_time_metrics()
+    task_metrics = {name: metric for name, metric in metrics.items() if metric['per'] == 'task'}
+    order_metrics = {name: metric for name, metric in metrics.items() if metric['per'] == 'order'}
+
+    queryset = queryset.order_by()
+    task_rows = queryset.values(*group_by).annotate(
+        task_count=Count('pk'),
+        **_aggregates(task_metrics, percentiles),
+    ).order_by(*group_by)
+    # 每个 (分组, 工单) 取一个代表任务
+    representatives = queryset.order_by('service_order_id', *group_by, 'pk').distinct(
+        'service_order_id', *group_by,
+    ).values('pk')
+    order_rows = queryset.model.objects.filter(pk__in=representatives).order_by().values(*group_by).annotate(
+        order_count=Count('pk'),
+        **_aggregates(order_metrics, percentiles),
+    )
+    order_rows = {tuple(row[field] for field in group_by): row for row in order_rows}
+
+    results = []
+    for row in task_rows:
+        row.update(order_rows.get(tuple(row[field] for field in group_by), {}))
+        # 输出时去掉关联前缀，如 service_order__check_type -> check_type
+        result: Dict[str, Any] = {field.rsplit('__', 1)[-1]: row[field] for field in group_by}
+        result['task_count'] = row['task_count']
+        result['order_count'] = row['order_count']
+        result['metrics'] = {
+            name: {
+                'count': row[f'{name}_count'],
+                **{f'p{p}': _days(row[f'{name}_p{p}']) for p in percentiles},
+            }
+            for name in metrics
+        }
+        results.append(result)
+    return results
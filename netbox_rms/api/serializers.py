@@ -1,12 +1,22 @@
 """
 NetBox RMS REST API 序列化器
 """
+from datetime import date
+
 from rest_framework import serializers
 
-from netbox.api.serializers import NetBoxModelSerializer
+from netbox.api.serializers import BaseModelSerializer, NetBoxModelSerializer
+from dcim.api.serializers import CableSerializer, SiteSerializer
 from tenancy.api.serializers import TenantSerializer
+from users.api.serializers import UserSerializer
 
-from ..models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult
+from .. import ports, schemas
+from ..choices import ExecutionStatusChoices
+from ..models import (
+    ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TaskTransition, DemandForecast, CableCoreInventory,
+    PortAssignment, TransmissionCircuit, ColocationDevice, OutboundEvent, BillingRun, BillingLine,
+    ResourceLedgerHistory, JSONRevision,
+)
 
 
 
@@ -24,7 +34,7 @@ class ResourceCheckResultSerializer(NetBoxModelSerializer):
         model = ResourceCheckResult
         fields = [
             'id', 'url', 'display', 'service_order',
-            'check_result', 'unavailable_reasons', 'description',
+            'check_result', 'check_result_at', 'unavailable_reasons', 'description', 'route_data', 'power_data',
             'tags', 'custom_fields', 'created', 'last_updated',
         ]
 
@@ -47,6 +57,9 @@ class ServiceOrderSerializer(NetBoxModelSerializer):
     # 嵌套显示核查结果（只读）
     check_result_obj = ResourceCheckResultSerializer(read_only=True)
     
+    # 变更单从原单继承的资源台账（只读）
+    change_resources = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    
     task_count = serializers.IntegerField(read_only=True)
     resource_count = serializers.IntegerField(read_only=True)
     
@@ -59,7 +72,7 @@ class ServiceOrderSerializer(NetBoxModelSerializer):
             'sales_contact',
             'business_manager', 'internal_participant',
             'apply_date', 'deadline_date', 'billing_start_date',
-            'parent_order', 'special_notes',
+            'parent_order', 'change_resources', 'special_notes',
             'check_type', 'check_data',
             'check_result_obj', # 输出对象
             'comments',
@@ -67,6 +80,17 @@ class ServiceOrderSerializer(NetBoxModelSerializer):
             'tags', 'custom_fields', 'created', 'last_updated',
         ]
         brief_fields = ['id', 'url', 'display', 'order_no', 'tenant']
+    
+    def validate(self, data):
+        data = super().validate(data)
+        if 'check_type' in data or 'check_data' in data:
+            messages = schemas.check_data_errors(
+                data.get('check_type', getattr(self.instance, 'check_type', '')),
+                data.get('check_data', getattr(self.instance, 'check_data', {})),
+            )
+            if messages:
+                raise serializers.ValidationError({'check_data': messages})
+        return data
 
 
 class TaskDetailSerializer(NetBoxModelSerializer):
@@ -83,10 +107,19 @@ class TaskDetailSerializer(NetBoxModelSerializer):
         fields = [
             'id', 'url', 'display', 'service_order',
             'task_type', 'execution_status', 'execution_department', 'assignee',
+            'completed_at', 'confirmed_at',
             'feedback_data',
             'comments', 'tags', 'custom_fields', 'created', 'last_updated',
         ]
         brief_fields = ['id', 'url', 'display', 'task_type']
+    
+    def validate(self, data):
+        data = super().validate(data)
+        if 'feedback_data' in data:
+            messages = schemas.feedback_data_errors(data['feedback_data'])
+            if messages:
+                raise serializers.ValidationError({'feedback_data': messages})
+        return data
 
 
 class ResourceLedgerSerializer(NetBoxModelSerializer):
@@ -102,8 +135,341 @@ class ResourceLedgerSerializer(NetBoxModelSerializer):
         model = ResourceLedger
         fields = [
             'id', 'url', 'display', 'service_order',
-            'resource_type', 'resource_id', 'resource_name',
+            'resource_type', 'resource_id', 'resource_name', 'lifecycle_status', 'decommissioned_at',
             'snapshot',
             'comments', 'tags', 'custom_fields', 'created', 'last_updated',
         ]
-        brief_fields = ['id', 'url', 'display', 'resource_type', 'resource_id']
+        brief_fields = ['id', 'url', 'display', 'resource_type', 'resource_id', 'lifecycle_status']
+
+
+class TaskTransitionSerializer(BaseModelSerializer):
+    """执行任务状态变更记录序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:tasktransition-detail',
+    )
+    
+    task = TaskDetailSerializer(nested=True, read_only=True)
+    user = UserSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = TaskTransition
+        fields = [
+            'id', 'url', 'display', 'task',
+            'from_status', 'to_status', 'timestamp', 'user', 'comment',
+        ]
+        brief_fields = ['id', 'url', 'display', 'to_status', 'timestamp']
+
+
+class TaskBulkTransitionSerializer(serializers.Serializer):
+    """批量状态流转请求"""
+    
+    tasks = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000,
+    )
+    status = serializers.ChoiceField(
+        choices=[c[0] for c in ExecutionStatusChoices.CHOICES],
+    )
+    comment = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        max_length=200,
+        default='',
+    )
+
+
+class OrderImportSerializer(serializers.Serializer):
+    """工单批量导入请求"""
+    
+    rows = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=50000,
+        help_text='每行一个工单：工单字段名 -> 值，tenant 为租户 ID / 缩写 / 名称，parent_order 为原单号',
+    )
+    
+    def validate_rows(self, rows):
+        missing = [index + 1 for index, row in enumerate(rows) if not row.get('order_no')]
+        if missing:
+            raise serializers.ValidationError(f'以下行缺少 order_no：{missing[:20]}')
+        return rows
+
+
+class ChangeOrderCreateSerializer(serializers.Serializer):
+    """批量生成变更单请求"""
+    
+    parents = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000,
+    )
+    apply_date = serializers.DateField(
+        required=False,
+    )
+    deadline_date = serializers.DateField()
+    check_data = serializers.DictField(
+        required=False,
+        default=dict,
+        help_text='覆盖原单核查数据的键，如 {"bandwidth": "10G"}',
+    )
+    
+    def validate(self, data):
+        data.setdefault('apply_date', date.today())
+        if data['deadline_date'] < data['apply_date']:
+            raise serializers.ValidationError({'deadline_date': '计划开通时间不能早于申请时间'})
+        return data
+
+
+class OrderCloneSerializer(serializers.Serializer):
+    """工单批量复制请求"""
+    
+    orders = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=10000,
+    )
+    filters = serializers.DictField(
+        required=False,
+        default=dict,
+        help_text='与工单列表相同的过滤参数，如 {"tenant_id": [1], "check_type": ["transmission"]}',
+    )
+    apply_date = serializers.DateField(
+        required=False,
+    )
+    deadline_date = serializers.DateField()
+    include_tasks = serializers.BooleanField(
+        default=True,
+    )
+    include_check_results = serializers.BooleanField(
+        default=True,
+    )
+    
+    def validate(self, data):
+        if not data.get('orders') and not data['filters']:
+            raise serializers.ValidationError('orders 与 filters 至少指定一项')
+        data.setdefault('apply_date', date.today())
+        if data['deadline_date'] < data['apply_date']:
+            raise serializers.ValidationError({'deadline_date': '计划开通时间不能早于申请时间'})
+        filters = {
+            key: [str(value) for value in (values if isinstance(values, list) else [values])]
+            for key, values in data['filters'].items()
+        }
+        if data.get('orders'):
+            filters['id'] = [str(pk) for pk in data['orders']]
+        data['filters'] = filters
+        return data
+
+
+class OrderValidationSerializer(serializers.Serializer):
+    """外部资源校验请求"""
+    
+    orders = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=5000,
+    )
+
+
+class DemandForecastSerializer(BaseModelSerializer):
+    """需求预测序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:demandforecast-detail',
+    )
+    
+    site = SiteSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = DemandForecast
+        fields = [
+            'id', 'url', 'display', 'site', 'bandwidth', 'period', 'quantity',
+            'method', 'history_months', 'history_quantity', 'generated',
+        ]
+        brief_fields = ['id', 'url', 'display', 'period', 'quantity']
+
+
+class CableCoreInventorySerializer(BaseModelSerializer):
+    """光缆纤芯占用序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:cablecoreinventory-detail',
+    )
+    
+    cable = CableSerializer(nested=True, read_only=True)
+    site_a = SiteSerializer(nested=True, read_only=True)
+    site_z = SiteSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = CableCoreInventory
+        fields = [
+            'id', 'url', 'display', 'cable', 'site_a', 'site_z',
+            'core_count', 'free_count', 'allocations', 'last_updated',
+        ]
+        brief_fields = ['id', 'url', 'display', 'core_count', 'free_count']
+
+
+class PortAssignmentSerializer(BaseModelSerializer):
+    """端口占用序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:portassignment-detail',
+    )
+    
+    task = TaskDetailSerializer(nested=True, read_only=True)
+    service_order = ServiceOrderSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = PortAssignment
+        fields = [
+            'id', 'url', 'display', 'task', 'service_order', 'circuit_code', 'end',
+            'site', 'device_model', 'card', 'port', 'port_key', 'active', 'last_updated',
+        ]
+        brief_fields = ['id', 'url', 'display', 'circuit_code', 'end', 'port_key', 'active']
+
+
+class TransmissionCircuitSerializer(NetBoxModelSerializer):
+    """传输电路序列化器（写入后回写所属任务的执行反馈）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:transmissioncircuit-detail',
+    )
+    
+    task = TaskDetailSerializer(nested=True)
+    service_order = ServiceOrderSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = TransmissionCircuit
+        fields = [
+            'id', 'url', 'display', 'task', 'service_order', 'sequence', 'code', 'bandwidth',
+            'site_a', 'model_a', 'card_a', 'port_a',
+            'site_z', 'model_z', 'card_z', 'port_z',
+            'tags', 'custom_fields', 'created', 'last_updated',
+        ]
+        brief_fields = ['id', 'url', 'display', 'code', 'bandwidth']
+    
+    def validate(self, data):
+        data = super().validate(data)
+        task = data.get('task') or getattr(self.instance, 'task', None)
+        if task is not None:
+            circuit = {
+                field: data.get(field, getattr(self.instance, field, ''))
+                for field in TransmissionCircuit.FEEDBACK_FIELDS
+            }
+            circuits = [
+                other.to_feedback()
+                for other in task.circuits.exclude(pk=getattr(self.instance, 'pk', None))
+            ] + [circuit]
+            conflicts = ports.find_conflicts(
+                ports.task_circuits({'transmission': {'circuits': circuits}}),
+                task.task_type,
+                task.pk,
+            )
+            if conflicts:
+                raise serializers.ValidationError({'port': conflicts})
+        return data
+
+
+class ColocationDeviceSerializer(BaseModelSerializer):
+    """托管设备序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:colocationdevice-detail',
+    )
+    
+    service_order = ServiceOrderSerializer(nested=True, read_only=True)
+    task = TaskDetailSerializer(nested=True, read_only=True)
+    site = SiteSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = ColocationDevice
+        fields = [
+            'id', 'url', 'display', 'service_order', 'task', 'site', 'source', 'sequence',
+            'device_type', 'model', 'rack_units', 'power', 'quantity', 'cabinet', 'unit',
+        ]
+        brief_fields = ['id', 'url', 'display', 'source', 'model', 'rack_units', 'power', 'quantity']
+
+
+class OutboundEventSerializer(BaseModelSerializer):
+    """外发事件序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:outboundevent-detail',
+    )
+    
+    class Meta:
+        model = OutboundEvent
+        fields = [
+            'id', 'url', 'display', 'event', 'object_type', 'object_id', 'payload', 'status',
+            'created', 'last_updated', 'attempts', 'next_attempt', 'delivered', 'last_error',
+        ]
+        brief_fields = ['id', 'url', 'display', 'event', 'status']
+
+
+class BillingRunSerializer(BaseModelSerializer):
+    """计费批次序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:billingrun-detail',
+    )
+    
+    class Meta:
+        model = BillingRun
+        fields = ['id', 'url', 'display', 'period', 'generated', 'line_count', 'resource_days', 'duration']
+        brief_fields = ['id', 'url', 'display', 'period']
+
+
+class BillingLineSerializer(BaseModelSerializer):
+    """计费明细序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:billingline-detail',
+    )
+    
+    run = BillingRunSerializer(nested=True, read_only=True)
+    tenant = TenantSerializer(nested=True, read_only=True)
+    service_order = ServiceOrderSerializer(nested=True, read_only=True)
+    
+    class Meta:
+        model = BillingLine
+        fields = [
+            'id', 'url', 'display', 'run', 'tenant', 'service_order', 'ledger', 'resource_type', 'resource_id',
+            'start_date', 'end_date', 'days',
+        ]
+        brief_fields = ['id', 'url', 'display', 'resource_id', 'days']
+
+
+class ResourceLedgerHistorySerializer(BaseModelSerializer):
+    """资源台账历史版本序列化器（只读）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:resourceledgerhistory-detail',
+    )
+    
+    valid_from = serializers.DateTimeField(source='valid.lower', read_only=True)
+    valid_to = serializers.DateTimeField(source='valid.upper', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = ResourceLedgerHistory
+        fields = [
+            'id', 'url', 'display', 'ledger', 'service_order', 'resource_type', 'resource_id', 'resource_name',
+            'lifecycle_status', 'snapshot', 'valid_from', 'valid_to',
+        ]
+        brief_fields = ['id', 'url', 'display', 'resource_id', 'valid_from', 'valid_to']
+
+
+class JSONRevisionSerializer(BaseModelSerializer):
+    """JSON 字段版本序列化器（只读，data 为完整内容或 JSON Patch，完整内容见 document/）"""
+    
+    url = serializers.HyperlinkedIdentityField(
+        view_name='plugins-api:netbox_rms-api:jsonrevision-detail',
+    )
+    
+    class Meta:
+        model = JSONRevision
+        fields = [
+            'id', 'url', 'display', 'object_type', 'object_id', 'field', 'version', 'base', 'checkpoint',
+            'data', 'created',
+        ]
+        brief_fields = ['id', 'url', 'display', 'object_type', 'object_id', 'field', 'version']
@@ -1,6 +1,8 @@
 """
 NetBox RMS REST API URL 路由
 """
+from django.urls import path
+
 from netbox.api.routers import NetBoxRouter
 
 from . import views
@@ -12,5 +14,29 @@ router.register('service-orders', views.ServiceOrderViewSet)
 router.register('tasks', views.TaskDetailViewSet)
 router.register('resources', views.ResourceLedgerViewSet)
 router.register('check-results', views.ResourceCheckResultViewSet)
+router.register('task-transitions', views.TaskTransitionViewSet)
+router.register('demand-forecasts', views.DemandForecastViewSet)
+router.register('core-inventory', views.CableCoreInventoryViewSet)
+router.register('port-assignments', views.PortAssignmentViewSet)
+router.register('circuits', views.TransmissionCircuitViewSet)
+router.register('colocation-devices', views.ColocationDeviceViewSet)
+router.register('outbound-events', views.OutboundEventViewSet)
+router.register('billing-runs', views.BillingRunViewSet)
+router.register('billing-lines', views.BillingLineViewSet)
+router.register('resource-history', views.ResourceLedgerHistoryViewSet)
+router.register('revisions', views.JSONRevisionViewSet)
 
-urlpatterns = router.urls
+# 自定义路由需在 router.urls 之前，避免被 tasks/<pk>/ 匹配
+urlpatterns = [
+    path('tasks/bulk-transition/', views.TaskBulkTransitionView.as_view(), name='taskdetail-bulk-transition'),
+    path('service-orders/validate/', views.OrderValidationView.as_view(), name='serviceorder-validate'),
+    path('service-orders/change-orders/', views.ChangeOrderCreateView.as_view(), name='serviceorder-change-orders'),
+    path('service-orders/clone/', views.OrderCloneView.as_view(), name='serviceorder-clone'),
+    path('service-orders/import/', views.OrderImportView.as_view(), name='serviceorder-import'),
+] + router.urls + [
+    path('analytics/cycle-times/', views.CycleTimeAnalyticsView.as_view(), name='analytics-cycle-times'),
+    path('analytics/demand-matrix/', views.DemandMatrixAPIView.as_view(), name='analytics-demand-matrix'),
+    path('analytics/colocation-capacity/', views.ColocationCapacityAPIView.as_view(), name='analytics-colocation-capacity'),
+    path('routing/paths/', views.RouteFinderView.as_view(), name='routing-paths'),
+    path('routing/wavelength/', views.WavelengthAssignmentView.as_view(), name='routing-wavelength'),
+]
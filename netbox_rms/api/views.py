@@ -1,13 +1,43 @@
 """
 NetBox RMS REST API 视图集
 """
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError
 from django.db.models import Count
+from django.utils.translation import gettext_lazy as _
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from netbox.api.viewsets import NetBoxModelViewSet
+from core.api.serializers import JobSerializer
+from netbox.api.viewsets import NetBoxModelViewSet, NetBoxReadOnlyModelViewSet
 
-from ..models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult
-from ..filtersets import ServiceOrderFilterSet, TaskDetailFilterSet, ResourceLedgerFilterSet, ResourceCheckResultFilterSet
-from .serializers import ServiceOrderSerializer, TaskDetailSerializer, ResourceLedgerSerializer, ResourceCheckResultSerializer
+from .. import (
+    analytics, changeorders, cloning, colocation, demand, fibercores, planner, revisions, routing, schemas, validation,
+    wavelength, workflow,
+)
+from ..jobs import BulkTransitionJob, ChangeOrderJob, CloneOrdersJob, OrderImportJob
+from ..models import (
+    ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TaskTransition, DemandForecast, CableCoreInventory,
+    PortAssignment, TransmissionCircuit, ColocationDevice, OutboundEvent, BillingRun, BillingLine,
+    ResourceLedgerHistory, JSONRevision,
+)
+from ..filtersets import (
+    ServiceOrderFilterSet, TaskDetailFilterSet, ResourceLedgerFilterSet, ResourceCheckResultFilterSet,
+    TaskTransitionFilterSet, DemandForecastFilterSet, CableCoreInventoryFilterSet,
+    PortAssignmentFilterSet, TransmissionCircuitFilterSet, ColocationDeviceFilterSet, OutboundEventFilterSet,
+    BillingRunFilterSet, BillingLineFilterSet, ResourceLedgerHistoryFilterSet, JSONRevisionFilterSet,
+)
+from .serializers import (
+    ServiceOrderSerializer, TaskDetailSerializer, ResourceLedgerSerializer, ResourceCheckResultSerializer,
+    TaskTransitionSerializer, TaskBulkTransitionSerializer, DemandForecastSerializer, CableCoreInventorySerializer,
+    PortAssignmentSerializer, TransmissionCircuitSerializer, ColocationDeviceSerializer, OrderValidationSerializer,
+    ChangeOrderCreateSerializer, OrderCloneSerializer, OrderImportSerializer, OutboundEventSerializer,
+    BillingRunSerializer, BillingLineSerializer, ResourceLedgerHistorySerializer, JSONRevisionSerializer,
+)
 
 
 class ServiceOrderViewSet(NetBoxModelViewSet):
@@ -19,6 +49,15 @@ class ServiceOrderViewSet(NetBoxModelViewSet):
     ).prefetch_related('tags')
     serializer_class = ServiceOrderSerializer
     filterset_class = ServiceOrderFilterSet
+    
+    @action(detail=True, methods=['get'], url_path='rack-plan')
+    def rack_plan(self, request, pk=None):
+        """托管工单机柜规划：上架方案或不具备原因"""
+        order = self.get_object()
+        result = planner.plan_order(order)
+        if result is None:
+            raise ValidationError(_('仅适用于已填写托管设备的托管业务工单'))
+        return Response(result)
 
 
 class TaskDetailViewSet(NetBoxModelViewSet):
@@ -35,6 +74,12 @@ class ResourceLedgerViewSet(NetBoxModelViewSet):
     queryset = ResourceLedger.objects.select_related('service_order').prefetch_related('tags')
     serializer_class = ResourceLedgerSerializer
     filterset_class = ResourceLedgerFilterSet
+    
+    def filter_queryset(self, queryset):
+        # 过滤器默认只保留在用资源，仅用于列表；已拆除的台账仍可按 ID 访问和修改
+        if self.action != 'list':
+            return queryset
+        return super().filter_queryset(queryset)
 
 
 class ResourceCheckResultViewSet(NetBoxModelViewSet):
@@ -43,3 +88,507 @@ class ResourceCheckResultViewSet(NetBoxModelViewSet):
     queryset = ResourceCheckResult.objects.select_related('service_order').prefetch_related('tags')
     serializer_class = ResourceCheckResultSerializer
     filterset_class = ResourceCheckResultFilterSet
+
+
+class TaskTransitionViewSet(NetBoxReadOnlyModelViewSet):
+    """执行任务状态变更记录 API 视图集（只读）"""
+    
+    queryset = TaskTransition.objects.select_related('task__service_order', 'user')
+    serializer_class = TaskTransitionSerializer
+    filterset_class = TaskTransitionFilterSet
+
+
+class DemandForecastViewSet(NetBoxReadOnlyModelViewSet):
+    """需求预测 API 视图集（只读，由后台任务每日重建）"""
+    
+    queryset = DemandForecast.objects.select_related('site')
+    serializer_class = DemandForecastSerializer
+    filterset_class = DemandForecastFilterSet
+
+
+class CableCoreInventoryViewSet(NetBoxReadOnlyModelViewSet):
+    """光缆纤芯占用 API 视图集（只读，随光缆光纤任务完成自动维护）"""
+    
+    queryset = CableCoreInventory.objects.select_related('cable', 'site_a', 'site_z')
+    serializer_class = CableCoreInventorySerializer
+    filterset_class = CableCoreInventoryFilterSet
+    
+    @action(detail=False, methods=['get'], url_path='available')
+    def available(self, request):
+        """
+        A、Z 站点间空闲芯数不少于 count 的光缆（空闲芯数最少者优先）
+        
+        查询参数：site_a_id、site_z_id、count（默认 1）
+        """
+        try:
+            site_a_id = int(request.query_params['site_a_id'])
+            site_z_id = int(request.query_params['site_z_id'])
+            count = int(request.query_params.get('count', 1))
+        except KeyError as e:
+            raise ValidationError({e.args[0]: '必填参数'})
+        except ValueError:
+            raise ValidationError('site_a_id、site_z_id、count 必须为整数')
+        queryset = fibercores.pair_inventory(site_a_id, site_z_id).restrict(request.user, 'view').filter(
+            free_count__gte=count,
+        ).select_related('cable', 'site_a', 'site_z').order_by('free_count', 'pk')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class TransmissionCircuitViewSet(NetBoxModelViewSet):
+    """
+    传输电路 API 视图集
+    
+    支持批量创建（POST 列表）、批量更新（PUT/PATCH 列表）和批量删除，
+    修改的电路在同一事务内回写任务执行反馈；同一请求内的电路端口互相冲突时整个请求回滚。
+    """
+    
+    queryset = TransmissionCircuit.objects.select_related('task', 'service_order').prefetch_related('tags')
+    serializer_class = TransmissionCircuitSerializer
+    filterset_class = TransmissionCircuitFilterSet
+    
+    def _port_conflict(self, operation, *args):
+        try:
+            return operation(*args)
+        except IntegrityError:
+            raise ValidationError({'port': _('电路端口已被其他有效电路占用')})
+    
+    def perform_create(self, serializer):
+        return self._port_conflict(super().perform_create, serializer)
+    
+    def perform_update(self, serializer):
+        return self._port_conflict(super().perform_update, serializer)
+    
+    def perform_destroy(self, instance):
+        return self._port_conflict(super().perform_destroy, instance)
+
+
+class PortAssignmentViewSet(NetBoxReadOnlyModelViewSet):
+    """端口占用 API 视图集（只读，随执行反馈自动维护）"""
+    
+    queryset = PortAssignment.objects.select_related('task', 'service_order')
+    serializer_class = PortAssignmentSerializer
+    filterset_class = PortAssignmentFilterSet
+
+
+class ColocationDeviceViewSet(NetBoxReadOnlyModelViewSet):
+    """托管设备 API 视图集（只读，随工单核查信息和执行反馈自动维护）"""
+    
+    queryset = ColocationDevice.objects.select_related('service_order', 'task', 'site')
+    serializer_class = ColocationDeviceSerializer
+    filterset_class = ColocationDeviceFilterSet
+
+
+class OutboundEventViewSet(NetBoxReadOnlyModelViewSet):
+    """外发事件 API 视图集（只读，由状态变化事件写入、后台任务投递）"""
+    
+    queryset = OutboundEvent.objects.all()
+    serializer_class = OutboundEventSerializer
+    filterset_class = OutboundEventFilterSet
+
+
+class BillingRunViewSet(NetBoxReadOnlyModelViewSet):
+    """计费批次 API 视图集（只读，由计费计算生成）"""
+    
+    queryset = BillingRun.objects.all()
+    serializer_class = BillingRunSerializer
+    filterset_class = BillingRunFilterSet
+
+
+class BillingLineViewSet(NetBoxReadOnlyModelViewSet):
+    """计费明细 API 视图集（只读，由计费计算生成）"""
+    
+    queryset = BillingLine.objects.select_related('run', 'tenant', 'service_order')
+    serializer_class = BillingLineSerializer
+    filterset_class = BillingLineFilterSet
+
+
+class ResourceLedgerHistoryViewSet(NetBoxReadOnlyModelViewSet):
+    """资源台账历史版本 API 视图集（只读，台账保存时写入；?as_of= 查询时间点的台账）"""
+    
+    queryset = ResourceLedgerHistory.objects.all()
+    serializer_class = ResourceLedgerHistorySerializer
+    filterset_class = ResourceLedgerHistoryFilterSet
+
+
+class JSONRevisionViewSet(NetBoxReadOnlyModelViewSet):
+    """资源快照、执行反馈版本 API 视图集（只读，保存时写入）"""
+    
+    queryset = JSONRevision.objects.all()
+    serializer_class = JSONRevisionSerializer
+    filterset_class = JSONRevisionFilterSet
+    
+    @action(detail=True, methods=['get'], url_path='document')
+    def document(self, request, pk=None):
+        """重建该版本的完整内容"""
+        revision = self.get_object()
+        try:
+            document = revisions.reconstruct(revision)
+        except revisions.PatchError as e:
+            raise ValidationError(_('版本 %(version)s 无法重建：%(error)s') % {'version': revision.version, 'error': e})
+        return Response({
+            'object_type': revision.object_type,
+            'object_id': revision.object_id,
+            'field': revision.field,
+            'version': revision.version,
+            'created': revision.created,
+            'document': document,
+        })
+
+
+class TaskBulkTransitionView(APIView):
+    """
+    批量流转执行任务状态
+    
+    请求体：{"tasks": [1, 2, 3], "status": "completed", "comment": "..."}
+    任务数不超过 SYNC_LIMIT 时所有任务在一个事务内校验并流转，任一任务不允许流转则整体拒绝；
+    否则提交后台任务（按批流转，不允许流转的任务记入任务数据）并返回任务（202）。
+    """
+    
+    SYNC_LIMIT = 500
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '批量状态流转'
+    
+    def post(self, request):
+        if not request.user.has_perm('netbox_rms.change_taskdetail'):
+            raise PermissionDenied()
+        serializer = TaskBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        task_ids = set(data['tasks'])
+        tasks = list(
+            TaskDetail.objects.restrict(request.user, 'change').filter(pk__in=task_ids).select_related('service_order')
+        )
+        missing = task_ids - {task.pk for task in tasks}
+        if missing:
+            raise ValidationError({'tasks': f'任务不存在或无权修改：{sorted(missing)}'})
+        
+        if len(tasks) > self.SYNC_LIMIT:
+            job = BulkTransitionJob.enqueue(
+                user=request.user,
+                tasks=sorted(task_ids),
+                status=data['status'],
+                comment=data['comment'],
+            )
+            return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+        
+        try:
+            changed = workflow.bulk_transition(tasks, data['status'], user=request.user, comment=data['comment'])
+        except workflow.TransitionError as e:
+            raise ValidationError(e.message_dict)
+        
+        return Response({
+            'status': data['status'],
+            'requested': len(tasks),
+            'changed': [task.pk for task in changed],
+        })
+
+
+class OrderImportView(APIView):
+    """
+    批量导入工单
+
+    请求体：{"rows": [{"order_no": "...", "tenant": "...", "apply_date": "...", ...}]}
+    提交后台任务并返回任务（202）；任务按批写入，单号已存在的行跳过，逐行错误写入任务数据。
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '工单批量导入'
+    
+    def post(self, request):
+        if not request.user.has_perm('netbox_rms.add_serviceorder'):
+            raise PermissionDenied()
+        serializer = OrderImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        job = OrderImportJob.enqueue(user=request.user, rows=serializer.validated_data['rows'])
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ChangeOrderCreateView(APIView):
+    """
+    按原单生成变更单
+    
+    请求体：{"parents": [1, 2, 3], "deadline_date": "2026-12-31", "apply_date": "...", "check_data": {...}}
+    原单数不超过 SYNC_LIMIT 时直接生成并返回变更单，否则提交后台任务并返回任务（202）。
+    """
+    
+    SYNC_LIMIT = 50
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '生成变更单'
+    
+    def post(self, request):
+        if not request.user.has_perm('netbox_rms.add_serviceorder'):
+            raise PermissionDenied()
+        serializer = ChangeOrderCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        parent_ids = set(data['parents'])
+        parents = list(ServiceOrder.objects.restrict(request.user, 'view').filter(pk__in=parent_ids).order_by('pk'))
+        missing = parent_ids - {order.pk for order in parents}
+        if missing:
+            raise ValidationError({'parents': f'原单不存在或无权查看：{sorted(missing)}'})
+        
+        # 覆盖的键按各原单核查类别的数据格式校验
+        messages = {
+            message
+            for check_type in {order.check_type for order in parents}
+            for message in schemas.check_data_errors(check_type, data['check_data'])
+        }
+        if messages:
+            raise ValidationError({'check_data': sorted(messages)})
+        
+        if len(parents) > self.SYNC_LIMIT:
+            job = ChangeOrderJob.enqueue(
+                user=request.user,
+                parents=[order.pk for order in parents],
+                apply_date=data['apply_date'],
+                deadline_date=data['deadline_date'],
+                check_data=data['check_data'] or None,
+            )
+            return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+        
+        orders = changeorders.create_change_orders(
+            parents,
+            apply_date=data['apply_date'],
+            deadline_date=data['deadline_date'],
+            check_data=data['check_data'] or None,
+            user=request.user,
+        )
+        return Response(
+            ServiceOrderSerializer(orders, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class OrderCloneView(APIView):
+    """
+    批量复制工单（合同续约）
+    
+    请求体：{"filters": {...} 或 "orders": [...], "deadline_date": "...", "include_tasks": true, ...}
+    提交后台任务并返回任务（202），复制进度见任务 data。
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '批量复制工单'
+    
+    def post(self, request):
+        serializer = OrderCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        permissions = ['netbox_rms.add_serviceorder']
+        if data['include_tasks']:
+            permissions.append('netbox_rms.add_taskdetail')
+        if data['include_check_results']:
+            permissions.append('netbox_rms.add_resourcecheckresult')
+        if not request.user.has_perms(permissions):
+            raise PermissionDenied()
+        
+        count = cloning.filter_orders(data['filters'], user=request.user).count()
+        if not count:
+            raise ValidationError({'filters': '没有符合条件的工单'})
+        
+        job = CloneOrdersJob.enqueue(user=request.user, **data)
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class OrderValidationView(APIView):
+    """
+    外部资源校验
+    
+    请求体：{"orders": [1, 2, 3]}
+    工单核查信息并发提交外部系统校验，已缓存的答复直接返回。
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '外部资源校验'
+    
+    def post(self, request):
+        if not request.user.has_perm('netbox_rms.view_serviceorder'):
+            raise PermissionDenied()
+        if not validation.enabled():
+            raise ValidationError(_('未开启外部资源校验 (enable_external_resource_validation)'))
+        serializer = OrderValidationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        order_ids = set(serializer.validated_data['orders'])
+        orders = list(
+            ServiceOrder.objects.restrict(request.user, 'view').filter(pk__in=order_ids).only(
+                'pk', 'order_no', 'check_type', 'check_data',
+            )
+        )
+        missing = order_ids - {order.pk for order in orders}
+        if missing:
+            raise ValidationError({'orders': f'工单不存在或无权查看：{sorted(missing)}'})
+        
+        results = validation.validate_orders(orders)
+        return Response({
+            'requested': len(orders),
+            'invalid': sum(1 for result in results.values() if result['valid'] is False),
+            'failed': sum(1 for result in results.values() if result['valid'] is None),
+            'results': [{'order': pk, **result} for pk, result in sorted(results.items())],
+        })
+
+
+# =============================================================================
+# 统计分析
+# =============================================================================
+
+def parse_percentiles(value: str) -> tuple:
+    """解析 percentiles 查询参数，如 "50,90,99" """
+    try:
+        percentiles = tuple(int(p) for p in value.split(',') if p.strip())
+    except ValueError:
+        raise ValidationError({'percentiles': '必须为逗号分隔的整数'})
+    if not percentiles or any(not 0 < p < 100 for p in percentiles):
+        raise ValidationError({'percentiles': '百分位必须在 1 到 99 之间'})
+    return percentiles
+
+
+class CycleTimeAnalyticsView(APIView):
+    """
+    业务周期分位数统计
+
+    按执行部门和核查业务类别分组，统计申请到核查结果、任务完成、起租的天数分位数。
+    支持 TaskDetail 过滤参数（如 task_type、apply_date_after），以及 percentiles=50,90,99。
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '业务周期统计'
+    
+    def get(self, request):
+        percentiles = parse_percentiles(request.query_params.get('percentiles', '50,90,99'))
+        queryset = TaskDetail.objects.restrict(request.user, 'view')
+        filterset = TaskDetailFilterSet(request.query_params, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        
+        return Response({
+            'percentiles': percentiles,
+            'unit': 'days',
+            'results': analytics.cycle_time_stats(filterset.qs, percentiles=percentiles),
+        })
+
+
+class DemandMatrixAPIView(APIView):
+    """
+    A-Z 站点对需求矩阵（稀疏）
+    
+    支持 ServiceOrder 过滤参数（如 apply_date_after、tenant_id、check_type），结果按过滤条件缓存。
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '站点对需求矩阵'
+    
+    def get(self, request):
+        if not request.user.has_perm('netbox_rms.view_serviceorder'):
+            raise PermissionDenied()
+        try:
+            matrix = demand.cached_demand_matrix(request.user, request.query_params)
+        except DjangoValidationError as e:
+            raise ValidationError(e.message_dict if hasattr(e, 'error_dict') else e.messages)
+        return Response(matrix)
+
+
+class ColocationCapacityAPIView(APIView):
+    """
+    各机房托管设备汇总（申请 / 在架的 U 数、功率、设备数及机柜总 U 数）
+    
+    查询参数：site_id（可多个）
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '托管容量汇总'
+    
+    def get(self, request):
+        if not request.user.has_perm('netbox_rms.view_colocationdevice'):
+            raise PermissionDenied()
+        try:
+            site_ids = [int(value) for value in request.query_params.getlist('site_id')]
+        except ValueError:
+            raise ValidationError({'site_id': '必须为整数'})
+        queryset = ColocationDevice.objects.restrict(request.user, 'view')
+        return Response(colocation.site_capacity(queryset, site_ids))
+
+
+class RouteFinderView(APIView):
+    """
+    站点间 K 条最短路由
+    
+    查询参数：site_a_id、site_z_id（必填），k（默认 3，最大 10）
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '路由计算'
+    
+    def get(self, request):
+        if not request.user.has_perm('dcim.view_cable'):
+            raise PermissionDenied()
+        try:
+            site_a_id = int(request.query_params['site_a_id'])
+            site_z_id = int(request.query_params['site_z_id'])
+            k = int(request.query_params.get('k', routing.DEFAULT_K))
+        except KeyError as e:
+            raise ValidationError({e.args[0]: '必填参数'})
+        except ValueError:
+            raise ValidationError('site_a_id、site_z_id、k 必须为整数')
+        if not 1 <= k <= 10:
+            raise ValidationError({'k': 'k 必须在 1 到 10 之间'})
+        return Response({
+            'site_a_id': site_a_id,
+            'site_z_id': site_z_id,
+            'routes': routing.find_routes(site_a_id, site_z_id, k),
+        })
+
+
+class WavelengthAssignmentView(APIView):
+    """
+    波道分配
+    
+    查询参数：site_a_id、site_z_id、bandwidth（必填），strategy（first_fit / most_used，默认 first_fit）
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def get_view_name(self) -> str:
+        return '波道分配'
+    
+    def get(self, request):
+        if not request.user.has_perm('dcim.view_cable'):
+            raise PermissionDenied()
+        try:
+            site_a_id = int(request.query_params['site_a_id'])
+            site_z_id = int(request.query_params['site_z_id'])
+            bandwidth = request.query_params['bandwidth']
+        except KeyError as e:
+            raise ValidationError({e.args[0]: '必填参数'})
+        except ValueError:
+            raise ValidationError('site_a_id、site_z_id 必须为整数')
+        strategy = request.query_params.get('strategy', wavelength.FIRST_FIT)
+        if strategy not in wavelength.STRATEGIES:
+            raise ValidationError({'strategy': f"可选值：{'、'.join(wavelength.STRATEGIES)}"})
+        return Response(wavelength.assign(site_a_id, site_z_id, bandwidth, strategy))
@@ -0,0 +1,284 @@
+"""
+NetBox RMS 计费
+
+按计费月计算各客户的资源计费天数，明细写入 BillingLine：
+
+- 计费工单：确认执行状态为“执行（计费）”且已填写起租日期的工单，自起租日期起计费；
+- 计费资源：工单的资源台账，每条台账一条明细；无资源台账的工单按工单本身计费；
+- 变更接续：变更单（同为计费工单）的变更涉及资源自变更单起租日期起改由变更单计费，
+  原单（或前一张变更单）对该资源的计费到前一天为止；
+- 停闭：已完成 / 已确认的停闭任务完成当天起，其所在谱系（原单及各级变更单）的资源停止计费，
+  资源在谱系内各计费工单的区间均截止到该日（资源可能已由变更单接续计费）。
+
+计费区间均为左闭右开 [开始, 结束)，计费天数 = 区间与计费月的交集天数。
+
+计算按列批量读取（工单、停闭任务、台账、变更涉及资源各一次 values_list 查询，谱系按层读取上级工单），
+日期转换为序数后按资源逐条求区间交集，不逐个加载模型实例；明细批量写入。
+"""
+import csv
+import datetime
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .choices import ConfirmationStatusChoices, ExecutionStatusChoices, TaskTypeChoices
+
+DONE_STATUSES = (ExecutionStatusChoices.COMPLETED, ExecutionStatusChoices.CONFIRMED)
+
+# 导出列
+EXPORT_FIELDS = (
+    ('tenant__name', '客户单位'),
+    ('service_order__order_no', '计费工单'),
+    ('service_order__contract_code', '合同编号'),
+    ('resource_type', '资源类型'),
+    ('resource_id', '资源标识'),
+    ('start_date', '计费开始'),
+    ('end_date', '计费结束'),
+    ('days', '计费天数'),
+)
+
+
+def month_bounds(period: datetime.date) -> Tuple[datetime.date, datetime.date]:
+    """计费月的 [第一天, 下月第一天)"""
+    start = period.replace(day=1)
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+# =============================================================================
+# 计算
+# =============================================================================
+
+def lineage_roots(parents: Dict[int, Optional[int]], order_ids: Iterable[int]) -> Dict[int, int]:
+    """工单 -> 所在谱系最初的原单（与 changeorders.lineage 一致）；parents 为 {工单: 上级工单}"""
+    roots = {}
+    for order_id in order_ids:
+        root, seen = order_id, {order_id}
+        while parents.get(root) and parents[root] not in seen:
+            root = parents[root]
+            seen.add(root)
+        roots[order_id] = root
+    return roots
+
+
+def lineage_stops(roots: Dict[int, int], deactivations: Dict[int, int], order_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    工单停止计费日：所在谱系内最早的停闭日
+
+    Args:
+        roots: lineage_roots() 的结果，须包含 order_ids 和 deactivations 中的工单
+        deactivations: {工单: 停闭日}
+    """
+    root_stops: Dict[int, int] = {}
+    for order_id, day in deactivations.items():
+        root = roots[order_id]
+        root_stops[root] = min(root_stops.get(root, day), day)
+    return {
+        order_id: root_stops[roots[order_id]]
+        for order_id in order_ids
+        if roots[order_id] in root_stops
+    }
+
+
+def holder_intervals(starts: Dict[int, int], stops: Dict[int, int], month_start: int,
+                     month_end: int) -> List[Tuple[int, int, int]]:
+    """
+    一个资源在各计费工单的计费区间
+
+    按计费工单起租日期排序，前一工单计费到后一工单起租为止；资源在各计费工单之间转移，
+    停止计费日取各计费工单中最早的一个，截断每个区间。
+
+    Args:
+        starts: {计费工单: 起租日}
+        stops: {工单: 停止计费日}
+
+    Returns:
+        [(计费工单, 开始, 结束)]，均为序数，已截取到计费月，不含空区间
+    """
+    timeline = sorted((start, order_id) for order_id, start in starts.items())
+    stop = min((stops.get(order_id, month_end) for order_id in starts), default=month_end)
+    intervals = []
+    for index, (start, order_id) in enumerate(timeline):
+        end = timeline[index + 1][0] if index + 1 < len(timeline) else month_end
+        start, end = max(start, month_start), min(end, month_end, stop)
+        if end > start:
+            intervals.append((order_id, start, end))
+    return intervals
+
+
+def _parents(order_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+    """工单及其各级上级工单的 {工单: 上级工单}（按层批量读取）"""
+    from .models import ServiceOrder
+
+    parents: Dict[int, Optional[int]] = {}
+    pending = set(order_ids)
+    while pending:
+        parents.update(ServiceOrder.objects.filter(pk__in=pending).values_list('pk', 'parent_order_id'))
+        pending = {parent_id for parent_id in parents.values() if parent_id and parent_id not in parents} - pending
+    return parents
+
+
+def _stop_dates(order_ids: List[int], month_end: int) -> Dict[int, int]:
+    """工单停止计费日（序数）：所在谱系内最早完成的停闭任务（计费月之后的停闭不影响本月）"""
+    from .models import TaskDetail
+
+    before = timezone.make_aware(datetime.datetime.combine(datetime.date.fromordinal(month_end), datetime.time.min))
+    deactivations: Dict[int, int] = {}
+    tasks = TaskDetail.objects.filter(
+        task_type=TaskTypeChoices.DEACTIVATION,
+        execution_status__in=DONE_STATUSES,
+        completed_at__lt=before,
+    ).values_list('service_order_id', 'completed_at')
+    for order_id, completed_at in tasks:
+        day = timezone.localdate(completed_at).toordinal()
+        deactivations[order_id] = min(deactivations.get(order_id, day), day)
+    if not deactivations:
+        return {}
+
+    related = set(order_ids) | set(deactivations)
+    return lineage_stops(lineage_roots(_parents(related), related), deactivations, order_ids)
+
+
+def compute(period: datetime.date) -> List[Tuple]:
+    """
+    计算计费月明细
+
+    Returns:
+        [(tenant_id, service_order_id, ledger_id, resource_type, resource_id, start_date, end_date, days)]
+    """
+    from .models import ResourceLedger, ServiceOrder
+
+    month_start, month_end = (day.toordinal() for day in month_bounds(period))
+
+    # 工单：(pk, tenant_id, order_no, billing_start_date)
+    orders = {
+        pk: (tenant_id, order_no, billing_start.toordinal())
+        for pk, tenant_id, order_no, billing_start in ServiceOrder.objects.filter(
+            confirmation_status=ConfirmationStatusChoices.EXECUTION_BILLING,
+            billing_start_date__isnull=False,
+            billing_start_date__lt=datetime.date.fromordinal(month_end),
+        ).values_list('pk', 'tenant_id', 'order_no', 'billing_start_date').iterator(chunk_size=5000)
+    }
+    order_ids = list(orders)
+    stops = _stop_dates(order_ids, month_end)
+
+    # 资源的计费工单：台账所属工单及引用该台账的变更单
+    holders: Dict[int, List[int]] = defaultdict(list)
+    resources: Dict[int, Tuple[str, str]] = {}
+    for pk, order_id, resource_type, resource_id in ResourceLedger.objects.filter(
+        service_order__in=order_ids,
+    ).values_list('pk', 'service_order_id', 'resource_type', 'resource_id').iterator(chunk_size=5000):
+        holders[pk].append(order_id)
+        resources[pk] = (resource_type, resource_id)
+    through = ServiceOrder.change_resources.through
+    changes = list(through.objects.filter(serviceorder__in=order_ids).values_list('resourceledger_id', 'serviceorder_id'))
+    missing = {ledger_id for ledger_id, _order_id in changes if ledger_id not in resources}
+    for pk, resource_type, resource_id in ResourceLedger.objects.filter(pk__in=missing).values_list(
+        'pk', 'resource_type', 'resource_id',
+    ):
+        resources[pk] = (resource_type, resource_id)
+    for ledger_id, order_id in changes:
+        holders[ledger_id].append(order_id)
+    with_resources = {order_id for holder_ids in holders.values() for order_id in holder_ids}
+
+    lines = []
+
+    def add(ledger_id: Optional[int], resource_type: str, resource_id: str, starts: Dict[int, int]) -> None:
+        for order_id, start, end in holder_intervals(starts, stops, month_start, month_end):
+            lines.append((
+                orders[order_id][0], order_id, ledger_id, resource_type, resource_id,
+                datetime.date.fromordinal(start), datetime.date.fromordinal(end), end - start,
+            ))
+
+    for ledger_id, holder_ids in holders.items():
+        resource_type, resource_id = resources[ledger_id]
+        add(ledger_id, resource_type, resource_id, {order_id: orders[order_id][2] for order_id in holder_ids})
+
+    for order_id, (_tenant_id, order_no, start) in orders.items():
+        if order_id not in with_resources:
+            add(None, '', order_no, {order_id: start})
+    return lines
+
+
+def run_billing(period: datetime.date, batch_size: int = 5000):
+    """
+    计算并保存计费月明细（替换该月已有明细）
+
+    Returns:
+        BillingRun
+    """
+    from .models import BillingLine, BillingRun
+
+    started = time.monotonic()
+    period = month_bounds(period)[0]
+    lines = compute(period)
+    with transaction.atomic():
+        run, _created = BillingRun.objects.select_for_update().get_or_create(period=period)
+        run.lines.all().delete()
+        BillingLine.objects.bulk_create(
+            [
+                BillingLine(
+                    run=run,
+                    tenant_id=tenant_id,
+                    service_order_id=order_id,
+                    ledger_id=ledger_id,
+                    resource_type=resource_type,
+                    resource_id=resource_id,
+                    start_date=start,
+                    end_date=end,
+                    days=days,
+                )
+                for tenant_id, order_id, ledger_id, resource_type, resource_id, start, end, days in lines
+            ],
+            batch_size=batch_size,
+        )
+        run.line_count = len(lines)
+        run.resource_days = sum(line[-1] for line in lines)
+        run.duration = round(time.monotonic() - started, 3)
+        run.save()
+    return run
+
+
+# =============================================================================
+# 导出
+# =============================================================================
+
+class _Echo:
+    """csv.writer 的伪文件：write 直接返回写入的行"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_rows(run, queryset=None) -> Iterator[str]:
+    """
+    逐行生成计费明细 CSV（供 StreamingHttpResponse 使用），首行带 BOM 以便 Excel 识别 UTF-8
+
+    Args:
+        run: BillingRun
+        queryset: BillingLine 查询集（可先按权限限制），默认该批次全部明细
+    """
+    from .models import BillingLine
+
+    queryset = BillingLine.objects.all() if queryset is None else queryset
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow([label for _field, label in EXPORT_FIELDS])
+    rows = queryset.filter(run=run).order_by(
+        'tenant__name', 'service_order__order_no', 'resource_id', 'start_date',
+    ).values_list(*(field for field, _label in EXPORT_FIELDS))
+    for row in rows.iterator(chunk_size=5000):
+        yield writer.writerow(row)
+
+
+def tenant_totals(run) -> List[Dict[str, Any]]:
+    """各客户的资源数与计费天数"""
+    return list(
+        run.lines.values('tenant_id', 'tenant__name').annotate(
+            resources=Count('pk'),
+            days=Sum('days'),
+        ).order_by('tenant__name')
+    )
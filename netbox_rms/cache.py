@@ -0,0 +1,131 @@
+"""
+NetBox RMS 缓存工具
+
+基于命名空间版本号的缓存：每个命名空间维护一个版本号，缓存键包含该版本号。
+数据变更时只需递增版本号，旧键即自然失效，无需逐个删除。
+"""
+import hashlib
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.core.cache import cache
+
+from netbox.plugins import get_plugin_config
+
+CACHE_PREFIX = 'netbox_rms'
+
+# 命名空间
+NAMESPACE_TASKS = 'tasks'
+NAMESPACE_ORDERS = 'orders'
+NAMESPACE_CHECK_RESULTS = 'check_results'
+NAMESPACE_LEDGER = 'ledger'
+NAMESPACE_TOPOLOGY = 'topology'
+NAMESPACE_POWER = 'power'
+NAMESPACE_VALIDATION = 'validation'
+
+
+def _version_key(namespace: str) -> str:
+    return f'{CACHE_PREFIX}:{namespace}:version'
+
+
+def get_namespace_version(namespace: str) -> int:
+    """获取命名空间当前版本号（不存在时以时间戳初始化，避免与被淘汰前的旧版本号冲突）"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_namespace(*namespaces: str) -> None:
+    """递增命名空间版本号，使其下所有缓存失效"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def make_key(namespaces: Iterable[str], *parts: Any) -> str:
+    """
+    生成缓存键
+
+    Args:
+        namespaces: 缓存依赖的命名空间，任一命名空间失效都会使该键失效
+        parts: 参与区分缓存的其他参数（需可 repr）
+    """
+    return _make_key(_versions(namespaces), parts)
+
+
+def _versions(namespaces: Iterable[str]) -> str:
+    return ':'.join(f'{ns}.{get_namespace_version(ns)}' for ns in namespaces)
+
+
+def _make_key(versions: str, parts: tuple) -> str:
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return f'{CACHE_PREFIX}:{versions}:{digest}'
+
+
+def get_or_compute(
+    namespaces: Iterable[str],
+    parts: Iterable[Any],
+    compute: Callable[[], Any],
+    timeout: Optional[int] = None,
+) -> Any:
+    """
+    从缓存读取，未命中时调用 compute() 计算并写入缓存
+
+    Args:
+        namespaces: 缓存依赖的命名空间
+        parts: 参与区分缓存的其他参数
+        compute: 计算函数
+        timeout: 过期时间（秒），默认读取插件配置 cache_timeout
+    """
+    key = make_key(namespaces, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            timeout = get_plugin_config('netbox_rms', 'cache_timeout')
+        cache.set(key, value, timeout)
+    return value
+
+
+def get_many_or_compute(
+    namespaces: Iterable[str],
+    prefix: str,
+    keys: Iterable[Any],
+    compute: Callable[[list], Dict[Any, Any]],
+    timeout: Optional[int] = None,
+) -> Dict[Any, Any]:
+    """
+    按键批量读取缓存，未命中的键一次性调用 compute(未命中键列表) 计算并写入
+
+    命名空间版本号只读取一次，缓存读写各为一次 get_many / set_many。
+
+    Args:
+        namespaces: 缓存依赖的命名空间
+        prefix: 区分用途的键前缀
+        keys: 逐个缓存的键（需可 repr）
+        compute: 计算函数，返回 {键: 值}
+        timeout: 过期时间（秒），默认读取插件配置 cache_timeout
+
+    Returns:
+        {键: 值}
+    """
+    versions = _versions(tuple(namespaces))
+    cache_keys = {_make_key(versions, (prefix, key)): key for key in keys}
+    values = {cache_keys[cache_key]: value for cache_key, value in cache.get_many(list(cache_keys)).items()}
+    missing = [key for key in cache_keys.values() if key not in values]
+    if missing:
+        computed = compute(missing)
+        if timeout is None:
+            timeout = get_plugin_config('netbox_rms', 'cache_timeout')
+        cache.set_many(
+            {_make_key(versions, (prefix, key)): computed[key] for key in missing if key in computed},
+            timeout,
+        )
+        values.update(computed)
+    return values
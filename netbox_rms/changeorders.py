@@ -0,0 +1,223 @@
+"""
+NetBox RMS 变更单生成
+
+由原单（parent_order）生成变更单：复制表头（客户、联系人、项目 / 合同编号）、
+核查类别和核查数据，并将原单关联的资源台账登记为变更单的变更涉及资源
+（原单本身为变更单时，连同其变更涉及资源一并继承）。
+
+- 单张：界面“创建变更单”在 auto_fill_change_order 开启时按原单预填新建表单，
+  保存时登记资源；
+- 批量：create_change_orders() 在一个事务内批量写入变更单、变更涉及资源和申请设备，
+  供 API 及批量变更任务（如带宽升级）使用。
+
+变更单号为 BG + 申请日期 (yymmdd) + 当日流水号，如 BG251226001。
+"""
+import copy
+import re
+import uuid
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from core.choices import ObjectChangeActionChoices
+from core.models import ObjectChange
+
+from . import cache, colocation
+from .choices import ResourceLifecycleChoices
+
+ORDER_NO_PREFIX = 'BG'
+
+# 从原单复制的表头字段
+HEADER_FIELDS = (
+    'tenant_id', 'project_report_code', 'project_approval_code', 'contract_code',
+    'sales_contact', 'business_manager', 'internal_participant', 'check_type',
+)
+
+
+# =============================================================================
+# 工单谱系
+# =============================================================================
+
+def lineage(order_id: int) -> List[int]:
+    """
+    工单谱系：由工单向上追溯到最初的原单，再包含原单的各级变更单（含停闭单），按 ID 升序
+
+    资源在谱系内的工单之间转移，停闭时按整个谱系处理。
+    """
+    from .models import ServiceOrder
+
+    root, seen = order_id, {order_id}
+    while True:
+        parent_id = ServiceOrder.objects.filter(pk=root).values_list('parent_order_id', flat=True).first()
+        if not parent_id or parent_id in seen:
+            break
+        root = parent_id
+        seen.add(root)
+    order_ids, frontier = {root}, {root}
+    while frontier:
+        frontier = set(
+            ServiceOrder.objects.filter(parent_order_id__in=frontier).values_list('pk', flat=True)
+        ) - order_ids
+        order_ids |= frontier
+    return sorted(order_ids)
+
+
+# =============================================================================
+# 单号
+# =============================================================================
+
+def next_order_numbers(count: int, day: date) -> List[str]:
+    """
+    生成 count 个当日未使用的变更单号
+
+    同时生成的变更单号连续；并发生成时由 order_no 唯一约束保证不重复。
+    """
+    from .models import ServiceOrder
+
+    prefix = f'{ORDER_NO_PREFIX}{day:%y%m%d}'
+    pattern = re.compile(rf'^{prefix}(\d+)$')
+    last = 0
+    for order_no in ServiceOrder.objects.filter(order_no__startswith=prefix).values_list('order_no', flat=True):
+        match = pattern.match(order_no)
+        if match:
+            last = max(last, int(match.group(1)))
+    width = max(3, len(str(last + count)))
+    return [f'{prefix}{last + sequence:0{width}d}' for sequence in range(1, count + 1)]
+
+
+# =============================================================================
+# 构建
+# =============================================================================
+
+def initial_values(parent) -> Dict[str, Any]:
+    """新建变更单表单的表头初始值"""
+    values = {field.removesuffix('_id'): getattr(parent, field) for field in HEADER_FIELDS}
+    values.update({
+        'parent_order': parent.pk,
+        'order_no': next_order_numbers(1, date.today())[0],
+        'apply_date': date.today(),
+    })
+    return values
+
+
+def build_change_order(
+    parent,
+    order_no: str,
+    apply_date: date,
+    deadline_date: date,
+    check_data: Optional[Dict[str, Any]] = None,
+):
+    """由原单生成（未保存的）变更单，check_data 中的键覆盖原单核查数据"""
+    from .models import ServiceOrder
+
+    return ServiceOrder(
+        order_no=order_no,
+        parent_order=parent,
+        apply_date=apply_date,
+        deadline_date=deadline_date,
+        check_data={**copy.deepcopy(parent.safe_check_data), **(check_data or {})},
+        **{field: getattr(parent, field) for field in HEADER_FIELDS},
+    )
+
+
+def link_resources(orders: Iterable, batch_size: int = 1000) -> int:
+    """
+    将原单关联的资源台账登记为变更单的变更涉及资源，返回登记数
+
+    原单的资源包括其未拆除的来源资源和（原单本身为变更单时）变更涉及资源。
+    """
+    from .models import ResourceLedger, ServiceOrder
+
+    orders = [order for order in orders if order.parent_order_id]
+    parent_ids = {order.parent_order_id for order in orders}
+    if not parent_ids:
+        return 0
+
+    resources: Dict[int, set] = defaultdict(set)
+    for order_id, ledger_id in ResourceLedger.objects.current().filter(
+        service_order_id__in=parent_ids,
+    ).values_list('service_order_id', 'pk'):
+        resources[order_id].add(ledger_id)
+    through = ServiceOrder.change_resources.through
+    for order_id, ledger_id in through.objects.filter(
+        serviceorder_id__in=parent_ids,
+    ).exclude(
+        resourceledger__lifecycle_status=ResourceLifecycleChoices.DECOMMISSIONED,
+    ).values_list('serviceorder_id', 'resourceledger_id'):
+        resources[order_id].add(ledger_id)
+
+    links = [
+        through(serviceorder_id=order.pk, resourceledger_id=ledger_id)
+        for order in orders
+        for ledger_id in sorted(resources[order.parent_order_id])
+    ]
+    through.objects.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+    return len(links)
+
+
+# =============================================================================
+# 批量生成
+# =============================================================================
+
+def log_creations(objects: Iterable, user, request_id: Optional[uuid.UUID] = None, batch_size: int = 500) -> None:
+    """为批量写入（不触发保存信号）的对象批量记录创建日志"""
+    request_id = request_id or uuid.uuid4()
+    changes = []
+    for obj in objects:
+        change = obj.to_objectchange(ObjectChangeActionChoices.ACTION_CREATE)
+        change.user = user
+        change.user_name = user.username
+        change.request_id = request_id
+        changes.append(change)
+    ObjectChange.objects.bulk_create(changes, batch_size=batch_size)
+
+
+def create_change_orders(
+    parents: Iterable,
+    apply_date: date,
+    deadline_date: date,
+    check_data: Optional[Dict[str, Any]] = None,
+    user=None,
+    batch_size: int = 500,
+) -> List:
+    """
+    批量生成变更单
+
+    全部变更单、变更涉及资源、托管申请设备在一个事务内批量写入；
+    批量写入不触发保存信号，指定 user 时一并批量写入变更日志。
+
+    Args:
+        parents: 原单
+        apply_date: 申请时间（同时决定变更单号日期）
+        deadline_date: 计划开通时间
+        check_data: 覆盖原单核查数据的键，如 {'bandwidth': '10G'}
+        user: 操作人
+        batch_size: 每批写入的记录数
+
+    Returns:
+        已创建的变更单
+    """
+    from .models import ColocationDevice, ServiceOrder
+
+    parents = list(parents)
+    if not parents:
+        return []
+
+    with transaction.atomic():
+        orders = [
+            build_change_order(parent, order_no, apply_date, deadline_date, check_data)
+            for parent, order_no in zip(parents, next_order_numbers(len(parents), apply_date))
+        ]
+        ServiceOrder.objects.bulk_create(orders, batch_size=batch_size)
+        link_resources(orders, batch_size=batch_size)
+        ColocationDevice.objects.bulk_create(
+            colocation.resolve_sites([device for order in orders for device in colocation.requested_devices(order)]),
+            batch_size=batch_size,
+        )
+        if user is not None:
+            log_creations(orders, user, batch_size=batch_size)
+
+    cache.invalidate_namespace(cache.NAMESPACE_ORDERS, cache.NAMESPACE_LEDGER)
+    return orders
@@ -91,6 +91,20 @@ class ResourceTypeChoices(ChoiceSet):
     ]
 
 
+class ResourceLifecycleChoices(ChoiceSet):
+    """资源台账生命周期状态"""
+    
+    RESERVED = 'reserved'               # 预留
+    ACTIVE = 'active'                   # 在用
+    DECOMMISSIONED = 'decommissioned'   # 已拆除
+    
+    CHOICES = [
+        (RESERVED, _('预留'), 'yellow'),
+        (ACTIVE, _('在用'), 'green'),
+        (DECOMMISSIONED, _('已拆除'), 'gray'),
+    ]
+
+
 class ChangeTypeChoices(ChoiceSet):
     """变更类型选择项 (多选)"""
     
@@ -295,3 +309,55 @@ class AddMethodChoices(ChoiceSet):
         (ALLOCATION, _('调配')),
         (OTHER, _('其他')),
     ]
+
+
+class ForecastMethodChoices(ChoiceSet):
+    """需求预测模型"""
+    
+    SEASONAL_DRIFT = 'seasonal_drift'   # 季节朴素 + 年度漂移
+    LINEAR_TREND = 'linear_trend'       # 线性趋势
+    MEAN = 'mean'                       # 历史均值
+    
+    CHOICES = [
+        (SEASONAL_DRIFT, _('季节朴素+年度漂移'), 'blue'),
+        (LINEAR_TREND, _('线性趋势'), 'green'),
+        (MEAN, _('历史均值'), 'gray'),
+    ]
+
+
+class CircuitEndChoices(ChoiceSet):
+    """电路端点"""
+    
+    A = 'A'
+    Z = 'Z'
+    
+    CHOICES = [
+        (A, _('A端')),
+        (Z, _('Z端')),
+    ]
+
+
+class ColocationDeviceSourceChoices(ChoiceSet):
+    """托管设备来源"""
+    
+    REQUESTED = 'requested'     # 工单申请
+    INSTALLED = 'installed'     # 执行反馈（已上架）
+    
+    CHOICES = [
+        (REQUESTED, _('申请'), 'blue'),
+        (INSTALLED, _('已上架'), 'green'),
+    ]
+
+
+class OutboundEventStatusChoices(ChoiceSet):
+    """外发事件投递状态"""
+    
+    PENDING = 'pending'         # 待投递
+    DELIVERED = 'delivered'     # 已投递
+    FAILED = 'failed'           # 投递失败（超过重试次数）
+    
+    CHOICES = [
+        (PENDING, _('待投递'), 'yellow'),
+        (DELIVERED, _('已投递'), 'green'),
+        (FAILED, _('投递失败'), 'red'),
+    ]
@@ -0,0 +1,232 @@
+"""
+NetBox RMS 工单批量复制（续约）
+
+将一批工单连同所选关联对象复制为新工单：
+
+- 工单：复制表头、核查数据、标签和变更涉及资源，申请 / 计划开通时间取新值，
+  起租日期和确认执行状态清空；单号为原单号加 -R 序号（如 XQ251010001-JX-R1，
+  复制已续约的工单时序号递增）；
+- 执行任务：复制任务类型、执行部门和执行人，状态重置为待实施，执行反馈清空；
+- 核查结果：复制核查结果、不具备原因和说明，路由 / 配电分析结果清空。
+
+按批读取、按批 bulk_create，原工单 ID 到新工单 ID 的映射保存在内存中；
+原单（parent_order）也在复制范围内时，全部复制完成后将副本的原单指向原单的副本。
+"""
+import copy
+import re
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from extras.models import TaggedItem
+
+from . import cache, colocation
+from .changeorders import log_creations
+from .choices import ExecutionStatusChoices
+
+RENEWAL_SUFFIX = re.compile(r'-R(\d+)$')
+
+# 复制的字段
+ORDER_FIELDS = (
+    'tenant_id', 'project_report_code', 'project_approval_code', 'contract_code',
+    'sales_contact', 'business_manager', 'internal_participant', 'special_notes',
+    'check_type', 'check_data', 'comments', 'custom_field_data',
+)
+TASK_FIELDS = ('task_type', 'execution_department', 'assignee_id', 'comments', 'custom_field_data')
+CHECK_RESULT_FIELDS = ('check_result', 'unavailable_reasons', 'description', 'custom_field_data')
+
+
+def filter_orders(filters: Dict[str, List[str]], user=None):
+    """
+    按列表页过滤参数得到工单查询集
+
+    Args:
+        filters: {参数名: [值]}（QueryDict.lists() 的结果，可 JSON 序列化后传给后台任务）
+        user: 指定时只包含其有权查看的工单
+    """
+    from .filtersets import ServiceOrderFilterSet
+    from .models import ServiceOrder
+
+    data = QueryDict(mutable=True)
+    for key, values in filters.items():
+        data.setlist(key, values if isinstance(values, list) else [values])
+    queryset = ServiceOrder.objects.all()
+    if user is not None:
+        queryset = queryset.restrict(user, 'view')
+    return ServiceOrderFilterSet(data, queryset).qs
+
+
+def renewal_numbers(order_nos: Iterable[str]) -> Dict[str, str]:
+    """为原单号生成未使用的续约单号：{原单号: 新单号}"""
+    from .models import ServiceOrder
+
+    order_nos = list(order_nos)
+    bases = {order_no: RENEWAL_SUFFIX.sub('', order_no) for order_no in order_nos}
+    last = {base: 0 for base in bases.values()}
+    query = Q()
+    for base in last:
+        query |= Q(order_no__startswith=f'{base}-R')
+    for order_no in ServiceOrder.objects.filter(query).values_list('order_no', flat=True):
+        base = RENEWAL_SUFFIX.sub('', order_no)
+        match = RENEWAL_SUFFIX.search(order_no)
+        if match and base in last:
+            last[base] = max(last[base], int(match.group(1)))
+
+    numbers = {}
+    for order_no in order_nos:
+        base = bases[order_no]
+        last[base] += 1
+        numbers[order_no] = f'{base}-R{last[base]}'
+    return numbers
+
+
+def _copy_fields(obj, fields: Iterable[str]) -> Dict[str, Any]:
+    return {field: copy.deepcopy(getattr(obj, field)) for field in fields}
+
+
+def _clone_chunk(
+    order_ids: List[int],
+    apply_date,
+    deadline_date,
+    include_tasks: bool,
+    include_check_results: bool,
+    user,
+    request_id: uuid.UUID,
+) -> Dict[int, int]:
+    """复制一批工单及其关联对象，返回 {原工单 ID: 新工单 ID}"""
+    from .models import ColocationDevice, ResourceCheckResult, ServiceOrder, TaskDetail
+
+    orders = list(ServiceOrder.objects.filter(pk__in=order_ids).order_by('pk'))
+    numbers = renewal_numbers(order.order_no for order in orders)
+    clones = [
+        ServiceOrder(
+            order_no=numbers[order.order_no],
+            apply_date=apply_date,
+            deadline_date=deadline_date,
+            parent_order_id=order.parent_order_id,
+            **_copy_fields(order, ORDER_FIELDS),
+        )
+        for order in orders
+    ]
+    ServiceOrder.objects.bulk_create(clones)
+    mapping = {order.pk: clone.pk for order, clone in zip(orders, clones)}
+
+    # 标签、变更涉及资源
+    content_type = ContentType.objects.get_for_model(ServiceOrder)
+    TaggedItem.objects.bulk_create([
+        TaggedItem(content_type=content_type, object_id=mapping[object_id], tag_id=tag_id)
+        for object_id, tag_id in TaggedItem.objects.filter(
+            content_type=content_type,
+            object_id__in=mapping,
+        ).values_list('object_id', 'tag_id')
+    ])
+    through = ServiceOrder.change_resources.through
+    through.objects.bulk_create([
+        through(serviceorder_id=mapping[order_id], resourceledger_id=ledger_id)
+        for order_id, ledger_id in through.objects.filter(
+            serviceorder_id__in=mapping,
+        ).values_list('serviceorder_id', 'resourceledger_id')
+    ])
+
+    # 托管申请设备（批量写入不触发工单保存信号）
+    ColocationDevice.objects.bulk_create(
+        colocation.resolve_sites([device for clone in clones for device in colocation.requested_devices(clone)]),
+    )
+
+    created = list(clones)
+    if include_tasks:
+        tasks = [
+            TaskDetail(
+                service_order_id=mapping[task.service_order_id],
+                execution_status=ExecutionStatusChoices.PENDING,
+                feedback_data={},
+                **_copy_fields(task, TASK_FIELDS),
+            )
+            for task in TaskDetail.objects.filter(service_order_id__in=mapping).order_by('pk')
+        ]
+        TaskDetail.objects.bulk_create(tasks)
+        created.extend(tasks)
+    if include_check_results:
+        # 批量写入不触发核查完成时间的信号处理器：复制的核查结果按复制时间记录
+        now = timezone.now()
+        results = [
+            ResourceCheckResult(
+                service_order_id=mapping[result.service_order_id],
+                check_result_at=now if result.check_result else None,
+                **_copy_fields(result, CHECK_RESULT_FIELDS),
+            )
+            for result in ResourceCheckResult.objects.filter(service_order_id__in=mapping)
+        ]
+        ResourceCheckResult.objects.bulk_create(results)
+        created.extend(results)
+
+    if user is not None:
+        log_creations(created, user, request_id=request_id)
+    return mapping
+
+
+def clone_orders(
+    queryset,
+    apply_date,
+    deadline_date,
+    include_tasks: bool = True,
+    include_check_results: bool = True,
+    user=None,
+    batch_size: int = 200,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[int, int]:
+    """
+    批量复制工单
+
+    每批在一个事务内写入；某一批失败时，之前已提交的批次保留。
+
+    Args:
+        queryset: 要复制的工单
+        apply_date: 新工单申请时间
+        deadline_date: 新工单计划开通时间
+        include_tasks: 是否复制执行任务
+        include_check_results: 是否复制核查结果
+        user: 操作人（指定时记录变更日志）
+        batch_size: 每批复制的工单数
+        progress: 每批完成后调用 progress(已复制数, 总数)
+
+    Returns:
+        {原工单 ID: 新工单 ID}
+    """
+    from .models import ServiceOrder
+
+    order_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    total = len(order_ids)
+    request_id = uuid.uuid4()
+    mapping: Dict[int, int] = {}
+    for start in range(0, total, batch_size):
+        with transaction.atomic():
+            mapping.update(_clone_chunk(
+                order_ids[start:start + batch_size],
+                apply_date,
+                deadline_date,
+                include_tasks,
+                include_check_results,
+                user,
+                request_id,
+            ))
+        if progress is not None:
+            progress(min(start + batch_size, total), total)
+
+    # 原单也被复制时，副本的原单改为原单的副本
+    remapped = [
+        ServiceOrder(pk=mapping[order_id], parent_order_id=mapping[parent_id])
+        for order_id, parent_id in ServiceOrder.objects.filter(
+            pk__in=order_ids,
+            parent_order_id__in=order_ids,
+        ).values_list('pk', 'parent_order_id')
+    ]
+    ServiceOrder.objects.bulk_update(remapped, ['parent_order'], batch_size=batch_size)
+
+    cache.invalidate_namespace(cache.NAMESPACE_ORDERS, cache.NAMESPACE_TASKS, cache.NAMESPACE_CHECK_RESULTS)
+    return mapping
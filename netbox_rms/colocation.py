@@ -0,0 +1,251 @@
+"""
+NetBox RMS 托管设备
+
+ColocationDevice 为托管设备清单的规范化存储，由两处 JSON 同步：
+- 工单 check_data['devices']：申请上架的设备（task 为空）；
+- 任务 feedback_data['colocation']['devices']：实际上架的设备。
+工单、任务保存后按 JSON 重建对应记录，内容未变化时不写入。
+JSON 中的机房 ID 写入前按 dcim.Site 核对，机房已删除时记为空（与 0026 迁移一致）。
+
+site_capacity() 用一次 GROUP BY 聚合得到各机房的申请 / 在架 U 数、功率和设备数：
+- 申请：未取消工单的申请设备；
+- 在架：已完成 / 已确认的开通、变更任务上架的设备，
+  所属工单（或其上级工单）已完成停闭任务的不计。
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+
+from django.db import models, transaction
+from django.db.models import Count, Exists, ExpressionWrapper, F, OuterRef, Q, Sum
+
+from dcim.choices import RackStatusChoices
+from dcim.models import Rack, Site
+
+from .choices import (
+    ColocationDeviceSourceChoices, ConfirmationStatusChoices, ExecutionStatusChoices, ResourceCheckTypeChoices,
+    TaskTypeChoices,
+)
+
+DONE_STATUSES = (ExecutionStatusChoices.COMPLETED, ExecutionStatusChoices.CONFIRMED)
+
+# 参与比较的字段（判断是否需要重建）
+COMPARE_FIELDS = (
+    'site_id', 'sequence', 'device_type', 'model', 'rack_units', 'power', 'quantity', 'cabinet', 'unit',
+)
+
+
+# =============================================================================
+# 解析
+# =============================================================================
+
+def _int(value: Any, default: int = 0) -> int:
+    try:
+        return max(int(float(value)), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _decimal(value: Any) -> Decimal:
+    try:
+        result = Decimal(str(value or 0)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return Decimal('0.00')
+    return result if result.is_finite() and result > 0 else Decimal('0.00')
+
+
+def _text(value: Any, length: int = 100) -> str:
+    return str(value or '').strip()[:length]
+
+
+def units_from_position(unit: Any) -> int:
+    """由 U 位文本估算 U 数："10-12" / "U10-U12" 为 3U，单个 U 位为 1U，无法识别为 0"""
+    numbers = [int(number) for number in re.findall(r'\d+', str(unit or ''))]
+    if len(numbers) >= 2:
+        return abs(numbers[1] - numbers[0]) + 1
+    return 1 if numbers else 0
+
+
+def _site_id(value: Any) -> Optional[int]:
+    return _int(value) or None
+
+
+def resolve_sites(devices: list) -> list:
+    """将不存在的机房 ID 置空（一次查询），避免写入时违反外键约束"""
+    site_ids = {device.site_id for device in devices if device.site_id}
+    if site_ids:
+        existing = set(Site.objects.filter(pk__in=site_ids).values_list('pk', flat=True))
+        for device in devices:
+            if device.site_id not in existing:
+                device.site_id = None
+    return devices
+
+
+def requested_devices(order) -> list:
+    """由工单 check_data['devices'] 生成（未保存的）申请设备记录"""
+    from .models import ColocationDevice
+
+    data = order.safe_check_data
+    if order.check_type != ResourceCheckTypeChoices.COLOCATION:
+        return []
+    site_id = _site_id(data.get('site_id'))
+    devices = []
+    for sequence, device in enumerate(data.get('devices') or []):
+        if not isinstance(device, dict):
+            continue
+        devices.append(ColocationDevice(
+            service_order_id=order.pk,
+            task_id=None,
+            site_id=site_id,
+            source=ColocationDeviceSourceChoices.REQUESTED,
+            sequence=sequence,
+            device_type=_text(device.get('device_type')),
+            model=_text(device.get('model')),
+            rack_units=_int(device.get('rack_units')),
+            power=_decimal(device.get('power_consumption')),
+            quantity=_int(device.get('quantity'), 1) or 1,
+        ))
+    return devices
+
+
+def installed_devices(task) -> list:
+    """由任务 feedback_data['colocation']['devices'] 生成（未保存的）已上架设备记录，跳过空白条目"""
+    from .models import ColocationDevice
+
+    colocation = (task.feedback_data or {}).get('colocation') or {}
+    site_id = _site_id(colocation.get('site_id')) or _site_id(task.service_order.safe_check_data.get('site_id'))
+    devices = []
+    for sequence, device in enumerate(colocation.get('devices') or []):
+        if not isinstance(device, dict) or not any(device.values()):
+            continue
+        devices.append(ColocationDevice(
+            service_order_id=task.service_order_id,
+            task_id=task.pk,
+            site_id=site_id,
+            source=ColocationDeviceSourceChoices.INSTALLED,
+            sequence=sequence,
+            model=_text(device.get('model')),
+            rack_units=units_from_position(device.get('unit')),
+            power=_decimal(device.get('power')),
+            quantity=1,
+            cabinet=_text(device.get('cabinet')),
+            unit=_text(device.get('unit'), 50),
+        ))
+    return devices
+
+
+# =============================================================================
+# 同步
+# =============================================================================
+
+def _replace(queryset, devices: list) -> None:
+    """记录内容与 devices 不一致时整体替换"""
+    from .models import ColocationDevice
+
+    current = list(queryset.order_by('sequence', 'pk').values_list(*COMPARE_FIELDS))
+    if current == [tuple(getattr(device, field) for field in COMPARE_FIELDS) for device in devices]:
+        return
+    with transaction.atomic():
+        queryset.delete()
+        ColocationDevice.objects.bulk_create(devices)
+
+
+def sync_order(order) -> None:
+    """工单保存后重建申请设备记录（由信号处理器调用）"""
+    from .models import ColocationDevice
+
+    _replace(
+        ColocationDevice.objects.filter(service_order=order, task__isnull=True),
+        resolve_sites(requested_devices(order)),
+    )
+
+
+def sync_task(task) -> None:
+    """任务保存后重建已上架设备记录（由信号处理器调用）"""
+    from .models import ColocationDevice
+
+    _replace(ColocationDevice.objects.filter(task=task), resolve_sites(installed_devices(task)))
+
+
+# =============================================================================
+# 容量汇总
+# =============================================================================
+
+def _total(expression) -> ExpressionWrapper:
+    return ExpressionWrapper(expression, output_field=models.DecimalField(max_digits=16, decimal_places=2))
+
+
+def site_capacity(queryset=None, site_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    各机房托管设备汇总
+
+    设备汇总为一次按机房分组的聚合查询，机柜总 U 数为第二次聚合查询。
+
+    Args:
+        queryset: ColocationDevice 查询集（可先按权限限制），默认全部
+        site_ids: 只统计这些机房
+
+    Returns:
+        [{
+            'site_id', 'site',
+            'requested_orders', 'requested_devices', 'requested_units', 'requested_power',
+            'installed_orders', 'installed_devices', 'installed_units', 'installed_power',
+            'racks', 'rack_units',
+        }]
+    """
+    from .models import ColocationDevice, TaskDetail
+
+    if queryset is None:
+        queryset = ColocationDevice.objects.all()
+    queryset = queryset.order_by().filter(site__isnull=False)
+    if site_ids:
+        queryset = queryset.filter(site_id__in=site_ids)
+
+    released = TaskDetail.objects.filter(
+        task_type=TaskTypeChoices.DEACTIVATION,
+        execution_status__in=DONE_STATUSES,
+    ).filter(
+        Q(service_order=OuterRef('service_order')) | Q(service_order__parent_order=OuterRef('service_order')),
+    )
+    requested = Q(source=ColocationDeviceSourceChoices.REQUESTED) & ~Q(
+        service_order__confirmation_status=ConfirmationStatusChoices.CANCEL,
+    )
+    installed = Q(
+        source=ColocationDeviceSourceChoices.INSTALLED,
+        task__execution_status__in=DONE_STATUSES,
+        released=False,
+    ) & ~Q(task__task_type=TaskTypeChoices.DEACTIVATION)
+
+    units = _total(F('rack_units') * F('quantity'))
+    power = _total(F('power') * F('quantity'))
+    rows = queryset.annotate(
+        released=Exists(released),
+    ).values('site_id', 'site__name').annotate(
+        requested_orders=Count('service_order', filter=requested, distinct=True),
+        requested_devices=Sum('quantity', filter=requested, default=0),
+        requested_units=Sum(units, filter=requested, default=0),
+        requested_power=Sum(power, filter=requested, default=0),
+        installed_orders=Count('service_order', filter=installed, distinct=True),
+        installed_devices=Sum('quantity', filter=installed, default=0),
+        installed_units=Sum(units, filter=installed, default=0),
+        installed_power=Sum(power, filter=installed, default=0),
+    ).order_by('site__name')
+
+    results = []
+    for row in rows:
+        row['site'] = row.pop('site__name')
+        results.append(row)
+
+    racks = {
+        site_id: (count, total)
+        for site_id, count, total in Rack.objects.filter(
+            site_id__in=[row['site_id'] for row in results],
+            status=RackStatusChoices.STATUS_ACTIVE,
+        ).values('site_id').annotate(
+            rack_count=Count('pk'),
+            total_units=Sum('u_height'),
+        ).values_list('site_id', 'rack_count', 'total_units')
+    }
+    for row in results:
+        row['racks'], row['rack_units'] = racks.get(row['site_id'], (0, 0))
+    return results
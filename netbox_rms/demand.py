@@ -0,0 +1,211 @@
+"""
+NetBox RMS 需求分析
+
+A-Z 站点对需求矩阵：统计每对 dcim.Site 之间的传输专线/光缆光纤工单数、
+电路（纤芯）数量和带宽需求。
+
+check_data 中的站点、带宽、数量在数据库内提取并按无向站点对 GROUP BY，
+只有非零单元格返回到 Python，结果为稀疏矩阵。
+"""
+from typing import Any, Dict, List, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import (
+    Case, Count, F, FloatField, IntegerField, Q, QuerySet, Sum, Value, When,
+)
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
+
+from dcim.models import Site
+
+from . import cache
+from .choices import BandwidthChoices, ResourceCheckTypeChoices
+
+# 带宽档位 -> Gbps
+BANDWIDTH_GBPS: Dict[str, float] = {
+    BandwidthChoices.GE: 1.0,
+    BandwidthChoices.G2_5: 2.5,
+    BandwidthChoices.G10: 10.0,
+    BandwidthChoices.G100: 100.0,
+}
+
+# 参与站点对统计的核查业务类别
+PAIR_CHECK_TYPES = (
+    ResourceCheckTypeChoices.TRANSMISSION,
+    ResourceCheckTypeChoices.FIBER,
+)
+
+
+def json_int(key: str, field: str = 'check_data'):
+    """提取 JSON 键并转换为整数；非整数（早期写入的文本、小数等）为 NULL，不做转换以免整条查询出错"""
+    return Case(
+        When(Q(**{f'{field}__{key}__regex': r'^\d{1,9}$'}), then=Cast(KeyTextTransform(key, field), IntegerField())),
+        default=None,
+        output_field=IntegerField(),
+    )
+
+
+def bandwidth_gbps_expression(annotation: str = 'bandwidth_text'):
+    """
+    将带宽档位转换为 Gbps 的 SQL 表达式（未知档位为 0）
+
+    Args:
+        annotation: 已注解的带宽文本字段名
+    """
+    return Case(
+        *[When(**{annotation: value}, then=Value(gbps)) for value, gbps in BANDWIDTH_GBPS.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def demand_matrix(queryset: QuerySet) -> Dict[str, Any]:
+    """
+    计算站点对需求矩阵
+
+    Args:
+        queryset: ServiceOrder 查询集（已按权限和过滤条件限定）
+
+    Returns:
+        {
+            'sites': [{'id', 'name', 'orders', 'bandwidth_gbps'}],   # 按带宽需求降序
+            'cells': [{'site_a', 'site_z', 'transmission_orders', 'fiber_orders',
+                       'circuits', 'fiber_cores', 'bandwidth_gbps'}],
+            'totals': {...},
+        }
+        站点对为无向：site_a 始终为较小的站点 ID。
+    """
+    rows = queryset.order_by().filter(
+        check_type__in=PAIR_CHECK_TYPES,
+        check_data__has_keys=['site_a_id', 'site_z_id'],
+    ).annotate(
+        raw_a=json_int('site_a_id'),
+        raw_z=json_int('site_z_id'),
+        qty=Coalesce(json_int('quantity'), Value(1)),
+        bandwidth_text=KeyTextTransform('bandwidth', 'check_data'),
+    ).annotate(
+        pair_a=Least('raw_a', 'raw_z'),
+        pair_z=Greatest('raw_a', 'raw_z'),
+        gbps=bandwidth_gbps_expression(),
+    ).values('pair_a', 'pair_z', 'check_type').annotate(
+        orders=Count('pk'),
+        quantity_sum=Sum('qty'),
+        bandwidth_sum=Sum(F('qty') * F('gbps'), output_field=FloatField()),
+    ).values_list('pair_a', 'pair_z', 'check_type', 'orders', 'quantity_sum', 'bandwidth_sum')
+
+    cells: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    site_totals: Dict[int, Dict[str, float]] = {}
+    for site_a, site_z, check_type, orders, quantity_sum, bandwidth_sum in rows:
+        if site_a is None or site_z is None:
+            continue
+        cell = cells.setdefault((site_a, site_z), {
+            'site_a': site_a,
+            'site_z': site_z,
+            'transmission_orders': 0,
+            'fiber_orders': 0,
+            'circuits': 0,
+            'fiber_cores': 0,
+            'bandwidth_gbps': 0.0,
+        })
+        if check_type == ResourceCheckTypeChoices.TRANSMISSION:
+            cell['transmission_orders'] += orders
+            cell['circuits'] += quantity_sum or 0
+            cell['bandwidth_gbps'] += bandwidth_sum or 0.0
+        else:
+            cell['fiber_orders'] += orders
+            cell['fiber_cores'] += quantity_sum or 0
+
+        for site_id in {site_a, site_z}:
+            totals = site_totals.setdefault(site_id, {'orders': 0, 'bandwidth_gbps': 0.0})
+            totals['orders'] += orders
+            if check_type == ResourceCheckTypeChoices.TRANSMISSION:
+                totals['bandwidth_gbps'] += bandwidth_sum or 0.0
+
+    names = dict(Site.objects.filter(pk__in=site_totals).values_list('pk', 'name'))
+    sites: List[Dict[str, Any]] = sorted(
+        (
+            {'id': site_id, 'name': names.get(site_id, str(site_id)), **totals}
+            for site_id, totals in site_totals.items()
+        ),
+        key=lambda site: (-site['bandwidth_gbps'], -site['orders'], site['name']),
+    )
+    cell_list = sorted(cells.values(), key=lambda cell: (cell['site_a'], cell['site_z']))
+
+    return {
+        'sites': sites,
+        'cells': cell_list,
+        'totals': {
+            'site_pairs': len(cell_list),
+            'transmission_orders': sum(cell['transmission_orders'] for cell in cell_list),
+            'fiber_orders': sum(cell['fiber_orders'] for cell in cell_list),
+            'circuits': sum(cell['circuits'] for cell in cell_list),
+            'fiber_cores': sum(cell['fiber_cores'] for cell in cell_list),
+            'bandwidth_gbps': sum(cell['bandwidth_gbps'] for cell in cell_list),
+        },
+    }
+
+
+def heatmap(matrix: Dict[str, Any], metric: str = 'bandwidth_gbps', limit: int = 40) -> Dict[str, Any]:
+    """
+    从稀疏矩阵生成热力图数据（仅取需求最大的 limit 个站点）
+
+    Returns:
+        {'sites': [...], 'rows': [{'site': ..., 'cells': [{'value', 'intensity'} | None, ...]}], 'max': float}
+    """
+    sites = matrix['sites'][:limit]
+    index = {site['id']: i for i, site in enumerate(sites)}
+    grid: List[List[Any]] = [[None] * len(sites) for _site in sites]
+    maximum = 0.0
+    for cell in matrix['cells']:
+        i, j = index.get(cell['site_a']), index.get(cell['site_z'])
+        if i is None or j is None:
+            continue
+        value = cell[metric]
+        grid[i][j] = grid[j][i] = value
+        maximum = max(maximum, value)
+
+    rows = [
+        {
+            'site': site,
+            'cells': [
+                {'value': value, 'intensity': round(value / maximum, 3) if maximum else 0}
+                if value else None
+                for value in row
+            ],
+        }
+        for site, row in zip(sites, grid)
+    ]
+    return {'sites': sites, 'rows': rows, 'max': maximum}
+
+
+# 不参与工单过滤的展示参数
+DISPLAY_PARAMS = ('metric', 'limit')
+
+
+def cached_demand_matrix(user, params) -> Dict[str, Any]:
+    """
+    按过滤条件计算（或从缓存读取）需求矩阵
+
+    Args:
+        user: 当前用户（用于对象权限限定）
+        params: 查询参数 QueryDict，支持 ServiceOrderFilterSet 的全部过滤参数
+
+    Raises:
+        ValidationError: 过滤参数无效
+    """
+    from .filtersets import ServiceOrderFilterSet
+    from .models import ServiceOrder
+
+    filter_data = params.copy()
+    for key in DISPLAY_PARAMS:
+        filter_data.pop(key, None)
+    filterset = ServiceOrderFilterSet(filter_data, queryset=ServiceOrder.objects.restrict(user, 'view'))
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+
+    filter_key = tuple(sorted((key, tuple(filter_data.getlist(key))) for key in filter_data))
+    return cache.get_or_compute(
+        (cache.NAMESPACE_ORDERS,),
+        ('demand_matrix', user.pk, filter_key),
+        lambda: demand_matrix(filterset.qs),
+    )
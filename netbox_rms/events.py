@@ -0,0 +1,175 @@
+"""
+NetBox RMS 领域事件
+
+信号处理器和批量操作在事务内登记领域事件（emit），事件按 (事件, 对象) 合并，
+事务提交时（transaction.on_commit）一次性分发：
+
+- 进程内处理器：@handler(事件, ...) 注册，每批调用一次，参数为该事件本批的全部事件；
+  处理器出错只记录日志，不影响其他处理器；
+- 后台处理器：@handler(事件, ..., queue=True) 注册，每批提交一个 EventDispatchJob 后台任务，
+  由任务调用处理器（事件数据须可 JSON 序列化）。
+
+事件按保存点分批：同一对象在同一保存点（或事务最外层）内多次登记同一事件时合并为一个，
+数据以后登记的为准，previous（变更前的值）保留第一次登记的值；每批各登记一个提交回调，
+保存点回滚时该批（连同其内层保存点的批次）随回调一起丢弃，事务回滚时全部丢弃。
+不在事务内（自动提交）时每次登记立即分发。
+"""
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('netbox_rms.events')
+
+# 事件
+OBJECT_CHANGED = 'object_changed'               # 对象保存或删除
+TASK_STATUS_CHANGED = 'task_status_changed'     # 任务执行状态变化
+CHECK_RESULT_SET = 'check_result_set'           # 核查结果写入
+ORDER_CONFIRMED = 'order_confirmed'             # 工单确认执行
+
+
+class Event(NamedTuple):
+    """领域事件：model 为 app_label.model_name"""
+
+    name: str
+    model: str
+    pk: int
+    data: Dict[str, Any]
+
+    def serialize(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+# 事件 -> [(处理器, 是否后台处理)]
+_handlers: Dict[str, List[Tuple[Callable, bool]]] = defaultdict(list)
+
+
+def handler(*names: str, queue: bool = False) -> Callable:
+    """
+    注册事件处理器
+
+    处理器签名为 func(events: List[Event])；queue=True 时须为模块级函数（后台任务按导入路径调用）。
+    """
+    def register(func: Callable) -> Callable:
+        for name in names:
+            _handlers[name].append((func, queue))
+        return func
+    return register
+
+
+def handlers_for(name: str) -> List[Tuple[Callable, bool]]:
+    return list(_handlers.get(name, ()))
+
+
+# =============================================================================
+# 登记与合并
+# =============================================================================
+
+class Batch:
+    """一个保存点（或事务最外层）内登记的事件，作为提交回调登记，提交时分发"""
+
+    def __init__(self):
+        self.events: Dict[Tuple[str, str, int], Event] = {}
+        self.dispatched = False
+
+    def add(self, event: Event) -> None:
+        key = (event.name, event.model, event.pk)
+        current = self.events.get(key)
+        if current is not None:
+            data = {**current.data, **event.data}
+            if 'previous' in current.data:
+                data['previous'] = current.data['previous']
+            event = event._replace(data=data)
+        self.events[key] = event
+
+    def __call__(self) -> None:
+        self.dispatched = True
+        dispatch(self.events.values())
+
+
+# 当前线程各 (数据库连接, 保存点) 的当前批次（连接按线程隔离）。
+# 只弱引用批次：批次由 Django 的提交回调列表持有，回滚丢弃回调后批次随之释放，
+# 之后在该层登记的事件进入新批次
+_local = threading.local()
+
+
+def _savepoint(connection) -> Optional[str]:
+    """当前所在的保存点；atomic(savepoint=False) 不创建保存点，其事件归入外层"""
+    return next((sid for sid in reversed(connection.savepoint_ids) if sid), None)
+
+
+def _label(model) -> str:
+    return model._meta.label_lower
+
+
+def emit(name: str, instance=None, model=None, pk: Optional[int] = None, using: Optional[str] = None,
+         **data: Any) -> None:
+    """
+    登记领域事件，事务提交时分发
+
+    Args:
+        name: 事件
+        instance: 事件对象（或以 model、pk 指定）
+        using: 数据库连接，默认 default
+        data: 事件数据（后台处理时须可 JSON 序列化）
+    """
+    using = using or DEFAULT_DB_ALIAS
+    event = Event(name, _label(model or type(instance)), pk if instance is None else instance.pk, data)
+    connection = connections[using]
+    if not connection.in_atomic_block:
+        dispatch([event])
+        return
+    batches = _local.__dict__.setdefault('batches', weakref.WeakValueDictionary())
+    key = (using, _savepoint(connection))
+    batch = batches.get(key)
+    # 已分发的批次可能仍被正在执行的提交回调持有（处理器内开启的新事务）
+    if batch is None or batch.dispatched:
+        batch = batches[key] = Batch()
+        transaction.on_commit(batch, using=using)
+    batch.add(event)
+
+
+def emit_many(name: str, instances: Iterable, using: Optional[str] = None, **data: Any) -> None:
+    """为批量写入的对象登记同一事件"""
+    for instance in instances:
+        emit(name, instance, using=using, **data)
+
+
+# =============================================================================
+# 分发
+# =============================================================================
+
+def dispatch(events: Iterable[Event]) -> None:
+    """按事件分组调用进程内处理器，后台处理器合并为一个后台任务"""
+    grouped: Dict[str, List[Event]] = defaultdict(list)
+    for event in events:
+        grouped[event.name].append(event)
+
+    queued: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for name, batch in grouped.items():
+        for func, queue in handlers_for(name):
+            if queue:
+                queued[f'{func.__module__}.{func.__qualname__}'].extend(event.serialize() for event in batch)
+                continue
+            try:
+                func(batch)
+            except Exception:
+                logger.exception("事件 %s 处理器 %s 执行失败", name, func.__qualname__)
+
+    if queued:
+        from .jobs import EventDispatchJob
+
+        EventDispatchJob.enqueue(handlers=dict(queued))
+
+
+def run_queued(handlers: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+    """后台任务调用：{处理器导入路径: [事件]}，返回各处理器处理的事件数"""
+    counts = {}
+    for path, items in handlers.items():
+        import_string(path)([Event(**item) for item in items])
+        counts[path] = len(items)
+    return counts
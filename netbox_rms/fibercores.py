@@ -0,0 +1,367 @@
+"""
+NetBox RMS 光缆纤芯占用
+
+维护 CableCoreInventory：每条站点间光缆一个纤芯占用位图。
+
+- 光缆光纤业务的开通 / 变更任务完成时，按执行反馈中的纤芯数量和 A、Z 站点
+  在该站点对的光缆中分配纤芯（最佳适应：空闲芯数最少但足够的光缆）；
+  变更任务先接收原单占用的纤芯，站点对不变时沿用并按纤芯数补足或释放多余的纤芯，其余光缆上的释放；
+- 已完成的开通任务退回待实施时释放纤芯，变更任务退回时纤芯交还原单；
+- 停闭任务完成时释放整个工单谱系（原单及其各级变更单）占用的纤芯；
+- 分配、释放均在事务内对光缆行加锁 (SELECT ... FOR UPDATE) 完成；
+- 未建立纤芯台账的站点对不做校验和分配。
+
+可通过 rms_rebuild_core_inventory 命令由 dcim 光缆和资源台账全量重建。
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils.translation import gettext_lazy as _
+
+from dcim.choices import LinkStatusChoices
+from dcim.models import CableTermination, RearPort
+
+from . import changeorders, routing
+from .choices import ExecutionStatusChoices, ResourceCheckTypeChoices, ResourceTypeChoices, TaskTypeChoices
+
+
+# =============================================================================
+# 查询
+# =============================================================================
+
+def pair_inventory(site_a_id: int, site_z_id: int):
+    """站点对之间的光缆纤芯台账（站点顺序无关）"""
+    from .models import CableCoreInventory
+
+    site_a_id, site_z_id = routing.link_key(site_a_id, site_z_id)
+    return CableCoreInventory.objects.filter(site_a_id=site_a_id, site_z_id=site_z_id)
+
+
+def order_inventory(service_order_id: int):
+    """工单占用了纤芯的光缆纤芯台账"""
+    from .models import CableCoreInventory
+
+    return CableCoreInventory.objects.filter(allocations__has_key=str(service_order_id))
+
+
+def find_cable(site_a_id: int, site_z_id: int, count: int, lock: bool = False):
+    """
+    查找空闲芯数不少于 count 的光缆（空闲芯数最少者优先）
+
+    走 (site_a, site_z, free_count) 索引，不存在时返回 None。
+    """
+    queryset = pair_inventory(site_a_id, site_z_id).filter(free_count__gte=count).order_by('free_count', 'pk')
+    if lock:
+        queryset = queryset.select_for_update()
+    return queryset.first()
+
+
+def task_fiber_demand(task) -> Optional[Tuple[int, int, int]]:
+    """
+    从执行反馈中获取 (A 站点 ID, Z 站点 ID, 纤芯数)
+
+    反馈未填写时使用工单核查信息；非光缆光纤业务或信息不全时返回 None。
+    """
+    order = task.service_order
+    if order.check_type != ResourceCheckTypeChoices.FIBER:
+        return None
+    fiber = (task.feedback_data or {}).get('fiber') or {}
+    check_data = order.safe_check_data
+    try:
+        site_a_id = int(fiber.get('site_a_id') or check_data.get('site_a_id'))
+        site_z_id = int(fiber.get('site_z_id') or check_data.get('site_z_id'))
+        count = int(fiber.get('core_count') or check_data.get('quantity'))
+    except (TypeError, ValueError):
+        return None
+    if site_a_id == site_z_id or count <= 0:
+        return None
+    return site_a_id, site_z_id, count
+
+
+def _holders(task) -> List[str]:
+    """任务完成后占用纤芯的工单：本工单，变更任务还包括将转来纤芯的原单"""
+    order = task.service_order
+    holders = [str(order.pk)]
+    if task.task_type == TaskTypeChoices.CHANGE and order.parent_order_id:
+        holders.append(str(order.parent_order_id))
+    return holders
+
+
+def check_available(task) -> Optional[str]:
+    """任务完成前校验纤芯是否充足，不足时返回错误信息"""
+    if task.task_type == TaskTypeChoices.DEACTIVATION:
+        return None
+    demand = task_fiber_demand(task)
+    if demand is None:
+        return None
+    site_a_id, site_z_id, count = demand
+    inventory = pair_inventory(site_a_id, site_z_id)
+    if not inventory.exists():
+        return None
+    # 已在站点对上占用的纤芯沿用，只校验需补足的芯数
+    holders = _holders(task)
+    held = sum(
+        len(cores)
+        for allocations in inventory.filter(allocations__has_any_keys=holders).values_list('allocations', flat=True)
+        for key, cores in allocations.items()
+        if key in holders
+    )
+    if held >= count:
+        return None
+    if find_cable(site_a_id, site_z_id, count - held) is None:
+        return _('A、Z 站点间没有空闲纤芯不少于 {count} 芯的光缆').format(count=count - held)
+    return None
+
+
+# =============================================================================
+# 分配 / 释放
+# =============================================================================
+
+def transfer(from_order_id: int, to_order_id: int) -> List[int]:
+    """工单占用的纤芯全部转给另一工单"""
+    transferred = []
+    with transaction.atomic():
+        for inventory in order_inventory(from_order_id).select_for_update():
+            transferred.extend(inventory.transfer(from_order_id, to_order_id))
+            inventory.save()
+    return transferred
+
+
+def release_orders(order_ids: List[int], exclude_pair: Optional[Tuple[int, int]] = None) -> List[int]:
+    """释放一批工单占用的纤芯；指定 exclude_pair 时保留该站点对光缆上的纤芯"""
+    from .models import CableCoreInventory
+
+    keys = [str(order_id) for order_id in order_ids]
+    inventories = CableCoreInventory.objects.filter(allocations__has_any_keys=keys)
+    if exclude_pair is not None:
+        site_a_id, site_z_id = routing.link_key(*exclude_pair)
+        inventories = inventories.exclude(site_a_id=site_a_id, site_z_id=site_z_id)
+    released = []
+    with transaction.atomic():
+        for inventory in inventories.select_for_update():
+            for order_id in order_ids:
+                released.extend(inventory.release(order_id))
+            inventory.save()
+    return released
+
+
+def _resize(inventories: List, order_id: int, site_a_id: int, site_z_id: int, count: int) -> Optional[Dict[str, Any]]:
+    """
+    工单已在站点对上占用纤芯：按纤芯数补足或释放多余的纤芯（变更扩容 / 缩容）
+
+    补足时优先在已占用的光缆上分配，其次另选光缆；释放时从编号最大的纤芯开始。
+    """
+    key = str(order_id)
+    held = sum(len(inventory.allocations[key]) for inventory in inventories)
+    if held > count:
+        surplus = held - count
+        for inventory in reversed(inventories):
+            cores = inventory.allocations[key]
+            take = min(surplus, len(cores))
+            inventory.release(order_id, cores[len(cores) - take:])
+            inventory.save()
+            surplus -= take
+            if not surplus:
+                break
+        return None
+    if held == count:
+        return None
+
+    missing = count - held
+    inventory = next((inventory for inventory in inventories if inventory.free_count >= missing), None)
+    if inventory is None:
+        inventory = find_cable(site_a_id, site_z_id, missing, lock=True)
+        if inventory is None:
+            return None
+    cores = inventory.allocate(order_id, missing)
+    inventory.save()
+    return {'cable_id': inventory.cable_id, 'cores': cores}
+
+
+def allocate(task) -> Optional[Dict[str, Any]]:
+    """
+    为光缆光纤任务分配纤芯（同一工单已分配时按纤芯数补足或释放多余的纤芯）
+
+    变更任务先接收原单的纤芯：站点对不变时沿用（纤芯数变化时扩容 / 缩容），其余光缆上的纤芯释放。
+    """
+    demand = task_fiber_demand(task)
+    if demand is None:
+        return None
+    site_a_id, site_z_id, count = demand
+    order = task.service_order
+    with transaction.atomic():
+        if task.task_type == TaskTypeChoices.CHANGE and order.parent_order_id:
+            transfer(order.parent_order_id, order.pk)
+            release_orders([order.pk], exclude_pair=(site_a_id, site_z_id))
+        held = list(
+            pair_inventory(site_a_id, site_z_id).filter(
+                allocations__has_key=str(order.pk),
+            ).select_for_update().order_by('pk')
+        )
+        if held:
+            return _resize(held, order.pk, site_a_id, site_z_id, count)
+        inventory = find_cable(site_a_id, site_z_id, count, lock=True)
+        if inventory is None:
+            return None
+        cores = inventory.allocate(order.pk, count)
+        inventory.save()
+    return {'cable_id': inventory.cable_id, 'cores': cores}
+
+
+def release(task) -> List[int]:
+    """停闭任务完成：释放整个工单谱系（原单及其各级变更单）占用的纤芯"""
+    return release_orders(changeorders.lineage(task.service_order_id))
+
+
+def revert(task) -> List[int]:
+    """已完成的开通 / 变更任务退回待实施：变更单的纤芯交还原单，其余释放"""
+    order = task.service_order
+    if task.task_type == TaskTypeChoices.CHANGE and order.parent_order_id:
+        return transfer(order.pk, order.parent_order_id)
+    return release_orders([order.pk])
+
+
+def on_status_change(task, previous: Optional[str]) -> None:
+    """
+    任务状态变化时同步纤芯占用（由信号处理器和批量流转调用）
+
+    停闭任务退回待实施时不恢复已释放的纤芯（可能已分配给其他工单），由纤芯台账重建修正。
+    """
+    completed = previous == ExecutionStatusChoices.PENDING and task.execution_status == ExecutionStatusChoices.COMPLETED
+    reworked = previous == ExecutionStatusChoices.COMPLETED and task.execution_status == ExecutionStatusChoices.PENDING
+    if not (completed or reworked) or task.service_order.check_type != ResourceCheckTypeChoices.FIBER:
+        return
+    if task.task_type == TaskTypeChoices.DEACTIVATION:
+        if completed:
+            release(task)
+    elif completed:
+        allocate(task)
+    else:
+        revert(task)
+
+
+# =============================================================================
+# 重建
+# =============================================================================
+
+def parse_cores(value: Any) -> List[int]:
+    """解析纤芯编号：列表或 "1-4,7" 形式的文本"""
+    if isinstance(value, list):
+        return [int(core) for core in value if str(core).isdigit() and int(core) >= 1]
+    cores = []
+    for part in str(value or '').replace('，', ',').split(','):
+        part = part.strip()
+        if '-' in part:
+            start, _sep, end = part.partition('-')
+            if start.strip().isdigit() and end.strip().isdigit():
+                cores.extend(range(int(start), int(end) + 1))
+        elif part.isdigit():
+            cores.append(int(part))
+    return [core for core in cores if core >= 1]
+
+
+def rebuild_items() -> List[int]:
+    """重建涉及的光缆（按 ID 升序）：两端已连接的光缆及已有纤芯台账的光缆"""
+    from .models import CableCoreInventory
+
+    cable_ids = set(
+        CableTermination.objects.filter(
+            cable__status=LinkStatusChoices.STATUS_CONNECTED,
+            _site__isnull=False,
+        ).values_list('cable_id', flat=True).distinct()
+    )
+    cable_ids.update(CableCoreInventory.objects.values_list('cable_id', flat=True))
+    return sorted(cable_ids)
+
+
+def rebuild(chunk_size: int = 1000, cable_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """
+    由 dcim 光缆和资源台账重建纤芯台账（指定 cable_ids 时只重建这些光缆，供分批重建使用）
+
+    - 站点间光缆：两端 CableTermination 的 _site 不同且状态为已连接；
+    - 纤芯数：A 端后面板 (RearPort) 位置数之和，无后面板时为 A 端端接数；
+    - 占用：资源类型为光缆的未拆除台账快照 {'cable_id': ..., 'cores': [...] 或 "1-12"}。
+
+    不再是站点间光缆的纤芯台账删除。
+    """
+    from .models import CableCoreInventory, ResourceLedger
+
+    def scoped(queryset, field='cable_id'):
+        return queryset if cable_ids is None else queryset.filter(**{f'{field}__in': cable_ids})
+
+    ends: Dict[int, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+    terminations = scoped(CableTermination.objects.filter(
+        cable__status=LinkStatusChoices.STATUS_CONNECTED,
+        _site__isnull=False,
+    )).values_list('cable_id', 'cable_end', '_site_id')
+    for cable_id, cable_end, site_id in terminations.iterator(chunk_size=5000):
+        ends[cable_id][cable_end].add(site_id)
+
+    rear_cores = dict(
+        scoped(RearPort.objects.filter(cable__isnull=False, cable_end='A')).values('cable_id').annotate(
+            cores=Sum('positions'),
+        ).values_list('cable_id', 'cores')
+    )
+    termination_counts = dict(
+        scoped(CableTermination.objects.filter(cable_end='A')).values('cable_id').annotate(
+            count=Count('pk'),
+        ).values_list('cable_id', 'count')
+    )
+
+    # cable_id -> {工单 ID: [纤芯]}
+    allocations: Dict[int, Dict[str, List[int]]] = defaultdict(dict)
+    ledger = ResourceLedger.objects.current().filter(
+        resource_type=ResourceTypeChoices.CABLE,
+        snapshot__has_key='cable_id',
+    )
+    if cable_ids is not None:
+        # 快照中的光缆 ID 可能为数字或文本
+        ledger = ledger.filter(
+            Q(snapshot__cable_id__in=cable_ids) | Q(snapshot__cable_id__in=[str(pk) for pk in cable_ids]),
+        )
+    for order_id, snapshot in ledger.values_list('service_order_id', 'snapshot').iterator(chunk_size=chunk_size):
+        try:
+            cable_id = int(snapshot['cable_id'])
+        except (TypeError, ValueError):
+            continue
+        cores = parse_cores(snapshot.get('cores'))
+        if cores:
+            key = str(order_id)
+            allocations[cable_id][key] = sorted(set(allocations[cable_id].get(key, []) + cores))
+
+    inventories = []
+    for cable_id, sides in ends.items():
+        sites_a, sites_z = sides.get('A', set()), sides.get('B', set())
+        if len(sites_a) != 1 or len(sites_z) != 1 or sites_a == sites_z:
+            continue
+        site_a_id, site_z_id = routing.link_key(next(iter(sites_a)), next(iter(sites_z)))
+        core_count = rear_cores.get(cable_id) or termination_counts.get(cable_id) or 0
+        if not core_count:
+            continue
+        inventory = CableCoreInventory(
+            cable_id=cable_id,
+            site_a_id=site_a_id,
+            site_z_id=site_z_id,
+            core_count=core_count,
+            allocations={
+                key: [core for core in cores if core <= core_count]
+                for key, cores in allocations.get(cable_id, {}).items()
+            },
+        )
+        mask = 0
+        for cores in inventory.allocations.values():
+            for core in cores:
+                mask |= 1 << (core - 1)
+        inventory.occupied_mask = mask
+        inventories.append(inventory)
+
+    with transaction.atomic():
+        scoped(CableCoreInventory.objects.all()).delete()
+        CableCoreInventory.objects.bulk_create(inventories, batch_size=chunk_size)
+
+    return {
+        'cables': len(inventories),
+        'allocations': sum(len(inventory.allocations) for inventory in inventories),
+    }
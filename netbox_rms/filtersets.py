@@ -4,19 +4,36 @@ NetBox RMS 过滤器集定义
 用于 REST API 和列表页面的过滤功能
 """
 import django_filters
-from django.db.models import Q
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from netbox.filtersets import NetBoxModelFilterSet
+from netbox.filtersets import BaseFilterSet, NetBoxModelFilterSet
 
-from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult
+from .models import (
+    ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TaskTransition, DemandForecast, CableCoreInventory,
+    PortAssignment, TransmissionCircuit, ColocationDevice, OutboundEvent, BillingRun, BillingLine,
+    ResourceLedgerHistory, JSONRevision,
+)
 from tenancy.models import Tenant
+from dcim.models import Cable, Site
 from .choices import (
     TaskTypeChoices,
     ExecutionStatusChoices,
     ExecutionDepartmentChoices,
     ResourceTypeChoices,
+    ResourceCheckTypeChoices,
+    ConfirmationStatusChoices,
+    BandwidthChoices,
+    ForecastMethodChoices,
+    CircuitEndChoices,
+    ColocationDeviceSourceChoices,
+    OutboundEventStatusChoices,
+    ResourceLifecycleChoices,
 )
+from . import temporal
+from .ports import normalize
 
 
 class ServiceOrderFilterSet(NetBoxModelFilterSet):
@@ -70,9 +87,24 @@ class ServiceOrderFilterSet(NetBoxModelFilterSet):
         label=_('有原单号'),
     )
     
+    check_type = django_filters.MultipleChoiceFilter(
+        choices=ResourceCheckTypeChoices,
+        label=_('核查业务类别'),
+    )
+    
+    check_pending = django_filters.BooleanFilter(
+        method='filter_check_pending',
+        label=_('待录入核查结果'),
+    )
+    
+    overdue = django_filters.BooleanFilter(
+        method='filter_overdue',
+        label=_('已逾期'),
+    )
+    
     class Meta:
         model = ServiceOrder
-        fields = ['id', 'order_no', 'tenant_id', 'project_report_code', 'sales_contact', 'business_manager']
+        fields = ['id', 'order_no', 'tenant_id', 'project_report_code', 'sales_contact', 'business_manager', 'check_type']
     
     def search(self, queryset, name, value):
         if not value.strip():
@@ -89,6 +121,27 @@ class ServiceOrderFilterSet(NetBoxModelFilterSet):
         if value:
             return queryset.filter(parent_order__isnull=False)
         return queryset.filter(parent_order__isnull=True)
+    
+    def filter_check_pending(self, queryset, name, value):
+        """已指定核查业务类别但核查结果为空"""
+        pending = Q(check_result_obj__isnull=True) | Q(check_result_obj__check_result='')
+        if value:
+            return queryset.exclude(check_type='').filter(pending)
+        return queryset.exclude(pending)
+    
+    def filter_overdue(self, queryset, name, value):
+        """已过计划开通时间、未取消且仍有待实施任务"""
+        pending_tasks = TaskDetail.objects.filter(
+            service_order=OuterRef('pk'),
+            execution_status=ExecutionStatusChoices.PENDING,
+        )
+        overdue = (
+            Q(Exists(pending_tasks), deadline_date__lt=timezone.localdate()) &
+            ~Q(confirmation_status=ConfirmationStatusChoices.CANCEL)
+        )
+        if value:
+            return queryset.filter(overdue)
+        return queryset.exclude(overdue)
 
 
 class TaskDetailFilterSet(NetBoxModelFilterSet):
@@ -120,7 +173,34 @@ class TaskDetailFilterSet(NetBoxModelFilterSet):
         label=_('执行状态'),
     )
     
-
+    assignee_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=get_user_model().objects.all(),
+        field_name='assignee',
+        label=_('执行人'),
+    )
+    
+    overdue = django_filters.BooleanFilter(
+        method='filter_overdue',
+        label=_('已逾期'),
+    )
+    
+    apply_date_after = django_filters.DateFilter(
+        field_name='service_order__apply_date',
+        lookup_expr='gte',
+        label=_('申请日期起'),
+    )
+    
+    apply_date_before = django_filters.DateFilter(
+        field_name='service_order__apply_date',
+        lookup_expr='lte',
+        label=_('申请日期止'),
+    )
+    
+    check_type = django_filters.MultipleChoiceFilter(
+        field_name='service_order__check_type',
+        choices=ResourceCheckTypeChoices,
+        label=_('核查业务类别'),
+    )
     
     class Meta:
         model = TaskDetail
@@ -135,6 +215,16 @@ class TaskDetailFilterSet(NetBoxModelFilterSet):
         return queryset.filter(
             Q(service_order__order_no__icontains=value)
         )
+    
+    def filter_overdue(self, queryset, name, value):
+        """待实施且所属工单已过计划开通时间"""
+        overdue = Q(
+            execution_status=ExecutionStatusChoices.PENDING,
+            service_order__deadline_date__lt=timezone.localdate(),
+        )
+        if value:
+            return queryset.filter(overdue)
+        return queryset.exclude(overdue)
 
 
 class ResourceLedgerFilterSet(NetBoxModelFilterSet):
@@ -155,6 +245,18 @@ class ResourceLedgerFilterSet(NetBoxModelFilterSet):
         label=_('资源标识'),
     )
     
+    lifecycle_status = django_filters.MultipleChoiceFilter(
+        choices=ResourceLifecycleChoices,
+        method='filter_lifecycle_status',
+        label=_('生命周期状态'),
+    )
+    
+    as_of = django_filters.CharFilter(
+        method='filter_as_of',
+        label=_('时间点'),
+        help_text=_('日期或日期时间；按当时的生命周期状态筛选'),
+    )
+    
     service_order_id = django_filters.ModelChoiceFilter(
         queryset=ServiceOrder.objects.all(),
         label=_('来源工单'),
@@ -164,6 +266,16 @@ class ResourceLedgerFilterSet(NetBoxModelFilterSet):
         model = ResourceLedger
         fields = ['id', 'resource_type', 'resource_id', 'service_order']
     
+    def __init__(self, data=None, *args, **kwargs):
+        # 未指定生命周期状态时只查询在用资源（由部分索引覆盖），已拆除的历史台账须显式筛选
+        if data is not None and 'lifecycle_status' not in data:
+            data = data.copy()
+            if hasattr(data, 'setlist'):
+                data.setlist('lifecycle_status', [ResourceLifecycleChoices.ACTIVE])
+            else:
+                data['lifecycle_status'] = [ResourceLifecycleChoices.ACTIVE]
+        super().__init__(data, *args, **kwargs)
+    
     def search(self, queryset, name, value):
         if not value.strip():
             return queryset
@@ -172,6 +284,21 @@ class ResourceLedgerFilterSet(NetBoxModelFilterSet):
             Q(resource_name__icontains=value) |
             Q(service_order__order_no__icontains=value)
         )
+    
+    def filter_lifecycle_status(self, queryset, name, value):
+        # 指定时间点时由 filter_as_of 按当时的状态筛选
+        if self.form.cleaned_data.get('as_of'):
+            return queryset
+        return queryset.filter(lifecycle_status__in=value)
+    
+    def filter_as_of(self, queryset, name, value):
+        moment = temporal.parse_moment(value)
+        if moment is None:
+            return queryset.none()
+        statuses = self.form.cleaned_data.get('lifecycle_status') or [ResourceLifecycleChoices.ACTIVE]
+        return queryset.filter(
+            pk__in=temporal.as_of(moment).filter(lifecycle_status__in=statuses).values('ledger_id'),
+        )
 
 
 class ResourceCheckResultFilterSet(NetBoxModelFilterSet):
@@ -204,3 +331,350 @@ class ResourceCheckResultFilterSet(NetBoxModelFilterSet):
             Q(check_result__icontains=value) |
             Q(description__icontains=value)
         )
+
+
+class TaskTransitionFilterSet(BaseFilterSet):
+    """执行任务状态变更记录过滤器集"""
+    
+    task_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=TaskDetail.objects.all(),
+        field_name='task',
+        label=_('执行任务'),
+    )
+    
+    from_status = django_filters.MultipleChoiceFilter(
+        choices=ExecutionStatusChoices,
+        label=_('原状态'),
+    )
+    
+    to_status = django_filters.MultipleChoiceFilter(
+        choices=ExecutionStatusChoices,
+        label=_('新状态'),
+    )
+    
+    timestamp_after = django_filters.DateTimeFilter(
+        field_name='timestamp',
+        lookup_expr='gte',
+        label=_('变更时间起'),
+    )
+    
+    timestamp_before = django_filters.DateTimeFilter(
+        field_name='timestamp',
+        lookup_expr='lt',
+        label=_('变更时间止'),
+    )
+    
+    user_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=get_user_model().objects.all(),
+        field_name='user',
+        label=_('操作人'),
+    )
+    
+    class Meta:
+        model = TaskTransition
+        fields = ['id', 'from_status', 'to_status']
+
+
+class DemandForecastFilterSet(BaseFilterSet):
+    """需求预测过滤器集"""
+    
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Site.objects.all(),
+        field_name='site',
+        label=_('站点'),
+    )
+    
+    bandwidth = django_filters.MultipleChoiceFilter(
+        choices=BandwidthChoices,
+        label=_('带宽'),
+    )
+    
+    method = django_filters.MultipleChoiceFilter(
+        choices=ForecastMethodChoices,
+        label=_('预测模型'),
+    )
+    
+    period_after = django_filters.DateFilter(
+        field_name='period',
+        lookup_expr='gte',
+        label=_('预测月份起'),
+    )
+    
+    period_before = django_filters.DateFilter(
+        field_name='period',
+        lookup_expr='lte',
+        label=_('预测月份止'),
+    )
+    
+    class Meta:
+        model = DemandForecast
+        fields = ['id', 'bandwidth', 'period', 'method']
+
+
+class CableCoreInventoryFilterSet(BaseFilterSet):
+    """光缆纤芯占用过滤器集"""
+    
+    cable_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Cable.objects.all(),
+        field_name='cable',
+        label=_('光缆'),
+    )
+    
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Site.objects.all(),
+        method='filter_site',
+        label=_('站点'),
+    )
+    
+    free_count__gte = django_filters.NumberFilter(
+        field_name='free_count',
+        lookup_expr='gte',
+        label=_('空闲芯数不少于'),
+    )
+    
+    class Meta:
+        model = CableCoreInventory
+        fields = ['id', 'core_count', 'free_count']
+    
+    def filter_site(self, queryset, name, value):
+        """A 端或 Z 端为所选站点"""
+        if not value:
+            return queryset
+        return queryset.filter(Q(site_a__in=value) | Q(site_z__in=value))
+
+
+class PortAssignmentFilterSet(BaseFilterSet):
+    """端口占用过滤器集"""
+    
+    q = django_filters.CharFilter(
+        method='search',
+        label=_('搜索'),
+    )
+    
+    task_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=TaskDetail.objects.all(),
+        field_name='task',
+        label=_('执行任务'),
+    )
+    
+    service_order_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=ServiceOrder.objects.all(),
+        field_name='service_order',
+        label=_('工单'),
+    )
+    
+    end = django_filters.MultipleChoiceFilter(
+        choices=CircuitEndChoices,
+        label=_('端点'),
+    )
+    
+    site = django_filters.CharFilter(
+        method='filter_site',
+        label=_('站点'),
+    )
+    
+    class Meta:
+        model = PortAssignment
+        fields = ['id', 'circuit_code', 'device_model', 'card', 'port', 'port_key', 'active']
+    
+    def search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return queryset.filter(
+            Q(circuit_code__icontains=value) |
+            Q(port_key__contains=normalize(value))
+        )
+    
+    def filter_site(self, queryset, name, value):
+        """按规范化后的站点名匹配 port_key 前缀，可走索引"""
+        if not value.strip():
+            return queryset
+        return queryset.filter(port_key__startswith=f'{normalize(value)}|')
+
+
+class TransmissionCircuitFilterSet(NetBoxModelFilterSet):
+    """传输电路过滤器集"""
+    
+    q = django_filters.CharFilter(
+        method='search',
+        label=_('搜索'),
+    )
+    
+    task_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=TaskDetail.objects.all(),
+        field_name='task',
+        label=_('执行任务'),
+    )
+    
+    service_order_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=ServiceOrder.objects.all(),
+        field_name='service_order',
+        label=_('工单'),
+    )
+    
+    bandwidth = django_filters.MultipleChoiceFilter(
+        choices=BandwidthChoices,
+        label=_('带宽'),
+    )
+    
+    site = django_filters.CharFilter(
+        method='filter_site',
+        label=_('站点'),
+    )
+    
+    class Meta:
+        model = TransmissionCircuit
+        fields = [
+            'id', 'code', 'site_a', 'model_a', 'card_a', 'port_a',
+            'site_z', 'model_z', 'card_z', 'port_z',
+        ]
+    
+    def search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return queryset.filter(
+            Q(code__icontains=value) |
+            Q(site_a__icontains=value) |
+            Q(site_z__icontains=value) |
+            Q(service_order__order_no__icontains=value)
+        )
+    
+    def filter_site(self, queryset, name, value):
+        """A 端或 Z 端为所选站点"""
+        if not value.strip():
+            return queryset
+        return queryset.filter(Q(site_a=value) | Q(site_z=value))
+
+
+class ColocationDeviceFilterSet(BaseFilterSet):
+    """托管设备过滤器集"""
+    
+    service_order_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=ServiceOrder.objects.all(),
+        field_name='service_order',
+        label=_('工单'),
+    )
+    
+    task_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=TaskDetail.objects.all(),
+        field_name='task',
+        label=_('执行任务'),
+    )
+    
+    site_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Site.objects.all(),
+        field_name='site',
+        label=_('机房'),
+    )
+    
+    source = django_filters.MultipleChoiceFilter(
+        choices=ColocationDeviceSourceChoices,
+        label=_('来源'),
+    )
+    
+    class Meta:
+        model = ColocationDevice
+        fields = ['id', 'device_type', 'model', 'rack_units', 'cabinet']
+
+
+class OutboundEventFilterSet(BaseFilterSet):
+    """外发事件过滤器集"""
+    
+    status = django_filters.MultipleChoiceFilter(
+        choices=OutboundEventStatusChoices,
+        label=_('投递状态'),
+    )
+    
+    class Meta:
+        model = OutboundEvent
+        fields = ['id', 'event', 'object_type', 'object_id', 'attempts']
+
+
+class BillingRunFilterSet(BaseFilterSet):
+    """计费批次过滤器集"""
+    
+    class Meta:
+        model = BillingRun
+        fields = ['id', 'period']
+
+
+class BillingLineFilterSet(BaseFilterSet):
+    """计费明细过滤器集"""
+    
+    run_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=BillingRun.objects.all(),
+        field_name='run',
+        label=_('计费批次'),
+    )
+    
+    period = django_filters.DateFilter(
+        field_name='run__period',
+        label=_('计费月'),
+    )
+    
+    tenant_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=Tenant.objects.all(),
+        field_name='tenant',
+        label=_('客户单位'),
+    )
+    
+    service_order_id = django_filters.ModelMultipleChoiceFilter(
+        queryset=ServiceOrder.objects.all(),
+        field_name='service_order',
+        label=_('计费工单'),
+    )
+    
+    resource_type = django_filters.MultipleChoiceFilter(
+        choices=ResourceTypeChoices,
+        label=_('资源类型'),
+    )
+    
+    class Meta:
+        model = BillingLine
+        fields = ['id', 'resource_id', 'start_date', 'end_date', 'days']
+
+
+class ResourceLedgerHistoryFilterSet(BaseFilterSet):
+    """资源台账历史版本过滤器集"""
+    
+    as_of = django_filters.CharFilter(
+        method='filter_as_of',
+        label=_('时间点'),
+        help_text=_('日期或日期时间；返回当时有效的版本'),
+    )
+    
+    ledger_id = django_filters.NumberFilter(
+        label=_('资源台账'),
+    )
+    
+    service_order_id = django_filters.NumberFilter(
+        label=_('来源工单'),
+    )
+    
+    resource_type = django_filters.MultipleChoiceFilter(
+        choices=ResourceTypeChoices,
+        label=_('资源类型'),
+    )
+    
+    lifecycle_status = django_filters.MultipleChoiceFilter(
+        choices=ResourceLifecycleChoices,
+        label=_('生命周期状态'),
+    )
+    
+    class Meta:
+        model = ResourceLedgerHistory
+        fields = ['id', 'resource_id']
+    
+    def filter_as_of(self, queryset, name, value):
+        moment = temporal.parse_moment(value)
+        if moment is None:
+            return queryset.none()
+        return temporal.as_of(moment, queryset)
+
+
+class JSONRevisionFilterSet(BaseFilterSet):
+    """JSON 字段版本过滤器集"""
+    
+    class Meta:
+        model = JSONRevision
+        fields = ['id', 'object_type', 'object_id', 'field', 'version', 'checkpoint']
@@ -0,0 +1,213 @@
+"""
+NetBox RMS 需求预测
+
+按站点、带宽统计历史传输专线工单的月度电路需求，拟合简单季节模型，
+预测未来一个季度各站点所需的模块（端口）数量，结果写入 DemandForecast。
+
+月度序列在数据库内用 TruncMonth + GROUP BY 一次聚合得到，
+每条序列只有几十个点，拟合在 Python 中逐条完成即可覆盖全部历史。
+"""
+import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Sum, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .choices import BandwidthChoices, ConfirmationStatusChoices, ForecastMethodChoices, ResourceCheckTypeChoices
+from .demand import json_int
+
+# 默认预测月数（一个季度）
+DEFAULT_HORIZON = 3
+
+# 季节周期（月）
+SEASON = 12
+
+# (站点 ID, 带宽) -> {月份: 电路数}
+Series = Dict[Tuple[int, str], Dict[datetime.date, int]]
+
+
+# =============================================================================
+# 月份工具
+# =============================================================================
+
+def month_start(value: datetime.date) -> datetime.date:
+    """所在月份的第一天"""
+    return value.replace(day=1)
+
+
+def add_months(value: datetime.date, months: int) -> datetime.date:
+    """月份加减（value 为月份第一天）"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    """[start, end) 内的所有月份"""
+    months = []
+    current = start
+    while current < end:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+# =============================================================================
+# 历史序列
+# =============================================================================
+
+def monthly_series(queryset, before: datetime.date) -> Series:
+    """
+    统计各站点、各带宽的月度电路需求
+
+    每条电路在 A、Z 两端站点各需要一个模块，因此分别按 A 端、Z 端站点聚合后合并。
+
+    Args:
+        queryset: ServiceOrder 查询集
+        before: 只统计该月份之前（不含）的工单，避免不完整的当月数据拉低预测
+    """
+    base = queryset.order_by().filter(
+        check_type=ResourceCheckTypeChoices.TRANSMISSION,
+        apply_date__lt=before,
+    ).exclude(
+        confirmation_status=ConfirmationStatusChoices.CANCEL,
+    ).annotate(
+        month=TruncMonth('apply_date'),
+        bandwidth_text=KeyTextTransform('bandwidth', 'check_data'),
+        qty=Coalesce(json_int('quantity'), Value(1)),
+    ).filter(
+        bandwidth_text__in=[value for value, _label in BandwidthChoices.CHOICES],
+    )
+
+    series: Series = {}
+    for site_key in ('site_a_id', 'site_z_id'):
+        rows = base.filter(
+            check_data__has_key=site_key,
+        ).annotate(
+            site=json_int(site_key),
+        ).filter(
+            site__isnull=False,
+        ).values('site', 'bandwidth_text', 'month').annotate(
+            total=Sum('qty'),
+        ).values_list('site', 'bandwidth_text', 'month', 'total')
+
+        for site_id, bandwidth, month, total in rows:
+            months = series.setdefault((site_id, bandwidth), {})
+            months[month] = months.get(month, 0) + (total or 0)
+    return series
+
+
+# =============================================================================
+# 模型
+# =============================================================================
+
+def _mean(values: Sequence[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def linear_trend(values: Sequence[float]) -> Tuple[float, float]:
+    """最小二乘拟合 y = a + b * t，返回 (a, b)"""
+    n = len(values)
+    if n < 2:
+        return _mean(values), 0.0
+    t_mean = (n - 1) / 2
+    y_mean = _mean(values)
+    denominator = sum((t - t_mean) ** 2 for t in range(n))
+    slope = sum((t - t_mean) * (y - y_mean) for t, y in enumerate(values)) / denominator
+    return y_mean - slope * t_mean, slope
+
+
+def fit_forecast(values: Sequence[float], horizon: int = DEFAULT_HORIZON) -> Tuple[List[float], str]:
+    """
+    拟合并预测
+
+    - 至少两个完整季节周期：季节朴素 + 年度漂移，
+      即去年同月值加上最近 12 个月与之前 12 个月的月均差；
+    - 至少 3 个月：最近 12 个月的线性趋势外推；
+    - 否则：历史均值。
+
+    Returns:
+        (未来 horizon 个月的预测值（不小于 0）, 预测模型)
+    """
+    n = len(values)
+    if n >= 2 * SEASON:
+        drift = _mean(values[-SEASON:]) - _mean(values[-2 * SEASON:-SEASON])
+        forecast = [values[n - SEASON + h % SEASON] + drift for h in range(horizon)]
+        method = ForecastMethodChoices.SEASONAL_DRIFT
+    elif n >= 3:
+        recent = values[-SEASON:]
+        intercept, slope = linear_trend(recent)
+        forecast = [intercept + slope * (len(recent) + h) for h in range(horizon)]
+        method = ForecastMethodChoices.LINEAR_TREND
+    else:
+        forecast = [_mean(values)] * horizon
+        method = ForecastMethodChoices.MEAN
+    return [round(max(value, 0.0), 2) for value in forecast], method
+
+
+# =============================================================================
+# 重建预测
+# =============================================================================
+
+def rebuild_forecasts(horizon: int = DEFAULT_HORIZON, today: Optional[datetime.date] = None) -> Dict[str, int]:
+    """
+    全量重建需求预测
+
+    Args:
+        horizon: 预测月数
+        today: 基准日期（默认今天），从下个月开始预测
+
+    Returns:
+        统计信息：序列数、写入记录数
+    """
+    from dcim.models import Site
+
+    from .models import DemandForecast, ServiceOrder
+
+    today = today or timezone.localdate()
+    current = month_start(today)
+    series = monthly_series(ServiceOrder.objects.all(), before=current)
+    # check_data 中的站点可能已被删除
+    site_ids = set(Site.objects.filter(
+        pk__in={site_id for site_id, _bandwidth in series},
+    ).values_list('pk', flat=True))
+    periods = [add_months(current, h + 1) for h in range(horizon)]
+    # 当月尚未结束，先预测当月再取之后的月份
+    steps = horizon + 1
+
+    generated = timezone.now()
+    forecasts = []
+    for (site_id, bandwidth), months in series.items():
+        if site_id not in site_ids:
+            continue
+        history = month_range(min(months), current)
+        values = [months.get(month, 0) for month in history]
+        predicted, method = fit_forecast(values, steps)
+        predicted = predicted[1:]
+        if not any(predicted):
+            continue
+        history_quantity = sum(values[-SEASON:])
+        forecasts.extend(
+            DemandForecast(
+                site_id=site_id,
+                bandwidth=bandwidth,
+                period=period,
+                quantity=quantity,
+                method=method,
+                history_months=len(values),
+                history_quantity=history_quantity,
+                generated=generated,
+            )
+            for period, quantity in zip(periods, predicted)
+        )
+
+    with transaction.atomic():
+        DemandForecast.objects.all().delete()
+        DemandForecast.objects.bulk_create(forecasts, batch_size=2000)
+
+    return {
+        'series': len(series),
+        'forecasts': len(forecasts),
+    }
@@ -10,11 +10,13 @@ from django import forms
 from django.utils.translation import gettext_lazy as _
 
 from netbox.forms import NetBoxModelForm, NetBoxModelFilterSetForm
-from utilities.forms.fields import DynamicModelChoiceField, CommentField
+from netbox.plugins import get_plugin_config
+from utilities.forms.fields import DynamicModelChoiceField, DynamicModelMultipleChoiceField, CommentField
 from utilities.forms.rendering import FieldSet
 from dcim.models import Site
 
-from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult
+from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TransmissionCircuit
+from . import changeorders, colocation, ports, power, routing, schemas, validation, wavelength, workflow
 from tenancy.models import Tenant
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -36,6 +38,7 @@ from .choices import (
     ColocationDeviceTypeChoices,
     ConfirmationStatusChoices,
     AddMethodChoices,
+    ResourceLifecycleChoices,
 )
 
 
@@ -199,12 +202,23 @@ class ServiceOrderForm(NetBoxModelForm):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         
-        if self.instance and self.instance.pk:
-            self.initial['check_type'] = self.instance.check_type
+        # 核查字段初始值来源：编辑时为工单本身，新建变更单时为原单
+        source = self.instance if self.instance and self.instance.pk else None
+        if source is None and not self.is_bound and self.initial.get('parent_order') \
+                and get_plugin_config('netbox_rms', 'auto_fill_change_order'):
+            try:
+                source = ServiceOrder.objects.filter(pk=int(self.initial['parent_order'])).first()
+            except (TypeError, ValueError):
+                source = None
+            if source is not None:
+                self.initial.update(changeorders.initial_values(source))
+        
+        if source is not None:
+            self.initial['check_type'] = source.check_type
 
         # 从 check_data 中解析初始值
-        if self.instance and self.instance.pk:
-            data = self.instance.check_data or {}
+        if source is not None:
+            data = source.check_data or {}
             if data:
                 self.initial['check_quantity'] = data.get('quantity')
                 self.initial['check_bandwidth'] = data.get('bandwidth')
@@ -288,6 +302,9 @@ class ServiceOrderForm(NetBoxModelForm):
         
         cleaned_data['check_data'] = check_data
         
+        # 核查数据按核查类别的数据格式校验
+        for message in schemas.check_data_errors(check_type, check_data):
+            self.add_error(None, message)
 
         
         return cleaned_data
@@ -362,11 +379,16 @@ class ServiceOrderForm(NetBoxModelForm):
         # 保存到实例
         instance.check_type = check_type
         instance.check_data = check_data
+        adding = instance._state.adding
         
         if commit:
             instance.save()
             self.save_m2m()
             
+            # 新建变更单：登记原单关联的资源台账
+            if adding and instance.parent_order_id and get_plugin_config('netbox_rms', 'auto_fill_change_order'):
+                changeorders.link_resources([instance])
+            
             # 手动处理标签
             tag_ids = self.data.getlist('tags')
             if tag_ids:
@@ -541,6 +563,10 @@ class TaskDetailForm(NetBoxModelForm):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         
+        # 执行状态只提供当前状态及工作流允许流转到的状态
+        current_status = self.instance.execution_status if self.instance.pk else None
+        self.fields['execution_status'].choices = workflow.status_choices_for(current_status)
+        
         # 初始化反馈字段
         if self.instance and self.instance.pk and self.instance.feedback_data:
             fb = self.instance.feedback_data
@@ -581,10 +607,20 @@ class TaskDetailForm(NetBoxModelForm):
             if colo.get('devices'):
                 self.initial['fb_colocation_info_json'] = json.dumps(colo.get('devices'))
 
-    def save(self, commit: bool = True) -> TaskDetail:
-        instance = super().save(commit=False)
+    def clean(self) -> Dict[str, Any]:
+        cleaned_data = super().clean()
+        
+        # 执行反馈须在模型校验（端口占用冲突检测）之前写入实例
+        self.instance.feedback_data = self._feedback_data()
         
-        # 构建 feedback_data
+        # 执行反馈按数据格式校验
+        for message in schemas.feedback_data_errors(self.instance.feedback_data):
+            self.add_error(None, message)
+        
+        return cleaned_data
+
+    def _feedback_data(self) -> Dict[str, Any]:
+        """由反馈字段构建 feedback_data"""
         fb = {
             'config_date': str(self.cleaned_data.get('fb_config_date') or ''),
             'test_date': str(self.cleaned_data.get('fb_test_date') or ''),
@@ -640,8 +676,11 @@ class TaskDetailForm(NetBoxModelForm):
             'cable_odf': self.cleaned_data.get('fb_colocation_cable_odf'),
             'devices': devices
         }
-        
-        instance.feedback_data = fb
+        return fb
+
+    def save(self, commit: bool = True) -> TaskDetail:
+        instance = super().save(commit=False)
+        instance.feedback_data = self._feedback_data()
         
         if commit:
             instance.save()
@@ -686,7 +725,7 @@ class ResourceLedgerForm(NetBoxModelForm):
     
     fieldsets = (
         FieldSet(
-            'service_order', 'resource_type', 'resource_id', 'resource_name',
+            'service_order', 'resource_type', 'resource_id', 'resource_name', 'lifecycle_status',
             name=_('资源信息'),
         ),
         FieldSet(
@@ -698,7 +737,7 @@ class ResourceLedgerForm(NetBoxModelForm):
     class Meta:
         model = ResourceLedger
         fields = [
-            'service_order', 'resource_type', 'resource_id', 'resource_name',
+            'service_order', 'resource_type', 'resource_id', 'resource_name', 'lifecycle_status',
             'snapshot', 'comments', 'tags',
         ]
         widgets = {
@@ -721,6 +760,90 @@ class ResourceLedgerFilterForm(NetBoxModelFilterSetForm):
         required=False,
         label=_('资源标识'),
     )
+    
+    lifecycle_status = forms.MultipleChoiceField(
+        choices=ResourceLifecycleChoices,
+        required=False,
+        label=_('生命周期状态'),
+        help_text=_('未选择时只显示在用资源'),
+    )
+    
+    as_of = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+        label=_('时间点'),
+        help_text=_('显示该日结束时的资源（生命周期状态按当时筛选）'),
+    )
+
+
+# =============================================================================
+# TransmissionCircuit 表单
+# =============================================================================
+
+class TransmissionCircuitForm(NetBoxModelForm):
+    """传输电路表单（保存后回写所属任务的执行反馈）"""
+    
+    task = DynamicModelChoiceField(
+        queryset=TaskDetail.objects.all(),
+        label=_('执行任务'),
+    )
+    
+    fieldsets = (
+        FieldSet('task', 'sequence', 'code', 'bandwidth', name=_('电路信息')),
+        FieldSet('site_a', 'model_a', 'card_a', 'port_a', name=_('A端')),
+        FieldSet('site_z', 'model_z', 'card_z', 'port_z', name=_('Z端')),
+        FieldSet('tags', name=_('标签')),
+    )
+    
+    class Meta:
+        model = TransmissionCircuit
+        fields = [
+            'task', 'sequence', 'code', 'bandwidth',
+            'site_a', 'model_a', 'card_a', 'port_a',
+            'site_z', 'model_z', 'card_z', 'port_z',
+            'tags',
+        ]
+    
+    def clean(self) -> Dict[str, Any]:
+        cleaned_data = super().clean()
+        task = cleaned_data.get('task')
+        if task is not None:
+            # 与同一任务的其他电路一并检查，即回写后任务反馈中的全部电路
+            circuits = [
+                circuit.to_feedback()
+                for circuit in task.circuits.exclude(pk=self.instance.pk)
+            ]
+            circuits.append({field: cleaned_data.get(field) for field in TransmissionCircuit.FEEDBACK_FIELDS})
+            conflicts = ports.find_conflicts(
+                ports.task_circuits({'transmission': {'circuits': circuits}}),
+                task.task_type,
+                task.pk,
+            )
+            if conflicts:
+                self.add_error(None, _('电路端口已被占用：{conflicts}').format(conflicts='；'.join(conflicts)))
+        return cleaned_data
+
+
+class TransmissionCircuitFilterForm(NetBoxModelFilterSetForm):
+    """传输电路过滤表单"""
+    
+    model = TransmissionCircuit
+    
+    code = forms.CharField(
+        required=False,
+        label=_('电路编号'),
+    )
+    
+    bandwidth = forms.MultipleChoiceField(
+        choices=BandwidthChoices,
+        required=False,
+        label=_('带宽'),
+    )
+    
+    site = forms.CharField(
+        required=False,
+        label=_('站点'),
+    )
 
 
 # =============================================================================
@@ -819,6 +942,72 @@ class ResourceCheckResultForm(NetBoxModelForm):
              self.fields['check_result'].choices = [('', '请先选择工单')]
              self.fields['unavailable_reasons'].choices = []
 
+        # 3. 建议路由、配电预算、外部资源校验：计算开销大（外部校验为同步 HTTP 请求），
+        #    只在初次打开表单时给出，提交及校验失败重绘时不重复计算
+        if service_order and not self.is_bound:
+            self._add_suggestions(service_order)
+
+    def _add_suggestions(self, service_order: ServiceOrder) -> None:
+        """在说明字段的帮助文字中给出建议路由、配电预算和外部资源校验结果"""
+        # 传输专线 / 光缆光纤：根据光缆、电路拓扑给出建议路由
+        if service_order.check_type in ('transmission', 'fiber'):
+            sites = routing.order_sites(service_order)
+            if sites:
+                routes = routing.find_routes(*sites)
+                if routes:
+                    suggestion = _('建议路由：{route}').format(route=routing.format_route(routes[0]))
+                    if len(routes) > 1:
+                        suggestion += '；' + _('备选：{routes}').format(
+                            routes='；'.join(routing.format_route(route) for route in routes[1:]),
+                        )
+                else:
+                    suggestion = _('A、Z 端站点之间未找到光缆或电路路由')
+                if routes and service_order.safe_check_data.get('needs_protection'):
+                    pair = routing.protection_routes(routing.get_graph(), *sites)
+                    if pair['disjoint']:
+                        suggestion += '；' + _('保护路由（{mode}分离）：{route}').format(
+                            mode=_('节点') if pair['disjoint'] == 'node' else _('链路'),
+                            route=routing.format_route(pair['protection']),
+                        )
+                    else:
+                        suggestion += '；' + _('不存在与主用路由分离的保护路由')
+                if routes and service_order.check_type == 'transmission':
+                    plan = wavelength.assign(*sites, service_order.safe_check_data.get('bandwidth') or '')
+                    if plan['available']:
+                        suggestion += '；' + _('可用波道：{channels}（{route}）').format(
+                            channels='、'.join(str(channel) for channel in plan['channels']),
+                            route=routing.format_route(plan['route']),
+                        )
+                    else:
+                        suggestion += '；' + _('候选路由上无全程连续空闲波道')
+                self.fields['description'].help_text = suggestion
+
+        # 托管业务：根据机房电源馈线容量给出配电预算
+        if service_order.check_type == 'colocation':
+            site_id = colocation._site_id(service_order.safe_check_data.get('site_id'))
+            budget = power.evaluate_order(service_order, power.site_budgets([site_id]) if site_id else {})
+            if budget['sufficient'] is None:
+                suggestion = _('配电：申请 {requested} W，机房未登记在用电源馈线').format(requested=budget['requested'])
+            else:
+                suggestion = _('配电：申请 {requested} W，机房余量 {remaining} W（{verdict}）').format(
+                    requested=budget['requested'],
+                    remaining=budget['remaining'],
+                    verdict=_('满足') if budget['sufficient'] else _('不满足'),
+                )
+            self.fields['description'].help_text = suggestion
+
+        # 外部资源校验（答复有缓存，核查信息变化后重新校验）
+        if validation.enabled():
+            result = validation.validate_orders([service_order])[service_order.pk]
+            if result['valid'] is None:
+                hint = _('外部资源校验失败：{error}').format(error=result['error'])
+            elif result['valid']:
+                hint = _('外部资源校验通过')
+            else:
+                hint = _('外部资源校验不通过：{messages}').format(messages='；'.join(result['messages']))
+            help_text = self.fields['description'].help_text
+            self.fields['description'].help_text = f'{help_text}；{hint}' if help_text else hint
+
 
 class ResourceCheckResultFilterForm(NetBoxModelFilterSetForm):
     """资源核查结果过滤表单"""
@@ -834,3 +1023,153 @@ class ResourceCheckResultFilterForm(NetBoxModelFilterSetForm):
         required=False,
         label=_('核查结果')
     )
+
+
+# =============================================================================
+# 统计分析表单
+# =============================================================================
+
+class DemandMatrixFilterForm(forms.Form):
+    """站点对需求矩阵过滤表单"""
+    
+    apply_date_after = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+        label=_('申请日期起'),
+    )
+    
+    apply_date_before = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+        label=_('申请日期止'),
+    )
+    
+    tenant_id = DynamicModelMultipleChoiceField(
+        queryset=Tenant.objects.all(),
+        required=False,
+        label=_('客户单位'),
+    )
+    
+    check_type = forms.MultipleChoiceField(
+        choices=[
+            (ResourceCheckTypeChoices.TRANSMISSION, _('传输专线业务')),
+            (ResourceCheckTypeChoices.FIBER, _('光缆光纤业务')),
+        ],
+        required=False,
+        label=_('核查业务类别'),
+    )
+    
+    metric = forms.ChoiceField(
+        choices=[
+            ('bandwidth_gbps', _('带宽 (Gbps)')),
+            ('transmission_orders', _('传输专线工单数')),
+            ('fiber_orders', _('光缆光纤工单数')),
+            ('circuits', _('电路数量')),
+            ('fiber_cores', _('纤芯数量')),
+        ],
+        required=False,
+        label=_('热力图指标'),
+    )
+    
+    limit = forms.IntegerField(
+        min_value=2,
+        max_value=200,
+        required=False,
+        label=_('显示站点数'),
+    )
+
+
+class ChangeOrderBulkForm(forms.Form):
+    """批量生成变更单表单"""
+    
+    parent_orders = DynamicModelMultipleChoiceField(
+        queryset=ServiceOrder.objects.all(),
+        label=_('原单'),
+    )
+    
+    apply_date = forms.DateField(
+        label=_('申请时间'),
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    
+    deadline_date = forms.DateField(
+        label=_('计划开通时间'),
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    
+    bandwidth = forms.ChoiceField(
+        choices=[('', _('不变'))] + list(BandwidthChoices.CHOICES),
+        required=False,
+        label=_('变更后带宽'),
+        help_text=_('仅传输专线工单生效'),
+    )
+    
+    def clean(self) -> Dict[str, Any]:
+        cleaned_data = super().clean()
+        apply_date, deadline_date = cleaned_data.get('apply_date'), cleaned_data.get('deadline_date')
+        if apply_date and deadline_date and deadline_date < apply_date:
+            raise forms.ValidationError({'deadline_date': _('计划开通时间不能早于申请时间')})
+        if cleaned_data.get('bandwidth'):
+            others = [
+                order.order_no for order in cleaned_data.get('parent_orders') or []
+                if order.check_type != ResourceCheckTypeChoices.TRANSMISSION
+            ]
+            if others:
+                raise forms.ValidationError({
+                    'parent_orders': _('变更带宽时原单须均为传输专线：{orders}').format(orders='、'.join(others)),
+                })
+        return cleaned_data
+
+
+class OrderCloneForm(forms.Form):
+    """工单批量复制选项"""
+    
+    apply_date = forms.DateField(
+        label=_('申请时间'),
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    
+    deadline_date = forms.DateField(
+        label=_('计划开通时间'),
+        widget=forms.DateInput(attrs={'type': 'date'}),
+    )
+    
+    include_tasks = forms.BooleanField(
+        required=False,
+        initial=True,
+        label=_('复制执行任务'),
+        help_text=_('状态重置为待实施，执行反馈清空'),
+    )
+    
+    include_check_results = forms.BooleanField(
+        required=False,
+        initial=True,
+        label=_('复制核查结果'),
+    )
+    
+    def clean(self) -> Dict[str, Any]:
+        cleaned_data = super().clean()
+        apply_date, deadline_date = cleaned_data.get('apply_date'), cleaned_data.get('deadline_date')
+        if apply_date and deadline_date and deadline_date < apply_date:
+            raise forms.ValidationError({'deadline_date': _('计划开通时间不能早于申请时间')})
+        return cleaned_data
+
+
+class BillingRunForm(forms.Form):
+    """计费计算"""
+    
+    period = forms.DateField(
+        label=_('计费月'),
+        input_formats=['%Y-%m'],
+        widget=forms.DateInput(attrs={'type': 'month'}, format='%Y-%m'),
+    )
+
+
+class ColocationCapacityFilterForm(forms.Form):
+    """托管容量汇总过滤表单"""
+    
+    site_id = DynamicModelMultipleChoiceField(
+        queryset=Site.objects.all(),
+        required=False,
+        label=_('机房'),
+    )
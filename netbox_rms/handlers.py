@@ -0,0 +1,36 @@
+"""
+NetBox RMS 领域事件处理器
+
+由 events 在事务提交时按批调用，一批事件只执行一次。
+"""
+from typing import List
+
+from . import cache, events
+
+# 模型 -> 受影响的缓存命名空间
+CACHE_NAMESPACES = {
+    'netbox_rms.serviceorder': (cache.NAMESPACE_ORDERS,),
+    'netbox_rms.taskdetail': (cache.NAMESPACE_TASKS,),
+    'netbox_rms.resourcecheckresult': (cache.NAMESPACE_CHECK_RESULTS,),
+    'netbox_rms.resourceledger': (cache.NAMESPACE_LEDGER,),
+    # 站点邻接图
+    'dcim.cable': (cache.NAMESPACE_TOPOLOGY,),
+    'dcim.cabletermination': (cache.NAMESPACE_TOPOLOGY,),
+    'circuits.circuit': (cache.NAMESPACE_TOPOLOGY,),
+    'circuits.circuittermination': (cache.NAMESPACE_TOPOLOGY,),
+    'dcim.site': (cache.NAMESPACE_TOPOLOGY,),
+    # 机房配电预算
+    'dcim.powerfeed': (cache.NAMESPACE_POWER,),
+    'dcim.powerpanel': (cache.NAMESPACE_POWER,),
+}
+
+
+@events.handler(events.OBJECT_CHANGED)
+def invalidate_cache(batch: List[events.Event]) -> None:
+    """对象保存或删除后使相关缓存失效（每批每个命名空间只递增一次版本号）"""
+    namespaces = {
+        namespace
+        for event in batch
+        for namespace in CACHE_NAMESPACES.get(event.model, ())
+    }
+    cache.invalidate_namespace(*sorted(namespaces))
@@ -0,0 +1,118 @@
+"""
+NetBox RMS 工单批量导入
+
+导入行为字典，键为工单字段名：
+- tenant：租户 ID、缩写 (slug) 或名称；
+- parent_order：原单号；
+- 其余字段按模型字段取值（日期可为 ISO 字符串），check_data 为字典，按核查类别的数据格式校验。
+
+每批在一个事务内写入：逐行构建并校验（full_clean），校验通过的行批量写入工单
+及托管申请设备，并批量记录变更日志。单号已存在的行跳过，因此中断后可从任意位置重新导入。
+"""
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from tenancy.models import Tenant
+
+from . import cache, colocation, schemas
+from .changeorders import log_creations
+
+# 可导入的字段（tenant、parent_order 另行解析）
+IMPORT_FIELDS = (
+    'order_no', 'project_report_code', 'project_approval_code', 'contract_code',
+    'sales_contact', 'business_manager', 'internal_participant',
+    'apply_date', 'deadline_date', 'billing_start_date', 'confirmation_status',
+    'special_notes', 'check_type', 'check_data', 'comments',
+)
+
+
+def _error_messages(error: ValidationError) -> List[str]:
+    if hasattr(error, 'error_dict'):
+        return [f'{field}: {message}' for field, messages in error.message_dict.items() for message in messages]
+    return list(error.messages)
+
+
+def _resolve_tenants(values: Iterable[Any]) -> Dict[str, int]:
+    """租户 ID / slug / 名称 -> 租户 ID（一次查询）"""
+    values = {str(value) for value in values if value not in (None, '')}
+    ids = [int(value) for value in values if value.isdigit()]
+    tenants = {}
+    for pk, slug, name in Tenant.objects.filter(
+        Q(pk__in=ids) | Q(slug__in=values) | Q(name__in=values),
+    ).values_list('pk', 'slug', 'name'):
+        tenants.setdefault(str(pk), pk)
+        tenants.setdefault(slug, pk)
+        tenants.setdefault(name, pk)
+    return tenants
+
+
+def import_orders(
+    rows: Iterable[Tuple[int, Dict[str, Any]]],
+    user=None,
+    request_id: Optional[uuid.UUID] = None,
+) -> Dict[str, Any]:
+    """
+    导入一批工单
+
+    Args:
+        rows: (行号, 行数据)
+        user: 操作人（指定时记录变更日志）
+        request_id: 变更日志的请求 ID（同一次导入的各批使用同一 ID）
+
+    Returns:
+        {'created', 'skipped', 'errors': {行号: [错误信息]}}
+    """
+    from .models import ColocationDevice, ServiceOrder
+
+    rows = list(rows)
+    tenants = _resolve_tenants(row.get('tenant') for _index, row in rows)
+    order_nos = {str(row.get('order_no') or '') for _index, row in rows}
+    parent_nos = {str(row['parent_order']) for _index, row in rows if row.get('parent_order')}
+    existing = dict(
+        ServiceOrder.objects.filter(order_no__in=order_nos | parent_nos).values_list('order_no', 'pk')
+    )
+
+    orders, errors, skipped, seen = [], {}, 0, set()
+    for index, row in rows:
+        order_no = str(row.get('order_no') or '')
+        if order_no in existing or order_no in seen:
+            skipped += 1
+            continue
+        order = ServiceOrder(**{field: row[field] for field in IMPORT_FIELDS if field in row})
+        messages = []
+        if row.get('tenant') not in (None, ''):
+            order.tenant_id = tenants.get(str(row['tenant']))
+            if order.tenant_id is None:
+                messages.append(f"tenant: 租户 {row['tenant']} 不存在")
+        if row.get('parent_order'):
+            order.parent_order_id = existing.get(str(row['parent_order']))
+            if order.parent_order_id is None:
+                messages.append(f"parent_order: 原单 {row['parent_order']} 不存在")
+        try:
+            order.full_clean(validate_unique=False)
+        except ValidationError as e:
+            messages.extend(_error_messages(e))
+        else:
+            messages.extend(schemas.check_data_errors(order.check_type, order.check_data))
+        if messages:
+            errors[index] = messages
+            continue
+        seen.add(order_no)
+        orders.append(order)
+
+    with transaction.atomic():
+        ServiceOrder.objects.bulk_create(orders)
+        # 批量写入不触发工单保存信号
+        ColocationDevice.objects.bulk_create(
+            colocation.resolve_sites([device for order in orders for device in colocation.requested_devices(order)]),
+        )
+        if user is not None:
+            log_creations(orders, user, request_id=request_id)
+
+    if orders:
+        cache.invalidate_namespace(cache.NAMESPACE_ORDERS)
+    return {'created': len(orders), 'skipped': skipped, 'errors': errors}
@@ -0,0 +1,466 @@
+"""
+NetBox RMS 后台任务
+
+RMSJobRunner 为批量操作的基类：按排序后的键（工单 / 任务 ID、导入行号）分批处理，
+每批一个事务；每批提交后将检查点（已处理的最后一个键）、进度和统计写入任务数据并记录日志。
+任务失败后以 resume=<原任务 ID> 重新提交，从原任务的检查点之后继续。
+同一任务类型同时运行的数量不超过 Meta.max_concurrent，超出时延后 RETRY_DELAY 秒重新提交。
+"""
+import datetime
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.choices import JobIntervalChoices, JobStatusChoices
+from core.models import Job
+from netbox.jobs import JobRunner, system_job
+
+from . import (
+    analytics, billing, changeorders, cloning, colocation, demand, events, fibercores, forecast, imports, ledger,
+    outbox, ports, power, protection, revisions, temporal, transmission, workflow,
+)
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_DAILY)
+class DemandForecastJob(JobRunner):
+    """按站点、带宽全量重建需求预测（每日执行）"""
+    
+    class Meta:
+        name = '需求预测'
+    
+    def run(self, *args, **kwargs) -> None:
+        horizon = kwargs.get('horizon', forecast.DEFAULT_HORIZON)
+        stats = forecast.rebuild_forecasts(horizon=horizon)
+        self.job.data = stats
+        self.logger.info(f"已生成 {stats['forecasts']} 条预测（{stats['series']} 条历史序列）")
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_DAILY)
+class ProtectionRouteJob(JobRunner):
+    """分析在途保护工单的主用 / 保护分离路由（每日执行）"""
+    
+    class Meta:
+        name = '保护路由分析'
+    
+    def run(self, *args, **kwargs) -> None:
+        stats = protection.evaluate_open_orders()
+        self.job.data = stats
+        self.logger.info(
+            f"已分析 {stats['orders']} 个保护工单：{stats['protected']} 个具备分离路由，"
+            f"{stats['unprotected']} 个不具备"
+        )
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_DAILY)
+class PowerBudgetJob(JobRunner):
+    """评估在途托管工单的机房配电预算（每日执行）"""
+    
+    class Meta:
+        name = '配电预算评估'
+    
+    def run(self, *args, **kwargs) -> None:
+        stats = power.evaluate_open_orders()
+        self.job.data = stats
+        self.logger.info(
+            f"已评估 {stats['orders']} 个托管工单：{stats['sufficient']} 个配电满足，"
+            f"{stats['insufficient']} 个不满足，{stats['unknown']} 个机房无在用电源馈线"
+        )
+
+
+class OutboundEventJob(JobRunner):
+    """按批投递到期的外发事件（配置 outbound_events_url 后每分钟执行）"""
+    
+    class Meta:
+        name = '外发事件投递'
+    
+    def run(self, *args, **kwargs) -> None:
+        if not outbox.enabled():
+            # 接收接口已取消配置：不再安排下次执行
+            self.job.interval = None
+            self.job.data = {}
+            return
+        stats = outbox.deliver()
+        self.job.data = stats
+        if stats['batches']:
+            self.logger.info(
+                f"已投递 {stats['delivered']} 个事件（{stats['batches']} 批），"
+                f"{stats['retrying']} 个待重试，{stats['failed']} 个投递失败"
+            )
+
+
+# 未配置接收接口时不登记定时投递，避免每分钟生成一条空任务记录
+if outbox.enabled():
+    system_job(interval=JobIntervalChoices.INTERVAL_MINUTELY)(OutboundEventJob)
+
+
+class ChangeOrderJob(JobRunner):
+    """按原单批量生成变更单（如带宽升级）"""
+    
+    class Meta:
+        name = '批量生成变更单'
+    
+    def run(self, parents, apply_date, deadline_date, check_data=None, *args, **kwargs) -> None:
+        from .models import ServiceOrder
+        
+        orders = changeorders.create_change_orders(
+            ServiceOrder.objects.filter(pk__in=parents).order_by('pk'),
+            apply_date=apply_date,
+            deadline_date=deadline_date,
+            check_data=check_data,
+            user=self.job.user,
+        )
+        self.job.data = {
+            'created': len(orders),
+            'orders': [order.order_no for order in orders],
+        }
+        self.logger.info(f"已生成 {len(orders)} 个变更单")
+
+
+class CloneOrdersJob(JobRunner):
+    """按过滤条件批量复制工单（合同续约），进度写入任务数据"""
+    
+    class Meta:
+        name = '工单批量复制'
+    
+    def run(self, filters, apply_date, deadline_date, include_tasks=True, include_check_results=True,
+            *args, **kwargs) -> None:
+        user = self.job.user
+        
+        def progress(done: int, total: int) -> None:
+            self.job.data = {'total': total, 'cloned': done}
+            self.job.save(update_fields=['data'])
+            self.logger.info(f"已复制 {done}/{total} 个工单")
+        
+        mapping = cloning.clone_orders(
+            cloning.filter_orders(filters, user=user),
+            apply_date=apply_date,
+            deadline_date=deadline_date,
+            include_tasks=include_tasks,
+            include_check_results=include_check_results,
+            user=user,
+            progress=progress,
+        )
+        self.job.data = {
+            'total': len(mapping),
+            'cloned': len(mapping),
+            # 原工单 ID -> 新工单 ID（JSON 键为字符串）
+            'orders': {str(old): new for old, new in mapping.items()},
+        }
+
+
+class BillingRunJob(JobRunner):
+    """计算计费月明细"""
+    
+    class Meta:
+        name = '计费计算'
+    
+    def run(self, period, *args, **kwargs) -> None:
+        if isinstance(period, str):
+            period = datetime.date.fromisoformat(period)
+        run = billing.run_billing(period)
+        self.job.data = {
+            'run': run.pk,
+            'period': f'{run.period:%Y-%m}',
+            'lines': run.line_count,
+            'resource_days': run.resource_days,
+            'duration': run.duration,
+        }
+        self.logger.info(
+            f"{run.period:%Y-%m} 计费明细 {run.line_count} 条，共 {run.resource_days} 资源天，耗时 {run.duration} 秒"
+        )
+
+class EventDispatchJob(JobRunner):
+    """调用后台事件处理器（每个事务的一批事件一个任务）"""
+    
+    class Meta:
+        name = '领域事件处理'
+    
+    def run(self, handlers, *args, **kwargs) -> None:
+        counts = events.run_queued(handlers)
+        self.job.data = counts
+        self.logger.info(f"已处理 {sum(counts.values())} 个事件")
+
+
+# =============================================================================
+# 分批、可续跑的批量任务
+# =============================================================================
+
+class RMSJobRunner(JobRunner):
+    """
+    分批、可续跑的批量任务基类
+
+    子类实现 items()（返回排序后的键）和 process()（处理一批键并返回计数统计），
+    可选实现 finish()。任务数据：
+        {'total', 'done', 'checkpoint', 'stats', 'errors'}
+    """
+    
+    # 每批处理的键数
+    chunk_size = 500
+    # 超出并发上限时延后重新提交的秒数
+    RETRY_DELAY = 60
+    # 任务数据中保留的错误条数上限
+    MAX_ERRORS = 1000
+    
+    class Meta:
+        name = 'RMS 批量任务'
+        max_concurrent = 1
+    
+    def items(self, **kwargs) -> List[Any]:
+        """待处理的键（须可排序，续跑时跳过不大于检查点的键）"""
+        raise NotImplementedError
+    
+    def process(self, chunk: List[Any], **kwargs) -> Dict[str, int]:
+        """处理一批键（在事务内执行），返回计数统计"""
+        raise NotImplementedError
+    
+    def finish(self, stats: Dict[str, int], **kwargs) -> None:
+        """全部批次处理完成后调用"""
+    
+    def record_error(self, key: Any, message: str) -> None:
+        errors = self.job.data.setdefault('errors', {})
+        if len(errors) < self.MAX_ERRORS:
+            errors.setdefault(str(key), []).append(str(message))
+    
+    # -------------------------------------------------------------------------
+    
+    def _running_before(self) -> int:
+        """先于本任务开始运行、仍在运行的同类任务数"""
+        return Job.objects.filter(
+            name=self.name,
+            status=JobStatusChoices.STATUS_RUNNING,
+        ).filter(
+            Q(started__lt=self.job.started) | Q(started=self.job.started, pk__lt=self.job.pk),
+        ).count()
+    
+    def _defer(self, **kwargs) -> None:
+        job = type(self).enqueue(
+            instance=self.job.object,
+            user=self.job.user,
+            schedule_at=timezone.now() + datetime.timedelta(seconds=self.RETRY_DELAY),
+            **kwargs,
+        )
+        self.job.data = {'deferred': job.pk}
+        self.logger.info(f"同类任务已达并发上限 {self.Meta.max_concurrent}，延后至任务 {job.pk} 执行")
+    
+    @staticmethod
+    def _checkpoint(resume: Optional[int]) -> Any:
+        if resume is None:
+            return None
+        job = Job.objects.filter(pk=resume).only('data').first()
+        return ((job.data or {}) if job else {}).get('checkpoint')
+    
+    def _save_progress(self) -> None:
+        self.job.save(update_fields=['data'])
+    
+    def run(self, *args, resume: Optional[int] = None, **kwargs) -> None:
+        if self._running_before() >= getattr(self.Meta, 'max_concurrent', 1):
+            self._defer(resume=resume, **kwargs)
+            return
+        
+        checkpoint = self._checkpoint(resume)
+        keys = self.items(**kwargs)
+        if checkpoint is not None:
+            keys = [key for key in keys if key > checkpoint]
+            self.logger.info(f"从任务 {resume} 的检查点 {checkpoint} 之后继续")
+        
+        stats: Dict[str, int] = {}
+        self.job.data = {'total': len(keys), 'done': 0, 'checkpoint': checkpoint, 'stats': stats, 'errors': {}}
+        self._save_progress()
+        for start in range(0, len(keys), self.chunk_size):
+            chunk = keys[start:start + self.chunk_size]
+            with transaction.atomic():
+                for name, count in self.process(chunk, **kwargs).items():
+                    stats[name] = stats.get(name, 0) + count
+            self.job.data.update({'done': start + len(chunk), 'checkpoint': chunk[-1]})
+            self._save_progress()
+            self.logger.info(f"已处理 {start + len(chunk)}/{len(keys)}：{stats}")
+        
+        self.finish(stats, **kwargs)
+        self._save_progress()
+
+
+class OrderImportJob(RMSJobRunner):
+    """批量导入工单（行号为检查点，单号已存在的行跳过）"""
+    
+    chunk_size = 200
+    
+    class Meta:
+        name = '工单批量导入'
+        max_concurrent = 1
+    
+    def items(self, rows, **kwargs) -> List[int]:
+        self.request_id = uuid.uuid4()
+        return list(range(len(rows)))
+    
+    def process(self, chunk, rows, **kwargs) -> Dict[str, int]:
+        result = imports.import_orders(
+            [(index, rows[index]) for index in chunk],
+            user=self.job.user,
+            request_id=self.request_id,
+        )
+        for index, messages in result['errors'].items():
+            for message in messages:
+                self.record_error(index + 1, message)
+        return {'created': result['created'], 'skipped': result['skipped'], 'failed': len(result['errors'])}
+
+
+class BulkTransitionJob(RMSJobRunner):
+    """
+    批量流转任务状态
+
+    与同步接口不同，不允许流转的任务记入错误并跳过，其余任务按批流转。
+    """
+    
+    class Meta:
+        name = '任务批量流转'
+        max_concurrent = 2
+    
+    def items(self, tasks, **kwargs) -> List[int]:
+        return sorted(set(tasks))
+    
+    def process(self, chunk, status, comment='', **kwargs) -> Dict[str, int]:
+        from .models import TaskDetail
+        
+        tasks = TaskDetail.objects.filter(pk__in=chunk).select_related('service_order').in_bulk()
+        current = dict(TaskDetail.objects.filter(pk__in=chunk).values_list('pk', 'execution_status'))
+        allowed = []
+        for pk in chunk:
+            if pk not in tasks:
+                self.record_error(pk, '任务不存在')
+                continue
+            error = workflow.check_transition(tasks[pk], current[pk], status)
+            if error:
+                self.record_error(pk, error)
+            else:
+                allowed.append(tasks[pk])
+        try:
+            changed = workflow.bulk_transition(allowed, status, user=self.job.user, comment=comment)
+        except workflow.TransitionError as e:
+            # 预校验后状态被并发修改：本批整体跳过
+            for pk, messages in e.message_dict.items():
+                for message in messages:
+                    self.record_error(pk, message)
+            return {'changed': 0, 'failed': len(chunk)}
+        return {'changed': len(changed), 'failed': len(chunk) - len(allowed)}
+
+
+class LedgerMaterializationJob(RMSJobRunner):
+    """由已完成 / 已确认的开通、变更任务生成资源台账"""
+    
+    class Meta:
+        name = '资源台账生成'
+        max_concurrent = 1
+    
+    def items(self, **kwargs) -> List[int]:
+        return list(ledger.materializable_tasks().order_by('pk').values_list('pk', flat=True))
+    
+    def process(self, chunk, **kwargs) -> Dict[str, int]:
+        return ledger.materialize(chunk)
+
+
+class ReindexJob(RMSJobRunner):
+    """
+    重建规范化索引
+
+    - circuits：传输电路（按任务分批）；
+    - colocation_requested / colocation_installed：托管申请 / 已上架设备（按工单 / 任务分批）；
+    - ports：端口占用（每次运行先重放全部执行反馈，再按端口分批写入）；
+    - core_inventory：纤芯占用（按光缆分批）；
+    - ledger_history：按变更日志回填资源台账历史版本（按台账分批）；
+    - snapshot_revisions / feedback_revisions：补记资源快照 / 执行反馈的当前版本（按台账 / 任务分批）。
+    """
+    
+    INDEXES = (
+        'circuits', 'colocation_requested', 'colocation_installed', 'ports', 'core_inventory', 'ledger_history',
+        'snapshot_revisions', 'feedback_revisions',
+    )
+    
+    class Meta:
+        name = '索引重建'
+        max_concurrent = 1
+    
+    def items(self, index, **kwargs) -> List[int]:
+        from .models import ResourceLedger, ServiceOrder, TaskDetail
+        
+        if index == 'snapshot_revisions':
+            return revisions.seed_items(ResourceLedger)
+        if index == 'feedback_revisions':
+            return revisions.seed_items(TaskDetail)
+        if index == 'colocation_requested':
+            return list(ServiceOrder.objects.order_by('pk').values_list('pk', flat=True))
+        if index in ('circuits', 'colocation_installed'):
+            return list(TaskDetail.objects.order_by('pk').values_list('pk', flat=True))
+        if index == 'ledger_history':
+            return temporal.backfill_items()
+        if index == 'ports':
+            # 端口占用由全部执行反馈按顺序重放得出，续跑时同样先完整重放
+            self.replayed = ports.replay()
+            return ports.rebuild_items(self.replayed)
+        return fibercores.rebuild_items()
+    
+    def process(self, chunk, index, **kwargs) -> Dict[str, int]:
+        from .models import ResourceLedger, ServiceOrder, TaskDetail
+        
+        if index == 'snapshot_revisions':
+            return revisions.seed(ResourceLedger, chunk)
+        if index == 'feedback_revisions':
+            return revisions.seed(TaskDetail, chunk)
+        if index == 'ports':
+            return ports.rebuild(self.replayed, port_keys=chunk)
+        if index == 'core_inventory':
+            return fibercores.rebuild(cable_ids=chunk)
+        if index == 'ledger_history':
+            return temporal.backfill(chunk)
+        if index == 'colocation_requested':
+            orders = ServiceOrder.objects.filter(pk__in=chunk)
+            for order in orders:
+                colocation.sync_order(order)
+            return {'orders': len(orders)}
+        sync = transmission.sync_task if index == 'circuits' else colocation.sync_task
+        tasks = TaskDetail.objects.filter(pk__in=chunk)
+        for task in tasks:
+            sync(task)
+        return {'tasks': len(tasks)}
+
+
+class ReportJob(RMSJobRunner):
+    """
+    生成统计报表，结果写入任务数据 report（按提交人的对象权限限定数据范围）
+
+    - colocation_capacity：托管容量汇总；
+    - cycle_times：业务周期分位数；
+    - demand_matrix：站点对需求矩阵。
+    """
+    
+    REPORTS = ('colocation_capacity', 'cycle_times', 'demand_matrix')
+    
+    class Meta:
+        name = '统计报表'
+        max_concurrent = 2
+    
+    def items(self, report, **kwargs) -> List[str]:
+        return [report]
+    
+    def process(self, chunk, report, **kwargs) -> Dict[str, int]:
+        from .models import ColocationDevice, ServiceOrder, TaskDetail
+        
+        def scoped(model):
+            # 报表可由任务查看者读取：与对应 API 一样按提交人的对象权限限定（系统提交时不限定）
+            if self.job.user is None:
+                return model.objects.all()
+            return model.objects.restrict(self.job.user, 'view')
+        
+        if report == 'colocation_capacity':
+            data = colocation.site_capacity(scoped(ColocationDevice))
+        elif report == 'cycle_times':
+            data = analytics.cycle_time_stats(scoped(TaskDetail))
+        else:
+            data = demand.demand_matrix(scoped(ServiceOrder))
+        # 日期、Decimal 等转换为可 JSON 序列化的值
+        self.job.data['report'] = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+        return {'rows': len(data) if isinstance(data, list) else len(data.get('cells', []))}
@@ -0,0 +1,317 @@
+"""
+NetBox RMS 资源台账生成
+
+由已完成 / 已确认的开通、变更任务生成资源台账（同一资源重复生成时更新来源工单和快照）：
+
+- 传输电路：每条 TransmissionCircuit 一条电路台账，资源标识为电路编号；
+- 托管设备：每个工单一条托管设备台账，资源标识为工单号，
+  快照 {'site_id', 'devices': [...]} 与配电预算评估读取的格式一致；
+- 光缆纤芯：工单在每条光缆上分配的纤芯一条光缆台账，资源标识为 "工单号/光缆 ID"，
+  快照 {'cable_id', 'cores'} 与纤芯台账重建读取的格式一致。
+
+停闭任务不生成台账。
+
+生命周期：任务变为已完成 / 已确认时，开通、变更任务将所属工单的预留台账转为在用；
+停闭任务将所属工单及其上级工单的台账（含变更涉及资源）转为已拆除。
+任务由已完成退回待实施时撤销：停闭任务恢复其拆除的台账，开通任务将在用台账退回预留
+（变更任务退回时资源仍在原单下在用，不变）。
+同一资源只有一条未拆除的台账；已拆除的台账保留为历史，生成时不再更新或重新启用。
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cache, revisions, temporal
+from .choices import (
+    ColocationDeviceSourceChoices, ExecutionStatusChoices, ResourceLifecycleChoices, ResourceTypeChoices,
+    TaskTypeChoices,
+)
+
+DONE_STATUSES = (ExecutionStatusChoices.COMPLETED, ExecutionStatusChoices.CONFIRMED)
+
+
+def materializable_tasks():
+    """可生成台账的任务：已完成 / 已确认的开通、变更任务"""
+    from .models import TaskDetail
+
+    return TaskDetail.objects.filter(
+        execution_status__in=DONE_STATUSES,
+    ).exclude(
+        task_type=TaskTypeChoices.DEACTIVATION,
+    )
+
+
+def _circuit_entries(task_ids: List[int]) -> Iterable:
+    from .models import ResourceLedger, TransmissionCircuit
+
+    circuits = TransmissionCircuit.objects.filter(
+        task_id__in=task_ids,
+    ).exclude(code='').select_related('service_order').order_by('task_id', 'sequence')
+    for circuit in circuits:
+        check_data = circuit.service_order.safe_check_data
+        yield ResourceLedger(
+            service_order_id=circuit.service_order_id,
+            resource_type=ResourceTypeChoices.CIRCUIT,
+            resource_id=circuit.code,
+            resource_name=f'{circuit.site_a} - {circuit.site_z}'[:255],
+            snapshot={
+                **circuit.to_feedback(),
+                'site_a_id': check_data.get('site_a_id'),
+                'site_z_id': check_data.get('site_z_id'),
+                'task_id': circuit.task_id,
+            },
+        )
+
+
+def _colocation_entries(task_ids: List[int]) -> Iterable:
+    from .models import ColocationDevice, ResourceLedger
+
+    orders: Dict[int, Tuple[Any, list]] = {}
+    devices = ColocationDevice.objects.filter(
+        task_id__in=task_ids,
+        source=ColocationDeviceSourceChoices.INSTALLED,
+    ).select_related('service_order').order_by('task_id', 'sequence')
+    for device in devices:
+        # 同一工单有多个任务时以后完成的任务为准
+        order, entries = orders.get(device.service_order_id, (None, None))
+        if order is None or entries[0]['task_id'] != device.task_id:
+            order, entries = device.service_order, []
+            orders[device.service_order_id] = (order, entries)
+        entries.append({
+            'task_id': device.task_id,
+            'site_id': device.site_id,
+            'model': device.model,
+            'cabinet': device.cabinet,
+            'unit': device.unit,
+            'power': str(device.power),
+        })
+    for order, entries in orders.values():
+        yield ResourceLedger(
+            service_order_id=order.pk,
+            resource_type=ResourceTypeChoices.HOSTING_DEVICE,
+            resource_id=order.order_no,
+            resource_name=', '.join(sorted({entry['cabinet'] for entry in entries if entry['cabinet']}))[:255],
+            snapshot={
+                'site_id': entries[0]['site_id'],
+                'task_id': entries[0]['task_id'],
+                'devices': [
+                    {key: entry[key] for key in ('model', 'cabinet', 'unit', 'power')}
+                    for entry in entries
+                ],
+            },
+        )
+
+
+def _cable_entries(task_ids: List[int]) -> Iterable:
+    from .models import CableCoreInventory, ResourceLedger, TaskDetail
+
+    orders = dict(
+        TaskDetail.objects.filter(pk__in=task_ids).values_list('service_order_id', 'service_order__order_no')
+    )
+    inventories = CableCoreInventory.objects.filter(
+        allocations__has_any_keys=[str(order_id) for order_id in orders],
+    ).values_list('cable_id', 'allocations')
+    for cable_id, allocations in inventories:
+        for key, cores in allocations.items():
+            order_id = int(key)
+            if order_id not in orders or not cores:
+                continue
+            yield ResourceLedger(
+                service_order_id=order_id,
+                resource_type=ResourceTypeChoices.CABLE,
+                resource_id=f'{orders[order_id]}/{cable_id}'[:100],
+                resource_name=f'{len(cores)} 芯',
+                snapshot={'cable_id': cable_id, 'cores': sorted(cores)},
+            )
+
+
+def materialize(task_ids: Iterable[int]) -> Dict[str, int]:
+    """
+    为一批任务生成或更新资源台账
+
+    已有未拆除台账的资源更新来源工单和快照（预留的转为在用），其余新建；
+    来源工单相同的台账已拆除时跳过，重建不会重新启用已拆除的资源。
+
+    Returns:
+        {'created', 'updated'}
+    """
+    from .models import ResourceLedger
+
+    task_ids = list(materializable_tasks().filter(pk__in=list(task_ids)).values_list('pk', flat=True))
+    entries: Dict[Tuple[str, str], Any] = {}
+    for source in (_circuit_entries, _colocation_entries, _cable_entries):
+        for entry in source(task_ids):
+            entries[(entry.resource_type, entry.resource_id)] = entry
+    if not entries:
+        return {'created': 0, 'updated': 0}
+
+    lookup = Q()
+    for resource_type in {key[0] for key in entries}:
+        lookup |= Q(
+            resource_type=resource_type,
+            resource_id__in=[key[1] for key in entries if key[0] == resource_type],
+        )
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing: Dict[Tuple[str, str], Any] = {}
+        decommissioned = set()
+        for ledger in ResourceLedger.objects.filter(lookup).only(
+            'pk', 'service_order', 'resource_type', 'resource_id', 'lifecycle_status',
+        ).select_for_update():
+            key = (ledger.resource_type, ledger.resource_id)
+            if ledger.lifecycle_status == ResourceLifecycleChoices.DECOMMISSIONED:
+                decommissioned.add((key, ledger.service_order_id))
+            else:
+                existing[key] = ledger
+
+        updated = []
+        for key, ledger in existing.items():
+            entry = entries[key]
+            ledger.service_order_id = entry.service_order_id
+            ledger.resource_name = entry.resource_name
+            ledger.snapshot = entry.snapshot
+            ledger.lifecycle_status = ResourceLifecycleChoices.ACTIVE
+            ledger.last_updated = now
+            updated.append(ledger)
+        ResourceLedger.objects.bulk_update(
+            updated,
+            ['service_order', 'resource_name', 'snapshot', 'lifecycle_status', 'last_updated'],
+            batch_size=500,
+        )
+        created = [
+            entry for key, entry in entries.items()
+            if key not in existing and (key, entry.service_order_id) not in decommissioned
+        ]
+        # 并发生成同一资源时由部分唯一约束去重
+        ResourceLedger.objects.bulk_create(created, ignore_conflicts=True)
+        # 批量写入不触发信号，重新读取本批资源的当前台账写入历史版本和快照版本
+        current = list(ResourceLedger.objects.current().filter(lookup))
+        temporal.record(current, now)
+        revisions.record(current, 'snapshot')
+    cache.invalidate_namespace(cache.NAMESPACE_LEDGER)
+    return {
+        'created': len(created),
+        'updated': len(updated),
+    }
+
+
+# =============================================================================
+# 生命周期
+# =============================================================================
+
+def _transition(ledgers, status: str) -> int:
+    """逐条保存台账状态（台账数量与工单相当，逐条保存以触发变更日志和缓存失效）"""
+    now = timezone.now()
+    count = 0
+    for ledger in ledgers:
+        ledger.lifecycle_status = status
+        update_fields = ['lifecycle_status', 'last_updated']
+        if status == ResourceLifecycleChoices.DECOMMISSIONED:
+            ledger.decommissioned_at = now
+            update_fields.append('decommissioned_at')
+        elif ledger.decommissioned_at is not None:
+            ledger.decommissioned_at = None
+            update_fields.append('decommissioned_at')
+        ledger.save(update_fields=update_fields)
+        count += 1
+    return count
+
+
+def activate(order_id: int) -> int:
+    """工单的预留台账转为在用"""
+    from .models import ResourceLedger
+
+    return _transition(
+        ResourceLedger.objects.filter(
+            service_order_id=order_id,
+            lifecycle_status=ResourceLifecycleChoices.RESERVED,
+        ),
+        ResourceLifecycleChoices.ACTIVE,
+    )
+
+
+def reserve(order_id: int) -> int:
+    """开通任务退回待实施：工单的在用台账退回预留（工单仍有其他已完成的开通 / 变更任务时不变）"""
+    from .models import ResourceLedger
+
+    if materializable_tasks().filter(service_order_id=order_id).exists():
+        return 0
+    return _transition(
+        ResourceLedger.objects.filter(
+            service_order_id=order_id,
+            lifecycle_status=ResourceLifecycleChoices.ACTIVE,
+        ),
+        ResourceLifecycleChoices.RESERVED,
+    )
+
+
+def _decommission_orders(order) -> List[int]:
+    """停闭工单拆除台账的范围：停闭工单及其上级工单"""
+    return [order_id for order_id in (order.pk, order.parent_order_id) if order_id]
+
+
+def decommission(order) -> int:
+    """停闭工单及其上级工单的台账（含变更涉及资源）转为已拆除"""
+    from .models import ResourceLedger
+
+    order_ids = _decommission_orders(order)
+    return _transition(
+        ResourceLedger.objects.current().filter(
+            Q(service_order_id__in=order_ids) | Q(change_orders__in=order_ids),
+        ).distinct(),
+        ResourceLifecycleChoices.DECOMMISSIONED,
+    )
+
+
+def reactivate(order) -> int:
+    """
+    停闭任务退回待实施：恢复停闭时拆除的台账为在用
+
+    范围内仍有其他已完成的停闭任务时不恢复；同一资源有多条已拆除台账时只恢复最后拆除的一条，
+    资源已重新生成未拆除的台账时保留为历史。
+    """
+    from .models import ResourceLedger, TaskDetail
+
+    order_ids = _decommission_orders(order)
+    if TaskDetail.objects.filter(
+        Q(service_order_id__in=order_ids) | Q(service_order__parent_order_id__in=order_ids),
+        task_type=TaskTypeChoices.DEACTIVATION,
+        execution_status__in=DONE_STATUSES,
+    ).exists():
+        return 0
+
+    ledgers: Dict[Tuple[str, str], Any] = {}
+    for ledger in ResourceLedger.objects.filter(
+        Q(service_order_id__in=order_ids) | Q(change_orders__in=order_ids),
+        lifecycle_status=ResourceLifecycleChoices.DECOMMISSIONED,
+    ).distinct().order_by('-decommissioned_at', '-pk'):
+        ledgers.setdefault((ledger.resource_type, ledger.resource_id), ledger)
+    if not ledgers:
+        return 0
+    current = set(
+        ResourceLedger.objects.current().filter(
+            resource_id__in={key[1] for key in ledgers},
+        ).values_list('resource_type', 'resource_id')
+    )
+    return _transition(
+        [ledger for key, ledger in ledgers.items() if key not in current],
+        ResourceLifecycleChoices.ACTIVE,
+    )
+
+
+def on_status_change(task, previous: Optional[str]) -> None:
+    """任务变为已完成 / 已确认时转换台账生命周期，退回待实施时撤销（由信号处理器和批量流转调用）"""
+    completed = previous not in DONE_STATUSES and task.execution_status in DONE_STATUSES
+    reworked = previous in DONE_STATUSES and task.execution_status not in DONE_STATUSES
+    if task.task_type == TaskTypeChoices.DEACTIVATION:
+        if completed:
+            decommission(task.service_order)
+        elif reworked:
+            reactivate(task.service_order)
+    elif completed:
+        activate(task.service_order_id)
+    elif reworked and task.task_type == TaskTypeChoices.ACTIVATION:
+        reserve(task.service_order_id)
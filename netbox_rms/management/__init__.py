@@ -0,0 +1 @@
+# NetBox RMS Plugin - management package
@@ -0,0 +1,45 @@
+"""
+审计传输电路端口占用：报告被两条以上有效电路占用的端口
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import ports
+
+
+class Command(BaseCommand):
+    help = '按执行反馈重放全部传输电路，报告被两条以上有效电路占用的端口，可选重建 PortAssignment'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='每批读取/写入的记录数',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='审计后按重放结果重建端口占用索引（冲突端口上先登记的电路保持有效）',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        replayed = ports.replay(chunk_size=chunk_size)
+        conflicts = ports.audit(replayed)
+        for conflict in conflicts:
+            claims = '；'.join(
+                f"{claim['code']} {claim['end']}端（{claim['order_no']}，任务 {claim['task_id']}）"
+                for claim in conflict['claims']
+            )
+            self.stdout.write(f"{conflict['port']}: {claims}")
+
+        if conflicts:
+            self.stdout.write(self.style.WARNING(f"发现 {len(conflicts)} 个端口被多条有效电路占用"))
+        else:
+            self.stdout.write(self.style.SUCCESS('未发现端口占用冲突'))
+
+        if options['rebuild']:
+            stats = ports.rebuild(replayed, chunk_size=chunk_size)
+            self.stdout.write(self.style.SUCCESS(
+                f"已重建 {stats['assignments']} 条端口占用记录（{stats['conflicts']} 条冲突记录置为无效）"
+            ))
@@ -0,0 +1,75 @@
+"""
+从 NetBox 变更日志回填执行任务的完成/确认时间
+"""
+from typing import Dict, Optional, Tuple
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import ObjectChange
+
+from netbox_rms.choices import ExecutionStatusChoices
+from netbox_rms.models import TaskDetail
+
+
+class Command(BaseCommand):
+    help = '从变更日志回填 TaskDetail.completed_at / confirmed_at'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='覆盖已有时间戳（默认只填充为空的任务）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='每批读取/写入的记录数',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        content_type = ContentType.objects.get_for_model(TaskDetail)
+
+        # 按对象、时间顺序重放状态变化，只取所需列
+        changes = ObjectChange.objects.filter(
+            changed_object_type=content_type,
+        ).order_by('changed_object_id', 'time', 'pk').values_list(
+            'changed_object_id', 'time', 'prechange_data', 'postchange_data',
+        )
+
+        # task_id -> (completed_at, confirmed_at)
+        stamps: Dict[int, Tuple[Optional[object], Optional[object]]] = {}
+        for task_id, time, prechange, postchange in changes.iterator(chunk_size=chunk_size):
+            if postchange is None:
+                continue
+            status = postchange.get('execution_status')
+            previous = (prechange or {}).get('execution_status')
+            if status == previous:
+                continue
+            completed_at, confirmed_at = stamps.get(task_id, (None, None))
+            if status == ExecutionStatusChoices.COMPLETED:
+                completed_at, confirmed_at = time, None
+            elif status == ExecutionStatusChoices.CONFIRMED:
+                confirmed_at = time
+                completed_at = completed_at or time
+            else:
+                completed_at = confirmed_at = None
+            stamps[task_id] = (completed_at, confirmed_at)
+
+        task_ids = list(stamps)
+        updated = 0
+        for start in range(0, len(task_ids), chunk_size):
+            tasks = TaskDetail.objects.filter(pk__in=task_ids[start:start + chunk_size])
+            if not options['force']:
+                tasks = tasks.filter(completed_at__isnull=True, confirmed_at__isnull=True)
+            batch = list(tasks.only('pk', 'completed_at', 'confirmed_at'))
+            for task in batch:
+                task.completed_at, task.confirmed_at = stamps[task.pk]
+            with transaction.atomic():
+                TaskDetail.objects.bulk_update(batch, ['completed_at', 'confirmed_at'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'已回填 {updated} 个任务的状态时间戳'))
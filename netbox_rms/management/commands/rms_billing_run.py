@@ -0,0 +1,43 @@
+"""
+计算计费月明细
+"""
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_rms import billing
+
+
+class Command(BaseCommand):
+    help = '按工单起租日期、资源台账及变更 / 停闭任务计算计费月各资源的计费天数，写入计费明细'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            help='计费月 (YYYY-MM)，默认上月',
+        )
+        parser.add_argument(
+            '--export',
+            metavar='FILE',
+            help='计算后将明细导出为 CSV（- 为标准输出）',
+        )
+
+    def handle(self, *args, **options):
+        if options['period']:
+            try:
+                period = datetime.datetime.strptime(options['period'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('计费月格式应为 YYYY-MM')
+        else:
+            period = (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+
+        run = billing.run_billing(period)
+        self.stderr.write(self.style.SUCCESS(
+            f"{run.period:%Y-%m} 计费明细 {run.line_count} 条，共 {run.resource_days} 资源天，耗时 {run.duration} 秒"
+        ))
+        if options['export'] == '-':
+            sys.stdout.writelines(billing.export_rows(run))
+        elif options['export']:
+            with open(options['export'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(billing.export_rows(run))
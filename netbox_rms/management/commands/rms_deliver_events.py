@@ -0,0 +1,32 @@
+"""
+立即投递到期的外发事件
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import outbox
+
+
+class Command(BaseCommand):
+    help = '将合并窗口已结束的外发事件按批投递到 outbound_events_url（或 --url 指定的接口）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='投递到该地址（如本地接收桩），默认使用插件配置',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='每批事件数，默认使用插件配置',
+        )
+
+    def handle(self, *args, **options):
+        client = outbox.build_client(options['url'])
+        try:
+            stats = outbox.deliver(client=client, batch_size=options['batch_size'])
+        finally:
+            client.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"已投递 {stats['delivered']} 个事件（{stats['batches']} 批），"
+            f"{stats['retrying']} 个待重试，{stats['failed']} 个投递失败"
+        ))
@@ -0,0 +1,50 @@
+"""
+提交 RMS 批量后台任务（资源台账生成、索引重建、统计报表）
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_rms.jobs import LedgerMaterializationJob, ReindexJob, ReportJob
+
+
+class Command(BaseCommand):
+    help = '提交 RMS 批量后台任务；任务失败后可加 --resume <任务 ID> 从其检查点继续'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'job',
+            choices=['materialize-ledger', 'reindex', 'report'],
+            help='任务类型',
+        )
+        parser.add_argument(
+            '--index',
+            choices=ReindexJob.INDEXES,
+            help='reindex：要重建的索引',
+        )
+        parser.add_argument(
+            '--report',
+            choices=ReportJob.REPORTS,
+            help='report：要生成的报表',
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            help='从该任务的检查点之后继续',
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {'resume': options['resume']}
+        if options['job'] == 'materialize-ledger':
+            runner = LedgerMaterializationJob
+        elif options['job'] == 'reindex':
+            if not options['index']:
+                raise CommandError('reindex 需指定 --index')
+            runner = ReindexJob
+            kwargs['index'] = options['index']
+        else:
+            if not options['report']:
+                raise CommandError('report 需指定 --report')
+            runner = ReportJob
+            kwargs['report'] = options['report']
+
+        job = runner.enqueue(**kwargs)
+        self.stdout.write(self.style.SUCCESS(f"已提交任务 {job.pk}（{job.name}）"))
@@ -0,0 +1,25 @@
+"""
+立即评估在途托管工单的机房配电预算
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import power
+
+
+class Command(BaseCommand):
+    help = '按机房电源馈线容量和已分配功率评估在途托管工单，结果写入 ResourceCheckResult.power_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='每批处理的工单数',
+        )
+
+    def handle(self, *args, **options):
+        stats = power.evaluate_open_orders(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"已评估 {stats['orders']} 个托管工单：{stats['sufficient']} 个配电满足，"
+            f"{stats['insufficient']} 个不满足，{stats['unknown']} 个机房无在用电源馈线"
+        ))
@@ -0,0 +1,25 @@
+"""
+立即分析在途保护工单的主用 / 保护分离路由
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import protection
+
+
+class Command(BaseCommand):
+    help = '为需要保护且已有核查结果的在途工单计算分离路由并写入 ResourceCheckResult.route_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='每批处理的工单数',
+        )
+
+    def handle(self, *args, **options):
+        stats = protection.evaluate_open_orders(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"已分析 {stats['orders']} 个保护工单：{stats['protected']} 个具备分离路由，"
+            f"{stats['unprotected']} 个不具备"
+        ))
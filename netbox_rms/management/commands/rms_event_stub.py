@@ -0,0 +1,62 @@
+"""
+本地外发事件接收桩，用于调试投递、合并和重试
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = '启动本地 HTTP 接收桩，打印收到的外发事件批次；--status 指定答复状态码以模拟投递失败'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--host',
+            default='127.0.0.1',
+            help='监听地址',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8099,
+            help='监听端口',
+        )
+        parser.add_argument(
+            '--status',
+            type=int,
+            default=200,
+            help='答复状态码',
+        )
+
+    def handle(self, *args, **options):
+        command = self
+        status = options['status']
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                events = body.get('events') or []
+                command.stdout.write(f"批次 {body.get('delivery')}：{len(events)} 个事件（答复 {status}）")
+                for event in events:
+                    command.stdout.write(
+                        f"  #{event['id']} {event['event']} {event['object_type']}#{event['object_id']}"
+                    )
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"接收桩已启动：http://{options['host']}:{options['port']}/ （Ctrl+C 退出）"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
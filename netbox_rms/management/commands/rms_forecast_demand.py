@@ -0,0 +1,24 @@
+"""
+立即重建站点 / 带宽需求预测
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import forecast
+
+
+class Command(BaseCommand):
+    help = '按历史传输专线工单重建 DemandForecast（默认预测未来 3 个月）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=forecast.DEFAULT_HORIZON,
+            help='预测月数',
+        )
+
+    def handle(self, *args, **options):
+        stats = forecast.rebuild_forecasts(horizon=options['horizon'])
+        self.stdout.write(self.style.SUCCESS(
+            f"已生成 {stats['forecasts']} 条预测（{stats['series']} 条历史序列）"
+        ))
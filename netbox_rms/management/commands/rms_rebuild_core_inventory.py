@@ -0,0 +1,24 @@
+"""
+由 dcim 光缆和资源台账全量重建光缆纤芯占用
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import fibercores
+
+
+class Command(BaseCommand):
+    help = '重建 CableCoreInventory（站点间光缆纤芯数及台账中的纤芯占用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='每批读取/写入的记录数',
+        )
+
+    def handle(self, *args, **options):
+        stats = fibercores.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"已重建 {stats['cables']} 条光缆的纤芯台账（{stats['allocations']} 个工单占用）"
+        ))
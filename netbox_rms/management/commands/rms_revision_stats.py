@@ -0,0 +1,18 @@
+"""
+统计资源快照、执行反馈版本的存储占用
+"""
+from django.core.management.base import BaseCommand
+
+from netbox_rms import revisions
+
+
+class Command(BaseCommand):
+    help = '对比 JSON 字段版本记录与变更日志中 JSON 数据的存储字节数'
+
+    def handle(self, *args, **options):
+        for row in revisions.footprint():
+            ratio = row['revision_bytes'] / row['changelog_bytes'] if row['changelog_bytes'] else 0
+            self.stdout.write(
+                f"{row['object_type']}.{row['field']}：{row['revisions']} 个版本（{row['checkpoints']} 个检查点），"
+                f"{row['revision_bytes']} 字节；变更日志 {row['changelog_bytes']} 字节（{ratio:.1%}）"
+            )
@@ -0,0 +1,43 @@
+"""
+按数据格式检查已有工单的核查数据和任务的执行反馈
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_rms import schemas
+
+
+class Command(BaseCommand):
+    help = '分批扫描工单核查数据 (check_data) 和任务执行反馈 (feedback_data)，报告不符合数据格式的记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--field',
+            choices=list(schemas.SCHEMAS),
+            help='只检查指定字段（默认全部）',
+        )
+        parser.add_argument(
+            '--schema-version',
+            type=int,
+            help='按指定版本的数据格式检查（默认各字段的当前版本）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='每批读取的记录数',
+        )
+
+    def handle(self, *args, **options):
+        fields = [options['field']] if options['field'] else list(schemas.SCHEMAS)
+        version = options['schema_version']
+        for field in fields:
+            if version is not None and version not in schemas.SCHEMAS[field]:
+                raise CommandError(f'{field} 没有版本 {version} 的数据格式（已有 {sorted(schemas.SCHEMAS[field])}）')
+
+        for field in fields:
+            invalid = 0
+            for label, messages in schemas.scan(field, version, options['chunk_size']):
+                invalid += 1
+                self.stdout.write(f"{label}: {'；'.join(messages)}")
+            summary = f'{field}（版本 {version or schemas.current_version(field)}）：{invalid} 条不符合数据格式'
+            self.stdout.write(self.style.WARNING(summary) if invalid else self.style.SUCCESS(summary))
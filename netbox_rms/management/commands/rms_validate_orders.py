@@ -0,0 +1,62 @@
+"""
+将在途工单的核查信息提交外部资源校验
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_rms import cache, validation
+from netbox_rms.choices import ConfirmationStatusChoices
+from netbox_rms.models import ServiceOrder
+
+
+class Command(BaseCommand):
+    help = '批量校验未取消且尚未起租的工单核查信息，报告校验不通过和校验失败的工单'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='每批提交的工单数',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='忽略已缓存的答复，全部重新校验',
+        )
+
+    def handle(self, *args, **options):
+        if not validation.enabled():
+            raise CommandError('未开启外部资源校验 (enable_external_resource_validation)')
+        if options['refresh']:
+            cache.invalidate_namespace(cache.NAMESPACE_VALIDATION)
+
+        orders = ServiceOrder.objects.filter(
+            billing_start_date__isnull=True,
+        ).exclude(
+            confirmation_status=ConfirmationStatusChoices.CANCEL,
+        ).only('pk', 'order_no', 'check_type', 'check_data').order_by('pk')
+
+        chunk_size = options['chunk_size']
+        stats = {'orders': 0, 'invalid': 0, 'failed': 0}
+        chunk = []
+        for order in orders.iterator(chunk_size=chunk_size):
+            chunk.append(order)
+            if len(chunk) >= chunk_size:
+                self._validate(chunk, stats)
+                chunk = []
+        if chunk:
+            self._validate(chunk, stats)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已校验 {stats['orders']} 个工单：{stats['invalid']} 个不通过，{stats['failed']} 个校验失败"
+        ))
+
+    def _validate(self, orders, stats):
+        for result in validation.validate_orders(orders).values():
+            stats['orders'] += 1
+            if result['valid'] is None:
+                stats['failed'] += 1
+                self.stdout.write(self.style.WARNING(f"{result['order_no']}: 校验失败 {result['error']}"))
+            elif not result['valid']:
+                stats['invalid'] += 1
+                self.stdout.write(f"{result['order_no']}: {'；'.join(result['messages'])}")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0018_taskdetail_feedback_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskdetail',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='完成时间'),
+        ),
+        migrations.AddField(
+            model_name='taskdetail',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='确认时间'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0019_taskdetail_completed_at_confirmed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('from_status', models.CharField(blank=True, choices=[('pending', '待实施'), ('completed', '已完成'), ('confirmed', '已确认')], max_length=50, verbose_name='原状态')),
+                ('to_status', models.CharField(choices=[('pending', '待实施'), ('completed', '已完成'), ('confirmed', '已确认')], max_length=50, verbose_name='新状态')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='变更时间')),
+                ('comment', models.CharField(blank=True, max_length=200, verbose_name='说明')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='netbox_rms.taskdetail', verbose_name='执行任务')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rms_task_transitions', to=settings.AUTH_USER_MODEL, verbose_name='操作人')),
+            ],
+            options={
+                'verbose_name': '状态变更记录',
+                'verbose_name_plural': '状态变更记录',
+                'ordering': ['-timestamp', '-pk'],
+                'indexes': [
+                    models.Index(fields=['to_status', 'timestamp'], name='netbox_rms_transition_to_ts'),
+                    models.Index(fields=['task', 'timestamp'], name='netbox_rms_transition_task_ts'),
+                ],
+            },
+        ),
+    ]
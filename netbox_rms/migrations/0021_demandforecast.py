@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0200_populate_mac_addresses'),
+        ('netbox_rms', '0020_tasktransition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('bandwidth', models.CharField(choices=[('GE', 'GE'), ('2.5G', '2.5G'), ('10G', '10G'), ('100G', '100G')], max_length=20, verbose_name='带宽')),
+                ('period', models.DateField(help_text='月份第一天', verbose_name='预测月份')),
+                ('quantity', models.FloatField(help_text='该月预计新增的电路端口数（即所需模块数）', verbose_name='预测电路数')),
+                ('method', models.CharField(choices=[('seasonal_drift', '季节朴素+年度漂移'), ('linear_trend', '线性趋势'), ('mean', '历史均值')], max_length=50, verbose_name='预测模型')),
+                ('history_months', models.PositiveIntegerField(verbose_name='历史月数')),
+                ('history_quantity', models.PositiveIntegerField(verbose_name='近12个月电路数')),
+                ('generated', models.DateTimeField(verbose_name='生成时间')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rms_demand_forecasts', to='dcim.site', verbose_name='站点')),
+            ],
+            options={
+                'verbose_name': '需求预测',
+                'verbose_name_plural': '需求预测',
+                'ordering': ['period', 'site', 'bandwidth'],
+                'constraints': [
+                    models.UniqueConstraint(fields=('site', 'bandwidth', 'period'), name='netbox_rms_demandforecast_unique'),
+                ],
+            },
+        ),
+    ]
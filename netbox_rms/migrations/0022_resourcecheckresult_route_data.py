@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0021_demandforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcecheckresult',
+            name='route_data',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='主用/保护分离路由计算结果（由保护路由分析任务写入）', verbose_name='路由分析'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0200_populate_mac_addresses'),
+        ('netbox_rms', '0022_resourcecheckresult_route_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CableCoreInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('core_count', models.PositiveSmallIntegerField(verbose_name='纤芯数')),
+                ('occupied', models.BinaryField(default=b'', verbose_name='占用位图')),
+                ('free_count', models.PositiveSmallIntegerField(verbose_name='空闲芯数')),
+                ('allocations', models.JSONField(blank=True, default=dict, help_text='工单 ID -> 占用的纤芯编号列表', verbose_name='分配记录')),
+                ('last_updated', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('cable', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rms_core_inventory', to='dcim.cable', verbose_name='光缆')),
+                ('site_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dcim.site', verbose_name='A端站点')),
+                ('site_z', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dcim.site', verbose_name='Z端站点')),
+            ],
+            options={
+                'verbose_name': '光缆纤芯占用',
+                'verbose_name_plural': '光缆纤芯占用',
+                'ordering': ['site_a', 'site_z', 'cable'],
+                'indexes': [
+                    models.Index(fields=['site_a', 'site_z', 'free_count'], name='netbox_rms_coreinv_pair_free'),
+                ],
+            },
+        ),
+    ]
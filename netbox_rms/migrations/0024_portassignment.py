@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0023_cablecoreinventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('circuit_code', models.CharField(max_length=100, verbose_name='电路编号')),
+                ('end', models.CharField(choices=[('A', 'A端'), ('Z', 'Z端')], max_length=1, verbose_name='端点')),
+                ('site', models.CharField(max_length=100, verbose_name='站点')),
+                ('device_model', models.CharField(blank=True, max_length=100, verbose_name='设备型号')),
+                ('card', models.CharField(blank=True, max_length=100, verbose_name='板卡/槽位')),
+                ('port', models.CharField(max_length=100, verbose_name='端口')),
+                ('port_key', models.CharField(editable=False, max_length=255, verbose_name='端口键')),
+                ('active', models.BooleanField(default=True, help_text='电路停闭或被后续任务替代后置为无效', verbose_name='有效')),
+                ('last_updated', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('service_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='port_assignments', to='netbox_rms.serviceorder', verbose_name='工单')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='port_assignments', to='netbox_rms.taskdetail', verbose_name='执行任务')),
+            ],
+            options={
+                'verbose_name': '端口占用',
+                'verbose_name_plural': '端口占用',
+                'ordering': ['port_key', 'pk'],
+                'indexes': [
+                    models.Index(fields=['circuit_code'], name='netbox_rms_portassign_code'),
+                ],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('active', True)), fields=('port_key',), name='netbox_rms_portassignment_active_port'),
+                ],
+            },
+        ),
+    ]
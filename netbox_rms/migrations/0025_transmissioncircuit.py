@@ -0,0 +1,96 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:40
+
+import django.db.models.deletion
+import netbox.models.deletion
+import taggit.managers
+import utilities.json
+from django.db import migrations, models
+
+# 每批读取的任务数
+CHUNK_SIZE = 500
+
+FEEDBACK_FIELDS = (
+    'code', 'bandwidth',
+    'site_a', 'model_a', 'card_a', 'port_a',
+    'site_z', 'model_z', 'card_z', 'port_z',
+)
+
+
+def explode_circuits(apps, schema_editor):
+    """将任务反馈中的电路 JSON 分批拆分为 TransmissionCircuit 记录"""
+    TaskDetail = apps.get_model('netbox_rms', 'TaskDetail')
+    TransmissionCircuit = apps.get_model('netbox_rms', 'TransmissionCircuit')
+
+    tasks = TaskDetail.objects.filter(
+        feedback_data__transmission__has_key='circuits',
+    ).order_by('pk').values_list('pk', 'service_order_id', 'feedback_data__transmission__circuits')
+
+    circuits = []
+    for task_id, service_order_id, feedback in tasks.iterator(chunk_size=CHUNK_SIZE):
+        for sequence, circuit in enumerate(feedback or []):
+            if not isinstance(circuit, dict):
+                continue
+            values = {field: str(circuit.get(field) or '').strip()[:100] for field in FEEDBACK_FIELDS}
+            if not any(values.values()):
+                continue
+            values['bandwidth'] = values['bandwidth'][:20]
+            circuits.append(TransmissionCircuit(
+                task_id=task_id,
+                service_order_id=service_order_id,
+                sequence=sequence,
+                **values,
+            ))
+        if len(circuits) >= CHUNK_SIZE:
+            TransmissionCircuit.objects.bulk_create(circuits)
+            circuits = []
+    TransmissionCircuit.objects.bulk_create(circuits)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('extras', '0133_make_cf_minmax_decimal'),
+        ('netbox_rms', '0024_portassignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransmissionCircuit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(auto_now_add=True, null=True)),
+                ('last_updated', models.DateTimeField(auto_now=True, null=True)),
+                ('custom_field_data', models.JSONField(blank=True, default=dict, encoder=utilities.json.CustomFieldJSONEncoder)),
+                ('sequence', models.PositiveSmallIntegerField(default=0, help_text='在任务反馈中的顺序', verbose_name='序号')),
+                ('code', models.CharField(max_length=100, verbose_name='电路编号')),
+                ('bandwidth', models.CharField(blank=True, choices=[('GE', 'GE'), ('2.5G', '2.5G'), ('10G', '10G'), ('100G', '100G')], max_length=20, verbose_name='带宽')),
+                ('site_a', models.CharField(blank=True, max_length=100, verbose_name='A端站点')),
+                ('model_a', models.CharField(blank=True, max_length=100, verbose_name='A端设备型号')),
+                ('card_a', models.CharField(blank=True, max_length=100, verbose_name='A端板卡/槽位')),
+                ('port_a', models.CharField(blank=True, max_length=100, verbose_name='A端端口')),
+                ('site_z', models.CharField(blank=True, max_length=100, verbose_name='Z端站点')),
+                ('model_z', models.CharField(blank=True, max_length=100, verbose_name='Z端设备型号')),
+                ('card_z', models.CharField(blank=True, max_length=100, verbose_name='Z端板卡/槽位')),
+                ('port_z', models.CharField(blank=True, max_length=100, verbose_name='Z端端口')),
+                ('service_order', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='transmission_circuits', to='netbox_rms.serviceorder', verbose_name='工单')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='circuits', to='netbox_rms.taskdetail', verbose_name='执行任务')),
+                ('tags', taggit.managers.TaggableManager(through='extras.TaggedItem', to='extras.Tag')),
+            ],
+            options={
+                'verbose_name': '传输电路',
+                'verbose_name_plural': '传输电路',
+                'ordering': ['task', 'sequence', 'pk'],
+                'indexes': [
+                    models.Index(fields=['code'], name='netbox_rms_circuit_code'),
+                    models.Index(fields=['bandwidth'], name='netbox_rms_circuit_bandwidth'),
+                    models.Index(fields=['site_a'], name='netbox_rms_circuit_site_a'),
+                    models.Index(fields=['site_z'], name='netbox_rms_circuit_site_z'),
+                ],
+            },
+            bases=(netbox.models.deletion.DeleteMixin, models.Model),
+        ),
+        migrations.RunPython(
+            explode_circuits,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
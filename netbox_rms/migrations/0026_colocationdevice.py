@@ -0,0 +1,139 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:25
+
+import re
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# 每批读取的记录数
+CHUNK_SIZE = 500
+
+
+def _int(value, default=0):
+    try:
+        return max(int(float(value)), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _decimal(value):
+    try:
+        result = Decimal(str(value or 0)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return Decimal('0.00')
+    return result if result.is_finite() and result > 0 else Decimal('0.00')
+
+
+def _units(unit):
+    numbers = [int(number) for number in re.findall(r'\d+', str(unit or ''))]
+    if len(numbers) >= 2:
+        return abs(numbers[1] - numbers[0]) + 1
+    return 1 if numbers else 0
+
+
+def backfill_devices(apps, schema_editor):
+    """将工单申请设备和任务上架设备 JSON 分批拆分为 ColocationDevice 记录"""
+    ServiceOrder = apps.get_model('netbox_rms', 'ServiceOrder')
+    TaskDetail = apps.get_model('netbox_rms', 'TaskDetail')
+    ColocationDevice = apps.get_model('netbox_rms', 'ColocationDevice')
+    site_ids = set(apps.get_model('dcim', 'Site').objects.values_list('pk', flat=True))
+
+    def site(value):
+        site_id = _int(value)
+        return site_id if site_id in site_ids else None
+
+    devices = []
+
+    def flush(force=False):
+        if devices and (force or len(devices) >= CHUNK_SIZE):
+            ColocationDevice.objects.bulk_create(devices)
+            devices.clear()
+
+    orders = ServiceOrder.objects.filter(
+        check_type='colocation',
+        check_data__has_key='devices',
+    ).order_by('pk').values_list('pk', 'check_data')
+    order_sites = {}
+    for order_id, data in orders.iterator(chunk_size=CHUNK_SIZE):
+        order_sites[order_id] = site(data.get('site_id'))
+        for sequence, device in enumerate(data.get('devices') or []):
+            if not isinstance(device, dict):
+                continue
+            devices.append(ColocationDevice(
+                service_order_id=order_id,
+                site_id=order_sites[order_id],
+                source='requested',
+                sequence=sequence,
+                device_type=str(device.get('device_type') or '').strip()[:100],
+                model=str(device.get('model') or '').strip()[:100],
+                rack_units=_int(device.get('rack_units')),
+                power=_decimal(device.get('power_consumption')),
+                quantity=_int(device.get('quantity'), 1) or 1,
+            ))
+        flush()
+
+    tasks = TaskDetail.objects.filter(
+        feedback_data__colocation__has_key='devices',
+    ).order_by('pk').values_list('pk', 'service_order_id', 'service_order__check_data', 'feedback_data__colocation')
+    for task_id, order_id, check_data, colocation in tasks.iterator(chunk_size=CHUNK_SIZE):
+        site_id = site(colocation.get('site_id')) or site((check_data or {}).get('site_id'))
+        for sequence, device in enumerate(colocation.get('devices') or []):
+            if not isinstance(device, dict) or not any(device.values()):
+                continue
+            devices.append(ColocationDevice(
+                service_order_id=order_id,
+                task_id=task_id,
+                site_id=site_id,
+                source='installed',
+                sequence=sequence,
+                model=str(device.get('model') or '').strip()[:100],
+                rack_units=_units(device.get('unit')),
+                power=_decimal(device.get('power')),
+                quantity=1,
+                cabinet=str(device.get('cabinet') or '').strip()[:100],
+                unit=str(device.get('unit') or '').strip()[:50],
+            ))
+        flush()
+    flush(force=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0200_populate_mac_addresses'),
+        ('netbox_rms', '0025_transmissioncircuit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColocationDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('source', models.CharField(choices=[('requested', '申请'), ('installed', '已上架')], max_length=20, verbose_name='来源')),
+                ('sequence', models.PositiveSmallIntegerField(default=0, verbose_name='序号')),
+                ('device_type', models.CharField(blank=True, max_length=100, verbose_name='设备类型')),
+                ('model', models.CharField(blank=True, max_length=100, verbose_name='设备型号')),
+                ('rack_units', models.PositiveSmallIntegerField(default=0, verbose_name='U 数')),
+                ('power', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='单台功率 (W)')),
+                ('quantity', models.PositiveSmallIntegerField(default=1, verbose_name='数量')),
+                ('cabinet', models.CharField(blank=True, max_length=100, verbose_name='机柜')),
+                ('unit', models.CharField(blank=True, max_length=50, verbose_name='U 位')),
+                ('service_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='colocation_devices', to='netbox_rms.serviceorder', verbose_name='工单')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rms_colocation_devices', to='dcim.site', verbose_name='机房')),
+                ('task', models.ForeignKey(blank=True, help_text='申请设备为空', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='colocation_devices', to='netbox_rms.taskdetail', verbose_name='执行任务')),
+            ],
+            options={
+                'verbose_name': '托管设备',
+                'verbose_name_plural': '托管设备',
+                'ordering': ['service_order', 'task', 'sequence', 'pk'],
+                'indexes': [
+                    models.Index(fields=['site', 'source'], name='netbox_rms_colodevice_site'),
+                ],
+            },
+        ),
+        migrations.RunPython(
+            backfill_devices,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0026_colocationdevice'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcecheckresult',
+            name='power_data',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='托管工单配电预算评估结果（由配电预算评估任务写入）', verbose_name='配电预算'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0027_resourcecheckresult_power_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='serviceorder',
+            name='change_resources',
+            field=models.ManyToManyField(blank=True, help_text='变更单从原单继承的资源台账', related_name='change_orders', to='netbox_rms.resourceledger', verbose_name='变更涉及资源'),
+        ),
+    ]
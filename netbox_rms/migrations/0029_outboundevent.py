@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 22:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0028_serviceorder_change_resources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('event', models.CharField(max_length=50, verbose_name='事件')),
+                ('object_type', models.CharField(help_text='app_label.model_name', max_length=100, verbose_name='对象类型')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='对象 ID')),
+                ('payload', models.JSONField(default=dict, verbose_name='事件内容')),
+                ('status', models.CharField(choices=[('pending', '待投递'), ('delivered', '已投递'), ('failed', '投递失败')], default='pending', max_length=20, verbose_name='投递状态')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('last_updated', models.DateTimeField(auto_now=True, help_text='最后一次合并变化的时间', verbose_name='更新时间')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='投递次数')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='下次投递时间')),
+                ('delivered', models.DateTimeField(blank=True, null=True, verbose_name='投递时间')),
+                ('last_error', models.TextField(blank=True, verbose_name='最近错误')),
+            ],
+            options={
+                'verbose_name': '外发事件',
+                'verbose_name_plural': '外发事件',
+                'ordering': ['pk'],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('event', 'object_type', 'object_id'), name='netbox_rms_outboundevent_pending'),
+                ],
+                'indexes': [
+                    models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt'], name='netbox_rms_outbound_due'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 23:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0029_outboundevent'),
+        ('tenancy', '0020_remove_contactgroupmembership'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('period', models.DateField(help_text='当月第一天', unique=True, verbose_name='计费月')),
+                ('generated', models.DateTimeField(auto_now=True, verbose_name='计算时间')),
+                ('line_count', models.PositiveIntegerField(default=0, verbose_name='明细数')),
+                ('resource_days', models.PositiveBigIntegerField(default=0, verbose_name='资源天数')),
+                ('duration', models.FloatField(default=0, verbose_name='耗时（秒）')),
+            ],
+            options={
+                'verbose_name': '计费批次',
+                'verbose_name_plural': '计费批次',
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BillingLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('resource_type', models.CharField(blank=True, choices=[('circuit', '电路'), ('hosting_device', '托管设备'), ('cable', '光缆/裸纤')], max_length=50, verbose_name='资源类型')),
+                ('resource_id', models.CharField(help_text='资源台账标识，无台账时为工单号', max_length=100, verbose_name='资源标识')),
+                ('start_date', models.DateField(verbose_name='计费开始')),
+                ('end_date', models.DateField(help_text='不含当天', verbose_name='计费结束')),
+                ('days', models.PositiveSmallIntegerField(verbose_name='计费天数')),
+                ('ledger', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='billing_lines', to='netbox_rms.resourceledger', verbose_name='资源台账')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='netbox_rms.billingrun', verbose_name='计费批次')),
+                ('service_order', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='billing_lines', to='netbox_rms.serviceorder', verbose_name='计费工单')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='rms_billing_lines', to='tenancy.tenant', verbose_name='客户单位')),
+            ],
+            options={
+                'verbose_name': '计费明细',
+                'verbose_name_plural': '计费明细',
+                'ordering': ['run', 'tenant', 'service_order', 'resource_id', 'start_date'],
+                'indexes': [
+                    models.Index(fields=['run', 'tenant'], name='netbox_rms_billline_tenant'),
+                ],
+            },
+        ),
+    ]
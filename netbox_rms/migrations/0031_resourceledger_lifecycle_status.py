@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0030_billingrun_billingline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourceledger',
+            name='lifecycle_status',
+            field=models.CharField(choices=[('reserved', '预留'), ('active', '在用'), ('decommissioned', '已拆除')], default='active', max_length=50, verbose_name='生命周期状态'),
+        ),
+        migrations.AddField(
+            model_name='resourceledger',
+            name='decommissioned_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='拆除时间'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resourceledger',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='resourceledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('lifecycle_status', 'decommissioned'), _negated=True), fields=('resource_type', 'resource_id'), name='netbox_rms_ledger_current_resource'),
+        ),
+        migrations.AddIndex(
+            model_name='resourceledger',
+            index=models.Index(condition=models.Q(('lifecycle_status', 'active')), fields=['resource_type', 'service_order'], name='netbox_rms_ledger_active'),
+        ),
+    ]
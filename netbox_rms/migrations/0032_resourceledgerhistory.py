@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 23:55
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0031_resourceledger_lifecycle_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceLedgerHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('resource_type', models.CharField(choices=[('circuit', '电路'), ('hosting_device', '托管设备'), ('cable', '光缆/裸纤')], max_length=50, verbose_name='资源类型')),
+                ('resource_id', models.CharField(max_length=100, verbose_name='资源标识')),
+                ('resource_name', models.CharField(blank=True, max_length=255, verbose_name='资源名称')),
+                ('lifecycle_status', models.CharField(choices=[('reserved', '预留'), ('active', '在用'), ('decommissioned', '已拆除')], max_length=50, verbose_name='生命周期状态')),
+                ('snapshot', models.JSONField(blank=True, default=dict, verbose_name='资源快照')),
+                ('valid', django.contrib.postgres.fields.ranges.DateTimeRangeField(verbose_name='有效期')),
+                ('ledger', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='history', to='netbox_rms.resourceledger', verbose_name='资源台账')),
+                ('service_order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='netbox_rms.serviceorder', verbose_name='来源工单')),
+            ],
+            options={
+                'verbose_name': '资源台账历史',
+                'verbose_name_plural': '资源台账历史',
+                'ordering': ['ledger', 'valid'],
+                'constraints': [
+                    models.UniqueConstraint(condition=models.Q(('valid__upper_inf', True)), fields=('ledger',), name='netbox_rms_ledgerhist_open'),
+                ],
+                'indexes': [
+                    django.contrib.postgres.indexes.GistIndex(fields=['valid'], name='netbox_rms_ledgerhist_valid'),
+                ],
+            },
+        ),
+    ]
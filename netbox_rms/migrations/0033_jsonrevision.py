@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-20 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0032_resourceledgerhistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JSONRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ('object_type', models.CharField(help_text='app_label.model_name', max_length=100, verbose_name='对象类型')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='对象 ID')),
+                ('field', models.CharField(max_length=50, verbose_name='字段')),
+                ('version', models.PositiveIntegerField(verbose_name='版本')),
+                ('base', models.PositiveIntegerField(verbose_name='检查点版本')),
+                ('checkpoint', models.BooleanField(default=False, verbose_name='检查点')),
+                ('data', models.JSONField(help_text='检查点为完整内容，否则为 JSON Patch', verbose_name='内容')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='时间')),
+            ],
+            options={
+                'verbose_name': 'JSON 版本',
+                'verbose_name_plural': 'JSON 版本',
+                'ordering': ['object_type', 'object_id', 'field', 'version'],
+                'constraints': [
+                    models.UniqueConstraint(fields=('object_type', 'object_id', 'field', 'version'), name='netbox_rms_jsonrevision_version'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-20 09:10
+
+from django.db import migrations, models
+
+# 每批读取 / 写入的记录数
+CHUNK_SIZE = 500
+
+
+def backfill_check_result_at(apps, schema_editor):
+    """按变更日志重放核查结果的填写时间；无变更日志的按核查结果的创建时间"""
+    ResourceCheckResult = apps.get_model('netbox_rms', 'ResourceCheckResult')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    ObjectChange = apps.get_model('core', 'ObjectChange')
+
+    stamps = {}
+    content_type = ContentType.objects.filter(app_label='netbox_rms', model='resourcecheckresult').first()
+    if content_type is not None:
+        changes = ObjectChange.objects.filter(
+            changed_object_type=content_type,
+        ).order_by('time', 'pk').values_list('changed_object_id', 'time', 'postchange_data')
+        for result_id, time, data in changes.iterator(chunk_size=CHUNK_SIZE):
+            if not (data or {}).get('check_result'):
+                stamps[result_id] = None
+            elif stamps.get(result_id) is None:
+                stamps[result_id] = time
+
+    results = []
+    for result in ResourceCheckResult.objects.exclude(check_result='').only('pk', 'created').iterator(
+        chunk_size=CHUNK_SIZE,
+    ):
+        result.check_result_at = stamps.get(result.pk) or result.created
+        results.append(result)
+        if len(results) >= CHUNK_SIZE:
+            ResourceCheckResult.objects.bulk_update(results, ['check_result_at'])
+            results.clear()
+    ResourceCheckResult.objects.bulk_update(results, ['check_result_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0033_jsonrevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourcecheckresult',
+            name='check_result_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='首次填写核查结果的时间，清空核查结果时一并清空', null=True, verbose_name='核查完成时间'),
+        ),
+        migrations.RunPython(
+            backfill_check_result_at,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-20 10:05
+
+from django.db import migrations
+
+# 每批读取 / 写入的记录数
+CHUNK_SIZE = 500
+
+DONE_STATUSES = ('completed', 'confirmed')
+
+
+def backfill_decommissioned(apps, schema_editor):
+    """
+    已有完成停闭任务的工单：其工单及上级工单的台账（含变更涉及资源）标记为已拆除，
+    拆除时间为最早完成的停闭任务的完成时间（与 ledger.decommission 的范围一致）
+    """
+    ServiceOrder = apps.get_model('netbox_rms', 'ServiceOrder')
+    TaskDetail = apps.get_model('netbox_rms', 'TaskDetail')
+    ResourceLedger = apps.get_model('netbox_rms', 'ResourceLedger')
+    through = ServiceOrder.change_resources.through
+
+    # 工单 -> 拆除时间
+    stops = {}
+    tasks = TaskDetail.objects.filter(
+        task_type='deactivation',
+        execution_status__in=DONE_STATUSES,
+        completed_at__isnull=False,
+    ).values_list('service_order_id', 'service_order__parent_order_id', 'completed_at')
+    for order_id, parent_id, completed_at in tasks.iterator(chunk_size=CHUNK_SIZE):
+        for target in (order_id, parent_id):
+            if target is not None and (target not in stops or completed_at < stops[target]):
+                stops[target] = completed_at
+
+    # 台账 -> 拆除时间
+    ledgers = {}
+    order_ids = sorted(stops)
+    for index in range(0, len(order_ids), CHUNK_SIZE):
+        chunk = order_ids[index:index + CHUNK_SIZE]
+        rows = list(ResourceLedger.objects.filter(service_order_id__in=chunk).values_list('pk', 'service_order_id'))
+        rows += list(through.objects.filter(serviceorder_id__in=chunk).values_list('resourceledger_id', 'serviceorder_id'))
+        for ledger_id, order_id in rows:
+            if ledger_id not in ledgers or stops[order_id] < ledgers[ledger_id]:
+                ledgers[ledger_id] = stops[order_id]
+
+    ledger_ids = sorted(ledgers)
+    for index in range(0, len(ledger_ids), CHUNK_SIZE):
+        chunk = ResourceLedger.objects.filter(
+            pk__in=ledger_ids[index:index + CHUNK_SIZE],
+        ).exclude(lifecycle_status='decommissioned').only('pk')
+        updated = []
+        for ledger in chunk:
+            ledger.lifecycle_status = 'decommissioned'
+            ledger.decommissioned_at = ledgers[ledger.pk]
+            updated.append(ledger)
+        ResourceLedger.objects.bulk_update(updated, ['lifecycle_status', 'decommissioned_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_rms', '0034_resourcecheckresult_check_result_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_decommissioned,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
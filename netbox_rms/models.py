@@ -8,15 +8,19 @@ NetBox RMS 数据模型
 """
 from typing import Dict, Any, List, Optional
 
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
 from django.conf import settings
 from django.urls import reverse
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from netbox.models import NetBoxModel
 from tenancy.models import Tenant
 from dcim.models import Site
+from utilities.querysets import RestrictedQuerySet
 
 from .mixins import ColorMixin
 
@@ -32,6 +36,12 @@ from .choices import (
     InternalParticipantChoices,
     ResourceCheckTypeChoices,
     ConfirmationStatusChoices,
+    BandwidthChoices,
+    ForecastMethodChoices,
+    CircuitEndChoices,
+    ColocationDeviceSourceChoices,
+    OutboundEventStatusChoices,
+    ResourceLifecycleChoices,
 )
 
 
@@ -138,6 +148,14 @@ class ServiceOrder(ColorMixin, NetBoxModel):
         help_text=_('变更单必须关联原调配单ID'),
     )
     
+    change_resources = models.ManyToManyField(
+        to='ResourceLedger',
+        related_name='change_orders',
+        blank=True,
+        verbose_name=_('变更涉及资源'),
+        help_text=_('变更单从原单继承的资源台账'),
+    )
+    
     # ========== 资源核查扩展字段 ==========
     check_type = models.CharField(
         max_length=50,
@@ -318,6 +336,23 @@ class TaskDetail(ColorMixin, NetBoxModel):
         null=True,
         verbose_name=_('执行人'),
     )
+    
+    # 状态变更时间戳（由信号处理器自动维护，用于周期统计）
+    completed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('完成时间'),
+    )
+    
+    confirmed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name=_('确认时间'),
+    )
 
     def get_task_type_color(self) -> str:
         """获取任务类型颜色"""
@@ -350,6 +385,10 @@ class TaskDetail(ColorMixin, NetBoxModel):
     def get_absolute_url(self) -> str:
         return reverse('plugins:netbox_rms:taskdetail', args=[self.pk])
     
+    def serialize_object(self, exclude=None) -> Dict[str, Any]:
+        """变更日志数据（执行反馈的各版本由 JSONRevision 保存，不重复记录）"""
+        return super().serialize_object(exclude=[*(exclude or []), 'feedback_data'])
+    
     def clean(self) -> None:
         """业务逻辑校验"""
         super().clean()
@@ -360,13 +399,113 @@ class TaskDetail(ColorMixin, NetBoxModel):
                 raise ValidationError(
                     _('变更类型任务的主工单必须关联原单号')
                 )
+        
+        # 执行状态必须按工作流流转
+        from .workflow import check_transition
+        previous = None
+        if self.pk:
+            previous = TaskDetail.objects.filter(pk=self.pk).values_list('execution_status', flat=True).first()
+        error = check_transition(self, previous, self.execution_status)
+        if error:
+            raise ValidationError({'execution_status': error})
+        
+        # 电路端口不能已被其他电路占用（表单、API 保存前均经过 clean，不等到写入时违反唯一约束）
+        from .ports import find_conflicts, task_circuits
+        conflicts = find_conflicts(task_circuits(self.feedback_data), self.task_type, self.pk)
+        if conflicts:
+            raise ValidationError(_('电路端口已被占用：{conflicts}').format(conflicts='；'.join(conflicts)))
+
+
+class TaskTransition(models.Model):
+    """
+    执行任务状态变更记录
+    
+    只追加：记录创建后不可修改或单独删除（随任务级联删除）。
+    (to_status, timestamp) 复合索引使“某时间段内进入某状态的任务”为索引范围扫描。
+    """
+    
+    task = models.ForeignKey(
+        to='TaskDetail',
+        on_delete=models.CASCADE,
+        related_name='transitions',
+        verbose_name=_('执行任务'),
+    )
+    
+    from_status = models.CharField(
+        max_length=50,
+        choices=ExecutionStatusChoices,
+        blank=True,
+        verbose_name=_('原状态'),
+    )
+    
+    to_status = models.CharField(
+        max_length=50,
+        choices=ExecutionStatusChoices,
+        verbose_name=_('新状态'),
+    )
+    
+    timestamp = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_('变更时间'),
+    )
+    
+    user = models.ForeignKey(
+        to=settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='rms_task_transitions',
+        blank=True,
+        null=True,
+        verbose_name=_('操作人'),
+    )
+    
+    comment = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name=_('说明'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['-timestamp', '-pk']
+        verbose_name = _('状态变更记录')
+        verbose_name_plural = _('状态变更记录')
+        indexes = [
+            models.Index(fields=['to_status', 'timestamp'], name='netbox_rms_transition_to_ts'),
+            models.Index(fields=['task', 'timestamp'], name='netbox_rms_transition_task_ts'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.task_id}: {self.from_status or '-'} → {self.to_status}"
+    
+    def save(self, *args, **kwargs) -> None:
+        if not self._state.adding:
+            raise ValidationError(_('状态变更记录不可修改'))
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValidationError(_('状态变更记录不可删除'))
+
 
+class ResourceLedgerQuerySet(RestrictedQuerySet):
+    """资源台账查询集"""
+    
+    def active(self):
+        """在用资源"""
+        return self.filter(lifecycle_status=ResourceLifecycleChoices.ACTIVE)
+    
+    def current(self):
+        """未拆除的资源（预留和在用），占用容量的计算以此为准"""
+        return self.exclude(lifecycle_status=ResourceLifecycleChoices.DECOMMISSIONED)
 
-class ResourceLedger(NetBoxModel):
+
+class ResourceLedger(ColorMixin, NetBoxModel):
     """
     资源台账模型
     
     最终形成的资产快照（如一条在用电路、一台托管设备）。
+    生命周期：预留 -> 在用（开通 / 变更任务完成）-> 已拆除（停闭任务完成），
+    已拆除的台账保留为历史，同一资源标识可重新启用为新的台账。
     """
     
     # 关联来源工单
@@ -404,23 +543,62 @@ class ResourceLedger(NetBoxModel):
         help_text=_('存储资源详细参数的快照数据'),
     )
     
+    # 生命周期
+    lifecycle_status = models.CharField(
+        max_length=50,
+        choices=ResourceLifecycleChoices,
+        default=ResourceLifecycleChoices.ACTIVE,
+        verbose_name=_('生命周期状态'),
+    )
+    
+    decommissioned_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name=_('拆除时间'),
+    )
+    
     # 备注
     comments = models.TextField(
         blank=True,
         verbose_name=_('备注'),
     )
     
+    objects = ResourceLedgerQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-pk']
         verbose_name = _('资源台账')
         verbose_name_plural = _('资源台账')
-        unique_together = [['resource_type', 'resource_id']]
+        constraints = [
+            # 同一资源只能有一条未拆除的台账，已拆除的历史台账不参与唯一性检查
+            models.UniqueConstraint(
+                fields=['resource_type', 'resource_id'],
+                condition=~models.Q(lifecycle_status='decommissioned'),
+                name='netbox_rms_ledger_current_resource',
+            ),
+        ]
+        indexes = [
+            # 在用资源查询只扫描在用台账，不随已拆除历史增长
+            models.Index(
+                fields=['resource_type', 'service_order'],
+                condition=models.Q(lifecycle_status='active'),
+                name='netbox_rms_ledger_active',
+            ),
+        ]
     
     def __str__(self) -> str:
         return f"{self.get_resource_type_display()} - {self.resource_id}"
     
+    def get_lifecycle_status_color(self) -> str:
+        """获取生命周期状态颜色"""
+        return self.get_color_for_field('lifecycle_status', ResourceLifecycleChoices)
+    
     def get_absolute_url(self) -> str:
         return reverse('plugins:netbox_rms:resourceledger', args=[self.pk])
+    
+    def serialize_object(self, exclude=None) -> Dict[str, Any]:
+        """变更日志数据（资源快照的各版本由 JSONRevision 保存，不重复记录）"""
+        return super().serialize_object(exclude=[*(exclude or []), 'snapshot'])
 
 
 class ResourceCheckResult(NetBoxModel):
@@ -442,6 +620,14 @@ class ResourceCheckResult(NetBoxModel):
         verbose_name=_('核查结果'),
     )
     
+    check_result_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('核查完成时间'),
+        help_text=_('首次填写核查结果的时间，清空核查结果时一并清空'),
+    )
+    
     unavailable_reasons = models.JSONField(
         default=list,
         blank=True,
@@ -454,6 +640,22 @@ class ResourceCheckResult(NetBoxModel):
         verbose_name=_('说明'),
     )
     
+    route_data = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_('路由分析'),
+        help_text=_('主用/保护分离路由计算结果（由保护路由分析任务写入）'),
+    )
+    
+    power_data = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name=_('配电预算'),
+        help_text=_('托管工单配电预算评估结果（由配电预算评估任务写入）'),
+    )
+    
     class Meta:
         ordering = ['-pk']
         verbose_name = _('资源核查结果')
@@ -469,3 +671,871 @@ class ResourceCheckResult(NetBoxModel):
 
 
     
+
+
+class DemandForecast(models.Model):
+    """
+    站点 / 带宽需求预测
+    
+    由需求预测任务按历史传输专线工单全量重建，每个 (站点, 带宽, 月份) 一条记录，
+    用于提前备货模块、板卡。
+    """
+    
+    site = models.ForeignKey(
+        to=Site,
+        on_delete=models.CASCADE,
+        related_name='rms_demand_forecasts',
+        verbose_name=_('站点'),
+    )
+    
+    bandwidth = models.CharField(
+        max_length=20,
+        choices=BandwidthChoices,
+        verbose_name=_('带宽'),
+    )
+    
+    period = models.DateField(
+        verbose_name=_('预测月份'),
+        help_text=_('月份第一天'),
+    )
+    
+    quantity = models.FloatField(
+        verbose_name=_('预测电路数'),
+        help_text=_('该月预计新增的电路端口数（即所需模块数）'),
+    )
+    
+    method = models.CharField(
+        max_length=50,
+        choices=ForecastMethodChoices,
+        verbose_name=_('预测模型'),
+    )
+    
+    history_months = models.PositiveIntegerField(
+        verbose_name=_('历史月数'),
+    )
+    
+    history_quantity = models.PositiveIntegerField(
+        verbose_name=_('近12个月电路数'),
+    )
+    
+    generated = models.DateTimeField(
+        verbose_name=_('生成时间'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['period', 'site', 'bandwidth']
+        verbose_name = _('需求预测')
+        verbose_name_plural = _('需求预测')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['site', 'bandwidth', 'period'],
+                name='netbox_rms_demandforecast_unique',
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.site} {self.bandwidth} {self.period:%Y-%m}"
+
+
+class CableCoreInventory(models.Model):
+    """
+    光缆纤芯占用
+    
+    每条站点间光缆一条记录，纤芯占用以位图存储（第 i 位表示第 i + 1 芯），
+    并冗余空闲芯数，(site_a, site_z, free_count) 复合索引使
+    “A、Z 站点间空闲芯数不少于 N 的光缆”为一次索引查询。
+    site_a 始终为较小的站点 ID。
+    """
+    
+    cable = models.OneToOneField(
+        to='dcim.Cable',
+        on_delete=models.CASCADE,
+        related_name='rms_core_inventory',
+        verbose_name=_('光缆'),
+    )
+    
+    site_a = models.ForeignKey(
+        to=Site,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('A端站点'),
+    )
+    
+    site_z = models.ForeignKey(
+        to=Site,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name=_('Z端站点'),
+    )
+    
+    core_count = models.PositiveSmallIntegerField(
+        verbose_name=_('纤芯数'),
+    )
+    
+    occupied = models.BinaryField(
+        default=b'',
+        verbose_name=_('占用位图'),
+    )
+    
+    free_count = models.PositiveSmallIntegerField(
+        verbose_name=_('空闲芯数'),
+    )
+    
+    allocations = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_('分配记录'),
+        help_text=_('工单 ID -> 占用的纤芯编号列表'),
+    )
+    
+    last_updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('更新时间'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['site_a', 'site_z', 'cable']
+        verbose_name = _('光缆纤芯占用')
+        verbose_name_plural = _('光缆纤芯占用')
+        indexes = [
+            models.Index(fields=['site_a', 'site_z', 'free_count'], name='netbox_rms_coreinv_pair_free'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.cable}: {self.free_count}/{self.core_count}"
+    
+    @property
+    def occupied_mask(self) -> int:
+        return int.from_bytes(bytes(self.occupied), 'little')
+    
+    @occupied_mask.setter
+    def occupied_mask(self, mask: int) -> None:
+        mask &= (1 << self.core_count) - 1
+        self.occupied = mask.to_bytes((self.core_count + 7) // 8, 'little')
+        self.free_count = self.core_count - bin(mask).count('1')
+    
+    def allocate(self, service_order_id: int, count: int) -> List[int]:
+        """为工单分配编号最小的 count 个空闲纤芯，返回纤芯编号（从 1 开始）"""
+        if count > self.free_count:
+            raise ValidationError(_('光缆 {cable} 空闲纤芯不足').format(cable=self.cable))
+        mask = self.occupied_mask
+        cores = []
+        for index in range(self.core_count):
+            if len(cores) == count:
+                break
+            if not mask >> index & 1:
+                mask |= 1 << index
+                cores.append(index + 1)
+        self.occupied_mask = mask
+        key = str(service_order_id)
+        self.allocations[key] = sorted(self.allocations.get(key, []) + cores)
+        return cores
+    
+    def release(self, service_order_id: int, cores: Optional[List[int]] = None) -> List[int]:
+        """释放工单占用的纤芯（指定 cores 时只释放其中属于该工单的纤芯），返回释放的纤芯编号"""
+        key = str(service_order_id)
+        if cores is None:
+            cores = self.allocations.pop(key, [])
+        else:
+            held, wanted = self.allocations.get(key, []), set(cores)
+            cores = [core for core in held if core in wanted]
+            remaining = [core for core in held if core not in wanted]
+            if remaining:
+                self.allocations[key] = remaining
+            else:
+                self.allocations.pop(key, None)
+        mask = self.occupied_mask
+        for core in cores:
+            mask &= ~(1 << (core - 1))
+        self.occupied_mask = mask
+        return cores
+    
+    def transfer(self, from_order_id: int, to_order_id: int) -> List[int]:
+        """工单占用的纤芯转给另一工单（占用位图不变），返回转移的纤芯编号"""
+        cores = self.allocations.pop(str(from_order_id), [])
+        if cores:
+            key = str(to_order_id)
+            self.allocations[key] = sorted(set(self.allocations.get(key, [])) | set(cores))
+        return cores
+
+
+class PortAssignment(models.Model):
+    """
+    端口占用
+    
+    由执行反馈中的传输电路生成，每条电路的 A、Z 端各一条记录。
+    port_key 为规范化后的“站点|设备型号|板卡|端口”，
+    有效记录上的部分唯一约束保证同一端口只能被一条有效电路占用。
+    """
+    
+    task = models.ForeignKey(
+        to=TaskDetail,
+        on_delete=models.CASCADE,
+        related_name='port_assignments',
+        verbose_name=_('执行任务'),
+    )
+    
+    service_order = models.ForeignKey(
+        to=ServiceOrder,
+        on_delete=models.CASCADE,
+        related_name='port_assignments',
+        verbose_name=_('工单'),
+    )
+    
+    circuit_code = models.CharField(
+        max_length=100,
+        verbose_name=_('电路编号'),
+    )
+    
+    end = models.CharField(
+        max_length=1,
+        choices=CircuitEndChoices,
+        verbose_name=_('端点'),
+    )
+    
+    site = models.CharField(
+        max_length=100,
+        verbose_name=_('站点'),
+    )
+    
+    device_model = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('设备型号'),
+    )
+    
+    card = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('板卡/槽位'),
+    )
+    
+    port = models.CharField(
+        max_length=100,
+        verbose_name=_('端口'),
+    )
+    
+    port_key = models.CharField(
+        max_length=255,
+        editable=False,
+        verbose_name=_('端口键'),
+    )
+    
+    active = models.BooleanField(
+        default=True,
+        verbose_name=_('有效'),
+        help_text=_('电路停闭或被后续任务替代后置为无效'),
+    )
+    
+    last_updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('更新时间'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['port_key', 'pk']
+        verbose_name = _('端口占用')
+        verbose_name_plural = _('端口占用')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['port_key'],
+                condition=models.Q(active=True),
+                name='netbox_rms_portassignment_active_port',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['circuit_code'], name='netbox_rms_portassign_code'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.circuit_code} {self.end}: {self.site} {self.device_model} {self.card} {self.port}"
+
+
+class TransmissionCircuit(NetBoxModel):
+    """
+    传输电路
+    
+    执行反馈 feedback_data['transmission']['circuits'] 的规范化存储，
+    每条电路一行，按电路编号、带宽、站点建立索引。
+    与任务反馈双向同步：保存任务时按反馈重建，通过 API 增删改电路时回写任务反馈。
+    """
+    
+    task = models.ForeignKey(
+        to=TaskDetail,
+        on_delete=models.CASCADE,
+        related_name='circuits',
+        verbose_name=_('执行任务'),
+    )
+    
+    service_order = models.ForeignKey(
+        to=ServiceOrder,
+        on_delete=models.CASCADE,
+        related_name='transmission_circuits',
+        editable=False,
+        verbose_name=_('工单'),
+    )
+    
+    sequence = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('序号'),
+        help_text=_('在任务反馈中的顺序'),
+    )
+    
+    code = models.CharField(
+        max_length=100,
+        verbose_name=_('电路编号'),
+    )
+    
+    bandwidth = models.CharField(
+        max_length=20,
+        choices=BandwidthChoices,
+        blank=True,
+        verbose_name=_('带宽'),
+    )
+    
+    site_a = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('A端站点'),
+    )
+    
+    model_a = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('A端设备型号'),
+    )
+    
+    card_a = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('A端板卡/槽位'),
+    )
+    
+    port_a = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('A端端口'),
+    )
+    
+    site_z = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Z端站点'),
+    )
+    
+    model_z = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Z端设备型号'),
+    )
+    
+    card_z = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Z端板卡/槽位'),
+    )
+    
+    port_z = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('Z端端口'),
+    )
+    
+    # 与任务反馈中电路字典一致的字段
+    FEEDBACK_FIELDS = (
+        'code', 'bandwidth',
+        'site_a', 'model_a', 'card_a', 'port_a',
+        'site_z', 'model_z', 'card_z', 'port_z',
+    )
+    
+    class Meta:
+        ordering = ['task', 'sequence', 'pk']
+        verbose_name = _('传输电路')
+        verbose_name_plural = _('传输电路')
+        indexes = [
+            models.Index(fields=['code'], name='netbox_rms_circuit_code'),
+            models.Index(fields=['bandwidth'], name='netbox_rms_circuit_bandwidth'),
+            models.Index(fields=['site_a'], name='netbox_rms_circuit_site_a'),
+            models.Index(fields=['site_z'], name='netbox_rms_circuit_site_z'),
+        ]
+    
+    def __str__(self) -> str:
+        return self.code
+    
+    def get_absolute_url(self) -> str:
+        return reverse('plugins:netbox_rms:transmissioncircuit', args=[self.pk])
+    
+    def save(self, *args, **kwargs) -> None:
+        # 工单始终与任务所属工单一致
+        if self.task_id:
+            self.service_order_id = self.task.service_order_id
+        super().save(*args, **kwargs)
+    
+    def to_feedback(self) -> Dict[str, str]:
+        """转换为任务反馈中的电路字典"""
+        return {field: getattr(self, field) for field in self.FEEDBACK_FIELDS}
+
+
+class ColocationDevice(models.Model):
+    """
+    托管设备
+    
+    工单 check_data['devices']（申请）和任务 feedback_data['colocation']['devices']（已上架）
+    的规范化存储，每个设备条目一行，随工单、任务保存自动重建。
+    按 (site, source) 建立索引，机房容量汇总为一次 GROUP BY 聚合。
+    """
+    
+    service_order = models.ForeignKey(
+        to=ServiceOrder,
+        on_delete=models.CASCADE,
+        related_name='colocation_devices',
+        verbose_name=_('工单'),
+    )
+    
+    task = models.ForeignKey(
+        to=TaskDetail,
+        on_delete=models.CASCADE,
+        related_name='colocation_devices',
+        blank=True,
+        null=True,
+        verbose_name=_('执行任务'),
+        help_text=_('申请设备为空'),
+    )
+    
+    site = models.ForeignKey(
+        to=Site,
+        on_delete=models.SET_NULL,
+        related_name='rms_colocation_devices',
+        blank=True,
+        null=True,
+        verbose_name=_('机房'),
+    )
+    
+    source = models.CharField(
+        max_length=20,
+        choices=ColocationDeviceSourceChoices,
+        verbose_name=_('来源'),
+    )
+    
+    sequence = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('序号'),
+    )
+    
+    device_type = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('设备类型'),
+    )
+    
+    model = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('设备型号'),
+    )
+    
+    rack_units = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('U 数'),
+    )
+    
+    power = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        verbose_name=_('单台功率 (W)'),
+    )
+    
+    quantity = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name=_('数量'),
+    )
+    
+    cabinet = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name=_('机柜'),
+    )
+    
+    unit = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name=_('U 位'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['service_order', 'task', 'sequence', 'pk']
+        verbose_name = _('托管设备')
+        verbose_name_plural = _('托管设备')
+        indexes = [
+            models.Index(fields=['site', 'source'], name='netbox_rms_colodevice_site'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.service_order.order_no} {self.model or self.device_type}"
+
+
+class OutboundEvent(models.Model):
+    """
+    外发事件（发件箱）
+    
+    计费等外部系统关心的状态变化（工单确认执行（计费）、任务已确认）先写入本表，
+    由后台任务按批投递。同一对象的同一事件在待投递期间只保留一条（部分唯一约束），
+    后续变化合并到该条记录；投递失败按指数退避重试。
+    """
+    
+    event = models.CharField(
+        max_length=50,
+        verbose_name=_('事件'),
+    )
+    
+    object_type = models.CharField(
+        max_length=100,
+        verbose_name=_('对象类型'),
+        help_text=_('app_label.model_name'),
+    )
+    
+    object_id = models.PositiveBigIntegerField(
+        verbose_name=_('对象 ID'),
+    )
+    
+    payload = models.JSONField(
+        default=dict,
+        verbose_name=_('事件内容'),
+    )
+    
+    status = models.CharField(
+        max_length=20,
+        choices=OutboundEventStatusChoices,
+        default=OutboundEventStatusChoices.PENDING,
+        verbose_name=_('投递状态'),
+    )
+    
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('创建时间'),
+    )
+    
+    last_updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('更新时间'),
+        help_text=_('最后一次合并变化的时间'),
+    )
+    
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_('投递次数'),
+    )
+    
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_('下次投递时间'),
+    )
+    
+    delivered = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name=_('投递时间'),
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        verbose_name=_('最近错误'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['pk']
+        verbose_name = _('外发事件')
+        verbose_name_plural = _('外发事件')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['event', 'object_type', 'object_id'],
+                condition=models.Q(status='pending'),
+                name='netbox_rms_outboundevent_pending',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['next_attempt'],
+                condition=models.Q(status='pending'),
+                name='netbox_rms_outbound_due',
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.event} {self.object_type}#{self.object_id}"
+
+
+class BillingRun(models.Model):
+    """
+    计费批次
+    
+    每个计费月一条记录，由工单起租日期、资源台账及变更 / 停闭任务计算各资源的计费天数，
+    明细写入 BillingLine；重新计算时替换该月全部明细。
+    """
+    
+    period = models.DateField(
+        unique=True,
+        verbose_name=_('计费月'),
+        help_text=_('当月第一天'),
+    )
+    
+    generated = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_('计算时间'),
+    )
+    
+    line_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('明细数'),
+    )
+    
+    resource_days = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_('资源天数'),
+    )
+    
+    duration = models.FloatField(
+        default=0,
+        verbose_name=_('耗时（秒）'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['-period']
+        verbose_name = _('计费批次')
+        verbose_name_plural = _('计费批次')
+    
+    def __str__(self) -> str:
+        return f"{self.period:%Y-%m}"
+
+
+class BillingLine(models.Model):
+    """
+    计费明细
+    
+    一个资源在一个计费月内由一个工单计费的连续区间 [start_date, end_date)。
+    资源由变更单接续时，原单与变更单各一条；无资源台账的工单按工单本身计费（ledger 为空）。
+    """
+    
+    run = models.ForeignKey(
+        to=BillingRun,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name=_('计费批次'),
+    )
+    
+    tenant = models.ForeignKey(
+        to=Tenant,
+        on_delete=models.PROTECT,
+        related_name='rms_billing_lines',
+        verbose_name=_('客户单位'),
+    )
+    
+    service_order = models.ForeignKey(
+        to=ServiceOrder,
+        on_delete=models.PROTECT,
+        related_name='billing_lines',
+        verbose_name=_('计费工单'),
+    )
+    
+    ledger = models.ForeignKey(
+        to=ResourceLedger,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='billing_lines',
+        verbose_name=_('资源台账'),
+    )
+    
+    resource_type = models.CharField(
+        max_length=50,
+        choices=ResourceTypeChoices,
+        blank=True,
+        verbose_name=_('资源类型'),
+    )
+    
+    resource_id = models.CharField(
+        max_length=100,
+        verbose_name=_('资源标识'),
+        help_text=_('资源台账标识，无台账时为工单号'),
+    )
+    
+    start_date = models.DateField(
+        verbose_name=_('计费开始'),
+    )
+    
+    end_date = models.DateField(
+        verbose_name=_('计费结束'),
+        help_text=_('不含当天'),
+    )
+    
+    days = models.PositiveSmallIntegerField(
+        verbose_name=_('计费天数'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['run', 'tenant', 'service_order', 'resource_id', 'start_date']
+        verbose_name = _('计费明细')
+        verbose_name_plural = _('计费明细')
+        indexes = [
+            models.Index(fields=['run', 'tenant'], name='netbox_rms_billline_tenant'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.run} {self.resource_id}: {self.days}"
+
+
+class ResourceLedgerHistory(models.Model):
+    """
+    资源台账历史版本
+
+    台账每次保存写入一个版本，有效期 valid 为左闭右开区间 [生效, 失效)，当前版本失效时间为空；
+    台账删除后历史版本保留，按时间点查询由区间上的 GiST 索引支持。
+    """
+    
+    ledger = models.ForeignKey(
+        to=ResourceLedger,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='history',
+        verbose_name=_('资源台账'),
+    )
+    
+    service_order = models.ForeignKey(
+        to=ServiceOrder,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('来源工单'),
+    )
+    
+    resource_type = models.CharField(
+        max_length=50,
+        choices=ResourceTypeChoices,
+        verbose_name=_('资源类型'),
+    )
+    
+    resource_id = models.CharField(
+        max_length=100,
+        verbose_name=_('资源标识'),
+    )
+    
+    resource_name = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_('资源名称'),
+    )
+    
+    lifecycle_status = models.CharField(
+        max_length=50,
+        choices=ResourceLifecycleChoices,
+        verbose_name=_('生命周期状态'),
+    )
+    
+    snapshot = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name=_('资源快照'),
+    )
+    
+    valid = DateTimeRangeField(
+        verbose_name=_('有效期'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['ledger', 'valid']
+        verbose_name = _('资源台账历史')
+        verbose_name_plural = _('资源台账历史')
+        constraints = [
+            # 每条台账只有一个当前版本
+            models.UniqueConstraint(
+                fields=['ledger'],
+                condition=models.Q(valid__upper_inf=True),
+                name='netbox_rms_ledgerhist_open',
+            ),
+        ]
+        indexes = [
+            GistIndex(fields=['valid'], name='netbox_rms_ledgerhist_valid'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.get_resource_type_display()} - {self.resource_id} {self.valid}"
+
+
+class JSONRevision(models.Model):
+    """
+    JSON 字段版本
+
+    检查点保存字段完整内容，其余版本保存相对上一版本的 JSON Patch；
+    base 为版本所依据的检查点版本号，重建时从该检查点起依次应用补丁。
+    """
+    
+    object_type = models.CharField(
+        max_length=100,
+        verbose_name=_('对象类型'),
+        help_text=_('app_label.model_name'),
+    )
+    
+    object_id = models.PositiveBigIntegerField(
+        verbose_name=_('对象 ID'),
+    )
+    
+    field = models.CharField(
+        max_length=50,
+        verbose_name=_('字段'),
+    )
+    
+    version = models.PositiveIntegerField(
+        verbose_name=_('版本'),
+    )
+    
+    base = models.PositiveIntegerField(
+        verbose_name=_('检查点版本'),
+    )
+    
+    checkpoint = models.BooleanField(
+        default=False,
+        verbose_name=_('检查点'),
+    )
+    
+    data = models.JSONField(
+        verbose_name=_('内容'),
+        help_text=_('检查点为完整内容，否则为 JSON Patch'),
+    )
+    
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('时间'),
+    )
+    
+    objects = RestrictedQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['object_type', 'object_id', 'field', 'version']
+        verbose_name = _('JSON 版本')
+        verbose_name_plural = _('JSON 版本')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['object_type', 'object_id', 'field', 'version'],
+                name='netbox_rms_jsonrevision_version',
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.object_type}:{self.object_id} {self.field} v{self.version}"
@@ -17,6 +17,18 @@ service_order_items = (
                 icon_class='mdi mdi-plus-thick',
                 permissions=['netbox_rms.add_serviceorder'],
             ),
+            PluginMenuButton(
+                link='plugins:netbox_rms:serviceorder_bulk_change',
+                title='批量生成变更单',
+                icon_class='mdi mdi-content-duplicate',
+                permissions=['netbox_rms.add_serviceorder'],
+            ),
+            PluginMenuButton(
+                link='plugins:netbox_rms:serviceorder_clone',
+                title='批量复制（续约）',
+                icon_class='mdi mdi-content-copy',
+                permissions=['netbox_rms.add_serviceorder'],
+            ),
         ),
     ),
 )
@@ -38,6 +50,15 @@ task_detail_items = (
     ),
 )
 
+# 传输电路菜单项
+transmission_circuit_items = (
+    PluginMenuItem(
+        link='plugins:netbox_rms:transmissioncircuit_list',
+        link_text='传输电路',
+        permissions=['netbox_rms.view_transmissioncircuit'],
+    ),
+)
+
 # 资源台账菜单项
 resource_ledger_items = (
     PluginMenuItem(
@@ -55,13 +76,33 @@ resource_ledger_items = (
     ),
 )
 
+# 统计分析菜单项
+analytics_items = (
+    PluginMenuItem(
+        link='plugins:netbox_rms:demand_matrix',
+        link_text='站点对需求矩阵',
+        permissions=['netbox_rms.view_serviceorder'],
+    ),
+    PluginMenuItem(
+        link='plugins:netbox_rms:colocation_capacity',
+        link_text='托管容量汇总',
+        permissions=['netbox_rms.view_colocationdevice'],
+    ),
+    PluginMenuItem(
+        link='plugins:netbox_rms:billingrun_list',
+        link_text='计费',
+        permissions=['netbox_rms.view_billingrun'],
+    ),
+)
+
 # 主菜单
 menu = PluginMenu(
     label='资源管理',
     groups=(
         ('业务工单', service_order_items),
-        ('执行管理', task_detail_items),
+        ('执行管理', task_detail_items + transmission_circuit_items),
         ('资源台账', resource_ledger_items),
+        ('统计分析', analytics_items),
     ),
     icon_class='mdi mdi-clipboard-list-outline',
 )
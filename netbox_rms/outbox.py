@@ -0,0 +1,285 @@
+"""
+NetBox RMS 外发事件（发件箱）
+
+配置 outbound_events_url 后，计费系统关心的状态变化写入 OutboundEvent 表并按批投递：
+
+- billing_confirmed：工单确认执行状态变为“执行（计费）”；
+- task_confirmed：任务执行状态变为“已确认”。
+
+写入：与状态变化在同一事务内写入（signals、workflow.bulk_transition），状态变化回滚时一并回滚。
+
+合并：同一对象的同一事件自创建起 outbound_events_window 秒内的后续变化合并到同一条待投递记录
+（内容以最新为准），窗口结束后才投递，批量操作不会逐条推送。
+
+投递：后台任务每分钟（未配置 outbound_events_url 时不登记）将到期记录按 outbound_events_batch_size 条一批 POST 到接口：
+    {"delivery": "<批次 UUID>", "sent": "...", "events": [{"id", "event", "object_type", "object_id",
+     "created", "updated", "data"}]}
+2xx 视为成功；失败按指数退避（30 秒起，每次翻倍，最长 1 小时）重试，超过
+outbound_events_max_attempts 次标记为投递失败。投递为至少一次，接收方可按事件 id 和 updated 去重
+（投递期间合并了新内容的事件以同一 id、新的 updated 再次投递）。
+投递期间不持有数据库事务：先以租约认领一批，投递后再写入结果，不阻塞状态变化写入发件箱。
+本地调试可执行 rms_event_stub 启动接收桩，再以 rms_deliver_events --url 指向它。
+"""
+import datetime
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+import requests
+
+from django.db import transaction
+from django.utils import timezone
+
+from netbox.plugins import get_plugin_config
+
+from .choices import OutboundEventStatusChoices
+
+BILLING_CONFIRMED = 'billing_confirmed'
+TASK_CONFIRMED = 'task_confirmed'
+
+# 重试退避（秒）
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+# 认领租约的最短时间（秒）
+LEASE_MIN = 60
+
+
+def _config(name: str) -> Any:
+    return get_plugin_config('netbox_rms', name)
+
+
+def enabled() -> bool:
+    return bool(_config('outbound_events_url'))
+
+
+def backoff(attempts: int) -> datetime.timedelta:
+    """第 attempts 次投递失败后的等待时间"""
+    return datetime.timedelta(seconds=min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX))
+
+
+# =============================================================================
+# 事件内容
+# =============================================================================
+
+def order_payloads(order_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    from .models import ServiceOrder
+
+    orders = ServiceOrder.objects.filter(pk__in=list(order_ids)).select_related('tenant')
+    return {
+        order.pk: {
+            'order_no': order.order_no,
+            'tenant': order.tenant.name,
+            'contract_code': order.contract_code,
+            'check_type': order.check_type,
+            'confirmation_status': order.confirmation_status,
+            'billing_start_date': order.billing_start_date.isoformat() if order.billing_start_date else None,
+        }
+        for order in orders
+    }
+
+
+def task_payloads(task_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    from .models import TaskDetail
+
+    tasks = TaskDetail.objects.filter(pk__in=list(task_ids)).select_related('service_order')
+    return {
+        task.pk: {
+            'order_no': task.service_order.order_no,
+            'task_type': task.task_type,
+            'execution_status': task.execution_status,
+            'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+            'confirmed_at': task.confirmed_at.isoformat() if task.confirmed_at else None,
+        }
+        for task in tasks
+    }
+
+
+# =============================================================================
+# 写入发件箱
+# =============================================================================
+
+def record(event: str, object_type: str, payloads: Dict[int, Dict[str, Any]]) -> Dict[str, int]:
+    """
+    写入一批事件：已有待投递记录的对象合并内容，其余新建
+
+    Returns:
+        {'created', 'merged'}
+    """
+    from .models import OutboundEvent
+
+    if not payloads:
+        return {'created': 0, 'merged': 0}
+    now = timezone.now()
+    with transaction.atomic():
+        pending = {
+            outbound.object_id: outbound
+            for outbound in OutboundEvent.objects.select_for_update().filter(
+                event=event,
+                object_type=object_type,
+                object_id__in=list(payloads),
+                status=OutboundEventStatusChoices.PENDING,
+            )
+        }
+        for object_id, outbound in pending.items():
+            outbound.payload = payloads[object_id]
+            outbound.last_updated = now
+        OutboundEvent.objects.bulk_update(list(pending.values()), ['payload', 'last_updated'])
+        # 并发写入同一对象时由部分唯一约束去重
+        OutboundEvent.objects.bulk_create(
+            [
+                OutboundEvent(event=event, object_type=object_type, object_id=object_id, payload=payload)
+                for object_id, payload in payloads.items()
+                if object_id not in pending
+            ],
+            ignore_conflicts=True,
+        )
+    return {'created': len(payloads) - len(pending), 'merged': len(pending)}
+
+
+def record_billing_confirmations(order_ids: Iterable[int]) -> None:
+    """工单确认执行（计费）后写入发件箱（未配置接收接口时不记录）"""
+    order_ids = list(order_ids)
+    if order_ids and enabled():
+        record(BILLING_CONFIRMED, 'netbox_rms.serviceorder', order_payloads(order_ids))
+
+
+def record_task_confirmations(task_ids: Iterable[int]) -> None:
+    """任务变为已确认后写入发件箱（未配置接收接口时不记录）"""
+    task_ids = list(task_ids)
+    if task_ids and enabled():
+        record(TASK_CONFIRMED, 'netbox_rms.taskdetail', task_payloads(task_ids))
+
+
+# =============================================================================
+# 投递
+# =============================================================================
+
+class OutboundClient:
+    """HTTP 投递客户端（进程内复用连接）"""
+
+    def __init__(self, url: str, token: str = '', timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['Accept'] = 'application/json'
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+
+    def send(self, body: Dict[str, Any]) -> None:
+        """投递一批事件，失败时抛出异常"""
+        response = self.session.post(self.url, json=body, timeout=self.timeout)
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def build_client(url: Optional[str] = None) -> OutboundClient:
+    return OutboundClient(
+        url or _config('outbound_events_url'),
+        token=_config('outbound_events_token'),
+        timeout=_config('outbound_events_timeout'),
+    )
+
+
+def due_events(now: Optional[datetime.datetime] = None):
+    """到期待投递的事件：合并窗口已结束且到了下次投递时间"""
+    from .models import OutboundEvent
+
+    now = now or timezone.now()
+    return OutboundEvent.objects.filter(
+        status=OutboundEventStatusChoices.PENDING,
+        next_attempt__lte=now,
+        created__lte=now - datetime.timedelta(seconds=_config('outbound_events_window')),
+    )
+
+
+def serialize(outbound) -> Dict[str, Any]:
+    return {
+        'id': outbound.pk,
+        'event': outbound.event,
+        'object_type': outbound.object_type,
+        'object_id': outbound.object_id,
+        'created': outbound.created.isoformat(),
+        'updated': outbound.last_updated.isoformat(),
+        'data': outbound.payload,
+    }
+
+
+def lease_time() -> datetime.timedelta:
+    """认领批次的租约：投递期间其他投递任务不会重复认领，进程中断时到期后重新投递"""
+    return datetime.timedelta(seconds=max(_config('outbound_events_timeout') * 3, LEASE_MIN))
+
+
+def deliver(client: Optional[OutboundClient] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    投递全部到期事件
+
+    每批分三步，HTTP 请求期间不持有事务和行锁：
+    1. 短事务内锁定到期记录（skip_locked），将下次投递时间推迟到租约结束，视为认领；
+    2. 事务外投递；
+    3. 短事务内写入结果。投递期间合并了新内容的记录（更新时间已变化）保持待投递，
+       下一轮投递新内容，不计为失败。
+    本次投递失败的批次推迟到退避时间之后，不在本次调用中重试。
+
+    Returns:
+        {'batches', 'delivered', 'retrying', 'failed'}
+    """
+    from .models import OutboundEvent
+
+    batch_size = batch_size or _config('outbound_events_batch_size')
+    max_attempts = _config('outbound_events_max_attempts')
+    client = client or build_client()
+    stats = {'batches': 0, 'delivered': 0, 'retrying': 0, 'failed': 0}
+    while True:
+        with transaction.atomic():
+            batch = list(due_events().select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            OutboundEvent.objects.filter(pk__in=[outbound.pk for outbound in batch]).update(
+                next_attempt=timezone.now() + lease_time(),
+            )
+        claimed = {outbound.pk: outbound.last_updated for outbound in batch}
+
+        now = timezone.now()
+        body = {
+            'delivery': str(uuid.uuid4()),
+            'sent': now.isoformat(),
+            'events': [serialize(outbound) for outbound in batch],
+        }
+        try:
+            client.send(body)
+            error = ''
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+
+        delivered = retrying = failed = 0
+        with transaction.atomic():
+            now = timezone.now()
+            batch = list(OutboundEvent.objects.select_for_update().filter(pk__in=list(claimed)).order_by('pk'))
+            for outbound in batch:
+                if not error and outbound.last_updated != claimed[outbound.pk]:
+                    outbound.next_attempt = now
+                    retrying += 1
+                    continue
+                outbound.attempts += 1
+                outbound.last_error = error
+                if not error:
+                    outbound.status = OutboundEventStatusChoices.DELIVERED
+                    outbound.delivered = now
+                    delivered += 1
+                elif outbound.attempts >= max_attempts:
+                    outbound.status = OutboundEventStatusChoices.FAILED
+                    failed += 1
+                else:
+                    outbound.next_attempt = now + backoff(outbound.attempts)
+                    retrying += 1
+            OutboundEvent.objects.bulk_update(
+                batch,
+                ['attempts', 'last_error', 'status', 'delivered', 'next_attempt'],
+            )
+
+        stats['batches'] += 1
+        stats['delivered'] += delivered
+        stats['retrying'] += retrying
+        stats['failed'] += failed
+    return stats
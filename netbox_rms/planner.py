@@ -0,0 +1,257 @@
+"""
+NetBox RMS 托管机柜规划
+
+根据托管工单 check_data['devices']（机架需求 U 数、单台能耗、数量），
+在目标机房的 dcim.Rack 中规划设备上架位置，或给出精确的不具备原因
+（机柜不满足 / 机柜空间不满足 / 配电不满足）。
+
+机房数据通过少量批量查询一次载入：
+- 每个机柜的占用 U 位保存为一个整数位图（第 i 位表示 starting_unit + i 号 U 被占用），
+  查找连续空闲 U 位只需若干次位运算；
+- 每个机柜的配电额度为所接电源馈线 available_power 之和，已用功率为
+  机柜内设备电源端口分配功率（未填写时取最大功率）之和。
+
+上架采用最佳适应递减（Best-Fit Decreasing）：设备按 U 数、功率从大到小依次放入
+放下后剩余空闲 U 最少、且功率不超额的机柜。
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+from dcim.choices import RackStatusChoices
+from dcim.models import Device, PowerFeed, PowerPort, Rack, RackReservation
+
+from .choices import ColocationCheckResultChoices, ColocationUnavailableReasonChoices, ResourceCheckTypeChoices
+
+
+@dataclass
+class RackState:
+    """机柜当前状态（规划过程中会被更新）"""
+
+    id: int
+    name: str
+    starting_unit: int
+    height: int
+    occupied: int = 0
+    power_budget: Optional[float] = None    # None 表示未配置电源馈线，不校验配电
+    power_used: float = 0.0
+    placements: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def full_mask(self) -> int:
+        return (1 << self.height) - 1
+
+    @property
+    def free_units(self) -> int:
+        return self.height - bin(self.occupied & self.full_mask).count('1')
+
+    def occupy(self, first: float, last: float) -> None:
+        """标记 [first, last) 号 U 位为占用（支持半 U 位置）"""
+        start = max(math.floor(first) - self.starting_unit, 0)
+        end = min(math.ceil(last) - self.starting_unit, self.height)
+        if end > start:
+            self.occupied |= ((1 << (end - start)) - 1) << start
+
+    def find_slot(self, units: int) -> Optional[int]:
+        """
+        查找最低的连续 units 个空闲 U 位，返回起始位偏移
+
+        将空闲位图与自身右移 1 位的结果反复求与 units-1 次，结果中置位的位即为满足长度的起点。
+        """
+        if units <= 0 or units > self.height:
+            return None
+        runs = ~self.occupied & self.full_mask
+        for _shift in range(1, units):
+            runs &= runs >> 1
+        if not runs:
+            return None
+        return (runs & -runs).bit_length() - 1
+
+    def fits_power(self, power: float) -> bool:
+        return self.power_budget is None or self.power_used + power <= self.power_budget
+
+
+# =============================================================================
+# 数据载入
+# =============================================================================
+
+def load_racks(site_id: int) -> Dict[int, RackState]:
+    """批量载入机房内在用机柜的 U 位占用和配电情况"""
+    racks = {
+        pk: RackState(id=pk, name=name, starting_unit=starting_unit, height=int(u_height))
+        for pk, name, starting_unit, u_height in Rack.objects.filter(
+            site_id=site_id,
+            status=RackStatusChoices.STATUS_ACTIVE,
+        ).order_by('name', 'pk').values_list('pk', 'name', 'starting_unit', 'u_height')
+    }
+    if not racks:
+        return racks
+
+    # 已上架设备占用的 U 位
+    devices = Device.objects.filter(
+        rack__in=racks,
+        position__isnull=False,
+    ).values_list('rack_id', 'position', 'device_type__u_height')
+    for rack_id, position, u_height in devices:
+        if u_height:
+            racks[rack_id].occupy(float(position), float(position + u_height))
+
+    # 预留的 U 位
+    for rack_id, units in RackReservation.objects.filter(rack__in=racks).values_list('rack_id', 'units'):
+        for unit in units:
+            racks[rack_id].occupy(unit, unit + 1)
+
+    # 配电额度
+    budgets = PowerFeed.objects.filter(
+        rack__in=racks,
+    ).values('rack_id').annotate(total=Sum('available_power')).values_list('rack_id', 'total')
+    for rack_id, total in budgets:
+        racks[rack_id].power_budget = float(total or 0)
+
+    # 已用功率
+    draws = PowerPort.objects.filter(
+        device__rack__in=racks,
+    ).filter(
+        Q(allocated_draw__isnull=False) | Q(maximum_draw__isnull=False),
+    ).values('device__rack_id').annotate(
+        total=Sum(Coalesce('allocated_draw', 'maximum_draw')),
+    ).values_list('device__rack_id', 'total')
+    for rack_id, total in draws:
+        racks[rack_id].power_used = float(total or 0)
+
+    return racks
+
+
+def expand_devices(devices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按数量展开设备，并按 U 数、功率递减排序"""
+    items = []
+    for index, device in enumerate(devices or []):
+        try:
+            units = int(device.get('rack_units') or 0)
+            power = float(device.get('power_consumption') or 0)
+            quantity = int(device.get('quantity') or 1)
+        except (TypeError, ValueError):
+            continue
+        for copy in range(max(quantity, 1)):
+            items.append({
+                'index': index,
+                'copy': copy + 1,
+                'model': device.get('model') or '',
+                'rack_units': units,
+                'power': power,
+            })
+    items.sort(key=lambda item: (-item['rack_units'], -item['power'], item['index'], item['copy']))
+    return items
+
+
+# =============================================================================
+# 规划
+# =============================================================================
+
+def plan(site_id: Optional[int], devices: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    为设备列表规划上架位置
+
+    Args:
+        site_id: 托管机房（dcim.Site）ID
+        devices: check_data['devices']
+
+    Returns:
+        {
+            'check_result': 'available' / 'unavailable',
+            'unavailable_reasons': [...],      # ColocationUnavailableReasonChoices
+            'placements': [{'model', 'rack_id', 'rack', 'position', 'rack_units', 'power'}],
+            'unplaced': [{'model', 'rack_units', 'power', 'reason'}],
+            'racks': [{'id', 'name', 'free_units', 'power_budget', 'power_used'}],
+        }
+    """
+    racks = load_racks(site_id) if site_id else {}
+    items = expand_devices(devices)
+
+    placements: List[Dict[str, Any]] = []
+    unplaced: List[Dict[str, Any]] = []
+    for item in items:
+        units = item['rack_units']
+        best = None
+        power_blocked = False
+        for rack in racks.values():
+            offset = rack.find_slot(units) if units else 0
+            if offset is None:
+                continue
+            if not rack.fits_power(item['power']):
+                power_blocked = True
+                continue
+            remaining = rack.free_units - units
+            if best is None or remaining < best[0]:
+                best = (remaining, rack, offset)
+
+        if best is None:
+            if not racks:
+                reason = ColocationUnavailableReasonChoices.CABINET
+            elif power_blocked:
+                reason = ColocationUnavailableReasonChoices.POWER
+            else:
+                reason = ColocationUnavailableReasonChoices.SPACE
+            unplaced.append({
+                'model': item['model'],
+                'rack_units': units,
+                'power': item['power'],
+                'reason': reason,
+            })
+            continue
+
+        _remaining, rack, offset = best
+        position = rack.starting_unit + offset
+        if units:
+            rack.occupied |= ((1 << units) - 1) << offset
+        rack.power_used += item['power']
+        placement = {
+            'model': item['model'],
+            'rack_id': rack.id,
+            'rack': rack.name,
+            'position': position if units else None,
+            'rack_units': units,
+            'power': item['power'],
+        }
+        rack.placements.append(placement)
+        placements.append(placement)
+
+    reasons = []
+    for reason, _label in ColocationUnavailableReasonChoices.CHOICES:
+        if any(device['reason'] == reason for device in unplaced):
+            reasons.append(reason)
+    placements.sort(key=lambda p: (p['rack'], p['position'] or 0))
+
+    return {
+        'check_result': (
+            ColocationCheckResultChoices.UNAVAILABLE if unplaced else ColocationCheckResultChoices.AVAILABLE
+        ),
+        'unavailable_reasons': reasons,
+        'placements': placements,
+        'unplaced': unplaced,
+        'racks': [
+            {
+                'id': rack.id,
+                'name': rack.name,
+                'free_units': rack.free_units,
+                'power_budget': rack.power_budget,
+                'power_used': rack.power_used,
+            }
+            for rack in racks.values() if rack.placements
+        ],
+    }
+
+
+def plan_order(order) -> Optional[Dict[str, Any]]:
+    """为托管工单规划；非托管工单或未填写设备时返回 None"""
+    data = order.safe_check_data
+    if order.check_type != ResourceCheckTypeChoices.COLOCATION or not data.get('devices'):
+        return None
+    try:
+        site_id = int(data.get('site_id')) if data.get('site_id') else None
+    except (TypeError, ValueError):
+        site_id = None
+    return plan(site_id, data['devices'])
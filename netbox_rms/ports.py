@@ -0,0 +1,336 @@
+"""
+NetBox RMS 端口占用索引
+
+将执行反馈 feedback_data['transmission']['circuits'] 中每条电路的 A、Z 端
+（站点、设备型号、板卡/槽位、端口）规范化后写入 PortAssignment，一端一行。
+
+- 同一电路编号视为同一条电路；开通 / 变更任务保存时整体替换该任务的端口记录，
+  并将其他任务中同编号电路的有效记录置为无效（变更后以新端口为准）；
+- 停闭任务完成时，将反馈中电路编号的有效记录置为无效，
+  反馈未填写电路时释放原工单（或其上级工单）的全部端口；
+- port_key 上的部分唯一约束（仅有效记录）保证同一端口只能被一条有效电路占用，
+  TaskDetail.clean()（表单、API 保存前均经过）通过 find_conflicts 一次索引查询给出冲突明细。
+
+rms_audit_ports 命令按任务顺序重放全部执行反馈，报告被两条以上有效电路占用的端口，
+并可据此重建索引。
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+
+from .choices import CircuitEndChoices, ExecutionStatusChoices, TaskTypeChoices
+
+# 反馈中各端点字段的后缀
+ENDS = (
+    (CircuitEndChoices.A, '_a'),
+    (CircuitEndChoices.Z, '_z'),
+)
+
+RELEASED_STATUSES = (ExecutionStatusChoices.COMPLETED, ExecutionStatusChoices.CONFIRMED)
+
+
+# =============================================================================
+# 规范化
+# =============================================================================
+
+def normalize(value: Any) -> str:
+    """去除首尾及重复空白并转为大写，避免 "slot 1" 与 "SLOT  1" 被视为不同端口"""
+    return ' '.join(str(value or '').split()).upper()
+
+
+def circuit_ends(circuit: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    电路 A、Z 端的端口信息
+
+    站点或端口未填写的端点不参与占用。
+
+    Returns:
+        [{'end', 'site', 'device_model', 'card', 'port', 'port_key'}]
+    """
+    ends = []
+    for end, suffix in ENDS:
+        site = str(circuit.get(f'site{suffix}') or '').strip()
+        device_model = str(circuit.get(f'model{suffix}') or '').strip()
+        card = str(circuit.get(f'card{suffix}') or '').strip()
+        port = str(circuit.get(f'port{suffix}') or '').strip()
+        if not site or not port:
+            continue
+        ends.append({
+            'end': end,
+            'site': site,
+            'device_model': device_model,
+            'card': card,
+            'port': port,
+            'port_key': '|'.join(normalize(value) for value in (site, device_model, card, port))[:255],
+        })
+    return ends
+
+
+def task_circuits(feedback_data: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """执行反馈中填写了电路编号的传输电路"""
+    circuits = ((feedback_data or {}).get('transmission') or {}).get('circuits') or []
+    return [
+        circuit for circuit in circuits
+        if isinstance(circuit, dict) and str(circuit.get('code') or '').strip()
+    ]
+
+
+def circuit_claims(circuits: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, str]]]:
+    """展开为 [(电路编号, 端点信息)]"""
+    return [
+        (str(circuit['code']).strip(), end)
+        for circuit in circuits
+        for end in circuit_ends(circuit)
+    ]
+
+
+def format_port(end: Dict[str, str]) -> str:
+    return ' / '.join(value for value in (end['site'], end['device_model'], end['card'], end['port']) if value)
+
+
+# =============================================================================
+# 冲突检测
+# =============================================================================
+
+def find_conflicts(circuits: List[Dict[str, Any]], task_type: str, task_id: Optional[int] = None) -> List[str]:
+    """
+    检查电路端口是否已被其他电路占用
+
+    Args:
+        circuits: 执行反馈中的电路列表
+        task_type: 任务类型，停闭任务不占用端口
+        task_id: 正在编辑的任务 ID（新建时为 None），其自身的端口记录不视为冲突
+
+    Returns:
+        冲突说明列表，为空表示无冲突
+    """
+    from .models import PortAssignment
+
+    if task_type == TaskTypeChoices.DEACTIVATION:
+        return []
+
+    errors = []
+    claimed: Dict[str, Tuple[str, Dict[str, str]]] = {}
+    for code, end in circuit_claims(circuits):
+        other = claimed.get(end['port_key'])
+        if other is not None:
+            errors.append(f"{format_port(end)}: {other[0]} {other[1]['end']}端 / {code} {end['end']}端")
+            continue
+        claimed[end['port_key']] = (code, end)
+    if not claimed:
+        return errors
+
+    existing = PortAssignment.objects.filter(
+        active=True,
+        port_key__in=claimed,
+    ).select_related('service_order')
+    if task_id:
+        existing = existing.exclude(task_id=task_id)
+    for assignment in existing:
+        code, end = claimed[assignment.port_key]
+        # 同编号电路由本任务接管
+        if assignment.circuit_code == code:
+            continue
+        errors.append(
+            f"{format_port(end)}: {assignment.circuit_code}"
+            f"（{assignment.service_order.order_no}）已占用"
+        )
+    return errors
+
+
+# =============================================================================
+# 同步
+# =============================================================================
+
+def build_assignments(task) -> list:
+    """由任务执行反馈生成（未保存的）端口记录"""
+    from .models import PortAssignment
+
+    return [
+        PortAssignment(
+            task_id=task.pk,
+            service_order_id=task.service_order_id,
+            circuit_code=code,
+            **end,
+        )
+        for code, end in circuit_claims(task_circuits(task.feedback_data))
+    ]
+
+
+def sync_task(task, previous: Optional[str]) -> None:
+    """
+    任务保存后同步端口记录（由信号处理器调用，previous 为保存前的执行状态）
+
+    反馈中的电路端口与该任务已有记录一致时不做任何写入，
+    避免重新保存旧任务时覆盖后续变更任务登记的端口。
+    停闭任务只在变为已完成 / 已确认时释放端口，之后再编辑不会释放同编号的新电路。
+    """
+    from .models import PortAssignment
+
+    if task.task_type == TaskTypeChoices.DEACTIVATION:
+        on_status_change(task, previous)
+        return
+
+    assignments = build_assignments(task)
+    current = set(PortAssignment.objects.filter(task=task).values_list(
+        'circuit_code', 'end', 'port_key',
+    ))
+    if current == {(a.circuit_code, a.end, a.port_key) for a in assignments}:
+        return
+
+    codes = {assignment.circuit_code for assignment in assignments}
+    with transaction.atomic():
+        PortAssignment.objects.filter(task=task).delete()
+        PortAssignment.objects.filter(active=True, circuit_code__in=codes).update(active=False)
+        PortAssignment.objects.bulk_create(assignments)
+
+
+def release(task) -> int:
+    """停闭任务：释放反馈中的电路（未填写时为原工单全部电路）占用的端口，返回释放的记录数"""
+    from .models import PortAssignment
+
+    codes = {str(circuit['code']).strip() for circuit in task_circuits(task.feedback_data)}
+    assignments = PortAssignment.objects.filter(active=True)
+    if codes:
+        assignments = assignments.filter(circuit_code__in=codes)
+    else:
+        order = task.service_order
+        assignments = assignments.filter(service_order_id=order.parent_order_id or order.pk)
+    return assignments.update(active=False)
+
+
+def on_status_change(task, previous: Optional[str]) -> None:
+    """停闭任务变为已完成 / 已确认时释放端口（由信号处理器和批量流转调用）"""
+    if task.task_type != TaskTypeChoices.DEACTIVATION or previous in RELEASED_STATUSES:
+        return
+    if task.execution_status in RELEASED_STATUSES:
+        release(task)
+
+
+# =============================================================================
+# 审计 / 重建
+# =============================================================================
+
+def replay(chunk_size: int = 2000) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    按任务创建顺序重放全部执行反馈，得到各端口上的有效电路
+
+    Returns:
+        {port_key: [{'code', 'end', 'task_id', 'service_order_id', 'order_no', ...端口信息}]}
+    """
+    from .models import TaskDetail
+
+    # 电路编号 -> 有效端点列表
+    circuits: Dict[str, List[Dict[str, Any]]] = {}
+    tasks = TaskDetail.objects.filter(
+        feedback_data__transmission__has_key='circuits',
+    ).order_by('pk').values_list(
+        'pk', 'service_order_id', 'service_order__parent_order_id', 'service_order__order_no',
+        'task_type', 'execution_status', 'feedback_data__transmission__circuits',
+    )
+    for task_id, order_id, parent_id, order_no, task_type, status, feedback in tasks.iterator(chunk_size=chunk_size):
+        feedback_circuits = task_circuits({'transmission': {'circuits': feedback}})
+        if task_type == TaskTypeChoices.DEACTIVATION:
+            if status not in RELEASED_STATUSES:
+                continue
+            codes = {str(circuit['code']).strip() for circuit in feedback_circuits}
+            if not codes:
+                target = parent_id or order_id
+                codes = {
+                    code for code, ends in circuits.items()
+                    if ends and ends[0]['service_order_id'] == target
+                }
+            for code in codes:
+                circuits.pop(code, None)
+            continue
+
+        replaced = defaultdict(list)
+        for code, end in circuit_claims(feedback_circuits):
+            replaced[code].append({
+                'code': code,
+                'task_id': task_id,
+                'service_order_id': order_id,
+                'order_no': order_no,
+                **end,
+            })
+        circuits.update(replaced)
+
+    by_port: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for ends in circuits.values():
+        for end in ends:
+            by_port[end['port_key']].append(end)
+    return dict(by_port)
+
+
+def audit(replayed: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    报告被两条以上有效电路占用的端口
+
+    Args:
+        replayed: replay() 的结果
+
+    Returns:
+        [{'port_key', 'port', 'claims': [{'code', 'end', 'task_id', 'order_no'}]}]
+    """
+    conflicts = []
+    for port_key, claims in sorted(replayed.items()):
+        if len({claim['code'] for claim in claims}) < 2:
+            continue
+        conflicts.append({
+            'port_key': port_key,
+            'port': format_port(claims[0]),
+            'claims': [
+                {key: claim[key] for key in ('code', 'end', 'task_id', 'order_no')}
+                for claim in claims
+            ],
+        })
+    return conflicts
+
+
+def rebuild_items(replayed: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """分批重建涉及的端口（升序）：重放结果中的端口及已有端口记录的端口"""
+    from .models import PortAssignment
+
+    port_keys = set(replayed)
+    port_keys.update(PortAssignment.objects.values_list('port_key', flat=True).distinct())
+    return sorted(port_keys)
+
+
+def rebuild(replayed: Dict[str, List[Dict[str, Any]]], chunk_size: int = 2000,
+            port_keys: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    由重放结果重建端口占用索引（指定 port_keys 时只重建这些端口，供分批重建使用）
+
+    冲突端口上先登记的电路保持有效，其余记录写入为无效，可通过 audit 查看。
+    每个端口的记录整体替换，部分唯一约束在各批之间不会冲突。
+    """
+    from .models import PortAssignment
+
+    assignments = []
+    conflicts = 0
+    keys = replayed if port_keys is None else port_keys
+    for port_key in keys:
+        claims = replayed.get(port_key, [])
+        for index, claim in enumerate(claims):
+            if index and claim['code'] != claims[0]['code']:
+                conflicts += 1
+            assignments.append(PortAssignment(
+                task_id=claim['task_id'],
+                service_order_id=claim['service_order_id'],
+                circuit_code=claim['code'],
+                active=index == 0,
+                **{key: claim[key] for key in ('end', 'site', 'device_model', 'card', 'port', 'port_key')},
+            ))
+
+    with transaction.atomic():
+        existing = PortAssignment.objects.all()
+        if port_keys is not None:
+            existing = existing.filter(port_key__in=port_keys)
+        existing.delete()
+        PortAssignment.objects.bulk_create(assignments, batch_size=chunk_size)
+
+    return {
+        'assignments': len(assignments),
+        'conflicts': conflicts,
+    }
@@ -0,0 +1,266 @@
+"""
+NetBox RMS 托管配电预算
+
+评估托管工单申请的功率是否超出机房配电余量：
+
+- 申请功率：工单 check_data['devices'] 中各设备 power_consumption × quantity 之和；
+- 配电容量：机房配电盘 (PowerPanel) 下在用电源馈线 (PowerFeed) 的 available_power 之和；
+- 已分配功率：未拆除的托管设备类资源台账快照中的功率（snapshot['power'] × quantity，
+  或 snapshot['devices'] 逐台累加），快照未记录 site_id 时归属工单的核查机房；
+- 余量 = 配电容量 - 已分配功率（工单自身已登记台账的功率不重复计算）。
+
+各机房的容量、已分配功率均由批量查询载入，并按机房缓存（电源馈线、资源台账或工单变更后失效）。
+
+evaluate_open_orders() 一次评估全部在途托管工单：按申请日期顺序，满足的工单依次预占余量，
+结果写入已有核查结果的 ResourceCheckResult.power_data（尚未核查的工单只参与预占，不代为创建核查结果）；配电不满足时自动加入“配电不满足”原因，
+余量恢复后只移除自动加入的原因，人工选择的原因保持不变。
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from dcim.choices import PowerFeedStatusChoices
+from dcim.models import PowerFeed
+
+from . import cache, colocation, events
+from .choices import (
+    ColocationUnavailableReasonChoices, ConfirmationStatusChoices, ResourceCheckTypeChoices, ResourceTypeChoices,
+)
+
+ZERO = Decimal('0.00')
+
+
+# =============================================================================
+# 功率解析
+# =============================================================================
+
+def device_power(device: Dict[str, Any]) -> Decimal:
+    """单条设备记录的功率 (W)：功率 × 数量"""
+    power = colocation._decimal(device.get('power_consumption') or device.get('power'))
+    return power * (colocation._int(device.get('quantity'), 1) or 1)
+
+
+def requested_power(check_data: Dict[str, Any]) -> Decimal:
+    """工单申请设备的总功率 (W)"""
+    return sum(
+        (device_power(device) for device in check_data.get('devices') or [] if isinstance(device, dict)),
+        ZERO,
+    )
+
+
+def snapshot_power(snapshot: Dict[str, Any]) -> Decimal:
+    """资源台账快照中的功率 (W)"""
+    devices = snapshot.get('devices')
+    if isinstance(devices, list):
+        return sum((device_power(device) for device in devices if isinstance(device, dict)), ZERO)
+    return device_power(snapshot)
+
+
+# =============================================================================
+# 机房配电预算
+# =============================================================================
+
+def _empty_budget() -> Dict[str, Any]:
+    return {'feeds': 0, 'capacity': ZERO, 'allocated': ZERO, 'orders': {}}
+
+
+def load_budgets(site_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    批量载入机房配电预算（不经缓存）
+
+    Returns:
+        {site_id: {'feeds', 'capacity', 'allocated', 'orders': {工单 ID: 已分配功率}}}
+    """
+    from .models import ResourceLedger
+
+    site_ids = list(site_ids)
+    budgets = {site_id: _empty_budget() for site_id in site_ids}
+
+    feeds = PowerFeed.objects.filter(
+        power_panel__site_id__in=site_ids,
+        status=PowerFeedStatusChoices.STATUS_ACTIVE,
+    ).values('power_panel__site_id').annotate(
+        feed_count=Count('pk'),
+        capacity=Sum('available_power', default=0),
+    ).values_list('power_panel__site_id', 'feed_count', 'capacity')
+    for site_id, feed_count, capacity in feeds:
+        budgets[site_id]['feeds'] = feed_count
+        budgets[site_id]['capacity'] = Decimal(capacity)
+
+    ledger = ResourceLedger.objects.current().filter(
+        resource_type=ResourceTypeChoices.HOSTING_DEVICE,
+    ).filter(
+        Q(snapshot__site_id__in=site_ids) | Q(service_order__check_data__site_id__in=site_ids),
+    ).values_list('service_order_id', 'service_order__check_data__site_id', 'snapshot')
+    for order_id, order_site_id, snapshot in ledger.iterator(chunk_size=2000):
+        snapshot = snapshot if isinstance(snapshot, dict) else {}
+        budget = budgets.get(colocation._site_id(snapshot.get('site_id')) or colocation._site_id(order_site_id))
+        if budget is None:
+            continue
+        power = snapshot_power(snapshot)
+        budget['allocated'] += power
+        budget['orders'][order_id] = budget['orders'].get(order_id, ZERO) + power
+    return budgets
+
+
+def site_budgets(site_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """机房配电预算（按机房缓存，未命中的机房一次批量载入；机房 ID 规范化为整数，无效的忽略）"""
+    return cache.get_many_or_compute(
+        (cache.NAMESPACE_POWER, cache.NAMESPACE_LEDGER, cache.NAMESPACE_ORDERS),
+        'power_budget',
+        sorted({colocation._site_id(site_id) for site_id in site_ids} - {None}),
+        load_budgets,
+    )
+
+
+# =============================================================================
+# 评估
+# =============================================================================
+
+def evaluate_order(
+    order,
+    budgets: Dict[int, Dict[str, Any]],
+    reserved: Decimal = ZERO,
+) -> Dict[str, Any]:
+    """
+    评估单个托管工单的配电预算
+
+    Args:
+        order: 托管工单
+        budgets: site_budgets() 的结果
+        reserved: 同机房排在前面的在途工单已预占的功率
+
+    Returns:
+        {'evaluated', 'site_id', 'requested', 'capacity', 'allocated', 'reserved', 'remaining', 'sufficient'}，
+        功率单位为 W；机房未登记在用电源馈线时 sufficient 为 None
+    """
+    data = order.safe_check_data
+    site_id = colocation._site_id(data.get('site_id'))
+    requested = requested_power(data)
+    result = {
+        'evaluated': timezone.now().isoformat(),
+        'site_id': site_id,
+        'requested': float(requested),
+        'capacity': None,
+        'allocated': None,
+        'reserved': None,
+        'remaining': None,
+        'sufficient': None,
+    }
+    budget = budgets.get(site_id)
+    if not budget or not budget['feeds']:
+        return result
+
+    allocated = budget['allocated'] - budget['orders'].get(order.pk, ZERO)
+    remaining = budget['capacity'] - allocated - reserved
+    result.update({
+        'capacity': float(budget['capacity']),
+        'allocated': float(allocated),
+        'reserved': float(reserved),
+        'remaining': float(remaining),
+        'sufficient': requested <= remaining,
+    })
+    return result
+
+
+def open_colocation_orders():
+    """未取消且尚未起租的托管工单"""
+    from .models import ServiceOrder
+
+    return ServiceOrder.objects.filter(
+        check_type=ResourceCheckTypeChoices.COLOCATION,
+        billing_start_date__isnull=True,
+    ).exclude(
+        confirmation_status=ConfirmationStatusChoices.CANCEL,
+    )
+
+
+def apply_result(result, power_data: Dict[str, Any]) -> None:
+    """
+    将评估结果写入核查结果（不保存）
+
+    配电不满足时加入“配电不满足”原因并记为自动加入；
+    满足或无法评估时仅移除此前自动加入的原因。
+    """
+    reasons = list(result.unavailable_reasons or [])
+    flagged = bool((result.power_data or {}).get('flagged'))
+    power = ColocationUnavailableReasonChoices.POWER
+    if power_data['sufficient'] is False:
+        if power not in reasons:
+            reasons.append(power)
+            flagged = True
+    elif flagged:
+        reasons = [reason for reason in reasons if reason != power]
+        flagged = False
+    result.unavailable_reasons = reasons
+    result.power_data = {**power_data, 'flagged': flagged}
+
+
+def evaluate_open_orders(chunk_size: int = 500) -> Dict[str, int]:
+    """
+    批量评估全部在途托管工单的配电预算
+
+    涉及机房的预算一次载入；工单按申请日期顺序分批读取，已有核查结果按批更新。
+
+    Returns:
+        统计信息：工单数、满足数、不满足数、无法评估数
+    """
+    from .models import ResourceCheckResult
+
+    stats = {'orders': 0, 'sufficient': 0, 'insufficient': 0, 'unknown': 0}
+    rows = list(
+        open_colocation_orders().order_by('apply_date', 'pk').values_list('pk', 'check_data__site_id')
+    )
+    budgets = site_budgets(
+        site_id for site_id in (colocation._site_id(site_id) for _pk, site_id in rows) if site_id
+    )
+    reserved: Dict[Optional[int], Decimal] = defaultdict(lambda: ZERO)
+
+    order_ids = [pk for pk, _site_id in rows]
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        orders = open_colocation_orders().filter(pk__in=chunk).only('pk', 'check_type', 'check_data').in_bulk()
+        results = {
+            result.service_order_id: result
+            for result in ResourceCheckResult.objects.filter(service_order_id__in=chunk)
+        }
+
+        updated = []
+        for pk in chunk:
+            order = orders.get(pk)
+            if order is None:
+                continue
+            site_id = colocation._site_id(order.safe_check_data.get('site_id'))
+            power_data = evaluate_order(order, budgets, reserved[site_id])
+            stats['orders'] += 1
+            if power_data['sufficient'] is None:
+                stats['unknown'] += 1
+            elif power_data['sufficient']:
+                stats['sufficient'] += 1
+                reserved[site_id] += requested_power(order.safe_check_data)
+            else:
+                stats['insufficient'] += 1
+
+            result = results.get(pk)
+            if result is not None:
+                apply_result(result, power_data)
+                updated.append(result)
+
+        with transaction.atomic():
+            ResourceCheckResult.objects.bulk_update(updated, ['unavailable_reasons', 'power_data'])
+            for result in updated:
+                events.emit(
+                    events.CHECK_RESULT_SET,
+                    result,
+                    service_order_id=result.service_order_id,
+                    check_result=result.check_result,
+                    unavailable_reasons=list(result.unavailable_reasons or []),
+                )
+
+    # 批量写入不触发信号，手动使缓存失效
+    cache.invalidate_namespace(cache.NAMESPACE_CHECK_RESULTS)
+    return stats
@@ -0,0 +1,259 @@
+"""
+NetBox RMS JSON 字段版本
+
+资源台账快照 (ResourceLedger.snapshot) 和任务执行反馈 (TaskDetail.feedback_data) 的各版本保存在
+JSONRevision 中，不再由变更日志重复记录完整 JSON：
+
+- 每个对象字段的第 1 个版本和此后每 revision_checkpoint_interval 个版本保存完整内容（检查点），
+  其余版本只保存相对上一版本的 JSON Patch（RFC 6902 的 add / remove / replace）；
+  补丁不小于完整内容时也保存为检查点；
+- 重建任一版本：从其所依据的检查点起依次应用补丁，至多读取 revision_checkpoint_interval 行；
+- 保存时与上一版本（由版本记录重建）比较，内容未变不写版本；批量写入处显式调用 record()。
+
+启用前的内容执行 rms_enqueue_job reindex --index snapshot_revisions / feedback_revisions 补记检查点。
+"""
+import copy
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Func, Q, Sum
+
+from netbox.plugins import get_plugin_config
+
+# 记录版本的字段：模型 -> 字段
+TRACKED_FIELDS = {
+    'netbox_rms.resourceledger': 'snapshot',
+    'netbox_rms.taskdetail': 'feedback_data',
+}
+
+
+class PatchError(Exception):
+    """补丁无法应用到文档"""
+
+
+# =============================================================================
+# JSON Patch
+# =============================================================================
+
+def _escape(token: str) -> str:
+    return token.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def diff(old: Any, new: Any, path: str = '') -> List[Dict[str, Any]]:
+    """生成由 old 变为 new 的补丁；列表按位置比较，末尾追加或删除的元素单独记录"""
+    if type(old) is not type(new):
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    if isinstance(old, dict):
+        ops = [{'op': 'remove', 'path': f'{path}/{_escape(key)}'} for key in old if key not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append({'op': 'add', 'path': f'{path}/{_escape(key)}', 'value': value})
+            else:
+                ops.extend(diff(old[key], value, f'{path}/{_escape(key)}'))
+        return ops
+    if isinstance(old, list):
+        ops = []
+        for index in range(min(len(old), len(new))):
+            ops.extend(diff(old[index], new[index], f'{path}/{index}'))
+        for index in range(len(old), len(new)):
+            ops.append({'op': 'add', 'path': f'{path}/{index}', 'value': new[index]})
+        for index in reversed(range(len(new), len(old))):
+            ops.append({'op': 'remove', 'path': f'{path}/{index}'})
+        return ops
+    if old != new:
+        return [{'op': 'replace', 'path': path, 'value': new}]
+    return []
+
+
+def apply(document: Any, patch: Iterable[Dict[str, Any]]) -> Any:
+    """将补丁应用到文档副本"""
+    document = copy.deepcopy(document)
+    for operation in patch:
+        op, path = operation['op'], operation['path']
+        if path == '':
+            if op == 'remove':
+                raise PatchError('不能删除文档根')
+            document = copy.deepcopy(operation['value'])
+            continue
+        *parents, last = [_unescape(token) for token in path.split('/')[1:]]
+        try:
+            target = document
+            for token in parents:
+                target = target[int(token)] if isinstance(target, list) else target[token]
+            if isinstance(target, list):
+                index = len(target) if last == '-' else int(last)
+                if op == 'add':
+                    target.insert(index, copy.deepcopy(operation['value']))
+                elif op == 'remove':
+                    del target[index]
+                else:
+                    target[index] = copy.deepcopy(operation['value'])
+            elif op == 'remove':
+                del target[last]
+            else:
+                target[last] = copy.deepcopy(operation['value'])
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            raise PatchError(f'{op} {path}: {e}')
+    return document
+
+
+def _as_json(value: Any) -> Any:
+    """字段值转换为纯 JSON 值（与 JSONField 读回的结果一致）"""
+    return json.loads(json.dumps(value if value is not None else {}, cls=DjangoJSONEncoder))
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+
+
+# =============================================================================
+# 记录与重建
+# =============================================================================
+
+def _chains(object_type: str, field: str, object_ids: List[int]) -> Dict[int, List]:
+    """各对象最新版本所在的补丁链（检查点至最新版本，按版本升序）"""
+    from .models import JSONRevision
+
+    revisions = JSONRevision.objects.filter(object_type=object_type, field=field)
+    latest = {
+        object_id: base
+        for object_id, base in revisions.filter(object_id__in=object_ids).order_by(
+            'object_id', '-version',
+        ).distinct('object_id').values_list('object_id', 'base')
+    }
+    chains: Dict[int, List] = defaultdict(list)
+    if not latest:
+        return chains
+    lookup = Q()
+    for object_id, base in latest.items():
+        lookup |= Q(object_id=object_id, version__gte=base)
+    for revision in revisions.filter(lookup).order_by('object_id', 'version'):
+        chains[revision.object_id].append(revision)
+    return chains
+
+
+def _replay(chain: List) -> Any:
+    document = None
+    for revision in chain:
+        document = copy.deepcopy(revision.data) if revision.checkpoint else apply(document, revision.data)
+    return document
+
+
+def record(instances: Iterable, field: Optional[str] = None, batch_size: int = 500) -> int:
+    """
+    为一批同一模型的对象记录字段的新版本（内容未变的跳过）
+
+    Returns:
+        写入的版本数
+    """
+    from .models import JSONRevision
+
+    instances = [instance for instance in instances if instance.pk]
+    if not instances:
+        return 0
+    object_type = instances[0]._meta.label_lower
+    field = field or TRACKED_FIELDS[object_type]
+    interval = get_plugin_config('netbox_rms', 'revision_checkpoint_interval')
+
+    created = []
+    for offset in range(0, len(instances), batch_size):
+        batch = instances[offset:offset + batch_size]
+        chains = _chains(object_type, field, [instance.pk for instance in batch])
+        for instance in batch:
+            value = _as_json(getattr(instance, field))
+            chain = chains.get(instance.pk)
+            if not chain:
+                created.append(JSONRevision(
+                    object_type=object_type, object_id=instance.pk, field=field,
+                    version=1, base=1, checkpoint=True, data=value,
+                ))
+                continue
+            previous = _replay(chain)
+            if previous == value:
+                continue
+            version = chain[-1].version + 1
+            patch = diff(previous, value)
+            if version - chain[0].version >= interval or _size(patch) >= _size(value):
+                created.append(JSONRevision(
+                    object_type=object_type, object_id=instance.pk, field=field,
+                    version=version, base=version, checkpoint=True, data=value,
+                ))
+            else:
+                created.append(JSONRevision(
+                    object_type=object_type, object_id=instance.pk, field=field,
+                    version=version, base=chain[0].version, checkpoint=False, data=patch,
+                ))
+    with transaction.atomic():
+        JSONRevision.objects.bulk_create(created, batch_size=batch_size)
+    return len(created)
+
+
+def reconstruct(revision) -> Any:
+    """重建某一版本的完整内容"""
+    from .models import JSONRevision
+
+    if revision.checkpoint:
+        return copy.deepcopy(revision.data)
+    chain = JSONRevision.objects.filter(
+        object_type=revision.object_type,
+        object_id=revision.object_id,
+        field=revision.field,
+        version__gte=revision.base,
+        version__lte=revision.version,
+    ).order_by('version')
+    return _replay(list(chain))
+
+
+# =============================================================================
+# 补记 / 统计
+# =============================================================================
+
+def seed_items(model) -> List[int]:
+    return list(model.objects.order_by('pk').values_list('pk', flat=True))
+
+
+def seed(model, object_ids: Iterable[int]) -> Dict[str, int]:
+    """为一批对象补记当前内容（无版本的写入检查点，与最新版本不同的写入新版本）"""
+    field = TRACKED_FIELDS[model._meta.label_lower]
+    objects = list(model.objects.filter(pk__in=list(object_ids)).only('pk', field))
+    return {'objects': len(objects), 'revisions': record(objects, field)}
+
+
+def footprint() -> List[Dict[str, Any]]:
+    """各模型版本记录与变更日志中 JSON 数据的存储字节数（pg_column_size）"""
+    from django.contrib.contenttypes.models import ContentType
+    from core.models import ObjectChange
+    from .models import JSONRevision
+
+    def column_size(name: str):
+        return Sum(Func(F(name), function='pg_column_size'), default=0)
+
+    rows = []
+    for object_type, field in TRACKED_FIELDS.items():
+        revisions = JSONRevision.objects.filter(object_type=object_type, field=field).aggregate(
+            count=Count('pk'),
+            checkpoints=Count('pk', filter=Q(checkpoint=True)),
+            size=column_size('data'),
+        )
+        changelog = ObjectChange.objects.filter(
+            changed_object_type=ContentType.objects.get_by_natural_key(*object_type.split('.')),
+        ).aggregate(
+            prechange=column_size('prechange_data'),
+            postchange=column_size('postchange_data'),
+        )
+        rows.append({
+            'object_type': object_type,
+            'field': field,
+            'revisions': revisions['count'],
+            'checkpoints': revisions['checkpoints'],
+            'revision_bytes': revisions['size'],
+            'changelog_bytes': changelog['prechange'] + changelog['postchange'],
+        })
+    return rows
@@ -0,0 +1,422 @@
+"""
+NetBox RMS 路由计算
+
+以 dcim.Site 为节点、站点间的光缆 (dcim.Cable) 和电路 (circuits.Circuit) 为链路，
+构建站点邻接图，计算 A、Z 端站点之间的 K 条最短路由（Dijkstra + Yen），
+以及需要保护的业务所需的主用 / 保护分离路由（Suurballe）。
+
+- 光缆：两端 CableTermination 缓存的 _site 不同即为站点间链路，
+  终结在配线架前/后面板 (FrontPort/RearPort) 上的 ODF 光缆同样计入；
+- 电路：A、Z 两端 CircuitTermination 所在站点之间的链路。
+
+同一站点对之间的多条光缆/电路合并为一条链路，权重取最短长度（公里），
+长度未知时按 UNKNOWN_LENGTH_KM 计。
+
+图数据由三次批量查询构建，缓存于 NAMESPACE_TOPOLOGY 命名空间，
+光缆、电路或站点变更时由信号处理器使其失效。
+"""
+import heapq
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from circuits.choices import CircuitStatusChoices
+from circuits.models import CircuitTermination
+from dcim.choices import LinkStatusChoices
+from dcim.models import CableTermination, Site
+
+from . import cache
+
+# 长度未知的链路权重（公里）
+UNKNOWN_LENGTH_KM = 1.0
+
+# 默认返回的路由条数
+DEFAULT_K = 3
+
+# 图数据缓存时间（秒）；拓扑变更时会主动失效
+GRAPH_CACHE_TIMEOUT = 3600
+
+Link = Tuple[int, int]
+
+
+def link_key(a: int, b: int) -> Link:
+    """无向链路键：较小的站点 ID 在前"""
+    return (a, b) if a < b else (b, a)
+
+
+class SiteGraph:
+    """站点邻接图"""
+
+    def __init__(self, sites: Dict[int, str], links: Dict[Link, Dict[str, Any]]) -> None:
+        self.sites = sites
+        self.links = links
+        self.adjacency: Dict[int, Dict[int, float]] = defaultdict(dict)
+        for (a, b), link in links.items():
+            self.adjacency[a][b] = link['weight']
+            self.adjacency[b][a] = link['weight']
+
+    def __contains__(self, site_id: int) -> bool:
+        return site_id in self.adjacency
+
+    def weight(self, a: int, b: int) -> float:
+        return self.adjacency[a][b]
+
+    def path_cost(self, path: List[int]) -> float:
+        return sum(self.weight(a, b) for a, b in zip(path, path[1:]))
+
+
+# =============================================================================
+# 图构建
+# =============================================================================
+
+def _add_edge(links: Dict[Link, Dict[str, Any]], a: int, b: int, edge: Dict[str, Any]) -> None:
+    link = links.setdefault(link_key(a, b), {'weight': None, 'edges': []})
+    link['edges'].append(edge)
+    weight = edge['length_km'] if edge['length_km'] is not None else UNKNOWN_LENGTH_KM
+    if link['weight'] is None or weight < link['weight']:
+        link['weight'] = weight
+
+
+def build_graph_data() -> Dict[str, Any]:
+    """批量查询光缆、电路和站点，生成可缓存的图数据"""
+    links: Dict[Link, Dict[str, Any]] = {}
+
+    # 光缆：cable_id -> {cable_end: {site_id}}
+    cable_sites: Dict[int, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+    cable_info: Dict[int, Tuple[str, Optional[float]]] = {}
+    terminations = CableTermination.objects.filter(
+        cable__status=LinkStatusChoices.STATUS_CONNECTED,
+        _site__isnull=False,
+    ).values_list('cable_id', 'cable_end', '_site_id', 'cable__label', 'cable___abs_length')
+    for cable_id, cable_end, site_id, label, abs_length in terminations.iterator(chunk_size=5000):
+        cable_sites[cable_id][cable_end].add(site_id)
+        cable_info[cable_id] = (label, float(abs_length) / 1000 if abs_length is not None else None)
+
+    for cable_id, ends in cable_sites.items():
+        label, length_km = cable_info[cable_id]
+        for a in ends.get('A', ()):
+            for b in ends.get('B', ()):
+                if a != b:
+                    _add_edge(links, a, b, {
+                        'type': 'cable', 'id': cable_id, 'label': label or f'#{cable_id}', 'length_km': length_km,
+                    })
+
+    # 电路：circuit_id -> {term_side: site_id}
+    circuit_sites: Dict[int, Dict[str, int]] = defaultdict(dict)
+    circuit_cids: Dict[int, str] = {}
+    terminations = CircuitTermination.objects.filter(
+        circuit__status=CircuitStatusChoices.STATUS_ACTIVE,
+        _site__isnull=False,
+    ).values_list('circuit_id', 'term_side', '_site_id', 'circuit__cid')
+    for circuit_id, term_side, site_id, cid in terminations:
+        circuit_sites[circuit_id][term_side] = site_id
+        circuit_cids[circuit_id] = cid
+
+    for circuit_id, sides in circuit_sites.items():
+        a, b = sides.get('A'), sides.get('Z')
+        if a and b and a != b:
+            _add_edge(links, a, b, {
+                'type': 'circuit', 'id': circuit_id, 'label': circuit_cids[circuit_id], 'length_km': None,
+            })
+
+    site_ids = {site_id for link in links for site_id in link}
+    sites = dict(Site.objects.filter(pk__in=site_ids).values_list('pk', 'name'))
+    return {'sites': sites, 'links': links}
+
+
+def get_graph() -> SiteGraph:
+    """获取（缓存的）站点邻接图"""
+    data = cache.get_or_compute(
+        (cache.NAMESPACE_TOPOLOGY,),
+        ('site_graph',),
+        build_graph_data,
+        timeout=GRAPH_CACHE_TIMEOUT,
+    )
+    return SiteGraph(data['sites'], data['links'])
+
+
+# =============================================================================
+# 最短路径
+# =============================================================================
+
+def dijkstra(
+    graph: SiteGraph,
+    source: int,
+    target: int,
+    excluded_nodes: FrozenSet[int] = frozenset(),
+    excluded_links: FrozenSet[Link] = frozenset(),
+) -> Optional[Tuple[float, List[int]]]:
+    """
+    Dijkstra 最短路径
+
+    Returns:
+        (总权重, 站点 ID 路径)，不可达时返回 None
+    """
+    if source not in graph or target not in graph:
+        return None
+    distances = {source: 0.0}
+    previous: Dict[int, int] = {}
+    heap = [(0.0, source)]
+    visited = set()
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if node in visited:
+            continue
+        if node == target:
+            path = [target]
+            while path[-1] != source:
+                path.append(previous[path[-1]])
+            return distance, path[::-1]
+        visited.add(node)
+        for neighbour, weight in graph.adjacency[node].items():
+            if neighbour in visited or neighbour in excluded_nodes:
+                continue
+            if link_key(node, neighbour) in excluded_links:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbour, float('inf')):
+                distances[neighbour] = candidate
+                previous[neighbour] = node
+                heapq.heappush(heap, (candidate, neighbour))
+    return None
+
+
+def k_shortest_paths(graph: SiteGraph, source: int, target: int, k: int = DEFAULT_K) -> List[Tuple[float, List[int]]]:
+    """
+    Yen 算法：K 条无环最短路径
+
+    Returns:
+        [(总权重, 站点 ID 路径), ...]，按权重升序
+    """
+    first = dijkstra(graph, source, target)
+    if first is None:
+        return []
+    paths = [first]
+    candidates: List[Tuple[float, List[int]]] = []
+    seen = {tuple(first[1])}
+
+    while len(paths) < k:
+        _cost, last_path = paths[-1]
+        for i in range(len(last_path) - 1):
+            spur_node = last_path[i]
+            root = last_path[:i + 1]
+            # 排除与已有路径共享同一前缀时使用过的下一段链路
+            excluded_links = frozenset(
+                link_key(path[i], path[i + 1])
+                for _c, path in paths
+                if len(path) > i + 1 and path[:i + 1] == root
+            )
+            spur = dijkstra(graph, spur_node, target, frozenset(root[:-1]), excluded_links)
+            if spur is None:
+                continue
+            total = root[:-1] + spur[1]
+            if tuple(total) in seen:
+                continue
+            seen.add(tuple(total))
+            heapq.heappush(candidates, (graph.path_cost(total), total))
+        if not candidates:
+            break
+        paths.append(heapq.heappop(candidates))
+    return paths
+
+
+# =============================================================================
+# 分离路由
+# =============================================================================
+
+def _add_arc(network: Dict[Any, List[list]], u: Any, v: Any, capacity: int, cost: float) -> None:
+    """添加有向弧及其残量反向弧；弧为 [终点, 残量, 费用, 反向弧下标, 是否原始弧]"""
+    network[u].append([v, capacity, cost, len(network[v]), True])
+    network[v].append([u, 0, -cost, len(network[u]) - 1, False])
+
+
+def _flow_network(graph: SiteGraph, source: int, target: int, node_disjoint: bool) -> Tuple[Dict, Any, Any]:
+    """
+    构建流网络
+
+    节点分离时将每个站点拆为入点 (v, 0) 和出点 (v, 1)，中间弧容量为 1，
+    使每个中间站点最多被一条路径经过；链路分离时每个方向的链路容量为 1。
+    """
+    network: Dict[Any, List[list]] = defaultdict(list)
+    if not node_disjoint:
+        for (a, b), link in graph.links.items():
+            _add_arc(network, a, b, 1, link['weight'])
+            _add_arc(network, b, a, 1, link['weight'])
+        return network, source, target
+
+    for site_id in graph.adjacency:
+        _add_arc(network, (site_id, 0), (site_id, 1), 2 if site_id in (source, target) else 1, 0.0)
+    for (a, b), link in graph.links.items():
+        _add_arc(network, (a, 1), (b, 0), 1, link['weight'])
+        _add_arc(network, (b, 1), (a, 0), 1, link['weight'])
+    return network, (source, 0), (target, 1)
+
+
+def _augment(network: Dict[Any, List[list]], source: Any, sink: Any, units: int) -> int:
+    """
+    逐次最短路增广（Suurballe）：每轮用带节点势的 Dijkstra 在残量网络上找最短增广路，
+    节点势保证残量网络中的约化费用非负。
+
+    Returns:
+        实际增广的流量
+    """
+    potential: Dict[Any, float] = defaultdict(float)
+    flow = 0
+    while flow < units:
+        distances = {source: 0.0}
+        previous: Dict[Any, Tuple[Any, int]] = {}
+        heap = [(0.0, 0, source)]
+        counter = 1
+        visited = set()
+        while heap:
+            distance, _order, node = heapq.heappop(heap)
+            if node in visited:
+                continue
+            visited.add(node)
+            for index, (neighbour, capacity, cost, _rev, _original) in enumerate(network[node]):
+                if capacity <= 0 or neighbour in visited:
+                    continue
+                candidate = distance + cost + potential[node] - potential[neighbour]
+                if candidate < distances.get(neighbour, float('inf')) - 1e-9:
+                    distances[neighbour] = candidate
+                    previous[neighbour] = (node, index)
+                    heapq.heappush(heap, (candidate, counter, neighbour))
+                    counter += 1
+        if sink not in distances:
+            break
+        for node, distance in distances.items():
+            potential[node] += distance
+
+        node = sink
+        while node != source:
+            parent, index = previous[node]
+            arc = network[parent][index]
+            arc[1] -= 1
+            network[node][arc[3]][1] += 1
+            node = parent
+        flow += 1
+    return flow
+
+
+def _decompose(network: Dict[Any, List[list]], source: Any, sink: Any, flow: int) -> List[List[int]]:
+    """将流分解为站点路径（同一链路上方向相反的流相互抵消）"""
+    used: Dict[Any, List[Any]] = defaultdict(list)
+    for node, arcs in list(network.items()):
+        for neighbour, _capacity, _cost, rev, original in arcs:
+            # 原始弧上的流量即其反向弧的残量
+            if original:
+                used[node].extend([neighbour] * network[neighbour][rev][1])
+    for node in list(used):
+        for neighbour in list(used[node]):
+            if node in used.get(neighbour, []) and neighbour in used[node]:
+                used[node].remove(neighbour)
+                used[neighbour].remove(node)
+
+    paths = []
+    for _i in range(flow):
+        node, path = source, [source]
+        while node != sink:
+            node = used[node].pop()
+            path.append(node)
+        sites: List[int] = []
+        for point in path:
+            site_id = point[0] if isinstance(point, tuple) else point
+            if not sites or sites[-1] != site_id:
+                sites.append(site_id)
+        paths.append(sites)
+    return paths
+
+
+def disjoint_paths(
+    graph: SiteGraph,
+    source: int,
+    target: int,
+    node_disjoint: bool = True,
+) -> Optional[Tuple[List[int], List[int]]]:
+    """
+    计算总长度最短的一对分离路由
+
+    Args:
+        node_disjoint: True 为节点（站点）分离，False 为链路分离
+
+    Returns:
+        (主用路由, 保护路由)，主用为较短者；不存在两条分离路由时返回 None
+    """
+    if source == target or source not in graph or target not in graph:
+        return None
+    network, source_node, sink_node = _flow_network(graph, source, target, node_disjoint)
+    if _augment(network, source_node, sink_node, 2) < 2:
+        return None
+    first, second = sorted(_decompose(network, source_node, sink_node, 2), key=graph.path_cost)
+    return first, second
+
+
+def protection_routes(graph: SiteGraph, source: int, target: int) -> Dict[str, Any]:
+    """
+    主用 / 保护路由：优先节点分离，其次链路分离
+
+    同一站点对之间的多条光缆已合并为一条链路，因此链路分离即不共用站点间光缆路由。
+
+    Returns:
+        {'disjoint': 'node' / 'link' / None, 'working': 路由 / None, 'protection': 路由 / None}
+    """
+    for mode, node_disjoint in (('node', True), ('link', False)):
+        pair = disjoint_paths(graph, source, target, node_disjoint)
+        if pair:
+            working, protection = pair
+            return {
+                'disjoint': mode,
+                'working': describe_path(graph, graph.path_cost(working), working),
+                'protection': describe_path(graph, graph.path_cost(protection), protection),
+            }
+    shortest = dijkstra(graph, source, target)
+    return {
+        'disjoint': None,
+        'working': describe_path(graph, *shortest) if shortest else None,
+        'protection': None,
+    }
+
+
+# =============================================================================
+# 对外接口
+# =============================================================================
+
+def describe_path(graph: SiteGraph, cost: float, path: List[int]) -> Dict[str, Any]:
+    """将站点路径转换为可序列化的路由描述"""
+    return {
+        'sites': [{'id': site_id, 'name': graph.sites.get(site_id, str(site_id))} for site_id in path],
+        'hops': len(path) - 1,
+        'cost_km': round(cost, 3),
+        'links': [
+            {
+                'site_a': a,
+                'site_z': b,
+                'edges': graph.links[link_key(a, b)]['edges'],
+            }
+            for a, b in zip(path, path[1:])
+        ],
+    }
+
+
+def find_routes(site_a_id: int, site_z_id: int, k: int = DEFAULT_K) -> List[Dict[str, Any]]:
+    """计算两站点之间的 K 条最短路由"""
+    graph = get_graph()
+    return [describe_path(graph, cost, path) for cost, path in k_shortest_paths(graph, site_a_id, site_z_id, k)]
+
+
+def order_sites(order) -> Optional[Tuple[int, int]]:
+    """获取传输专线 / 光缆光纤工单的 A、Z 端站点 ID"""
+    data = order.safe_check_data
+    try:
+        site_a_id, site_z_id = int(data['site_a_id']), int(data['site_z_id'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return site_a_id, site_z_id
+
+
+def format_route(route: Dict[str, Any]) -> str:
+    """路由的单行文字描述，如：站点A → 站点B（1 段，12.5 km）"""
+    return '{sites}（{hops} 段，{cost} km）'.format(
+        sites=' → '.join(site['name'] for site in route['sites']),
+        hops=route['hops'],
+        cost=route['cost_km'],
+    )
@@ -0,0 +1,238 @@
+"""
+NetBox RMS JSON 字段数据格式
+
+工单核查数据 (ServiceOrder.check_data) 按核查类别、执行反馈 (TaskDetail.feedback_data) 按反馈分区
+定义 JSON Schema，并按版本登记在 SCHEMAS 中：
+
+- 写入（表单、API、批量导入）按各字段的当前版本（最大版本号）校验，不合格时报告字段路径和原因；
+- 校验器在插件就绪时由 load() 一次生成并检查各版本的格式定义，之后重复使用；
+- 已有数据执行 rms_validate_json 分批扫描，可用 --schema-version 按指定版本检查。
+
+各分区允许出现未定义的键（变更单覆盖、早期数据），只约束已定义键的类型和取值；
+表单中未填写的项保存为空字符串或 null，均视为合格。
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .choices import (
+    AddMethodChoices,
+    BandwidthChoices,
+    ColocationDeviceTypeChoices,
+    InterfaceTypeChoices,
+)
+
+DIALECT = 'https://json-schema.org/draft/2020-12/schema'
+
+# 执行反馈中的分区（其余为顶层的通用项）
+FEEDBACK_SECTIONS = ('transmission', 'fiber', 'colocation')
+
+
+def _choice(choices) -> Dict[str, Any]:
+    return {'enum': [value for value, *_rest in choices.CHOICES] + ['', None]}
+
+
+def _section(properties: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    return {'$schema': DIALECT, 'type': 'object', 'properties': properties, **extra}
+
+
+_TEXT = {'type': ['string', 'null']}
+_FLAG = {'type': ['boolean', 'null']}
+_COUNT = {'type': ['integer', 'null'], 'minimum': 0}
+_AMOUNT = {'type': ['number', 'null'], 'minimum': 0}
+_ID = {'type': ['integer', 'null'], 'minimum': 1}
+_DATE = {'type': ['string', 'null'], 'pattern': r'^(\d{4}-\d{2}-\d{2})?$'}
+# 反馈页面的输入框内容，数字也可能以字符串保存
+_INPUT = {'type': ['string', 'number', 'null']}
+
+_CIRCUIT_SITES = {
+    'needs_protection': _FLAG,
+    'interface_type': _choice(InterfaceTypeChoices),
+    'site_a_id': _ID,
+    'site_a_name': _TEXT,
+    'site_z_id': _ID,
+    'site_z_name': _TEXT,
+}
+_SITE_NAMES = {'site_a_id': ['site_a_name'], 'site_z_id': ['site_z_name']}
+
+# 字段 -> 版本 -> 分区 -> JSON Schema
+SCHEMAS: Dict[str, Dict[int, Dict[str, Dict[str, Any]]]] = {
+    'check_data': {
+        1: {
+            # 未选择核查类别
+            '': _section({}),
+            'transmission': _section({
+                'bandwidth': _choice(BandwidthChoices),
+                'quantity': _COUNT,
+                **_CIRCUIT_SITES,
+            }, dependentRequired=_SITE_NAMES),
+            'fiber': _section({
+                'quantity': _COUNT,
+                **_CIRCUIT_SITES,
+            }, dependentRequired=_SITE_NAMES),
+            'colocation': _section({
+                'site_id': _ID,
+                'site_name': _TEXT,
+                'egress_fiber_cores': _COUNT,
+                'devices': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'device_type': _choice(ColocationDeviceTypeChoices),
+                            'model': _TEXT,
+                            'length': _AMOUNT,
+                            'width': _AMOUNT,
+                            'height': _AMOUNT,
+                            'rack_units': _COUNT,
+                            'power_consumption': _AMOUNT,
+                            'quantity': _COUNT,
+                        },
+                    },
+                },
+            }, dependentRequired={'site_id': ['site_name']}),
+        },
+    },
+    'feedback_data': {
+        1: {
+            'general': _section({
+                'config_date': _DATE,
+                'test_date': _DATE,
+                'remarks': _TEXT,
+                **{section: {'type': 'object'} for section in FEEDBACK_SECTIONS},
+            }),
+            'transmission': _section({
+                'is_card_added': _FLAG,
+                'card_add_method': _choice(AddMethodChoices),
+                'card_add_desc': _TEXT,
+                'is_module_added': _FLAG,
+                'module_add_method': _choice(AddMethodChoices),
+                'module_add_desc': _TEXT,
+                # 各项与 TransmissionCircuit.FEEDBACK_FIELDS 对应，均为文本
+                'circuits': {
+                    'type': 'array',
+                    'items': {'type': 'object', 'additionalProperties': _TEXT},
+                },
+            }),
+            'fiber': _section({
+                'core_count': _COUNT,
+                'site_a_id': _ID,
+                'site_a_name': _TEXT,
+                'odf_a': _TEXT,
+                'desc_a': _TEXT,
+                'site_z_id': _ID,
+                'site_z_name': _TEXT,
+                'odf_z': _TEXT,
+                'desc_z': _TEXT,
+            }),
+            'colocation': _section({
+                'site_id': _ID,
+                'site_name': _TEXT,
+                'cable_count': _COUNT,
+                'cable_odf': _TEXT,
+                'devices': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'model': _TEXT,
+                            'cabinet': _TEXT,
+                            'unit': _INPUT,
+                            'power': _INPUT,
+                        },
+                    },
+                },
+            }),
+        },
+    },
+}
+
+# 字段 -> 版本 -> 分区 -> 校验器（load() 生成）
+_VALIDATORS: Dict[str, Dict[int, Dict[str, Any]]] = {}
+
+
+def load() -> None:
+    """检查各版本的格式定义并生成校验器（格式定义有误时抛出 SchemaError）"""
+    from jsonschema.validators import validator_for
+
+    validators = {}
+    for field, versions in SCHEMAS.items():
+        validators[field] = {}
+        for version, sections in versions.items():
+            validators[field][version] = {}
+            for section, schema in sections.items():
+                cls = validator_for(schema)
+                cls.check_schema(schema)
+                validators[field][version][section] = cls(schema)
+    _VALIDATORS.clear()
+    _VALIDATORS.update(validators)
+
+
+def current_version(field: str) -> int:
+    return max(SCHEMAS[field])
+
+
+def _validator(field: str, section: str, version: Optional[int] = None):
+    if not _VALIDATORS:
+        load()
+    return _VALIDATORS[field][version or current_version(field)].get(section)
+
+
+def _messages(validator, data: Any, prefix: str) -> List[str]:
+    messages = []
+    for error in sorted(validator.iter_errors(data), key=lambda e: [str(p) for p in e.absolute_path]):
+        path = '/'.join([prefix, *[str(p) for p in error.absolute_path]])
+        messages.append(f'{path}: {error.message}')
+    return messages
+
+
+# =============================================================================
+# 校验
+# =============================================================================
+
+def check_data_errors(check_type: Optional[str], data: Any, version: Optional[int] = None) -> List[str]:
+    """核查数据不合格项（字段路径: 原因）"""
+    validator = _validator('check_data', check_type or '', version)
+    if validator is None:
+        return [f'check_data: 未定义核查类别 {check_type} 的数据格式']
+    return _messages(validator, data if data is not None else {}, 'check_data')
+
+
+def feedback_data_errors(data: Any, version: Optional[int] = None) -> List[str]:
+    """执行反馈不合格项：先校验顶层通用项，再分别校验各反馈分区"""
+    data = data if data is not None else {}
+    messages = _messages(_validator('feedback_data', 'general', version), data, 'feedback_data')
+    if not isinstance(data, dict):
+        return messages
+    for section in FEEDBACK_SECTIONS:
+        # 分区本身不是对象时已在通用项中报告
+        if isinstance(data.get(section), dict):
+            messages.extend(_messages(
+                _validator('feedback_data', section, version), data[section], f'feedback_data/{section}',
+            ))
+    return messages
+
+
+# =============================================================================
+# 批量检查
+# =============================================================================
+
+def scan(field: str, version: Optional[int] = None, chunk_size: int = 2000) -> Iterator[Tuple[str, List[str]]]:
+    """
+    按主键顺序分批读取已有数据，逐条校验
+
+    Yields:
+        (对象标识, 不合格项)，只返回不合格的对象
+    """
+    from .models import ServiceOrder, TaskDetail
+
+    if field == 'check_data':
+        rows = ServiceOrder.objects.order_by('pk').values_list('order_no', 'check_type', 'check_data')
+        for order_no, check_type, data in rows.iterator(chunk_size=chunk_size):
+            messages = check_data_errors(check_type, data, version)
+            if messages:
+                yield order_no, messages
+    else:
+        rows = TaskDetail.objects.order_by('pk').values_list('pk', 'service_order__order_no', 'feedback_data')
+        for pk, order_no, data in rows.iterator(chunk_size=chunk_size):
+            messages = feedback_data_errors(data, version)
+            if messages:
+                yield f'{order_no} 任务 #{pk}', messages
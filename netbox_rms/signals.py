@@ -1,14 +1,261 @@
 """
 NetBox RMS 信号处理器
 
-实现业务逻辑的自动化处理
+实现业务逻辑的自动化处理：须在事务内同步完成的写入（状态记录、规范化索引）直接处理；
+其余自动化登记为领域事件（events），事务提交时按批交给 handlers 中的处理器。
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 
-from .models import TaskDetail, ResourceLedger
-from .choices import TaskTypeChoices, ChangeTypeChoices
+from circuits.models import Circuit, CircuitTermination
+from dcim.models import Cable, CableTermination, PowerFeed, PowerPanel, Site
+from netbox.context import current_request
 
+from . import colocation, events, fibercores, ledger, outbox, ports, revisions, temporal, transmission, workflow
+from .choices import ConfirmationStatusChoices, ExecutionStatusChoices
+from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TaskTransition, TransmissionCircuit
 
-# 所有信号处理器已被移除，因为相关字段已不存在
-# 如需添加新的业务逻辑，请在此处定义信号处理器
+
+# =============================================================================
+# 任务状态变更 / 核查结果时间戳
+# =============================================================================
+
+@receiver(pre_save, sender=TaskDetail)
+def stamp_status_transition(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """执行状态变化时记录完成/确认时间，并暂存原状态供 post_save 写入变更记录"""
+    if raw:
+        return
+    previous = None
+    if instance.pk:
+        previous = TaskDetail.objects.filter(pk=instance.pk).values_list('execution_status', flat=True).first()
+    instance._previous_execution_status = previous
+    if previous == instance.execution_status:
+        return
+    workflow.apply_timestamps(instance, instance.execution_status, timezone.now())
+
+
+@receiver(pre_save, sender=ResourceCheckResult)
+def stamp_check_result(sender, instance: ResourceCheckResult, raw: bool = False, **kwargs) -> None:
+    """首次填写核查结果时记录核查完成时间，清空核查结果时一并清空"""
+    if raw:
+        return
+    if not instance.check_result:
+        instance.check_result_at = None
+    elif instance.check_result_at is None:
+        instance.check_result_at = timezone.now()
+
+
+# 以下处理器（及 sync_port_assignments）须在 log_status_transition 之前注册：后者会移除 _previous_execution_status
+@receiver(post_save, sender=TaskDetail)
+def sync_fiber_core_inventory(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """光缆光纤任务完成后分配或释放纤芯"""
+    if raw or not hasattr(instance, '_previous_execution_status'):
+        return
+    fibercores.on_status_change(instance, instance._previous_execution_status)
+
+
+@receiver(post_save, sender=TaskDetail)
+def sync_resource_lifecycle(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """任务完成后转换资源台账生命周期"""
+    if raw or not hasattr(instance, '_previous_execution_status'):
+        return
+    ledger.on_status_change(instance, instance._previous_execution_status)
+
+
+@receiver(post_save, sender=ServiceOrder)
+def sync_requested_colocation_devices(sender, instance: ServiceOrder, raw: bool = False, **kwargs) -> None:
+    """按工单核查信息重建申请托管设备记录"""
+    if raw:
+        return
+    colocation.sync_order(instance)
+
+
+@receiver(post_save, sender=TaskDetail)
+def sync_installed_colocation_devices(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """按执行反馈重建已上架托管设备记录"""
+    if raw:
+        return
+    colocation.sync_task(instance)
+
+
+@receiver(post_save, sender=TaskDetail)
+def sync_transmission_circuits(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """按执行反馈重建传输电路记录（电路记录回写反馈引起的保存除外）"""
+    if raw or transmission.syncing():
+        return
+    transmission.sync_task(instance)
+
+
+@receiver(post_save, sender=TransmissionCircuit)
+@receiver(post_delete, sender=TransmissionCircuit)
+def write_back_transmission_circuits(sender, instance: TransmissionCircuit, raw: bool = False, **kwargs) -> None:
+    """直接增删改电路记录后，在同一事务内回写任务执行反馈（随任务、工单级联删除时不回写）"""
+    if raw or transmission.syncing():
+        return
+    origin = kwargs.get('origin')
+    if origin is not None and getattr(origin, 'model', type(origin)) is not TransmissionCircuit:
+        return
+    transmission.write_back(instance.task_id)
+
+
+@receiver(post_save, sender=TaskDetail)
+def sync_port_assignments(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """按执行反馈中的传输电路同步端口占用索引，停闭任务完成时释放端口"""
+    if raw:
+        return
+    # 未经 pre_save 暂存原状态时视为状态未变化
+    ports.sync_task(instance, instance.__dict__.get('_previous_execution_status', instance.execution_status))
+
+
+@receiver(post_save, sender=TaskDetail)
+def log_status_transition(sender, instance: TaskDetail, raw: bool = False, **kwargs) -> None:
+    """执行状态变化后写入状态变更记录"""
+    if raw or not hasattr(instance, '_previous_execution_status'):
+        return
+    previous = instance.__dict__.pop('_previous_execution_status')
+    if previous == instance.execution_status:
+        return
+
+    user = getattr(instance, '_transition_user', None)
+    if user is None:
+        request = current_request.get()
+        if request is not None and request.user.is_authenticated:
+            user = request.user
+    # 与任务上的完成/确认时间保持一致
+    timestamp = {
+        ExecutionStatusChoices.COMPLETED: instance.completed_at,
+        ExecutionStatusChoices.CONFIRMED: instance.confirmed_at,
+    }.get(instance.execution_status) or timezone.now()
+    TaskTransition.objects.create(
+        task=instance,
+        from_status=previous or '',
+        to_status=instance.execution_status,
+        timestamp=timestamp,
+        user=user,
+        comment=getattr(instance, '_transition_comment', ''),
+    )
+    if instance.execution_status == ExecutionStatusChoices.CONFIRMED:
+        outbox.record_task_confirmations([instance.pk])
+    events.emit(
+        events.TASK_STATUS_CHANGED,
+        instance,
+        previous=previous or '',
+        status=instance.execution_status,
+        user_id=user.pk if user else None,
+    )
+
+
+# =============================================================================
+# 领域事件
+# =============================================================================
+
+# 工单确认执行的状态
+CONFIRMED_STATUSES = (
+    ConfirmationStatusChoices.EXECUTION_BILLING,
+    ConfirmationStatusChoices.EXECUTION_TEST,
+)
+
+
+@receiver(pre_save, sender=ServiceOrder)
+def stash_confirmation_status(sender, instance: ServiceOrder, raw: bool = False, **kwargs) -> None:
+    """暂存原确认执行状态，供 post_save 判断是否登记确认事件"""
+    if raw or instance.confirmation_status not in CONFIRMED_STATUSES:
+        return
+    instance._previous_confirmation_status = None
+    if instance.pk:
+        instance._previous_confirmation_status = ServiceOrder.objects.filter(
+            pk=instance.pk,
+        ).values_list('confirmation_status', flat=True).first()
+
+
+@receiver(post_save, sender=ServiceOrder)
+def emit_order_confirmed(sender, instance: ServiceOrder, raw: bool = False, **kwargs) -> None:
+    """工单变为确认执行时登记事件，确认执行（计费）时在同一事务内写入发件箱"""
+    if raw or not hasattr(instance, '_previous_confirmation_status'):
+        return
+    previous = instance.__dict__.pop('_previous_confirmation_status')
+    if previous != instance.confirmation_status:
+        if instance.confirmation_status == ConfirmationStatusChoices.EXECUTION_BILLING:
+            outbox.record_billing_confirmations([instance.pk])
+        events.emit(
+            events.ORDER_CONFIRMED,
+            instance,
+            using=kwargs.get('using'),
+            previous=previous or '',
+            status=instance.confirmation_status,
+        )
+
+
+@receiver(post_save, sender=ResourceCheckResult)
+def emit_check_result_set(sender, instance: ResourceCheckResult, raw: bool = False, **kwargs) -> None:
+    """核查结果保存后登记事件"""
+    if raw:
+        return
+    events.emit(
+        events.CHECK_RESULT_SET,
+        instance,
+        using=kwargs.get('using'),
+        service_order_id=instance.service_order_id,
+        check_result=instance.check_result,
+        unavailable_reasons=list(instance.unavailable_reasons or []),
+    )
+
+
+# =============================================================================
+# 资源台账历史版本
+# =============================================================================
+
+@receiver(post_save, sender=ResourceLedger)
+def record_ledger_version(sender, instance: ResourceLedger, raw: bool = False, **kwargs) -> None:
+    """台账保存后写入历史版本"""
+    if raw:
+        return
+    temporal.record([instance])
+
+
+@receiver(post_delete, sender=ResourceLedger)
+def close_ledger_version(sender, instance: ResourceLedger, **kwargs) -> None:
+    """台账删除后关闭当前历史版本"""
+    temporal.close([instance.pk])
+
+
+@receiver(post_save, sender=ResourceLedger)
+@receiver(post_save, sender=TaskDetail)
+def record_json_revision(sender, instance, raw: bool = False, update_fields=None, **kwargs) -> None:
+    """资源快照、执行反馈保存后记录版本（只更新其他字段时跳过）"""
+    field = revisions.TRACKED_FIELDS[instance._meta.label_lower]
+    if raw or (update_fields is not None and field not in update_fields):
+        return
+    revisions.record([instance], field)
+
+
+# =============================================================================
+# 缓存失效（由 handlers.invalidate_cache 在事务提交时按批处理）
+# =============================================================================
+
+@receiver(post_save, sender=ServiceOrder)
+@receiver(post_save, sender=TaskDetail)
+@receiver(post_save, sender=ResourceCheckResult)
+@receiver(post_save, sender=ResourceLedger)
+@receiver(post_save, sender=Cable)
+@receiver(post_save, sender=CableTermination)
+@receiver(post_save, sender=Circuit)
+@receiver(post_save, sender=CircuitTermination)
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=PowerFeed)
+@receiver(post_save, sender=PowerPanel)
+@receiver(post_delete, sender=ServiceOrder)
+@receiver(post_delete, sender=TaskDetail)
+@receiver(post_delete, sender=ResourceCheckResult)
+@receiver(post_delete, sender=ResourceLedger)
+@receiver(post_delete, sender=Cable)
+@receiver(post_delete, sender=CableTermination)
+@receiver(post_delete, sender=Circuit)
+@receiver(post_delete, sender=CircuitTermination)
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=PowerFeed)
+@receiver(post_delete, sender=PowerPanel)
+def emit_object_changed(sender, instance, **kwargs) -> None:
+    """对象保存或删除后登记变更事件"""
+    events.emit(events.OBJECT_CHANGED, instance, using=kwargs.get('using'))
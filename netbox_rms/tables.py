@@ -8,7 +8,7 @@ from django.utils.translation import gettext_lazy as _
 
 from netbox.tables import NetBoxTable, columns
 
-from .models import ServiceOrder, TaskDetail, ResourceLedger
+from .models import ServiceOrder, TaskDetail, ResourceLedger, TransmissionCircuit
 
 
 class ServiceOrderTable(NetBoxTable):
@@ -96,6 +96,14 @@ class TaskDetailTable(NetBoxTable):
         verbose_name=_('执行人'),
     )
     
+    completed_at = columns.DateTimeColumn(
+        verbose_name=_('完成时间'),
+    )
+    
+    confirmed_at = columns.DateTimeColumn(
+        verbose_name=_('确认时间'),
+    )
+    
     def render_task_type(self, value, record):
         """自定义任务类型渲染，使用模型的颜色方法"""
         from django.utils.html import format_html
@@ -135,7 +143,8 @@ class TaskDetailTable(NetBoxTable):
         model = TaskDetail
         fields = (
             'pk', 'id', 'service_order', 'task_type',
-            'execution_status', 'execution_department', 'assignee', 'actions',
+            'execution_status', 'execution_department', 'assignee',
+            'completed_at', 'confirmed_at', 'actions',
         )
         default_columns = (
             'service_order', 'task_type',
@@ -159,18 +168,61 @@ class ResourceLedgerTable(NetBoxTable):
         verbose_name=_('资源名称'),
     )
     
+    lifecycle_status = columns.ChoiceFieldColumn(
+        verbose_name=_('生命周期状态'),
+    )
+    
     service_order = tables.Column(
         linkify=True,
         verbose_name=_('来源工单'),
     )
     
+    decommissioned_at = columns.DateTimeColumn(
+        verbose_name=_('拆除时间'),
+    )
+    
     class Meta(NetBoxTable.Meta):
         model = ResourceLedger
         fields = (
-            'pk', 'id', 'resource_id', 'resource_type', 'resource_name',
-            'service_order', 'actions',
+            'pk', 'id', 'resource_id', 'resource_type', 'resource_name', 'lifecycle_status',
+            'service_order', 'decommissioned_at', 'actions',
         )
         default_columns = (
-            'resource_id', 'resource_type', 'resource_name',
+            'resource_id', 'resource_type', 'resource_name', 'lifecycle_status',
             'actions',
         )
+
+
+class TransmissionCircuitTable(NetBoxTable):
+    """传输电路表格"""
+    
+    code = tables.Column(
+        linkify=True,
+        verbose_name=_('电路编号'),
+    )
+    
+    bandwidth = tables.Column(
+        verbose_name=_('带宽'),
+    )
+    
+    task = tables.Column(
+        linkify=True,
+        verbose_name=_('执行任务'),
+    )
+    
+    service_order = tables.Column(
+        linkify=True,
+        verbose_name=_('工单'),
+    )
+    
+    class Meta(NetBoxTable.Meta):
+        model = TransmissionCircuit
+        fields = (
+            'pk', 'id', 'code', 'bandwidth', 'service_order', 'task',
+            'site_a', 'model_a', 'card_a', 'port_a',
+            'site_z', 'model_z', 'card_z', 'port_z',
+            'created', 'last_updated', 'actions',
+        )
+        default_columns = (
+            'code', 'bandwidth', 'service_order', 'site_a', 'port_a', 'site_z', 'port_z', 'actions',
+        )
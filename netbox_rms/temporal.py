@@ -0,0 +1,218 @@
+"""
+NetBox RMS 资源台账时间点查询
+
+ResourceLedgerHistory 保存台账的各个版本，有效期为左闭右开区间 [生效, 失效)：
+
+- 记录：台账保存时关闭当前版本并写入新版本，删除时关闭当前版本（信号处理器及批量生成台账时调用，
+  与台账写入在同一事务内）；
+- 查询：as_of(时间点) 返回当时有效的版本，一次查询，由有效期区间上的 GiST 索引支持；
+  只给日期时按当天结束时的状态；
+- 回填：按 NetBox 变更日志重放启用历史表之前的版本（rms_enqueue_job reindex --index ledger_history）。
+  只回填各台账最早记录版本之前的时段，可重复执行；缺少变更日志的时段以最早已知状态补齐。
+"""
+import datetime
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.choices import ObjectChangeActionChoices
+from core.models import ObjectChange
+
+from .choices import ResourceLifecycleChoices
+
+
+def parse_moment(value: Union[str, datetime.date, datetime.datetime]) -> Optional[datetime.datetime]:
+    """解析时间点：日期取当天结束时刻，无时区的时间按当前时区解释"""
+    if isinstance(value, str):
+        value = value.strip()
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.datetime.combine(day, datetime.time.max)
+    elif isinstance(value, datetime.datetime):
+        moment = value
+    else:
+        moment = datetime.datetime.combine(value, datetime.time.max)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def as_of(moment: datetime.datetime, queryset=None):
+    """时间点有效的台账版本"""
+    from .models import ResourceLedgerHistory
+
+    queryset = ResourceLedgerHistory.objects.all() if queryset is None else queryset
+    return queryset.filter(valid__contains=moment)
+
+
+# =============================================================================
+# 记录
+# =============================================================================
+
+def _normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+    """版本字段（变更日志中缺少生命周期状态的记录按在用处理）"""
+    snapshot = data.get('snapshot')
+    return {
+        'service_order': data.get('service_order'),
+        'resource_type': data.get('resource_type') or '',
+        'resource_id': data.get('resource_id') or '',
+        'resource_name': data.get('resource_name') or '',
+        'lifecycle_status': data.get('lifecycle_status') or ResourceLifecycleChoices.ACTIVE,
+        'snapshot': snapshot if isinstance(snapshot, dict) else {},
+    }
+
+
+def _ledger_data(ledger) -> Dict[str, Any]:
+    return _normalize({
+        'service_order': ledger.service_order_id,
+        'resource_type': ledger.resource_type,
+        'resource_id': ledger.resource_id,
+        'resource_name': ledger.resource_name,
+        'lifecycle_status': ledger.lifecycle_status,
+        'snapshot': ledger.snapshot,
+    })
+
+
+def _version(ledger_id: int, data: Dict[str, Any], lower: datetime.datetime,
+             upper: Optional[datetime.datetime] = None):
+    from .models import ResourceLedgerHistory
+
+    data = _normalize(data)
+    return ResourceLedgerHistory(
+        ledger_id=ledger_id,
+        service_order_id=data['service_order'],
+        resource_type=data['resource_type'],
+        resource_id=data['resource_id'],
+        resource_name=data['resource_name'],
+        lifecycle_status=data['lifecycle_status'],
+        snapshot=data['snapshot'],
+        valid=DateTimeTZRange(lower, upper, '[)'),
+    )
+
+
+def close(ledger_ids: Iterable[int], now: Optional[datetime.datetime] = None) -> int:
+    """关闭台账的当前版本；同一时刻生效的版本直接删除（不留空区间）"""
+    from .models import ResourceLedgerHistory
+
+    now = now or timezone.now()
+    current = ResourceLedgerHistory.objects.filter(ledger_id__in=list(ledger_ids), valid__upper_inf=True)
+    current.filter(valid__startswith__gte=now).delete()
+    versions = list(current.only('pk', 'valid'))
+    for version in versions:
+        version.valid = DateTimeTZRange(version.valid.lower, now, '[)')
+    ResourceLedgerHistory.objects.bulk_update(versions, ['valid'], batch_size=500)
+    return len(versions)
+
+
+def record(ledgers: Iterable, now: Optional[datetime.datetime] = None) -> int:
+    """台账保存后关闭当前版本并写入新版本"""
+    from .models import ResourceLedgerHistory
+
+    ledgers = list(ledgers)
+    if not ledgers:
+        return 0
+    now = now or timezone.now()
+    with transaction.atomic():
+        close([ledger.pk for ledger in ledgers], now)
+        ResourceLedgerHistory.objects.bulk_create(
+            [_version(ledger.pk, _ledger_data(ledger), now) for ledger in ledgers],
+            batch_size=500,
+        )
+    return len(ledgers)
+
+
+# =============================================================================
+# 回填
+# =============================================================================
+
+def backfill_items() -> List[int]:
+    """需要回填的台账 ID：现有台账及变更日志中出现过（含已删除）的台账"""
+    from .models import ResourceLedger
+
+    object_type = ContentType.objects.get_for_model(ResourceLedger)
+    ids = set(ResourceLedger.objects.values_list('pk', flat=True))
+    ids.update(
+        ObjectChange.objects.filter(changed_object_type=object_type).values_list(
+            'changed_object_id', flat=True,
+        ).distinct()
+    )
+    return sorted(ids)
+
+
+def backfill(ledger_ids: Iterable[int]) -> Dict[str, int]:
+    """
+    按变更日志回填一批台账在最早记录版本之前的历史
+
+    Returns:
+        {'ledgers', 'versions'}
+    """
+    from .models import ResourceLedger, ResourceLedgerHistory
+
+    ledger_ids = list(ledger_ids)
+    object_type = ContentType.objects.get_for_model(ResourceLedger)
+    # 各台账最早的已记录版本（DISTINCT ON，区间按下界排序）
+    first = {
+        version.ledger_id: version
+        for version in ResourceLedgerHistory.objects.filter(ledger_id__in=ledger_ids).order_by(
+            'ledger_id', 'valid',
+        ).distinct('ledger_id')
+    }
+    ledgers = {ledger.pk: ledger for ledger in ResourceLedger.objects.filter(pk__in=ledger_ids)}
+    changes: Dict[int, List] = defaultdict(list)
+    for ledger_id, time, action, prechange, postchange in ObjectChange.objects.filter(
+        changed_object_type=object_type,
+        changed_object_id__in=ledger_ids,
+    ).order_by('time', 'pk').values_list(
+        'changed_object_id', 'time', 'action', 'prechange_data', 'postchange_data',
+    ).iterator(chunk_size=2000):
+        if ledger_id not in first or time < first[ledger_id].valid.lower:
+            changes[ledger_id].append((time, action, prechange or {}, postchange or {}))
+
+    versions = []
+    backfilled = 0
+    for ledger_id in ledger_ids:
+        ledger = ledgers.get(ledger_id)
+        earliest = first.get(ledger_id)
+        end = earliest.valid.lower if earliest else None
+        replayed = []
+        opened = None
+        for time, action, prechange, postchange in changes.get(ledger_id, ()):
+            if opened is None and action != ObjectChangeActionChoices.ACTION_CREATE and prechange:
+                # 创建记录已清理：以首条修改前的数据作为创建时状态
+                created = parse_datetime(prechange.get('created') or '') or (ledger.created if ledger else None)
+                if created and created < time:
+                    opened = (created, prechange)
+            if opened is not None:
+                replayed.append((opened[0], time, opened[1]))
+                opened = None
+            if action != ObjectChangeActionChoices.ACTION_DELETE:
+                opened = (time, postchange)
+
+        if ledger is not None and opened is None and not replayed:
+            # 无变更日志（如批量生成）：自创建起以最早已知状态补齐
+            opened = (ledger.created, _ledger_data(earliest) if earliest else _ledger_data(ledger))
+        elif ledger is not None and opened is not None and end is None and ledger.last_updated > opened[0]:
+            if _normalize(opened[1]) != _ledger_data(ledger):
+                # 最后一条变更日志之后还有未记录日志的修改
+                replayed.append((opened[0], ledger.last_updated, opened[1]))
+                opened = (ledger.last_updated, _ledger_data(ledger))
+        if opened is not None:
+            replayed.append((opened[0], end, opened[1]))
+
+        for lower, upper, data in replayed:
+            if upper is not None and upper <= lower:
+                continue
+            versions.append(_version(ledger_id, data, lower, upper))
+        backfilled += bool(replayed)
+
+    with transaction.atomic():
+        ResourceLedgerHistory.objects.bulk_create(versions, batch_size=500)
+    return {'ledgers': backfilled, 'versions': len(versions)}
@@ -0,0 +1,106 @@
+import datetime
+
+from django.test import SimpleTestCase
+
+from netbox_rms import billing
+
+
+def day(month, date, year=2026):
+    return datetime.date(year, month, date).toordinal()
+
+
+class MonthBoundsTestCase(SimpleTestCase):
+
+    def test_month_bounds(self):
+        self.assertEqual(
+            billing.month_bounds(datetime.date(2026, 2, 14)),
+            (datetime.date(2026, 2, 1), datetime.date(2026, 3, 1)),
+        )
+        self.assertEqual(
+            billing.month_bounds(datetime.date(2026, 12, 31)),
+            (datetime.date(2026, 12, 1), datetime.date(2027, 1, 1)),
+        )
+
+
+class LineageTestCase(SimpleTestCase):
+
+    def setUp(self):
+        # 1 <- 2 <- 3 为原单及其变更单，4 <- 5 为另一谱系，6 独立
+        self.parents = {1: None, 2: 1, 3: 2, 4: None, 5: 4, 6: None}
+
+    def test_lineage_roots(self):
+        self.assertEqual(
+            billing.lineage_roots(self.parents, [1, 2, 3, 5, 6]),
+            {1: 1, 2: 1, 3: 1, 5: 4, 6: 6},
+        )
+
+    def test_lineage_roots_cycle(self):
+        self.assertEqual(billing.lineage_roots({7: 8, 8: 7}, [7]), {7: 8})
+
+    def test_lineage_stops(self):
+        order_ids = [1, 2, 3, 4, 5, 6]
+        roots = billing.lineage_roots(self.parents, order_ids)
+        # 谱系内任一工单停闭，整条谱系自最早的停闭日起停止计费
+        stops = billing.lineage_stops(roots, {3: day(10, 20), 1: day(10, 25)}, order_ids)
+        self.assertEqual(stops, {1: day(10, 20), 2: day(10, 20), 3: day(10, 20)})
+
+        stops = billing.lineage_stops(roots, {4: day(10, 5)}, [5, 6])
+        self.assertEqual(stops, {5: day(10, 5)})
+
+
+class HolderIntervalsTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.month_start, self.month_end = day(10, 1), day(11, 1)
+
+    def intervals(self, starts, stops=None):
+        return billing.holder_intervals(starts, stops or {}, self.month_start, self.month_end)
+
+    def test_full_month(self):
+        self.assertEqual(self.intervals({1: day(9, 15)}), [(1, day(10, 1), day(11, 1))])
+
+    def test_started_in_month(self):
+        intervals = self.intervals({1: day(10, 10)})
+        self.assertEqual(intervals, [(1, day(10, 10), day(11, 1))])
+        self.assertEqual(intervals[0][2] - intervals[0][1], 22)
+
+    def test_change_order_takes_over(self):
+        # 变更单起租当天起改由变更单计费，原单计费到前一天为止
+        self.assertEqual(self.intervals({2: day(10, 15), 1: day(9, 1)}), [
+            (1, day(10, 1), day(10, 15)),
+            (2, day(10, 15), day(11, 1)),
+        ])
+
+    def test_change_order_before_month(self):
+        self.assertEqual(self.intervals({1: day(8, 1), 2: day(9, 1), 3: day(10, 20)}), [
+            (2, day(10, 1), day(10, 20)),
+            (3, day(10, 20), day(11, 1)),
+        ])
+
+    def test_stop_truncates_every_holder(self):
+        stops = {2: day(10, 20)}
+        self.assertEqual(self.intervals({1: day(9, 1), 2: day(10, 15)}, stops), [
+            (1, day(10, 1), day(10, 15)),
+            (2, day(10, 15), day(10, 20)),
+        ])
+
+    def test_stop_before_change_order(self):
+        stops = {1: day(10, 10), 2: day(10, 10)}
+        self.assertEqual(self.intervals({1: day(9, 1), 2: day(10, 15)}, stops), [
+            (1, day(10, 1), day(10, 10)),
+        ])
+
+    def test_earliest_stop_among_holders(self):
+        stops = {1: day(10, 25), 2: day(10, 18)}
+        self.assertEqual(self.intervals({1: day(9, 1), 2: day(10, 15)}, stops), [
+            (1, day(10, 1), day(10, 15)),
+            (2, day(10, 15), day(10, 18)),
+        ])
+
+    def test_stopped_before_month(self):
+        self.assertEqual(self.intervals({1: day(8, 1)}, {1: day(9, 30)}), [])
+        self.assertEqual(self.intervals({1: day(8, 1)}, {1: day(10, 1)}), [])
+
+    def test_stop_on_start_date(self):
+        self.assertEqual(self.intervals({1: day(10, 12)}, {1: day(10, 12)}), [])
+        self.assertEqual(self.intervals({1: day(10, 12)}, {1: day(10, 13)}), [(1, day(10, 12), day(10, 13))])
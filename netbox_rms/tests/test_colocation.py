@@ -0,0 +1,85 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from netbox_rms import colocation
+from netbox_rms.choices import ColocationDeviceSourceChoices, ResourceCheckTypeChoices
+from netbox_rms.models import ServiceOrder, TaskDetail
+
+
+class ParsingTestCase(SimpleTestCase):
+
+    def test_units_from_position(self):
+        self.assertEqual(colocation.units_from_position('10-12'), 3)
+        self.assertEqual(colocation.units_from_position('U12-U10'), 3)
+        self.assertEqual(colocation.units_from_position('U7'), 1)
+        self.assertEqual(colocation.units_from_position(''), 0)
+        self.assertEqual(colocation.units_from_position(None), 0)
+
+    def test_int(self):
+        self.assertEqual(colocation._int('2.7'), 2)
+        self.assertEqual(colocation._int(-3), 0)
+        self.assertEqual(colocation._int('x', 1), 1)
+        self.assertIsNone(colocation._site_id('0'))
+        self.assertEqual(colocation._site_id('12'), 12)
+
+    def test_decimal(self):
+        self.assertEqual(colocation._decimal('1.005'), Decimal('1.00'))
+        self.assertEqual(colocation._decimal(350), Decimal('350.00'))
+        for value in (None, '', 'abc', '-5', 'NaN', 'Infinity'):
+            self.assertEqual(colocation._decimal(value), Decimal('0.00'))
+
+
+class DevicesTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.order = ServiceOrder(
+            pk=5,
+            check_type=ResourceCheckTypeChoices.COLOCATION,
+            check_data={
+                'site_id': '3',
+                'devices': [
+                    {'device_type': '服务器', 'model': 'R740', 'rack_units': '2', 'power_consumption': '450.5', 'quantity': 4},
+                    'invalid',
+                    {'model': 'S5735', 'quantity': 0},
+                ],
+            },
+        )
+
+    def test_requested_devices(self):
+        devices = colocation.requested_devices(self.order)
+        self.assertEqual(
+            [(device.sequence, device.model, device.rack_units, device.power, device.quantity) for device in devices],
+            [(0, 'R740', 2, Decimal('450.50'), 4), (2, 'S5735', 0, Decimal('0.00'), 1)],
+        )
+        for device in devices:
+            self.assertEqual(device.service_order_id, 5)
+            self.assertEqual(device.site_id, 3)
+            self.assertEqual(device.source, ColocationDeviceSourceChoices.REQUESTED)
+
+    def test_requested_devices_other_check_type(self):
+        self.order.check_type = ResourceCheckTypeChoices.FIBER
+        self.assertEqual(colocation.requested_devices(self.order), [])
+
+    def test_installed_devices(self):
+        task = TaskDetail(pk=9, service_order=self.order, feedback_data={
+            'colocation': {
+                'devices': [
+                    {'model': 'R740', 'cabinet': 'A01', 'unit': 'U10-U11', 'power': '400'},
+                    {'model': '', 'cabinet': '', 'unit': ''},
+                    {'model': 'S5735', 'cabinet': 'A02', 'unit': '20'},
+                ],
+            },
+        })
+        devices = colocation.installed_devices(task)
+        self.assertEqual(
+            [(device.sequence, device.cabinet, device.rack_units, device.power) for device in devices],
+            [(0, 'A01', 2, Decimal('400.00')), (2, 'A02', 1, Decimal('0.00'))],
+        )
+        for device in devices:
+            self.assertEqual((device.service_order_id, device.task_id, device.site_id), (5, 9, 3))
+            self.assertEqual(device.source, ColocationDeviceSourceChoices.INSTALLED)
+
+        # 执行反馈中的机房优先于工单核查信息
+        task.feedback_data['colocation']['site_id'] = 8
+        self.assertEqual({device.site_id for device in colocation.installed_devices(task)}, {8})
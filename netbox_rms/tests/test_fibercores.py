@@ -0,0 +1,123 @@
+from unittest import mock
+
+from dcim.models import Cable
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from netbox_rms import fibercores
+from netbox_rms.models import CableCoreInventory
+
+
+def make_inventory(core_count=12, allocations=None, cable_id=1):
+    """未保存的纤芯台账，占用位图由分配记录生成"""
+    inventory = CableCoreInventory(
+        cable=Cable(pk=cable_id, label=f'C{cable_id}'),
+        site_a_id=1,
+        site_z_id=2,
+        core_count=core_count,
+        allocations=allocations or {},
+    )
+    inventory.occupied_mask = sum(
+        1 << (core - 1) for cores in inventory.allocations.values() for core in cores
+    )
+    return inventory
+
+
+class CableCoreInventoryTestCase(SimpleTestCase):
+
+    def test_occupied_mask(self):
+        inventory = make_inventory(core_count=12)
+        self.assertEqual(inventory.free_count, 12)
+        self.assertEqual(bytes(inventory.occupied), b'\x00\x00')
+
+        # 超出纤芯数的位被截断
+        inventory.occupied_mask = 0b1 | 1 << 11 | 1 << 12
+        self.assertEqual(inventory.occupied_mask, 0b1 | 1 << 11)
+        self.assertEqual(inventory.free_count, 10)
+
+    def test_allocate_lowest_free_cores(self):
+        inventory = make_inventory(allocations={'7': [1, 2, 4]})
+        self.assertEqual(inventory.allocate(8, 3), [3, 5, 6])
+        self.assertEqual(inventory.free_count, 6)
+        self.assertEqual(inventory.allocations['8'], [3, 5, 6])
+
+        # 同一工单再次分配时合并分配记录
+        self.assertEqual(inventory.allocate(7, 1), [7])
+        self.assertEqual(inventory.allocations['7'], [1, 2, 4, 7])
+
+    def test_allocate_insufficient(self):
+        inventory = make_inventory(core_count=4, allocations={'7': [1, 2, 3]})
+        with self.assertRaises(ValidationError):
+            inventory.allocate(8, 2)
+        self.assertEqual(inventory.free_count, 1)
+        self.assertNotIn('8', inventory.allocations)
+
+    def test_release(self):
+        inventory = make_inventory(allocations={'7': [1, 2], '8': [3, 4]})
+        self.assertEqual(inventory.release(7), [1, 2])
+        self.assertEqual(inventory.allocations, {'8': [3, 4]})
+        self.assertEqual(inventory.occupied_mask, 0b1100)
+        self.assertEqual(inventory.free_count, 10)
+
+        # 释放后空出的纤芯可再次分配
+        self.assertEqual(inventory.allocate(9, 3), [1, 2, 5])
+
+    def test_release_subset(self):
+        inventory = make_inventory(allocations={'7': [1, 2, 3], '8': [4]})
+        # 不属于该工单的纤芯不释放
+        self.assertEqual(inventory.release(7, [3, 4]), [3])
+        self.assertEqual(inventory.allocations, {'7': [1, 2], '8': [4]})
+        self.assertEqual(inventory.occupied_mask, 0b1011)
+
+        self.assertEqual(inventory.release(7, [1, 2]), [1, 2])
+        self.assertEqual(inventory.allocations, {'8': [4]})
+
+    def test_release_unknown_order(self):
+        inventory = make_inventory(allocations={'7': [1]})
+        self.assertEqual(inventory.release(8), [])
+        self.assertEqual(inventory.release(8, [1]), [])
+        self.assertEqual(inventory.occupied_mask, 0b1)
+
+    def test_transfer(self):
+        inventory = make_inventory(allocations={'7': [1, 2], '8': [5]})
+        self.assertEqual(inventory.transfer(7, 8), [1, 2])
+        self.assertEqual(inventory.allocations, {'8': [1, 2, 5]})
+        # 占用位图不变
+        self.assertEqual(inventory.occupied_mask, 0b10011)
+        self.assertEqual(inventory.free_count, 9)
+
+        self.assertEqual(inventory.transfer(7, 9), [])
+        self.assertEqual(inventory.allocations, {'8': [1, 2, 5]})
+
+
+@mock.patch.object(CableCoreInventory, 'save')
+class ResizeTestCase(SimpleTestCase):
+
+    def test_release_surplus_from_highest_cores(self, save):
+        first = make_inventory(allocations={'7': [1, 2, 3]}, cable_id=1)
+        second = make_inventory(allocations={'7': [1, 2]}, cable_id=2)
+        self.assertIsNone(fibercores._resize([first, second], 7, 1, 2, 2))
+        self.assertEqual(first.allocations, {'7': [1, 2]})
+        self.assertEqual(second.allocations, {})
+        self.assertEqual(first.free_count, 10)
+
+    def test_top_up_on_held_cable(self, save):
+        first = make_inventory(core_count=4, allocations={'7': [1, 2], '8': [3, 4]}, cable_id=1)
+        second = make_inventory(allocations={'7': [1]}, cable_id=2)
+        self.assertEqual(fibercores._resize([first, second], 7, 1, 2, 5), {'cable_id': 2, 'cores': [2, 3]})
+        self.assertEqual(second.allocations, {'7': [1, 2, 3]})
+        save.assert_called_once_with()
+
+    def test_unchanged(self, save):
+        inventory = make_inventory(allocations={'7': [1, 2]})
+        self.assertIsNone(fibercores._resize([inventory], 7, 1, 2, 2))
+        save.assert_not_called()
+
+
+class ParseCoresTestCase(SimpleTestCase):
+
+    def test_parse_cores(self):
+        self.assertEqual(fibercores.parse_cores('1-3，7, 9'), [1, 2, 3, 7, 9])
+        self.assertEqual(fibercores.parse_cores([1, '2', 0, 'x']), [1, 2])
+        self.assertEqual(fibercores.parse_cores('0, a-b, 4'), [4])
+        self.assertEqual(fibercores.parse_cores(None), [])
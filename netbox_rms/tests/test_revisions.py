@@ -0,0 +1,118 @@
+import copy
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from netbox_rms import revisions
+from netbox_rms.models import JSONRevision
+
+
+class PatchTestCase(SimpleTestCase):
+
+    def assertRoundTrip(self, old, new):
+        original = copy.deepcopy(old)
+        patch = revisions.diff(old, new)
+        self.assertEqual(revisions.apply(old, patch), new)
+        # 应用补丁不修改原文档
+        self.assertEqual(old, original)
+        return patch
+
+    def test_unchanged(self):
+        self.assertEqual(revisions.diff({'a': [1, {'b': 2}]}, {'a': [1, {'b': 2}]}), [])
+
+    def test_dict(self):
+        patch = self.assertRoundTrip({'a': 1, 'b': 2, 'c': {'d': 3}}, {'a': 1, 'c': {'d': 4}, 'e': None})
+        self.assertEqual(patch, [
+            {'op': 'remove', 'path': '/b'},
+            {'op': 'replace', 'path': '/c/d', 'value': 4},
+            {'op': 'add', 'path': '/e', 'value': None},
+        ])
+
+    def test_list_grow(self):
+        patch = self.assertRoundTrip({'cores': [1, 2]}, {'cores': [1, 3, 4, 5]})
+        self.assertEqual(patch, [
+            {'op': 'replace', 'path': '/cores/1', 'value': 3},
+            {'op': 'add', 'path': '/cores/2', 'value': 4},
+            {'op': 'add', 'path': '/cores/3', 'value': 5},
+        ])
+
+    def test_list_shrink(self):
+        patch = self.assertRoundTrip([{'a': 1}, {'a': 2}, {'a': 3}, {'a': 4}], [{'a': 1}, {'a': 5}])
+        # 从末尾起删除，先删除的元素不影响后续下标
+        self.assertEqual(patch, [
+            {'op': 'replace', 'path': '/1/a', 'value': 5},
+            {'op': 'remove', 'path': '/3'},
+            {'op': 'remove', 'path': '/2'},
+        ])
+
+    def test_type_change(self):
+        self.assertRoundTrip({'a': [1, 2]}, {'a': {'0': 1}})
+        self.assertRoundTrip({'a': 1}, {'a': 1.5})
+        self.assertRoundTrip({'a': '1'}, {'a': 1})
+        self.assertEqual(revisions.diff([1], {'a': 1}), [{'op': 'replace', 'path': '', 'value': {'a': 1}}])
+
+    def test_escaped_keys(self):
+        patch = self.assertRoundTrip({'a/b': 1, 'c~d': {'~1': 2}}, {'a/b': 3, 'c~d': {'~1': 4}})
+        self.assertEqual([operation['path'] for operation in patch], ['/a~1b', '/c~0d/~01'])
+
+    def test_root(self):
+        self.assertEqual(revisions.apply({'a': 1}, [{'op': 'replace', 'path': '', 'value': [1]}]), [1])
+        with self.assertRaises(revisions.PatchError):
+            revisions.apply({'a': 1}, [{'op': 'remove', 'path': ''}])
+
+    def test_append(self):
+        self.assertEqual(revisions.apply([1], [{'op': 'add', 'path': '/-', 'value': 2}]), [1, 2])
+
+    def test_invalid_path(self):
+        for operation in (
+            {'op': 'remove', 'path': '/missing'},
+            {'op': 'replace', 'path': '/a/b/c', 'value': 1},
+            {'op': 'remove', 'path': '/list/5'},
+            {'op': 'replace', 'path': '/list/x', 'value': 1},
+        ):
+            with self.assertRaises(revisions.PatchError):
+                revisions.apply({'a': 1, 'list': [1]}, [operation])
+
+
+class ReconstructTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.versions = [
+            {'status': 'pending', 'devices': []},
+            {'status': 'pending', 'devices': [{'model': 'R740'}]},
+            {'status': 'completed', 'devices': [{'model': 'R740'}, {'model': 'S5735'}]},
+            {'status': 'completed', 'devices': [{'model': 'S5735'}]},
+        ]
+        self.chain = [JSONRevision(
+            object_type='netbox_rms.taskdetail', object_id=1, field='feedback_data',
+            version=1, base=1, checkpoint=True, data=copy.deepcopy(self.versions[0]),
+        )]
+        for version, (old, new) in enumerate(zip(self.versions, self.versions[1:]), start=2):
+            self.chain.append(JSONRevision(
+                object_type='netbox_rms.taskdetail', object_id=1, field='feedback_data',
+                version=version, base=1, checkpoint=False, data=revisions.diff(old, new),
+            ))
+
+    def test_replay(self):
+        for index, expected in enumerate(self.versions):
+            self.assertEqual(revisions._replay(self.chain[:index + 1]), expected)
+
+    def test_replay_from_later_checkpoint(self):
+        checkpoint = JSONRevision(version=3, base=3, checkpoint=True, data=copy.deepcopy(self.versions[2]))
+        self.assertEqual(revisions._replay([checkpoint, self.chain[3]]), self.versions[3])
+
+    def test_reconstruct_checkpoint(self):
+        revision = self.chain[0]
+        document = revisions.reconstruct(revision)
+        self.assertEqual(document, self.versions[0])
+        document['devices'].append({})
+        self.assertEqual(revision.data, self.versions[0])
+
+    def test_reconstruct(self):
+        with mock.patch.object(JSONRevision.objects, 'filter') as query:
+            query.return_value.order_by.return_value = self.chain[:3]
+            self.assertEqual(revisions.reconstruct(self.chain[2]), self.versions[2])
+        query.assert_called_once_with(
+            object_type='netbox_rms.taskdetail', object_id=1, field='feedback_data',
+            version__gte=1, version__lte=3,
+        )
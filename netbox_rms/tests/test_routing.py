@@ -0,0 +1,103 @@
+from django.test import SimpleTestCase
+
+from netbox_rms import routing
+
+
+def make_graph(weights):
+    """由 {(A, Z): 权重} 构建站点图"""
+    links = {
+        routing.link_key(a, b): {'weight': weight, 'edges': [{'cable_id': index}]}
+        for index, ((a, b), weight) in enumerate(weights.items(), start=1)
+    }
+    sites = {site_id: f'S{site_id}' for link in links for site_id in link}
+    return routing.SiteGraph(sites, links)
+
+
+class DijkstraTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.graph = make_graph({(1, 2): 1, (2, 4): 1, (1, 3): 2, (3, 4): 3, (2, 3): 1.5, (5, 6): 1})
+
+    def test_shortest_path(self):
+        self.assertEqual(routing.dijkstra(self.graph, 1, 4), (2, [1, 2, 4]))
+        self.assertEqual(routing.dijkstra(self.graph, 4, 1), (2, [4, 2, 1]))
+
+    def test_unreachable(self):
+        self.assertIsNone(routing.dijkstra(self.graph, 1, 5))
+        self.assertIsNone(routing.dijkstra(self.graph, 1, 99))
+
+    def test_exclusions(self):
+        self.assertEqual(routing.dijkstra(self.graph, 1, 4, excluded_nodes=frozenset({2})), (5, [1, 3, 4]))
+        self.assertEqual(
+            routing.dijkstra(self.graph, 1, 4, excluded_links=frozenset({routing.link_key(4, 2)})),
+            (5, [1, 3, 4]),
+        )
+
+
+class KShortestPathsTestCase(SimpleTestCase):
+
+    def setUp(self):
+        # 1 -> 4 的全部无环路径：1-2-4 (2)、1-3-2-4 (4.5)、1-3-4 (5)、1-2-3-4 (5.5)
+        self.graph = make_graph({(1, 2): 1, (2, 4): 1, (1, 3): 2, (3, 4): 3, (2, 3): 1.5})
+
+    def test_ordered_by_cost(self):
+        self.assertEqual(routing.k_shortest_paths(self.graph, 1, 4, 3), [
+            (2, [1, 2, 4]),
+            (4.5, [1, 3, 2, 4]),
+            (5, [1, 3, 4]),
+        ])
+
+    def test_exhausts_simple_paths(self):
+        paths = routing.k_shortest_paths(self.graph, 1, 4, 10)
+        self.assertEqual([cost for cost, _path in paths], [2, 4.5, 5, 5.5])
+        self.assertEqual(len({tuple(path) for _cost, path in paths}), 4)
+        for cost, path in paths:
+            self.assertEqual(len(set(path)), len(path))
+            self.assertEqual(self.graph.path_cost(path), cost)
+
+    def test_unreachable(self):
+        self.assertEqual(routing.k_shortest_paths(self.graph, 1, 99, 3), [])
+
+    def test_describe_path(self):
+        route = routing.describe_path(self.graph, 2, [1, 2, 4])
+        self.assertEqual([site['name'] for site in route['sites']], ['S1', 'S2', 'S4'])
+        self.assertEqual(route['hops'], 2)
+        self.assertEqual([(link['site_a'], link['site_z']) for link in route['links']], [(1, 2), (2, 4)])
+
+
+class DisjointPathsTestCase(SimpleTestCase):
+
+    def test_avoids_shortest_path_trap(self):
+        # 最短路径 1-2-3-4 (3) 会阻断其余路由；最优分离路由对为 1-2-4 与 1-3-4
+        graph = make_graph({(1, 2): 1, (2, 3): 1, (3, 4): 1, (1, 3): 2, (2, 4): 2})
+        working, protection = routing.disjoint_paths(graph, 1, 4)
+        self.assertEqual(sorted([working, protection]), [[1, 2, 4], [1, 3, 4]])
+        self.assertLessEqual(graph.path_cost(working), graph.path_cost(protection))
+
+    def test_working_is_shorter(self):
+        graph = make_graph({(1, 2): 1, (2, 4): 1, (1, 3): 5, (3, 4): 5})
+        self.assertEqual(routing.disjoint_paths(graph, 1, 4), ([1, 2, 4], [1, 3, 4]))
+
+    def test_link_disjoint_through_shared_site(self):
+        # 站点 3 为割点：不存在节点分离路由，但存在链路分离路由
+        graph = make_graph({(1, 2): 1, (2, 3): 1, (1, 3): 1, (3, 4): 1, (4, 5): 1, (3, 5): 1})
+        self.assertIsNone(routing.disjoint_paths(graph, 1, 5))
+        self.assertEqual(
+            routing.disjoint_paths(graph, 1, 5, node_disjoint=False),
+            ([1, 3, 5], [1, 2, 3, 4, 5]),
+        )
+
+        routes = routing.protection_routes(graph, 1, 5)
+        self.assertEqual(routes['disjoint'], 'link')
+        self.assertEqual([site['id'] for site in routes['working']['sites']], [1, 3, 5])
+        self.assertEqual(routes['protection']['cost_km'], 4)
+
+    def test_no_disjoint_pair(self):
+        graph = make_graph({(1, 2): 1, (2, 3): 1})
+        self.assertIsNone(routing.disjoint_paths(graph, 1, 3, node_disjoint=False))
+        self.assertIsNone(routing.disjoint_paths(graph, 1, 1))
+
+        routes = routing.protection_routes(graph, 1, 3)
+        self.assertIsNone(routes['disjoint'])
+        self.assertEqual(routes['working']['hops'], 2)
+        self.assertIsNone(routes['protection'])
@@ -0,0 +1,120 @@
+"""
+NetBox RMS 传输电路同步
+
+TransmissionCircuit 与任务执行反馈 feedback_data['transmission']['circuits'] 双向同步：
+
+- 任务保存（表单或 API）后，按反馈中的电路重建该任务的电路记录，
+  内容未变化时不做写入；
+- 通过 API 创建、更新、删除电路后，在同一事务内将任务的电路记录回写到反馈：
+  保存任务（记录变更日志、触发事件），端口占用索引随任务保存同步，
+  端口冲突时抛出 IntegrityError，电路修改随事务回滚。
+
+重建电路记录、回写反馈期间（syncing() 为真）两个方向互不触发。
+"""
+import contextvars
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+
+# 正在按任务反馈重建电路记录或回写反馈（此时不再反向同步）
+_syncing: contextvars.ContextVar = contextvars.ContextVar('netbox_rms_circuit_sync', default=False)
+
+
+def feedback_values(circuit: Dict[str, Any]) -> Dict[str, str]:
+    """反馈中的电路字典 -> 模型字段值（截断到字段长度）"""
+    from .models import TransmissionCircuit
+
+    return {
+        field: str(circuit.get(field) or '').strip()[:TransmissionCircuit._meta.get_field(field).max_length]
+        for field in TransmissionCircuit.FEEDBACK_FIELDS
+    }
+
+
+def build_circuits(task) -> list:
+    """由任务执行反馈生成（未保存的）电路记录，跳过空白电路"""
+    from .models import TransmissionCircuit
+
+    circuits = []
+    feedback = ((task.feedback_data or {}).get('transmission') or {}).get('circuits') or []
+    for sequence, circuit in enumerate(feedback):
+        if not isinstance(circuit, dict):
+            continue
+        values = feedback_values(circuit)
+        if not any(values.values()):
+            continue
+        circuits.append(TransmissionCircuit(
+            task_id=task.pk,
+            service_order_id=task.service_order_id,
+            sequence=sequence,
+            **values,
+        ))
+    return circuits
+
+
+# =============================================================================
+# 反馈 -> 电路记录
+# =============================================================================
+
+def sync_task(task) -> None:
+    """任务保存后按执行反馈重建电路记录（由信号处理器调用）"""
+    from .models import TransmissionCircuit
+
+    fields = ('service_order_id', 'sequence', *TransmissionCircuit.FEEDBACK_FIELDS)
+    circuits = build_circuits(task)
+    current = list(
+        TransmissionCircuit.objects.filter(task=task).order_by('sequence', 'pk').values_list(*fields)
+    )
+    if current == [tuple(getattr(circuit, field) for field in fields) for circuit in circuits]:
+        return
+
+    token = _syncing.set(True)
+    try:
+        with transaction.atomic():
+            TransmissionCircuit.objects.filter(task=task).delete()
+            TransmissionCircuit.objects.bulk_create(circuits)
+    finally:
+        _syncing.reset(token)
+
+
+def syncing() -> bool:
+    return _syncing.get()
+
+
+# =============================================================================
+# 电路记录 -> 反馈
+# =============================================================================
+
+def write_back(task_id: int) -> Optional[List[Dict[str, str]]]:
+    """
+    将任务的电路记录写回执行反馈（由信号处理器在电路修改的事务内调用）
+
+    任务按 update_fields 保存：记录变更日志、执行反馈版本并触发事件；端口占用索引由任务保存信号同步，
+    端口冲突的 IntegrityError 不捕获，调用方的事务随之回滚。
+
+    Returns:
+        写入的电路列表；任务已删除时返回 None
+    """
+    from .models import TaskDetail, TransmissionCircuit
+
+    task = TaskDetail.objects.filter(pk=task_id).first()
+    if task is None:
+        return None
+    circuits = [
+        circuit.to_feedback()
+        for circuit in TransmissionCircuit.objects.filter(task_id=task_id).order_by('sequence', 'pk')
+    ]
+    feedback = dict(task.feedback_data or {})
+    feedback['transmission'] = {**(feedback.get('transmission') or {}), 'circuits': circuits}
+    if feedback == task.feedback_data:
+        return circuits
+
+    # 变更日志记录修改前的数据
+    task.snapshot()
+    task.feedback_data = feedback
+    token = _syncing.set(True)
+    try:
+        with transaction.atomic():
+            task.save(update_fields=['feedback_data', 'last_updated'])
+    finally:
+        _syncing.reset(token)
+    return circuits
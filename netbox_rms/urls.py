@@ -6,7 +6,7 @@ from django.urls import include, path
 from netbox.views.generic import ObjectChangeLogView, ObjectJournalView
 
 from . import views
-from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult
+from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TransmissionCircuit
 
 app_name = 'netbox_rms'
 
@@ -22,6 +22,8 @@ urlpatterns = [
     path('service-orders/<int:pk>/changelog/', ObjectChangeLogView.as_view(), name='serviceorder_changelog', kwargs={'model': ServiceOrder}),
     path('service-orders/<int:pk>/journal/', ObjectJournalView.as_view(), name='serviceorder_journal', kwargs={'model': ServiceOrder}),
     path('service-orders/delete/', views.ServiceOrderBulkDeleteView.as_view(), name='serviceorder_bulk_delete'),
+    path('service-orders/change-orders/', views.ChangeOrderBulkCreateView.as_view(), name='serviceorder_bulk_change'),
+    path('service-orders/clone/', views.OrderCloneView.as_view(), name='serviceorder_clone'),
     
     # =============================================================================
     # TaskDetail 路由
@@ -47,6 +49,18 @@ urlpatterns = [
     path('resources/<int:pk>/journal/', ObjectJournalView.as_view(), name='resourceledger_journal', kwargs={'model': ResourceLedger}),
     path('resources/delete/', views.ResourceLedgerBulkDeleteView.as_view(), name='resourceledger_bulk_delete'),
     
+    # =============================================================================
+    # TransmissionCircuit 路由
+    # =============================================================================
+    path('circuits/', views.TransmissionCircuitListView.as_view(), name='transmissioncircuit_list'),
+    path('circuits/add/', views.TransmissionCircuitEditView.as_view(), name='transmissioncircuit_add'),
+    path('circuits/<int:pk>/', views.TransmissionCircuitView.as_view(), name='transmissioncircuit'),
+    path('circuits/<int:pk>/edit/', views.TransmissionCircuitEditView.as_view(), name='transmissioncircuit_edit'),
+    path('circuits/<int:pk>/delete/', views.TransmissionCircuitDeleteView.as_view(), name='transmissioncircuit_delete'),
+    path('circuits/<int:pk>/changelog/', ObjectChangeLogView.as_view(), name='transmissioncircuit_changelog', kwargs={'model': TransmissionCircuit}),
+    path('circuits/<int:pk>/journal/', ObjectJournalView.as_view(), name='transmissioncircuit_journal', kwargs={'model': TransmissionCircuit}),
+    path('circuits/delete/', views.TransmissionCircuitBulkDeleteView.as_view(), name='transmissioncircuit_bulk_delete'),
+    
     # =============================================================================
     # ResourceCheckResult 路由
     # =============================================================================
@@ -54,4 +68,16 @@ urlpatterns = [
     path('check-results/<int:pk>/edit/', views.ResourceCheckResultEditView.as_view(), name='resourcecheckresult_edit'),
     path('check-results/<int:pk>/delete/', views.ResourceCheckResultDeleteView.as_view(), name='resourcecheckresult_delete'),
     path('check-results/<int:pk>/changelog/', ObjectChangeLogView.as_view(), name='resourcecheckresult_changelog', kwargs={'model': ResourceCheckResult}),
+    
+    # =============================================================================
+    # 统计分析
+    # =============================================================================
+    path('analytics/demand-matrix/', views.DemandMatrixView.as_view(), name='demand_matrix'),
+    path('analytics/colocation-capacity/', views.ColocationCapacityView.as_view(), name='colocation_capacity'),
+    
+    # =============================================================================
+    # 计费
+    # =============================================================================
+    path('billing/', views.BillingRunView.as_view(), name='billingrun_list'),
+    path('billing/<int:pk>/export/', views.BillingRunExportView.as_view(), name='billingrun_export'),
 ]
@@ -0,0 +1,257 @@
+"""
+NetBox RMS 外部资源校验
+
+插件配置 enable_external_resource_validation 开启时，将工单核查信息提交给资源 / OSS 系统校验。
+
+客户端：
+- ValidationClient：接口，validate(payload) 返回 {'valid': bool, 'messages': [...]}，失败时抛出异常；
+- HTTPValidationClient：配置 external_validation_url 时使用，进程内共享一个 requests.Session
+  （连接池大小与并发数一致，连接复用），每次请求带超时，批量校验时在有界线程池中并发请求；
+- LocalValidationClient：未配置地址时使用，按本地 NetBox 数据校验工单引用的站点，不访问网络，
+  供开发和测试使用；
+- 也可通过 external_validation_client 指定自定义客户端类的导入路径。
+
+validate_orders() 批量校验工单：答复按工单核查内容缓存 external_validation_cache_ttl 秒
+（核查内容变化即重新校验），只有未命中的工单才提交；超时或出错的工单 valid 为 None，不写入缓存。
+"""
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.utils.module_loading import import_string
+
+from netbox.plugins import get_plugin_config
+
+from . import cache
+
+logger = logging.getLogger('netbox_rms.validation')
+
+# 核查信息中引用站点的字段
+SITE_FIELDS = ('site_id', 'site_a_id', 'site_z_id')
+
+_client: Optional['ValidationClient'] = None
+_client_lock = threading.Lock()
+
+
+def _config(name: str) -> Any:
+    return get_plugin_config('netbox_rms', name)
+
+
+def enabled() -> bool:
+    return bool(_config('enable_external_resource_validation'))
+
+
+def _failed(error: Exception) -> Dict[str, Any]:
+    return {'valid': None, 'messages': [], 'error': f'{type(error).__name__}: {error}'}
+
+
+# =============================================================================
+# 客户端
+# =============================================================================
+
+class ValidationClient:
+    """外部资源校验客户端接口"""
+
+    def validate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        校验单个工单
+
+        Args:
+            payload: order_payload() 的结果
+
+        Returns:
+            {'valid': bool, 'messages': [str]}；无法校验时抛出异常
+        """
+        raise NotImplementedError
+
+    def validate_many(self, payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量校验（默认逐个调用 validate），单个工单失败不影响其余工单
+
+        Returns:
+            {键: {'valid', 'messages', 'error'}}，失败的工单 valid 为 None
+        """
+        return {key: self._safe_validate(payload) for key, payload in payloads.items()}
+
+    def _safe_validate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return {'error': '', **self.validate(payload)}
+        except Exception as e:
+            logger.warning("工单 %s 外部校验失败：%s", payload.get('order_no'), e)
+            return _failed(e)
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPValidationClient(ValidationClient):
+    """
+    HTTP 接口校验客户端
+
+    POST JSON 载荷到 url，答复 {"valid": true/false, "messages": [...]}。
+    """
+
+    def __init__(self, url: str, token: str = '', timeout: float = 10, workers: int = 16):
+        self.url = url
+        self.timeout = timeout
+        self.workers = max(int(workers), 1)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/json'
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+
+    def validate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        return {
+            'valid': bool(data.get('valid')),
+            'messages': [str(message) for message in data.get('messages') or []],
+        }
+
+    def validate_many(self, payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """在有界线程池中并发请求，共享会话的连接池"""
+        if len(payloads) <= 1:
+            return super().validate_many(payloads)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(payloads))) as executor:
+            answers = executor.map(self._safe_validate, payloads.values())
+            return dict(zip(payloads, answers))
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class LocalValidationClient(ValidationClient):
+    """本地校验客户端：核查信息引用的站点须存在且为在用状态（一次查询校验整批工单）"""
+
+    def validate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self.validate_many({'': payload})['']
+
+    def validate_many(self, payloads: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        from dcim.choices import SiteStatusChoices
+        from dcim.models import Site
+
+        references = {
+            key: [(field, _site_id(payload['check_data'].get(field))) for field in SITE_FIELDS
+                  if payload['check_data'].get(field) not in (None, '')]
+            for key, payload in payloads.items()
+        }
+        site_ids = {site_id for fields in references.values() for _field, site_id in fields if site_id}
+        sites = dict(Site.objects.filter(pk__in=site_ids).values_list('pk', 'status'))
+
+        answers = {}
+        for key, fields in references.items():
+            messages = []
+            for field, site_id in fields:
+                if site_id not in sites:
+                    messages.append(f'{field}: 站点不存在')
+                elif sites[site_id] != SiteStatusChoices.STATUS_ACTIVE:
+                    messages.append(f'{field}: 站点未启用')
+            answers[key] = {'valid': not messages, 'messages': messages, 'error': ''}
+        return answers
+
+
+def _site_id(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_client() -> ValidationClient:
+    """按插件配置创建客户端"""
+    path = _config('external_validation_client')
+    if path:
+        return import_string(path)()
+    url = _config('external_validation_url')
+    if url:
+        return HTTPValidationClient(
+            url,
+            token=_config('external_validation_token'),
+            timeout=_config('external_validation_timeout'),
+            workers=_config('external_validation_workers'),
+        )
+    return LocalValidationClient()
+
+
+def get_client() -> ValidationClient:
+    """进程内共享的客户端（首次调用时创建）"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = build_client()
+        return _client
+
+
+# =============================================================================
+# 校验
+# =============================================================================
+
+def order_payload(order) -> Dict[str, Any]:
+    """提交校验的工单内容"""
+    return {
+        'order_no': order.order_no,
+        'check_type': order.check_type,
+        'check_data': order.safe_check_data,
+    }
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    return hashlib.md5(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'),
+    ).hexdigest()
+
+
+def validate_orders(orders: Iterable, client: Optional[ValidationClient] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    批量校验工单核查信息
+
+    Args:
+        orders: 工单
+        client: 校验客户端，默认按插件配置
+
+    Returns:
+        {工单 ID: {'order_no', 'valid', 'messages', 'error', 'cached'}}；未开启外部校验时为空
+    """
+    if not enabled():
+        return {}
+    client = client or get_client()
+
+    payloads, order_ids = {}, {}
+    for order in orders:
+        payload = order_payload(order)
+        key = payload_key(payload)
+        payloads[key] = payload
+        order_ids[key] = order.pk
+
+    answers: Dict[str, Dict[str, Any]] = {}
+
+    def compute(keys: list) -> Dict[str, Dict[str, Any]]:
+        answers.update(client.validate_many({key: payloads[key] for key in keys}))
+        # 失败的答复不缓存，下次重新校验
+        return {key: answer for key, answer in answers.items() if answer['valid'] is not None}
+
+    cached = cache.get_many_or_compute(
+        (cache.NAMESPACE_VALIDATION,),
+        f'external_validation:{type(client).__name__}',
+        list(payloads),
+        compute,
+        timeout=_config('external_validation_cache_ttl'),
+    )
+    return {
+        order_ids[key]: {
+            'order_no': payloads[key]['order_no'],
+            **{'error': '', **(answers.get(key) or cached[key])},
+            'cached': key not in answers,
+        }
+        for key in payloads
+    }
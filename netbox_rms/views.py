@@ -3,24 +3,37 @@ NetBox RMS 视图定义
 
 为每个模型实现标准 NetBox 视图集
 """
+from datetime import date, timedelta
 from typing import Dict, Any, Optional
 
+from django.contrib import messages
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.core.exceptions import ValidationError
 from django.db.models import Count
-from django.http import HttpRequest
+from django.http import HttpRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.translation import gettext_lazy as _
+from django.views.generic import View
 
 from netbox.views import generic
 
-from .models import ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult
-from .tables import ServiceOrderTable, TaskDetailTable, ResourceLedgerTable
-from .filtersets import ServiceOrderFilterSet, TaskDetailFilterSet, ResourceLedgerFilterSet
+from .models import (
+    ServiceOrder, TaskDetail, ResourceLedger, ResourceCheckResult, TransmissionCircuit, ColocationDevice, BillingRun,
+    BillingLine,
+)
+from .tables import ServiceOrderTable, TaskDetailTable, ResourceLedgerTable, TransmissionCircuitTable
+from .filtersets import ServiceOrderFilterSet, TaskDetailFilterSet, ResourceLedgerFilterSet, TransmissionCircuitFilterSet
 from .forms import (
     ServiceOrderForm, ServiceOrderFilterForm,
     TaskDetailForm, TaskDetailFilterForm,
     ResourceLedgerForm, ResourceLedgerFilterForm,
+    TransmissionCircuitForm, TransmissionCircuitFilterForm,
     ResourceCheckResultForm, ResourceCheckResultFilterForm,
+    DemandMatrixFilterForm, ColocationCapacityFilterForm, ChangeOrderBulkForm, OrderCloneForm, BillingRunForm,
 )
 from .choices import BandwidthChoices
+from . import billing, cloning, colocation, demand, planner
+from .jobs import BillingRunJob, ChangeOrderJob, CloneOrdersJob
 
 
 # =============================================================================
@@ -52,6 +65,10 @@ class ServiceOrderView(generic.ObjectView):
         resources_table = ResourceLedgerTable(instance.resources.all())
         resources_table.configure(request)
         
+        # 变更单从原单继承的资源
+        change_resources_table = ResourceLedgerTable(instance.change_resources.all(), prefix='change_')
+        change_resources_table.configure(request)
+        
         # 获取子工单（变更单）
         child_orders = ServiceOrder.objects.filter(parent_order=instance)
         child_orders_table = ServiceOrderTable(child_orders)
@@ -60,7 +77,9 @@ class ServiceOrderView(generic.ObjectView):
         return {
             'tasks_table': tasks_table,
             'resources_table': resources_table,
+            'change_resources_table': change_resources_table,
             'child_orders_table': child_orders_table,
+            'rack_plan': planner.plan_order(instance),
         }
 
 
@@ -86,6 +105,87 @@ class ServiceOrderBulkDeleteView(generic.BulkDeleteView):
     table = ServiceOrderTable
 
 
+class ChangeOrderBulkCreateView(PermissionRequiredMixin, View):
+    """按原单批量生成变更单（后台任务执行）"""
+    
+    permission_required = 'netbox_rms.add_serviceorder'
+    template_name = 'netbox_rms/changeorder_bulk.html'
+    
+    def get(self, request: HttpRequest):
+        form = ChangeOrderBulkForm(initial={
+            'parent_orders': request.GET.getlist('parent_orders'),
+            'apply_date': date.today(),
+        })
+        return render(request, self.template_name, {'form': form})
+    
+    def post(self, request: HttpRequest):
+        form = ChangeOrderBulkForm(request.POST)
+        if not form.is_valid():
+            return render(request, self.template_name, {'form': form})
+        
+        data = form.cleaned_data
+        parents = ServiceOrder.objects.restrict(request.user, 'view').filter(
+            pk__in=[order.pk for order in data['parent_orders']],
+        )
+        job = ChangeOrderJob.enqueue(
+            user=request.user,
+            parents=list(parents.values_list('pk', flat=True)),
+            apply_date=data['apply_date'],
+            deadline_date=data['deadline_date'],
+            check_data={'bandwidth': data['bandwidth']} if data['bandwidth'] else None,
+        )
+        messages.success(request, _('已提交批量生成变更单任务（{count} 个原单）').format(count=parents.count()))
+        return redirect(job.get_absolute_url())
+
+
+class OrderCloneView(PermissionRequiredMixin, View):
+    """
+    按过滤条件批量复制工单（后台任务执行）
+    
+    过滤参数与工单列表相同，通过查询字符串传入。
+    """
+    
+    permission_required = 'netbox_rms.add_serviceorder'
+    template_name = 'netbox_rms/serviceorder_clone.html'
+    
+    def _context(self, request: HttpRequest, form: OrderCloneForm) -> Dict[str, Any]:
+        filters = {key: values for key, values in request.GET.lists() if key not in ('page', 'per_page', 'sort')}
+        return {
+            'form': form,
+            'filter_form': ServiceOrderFilterForm(request.GET),
+            'filters': filters,
+            'count': cloning.filter_orders(filters, user=request.user).count() if filters else 0,
+        }
+    
+    def get(self, request: HttpRequest):
+        form = OrderCloneForm(initial={'apply_date': date.today()})
+        return render(request, self.template_name, self._context(request, form))
+    
+    def post(self, request: HttpRequest):
+        form = OrderCloneForm(request.POST)
+        context = self._context(request, form)
+        if not context['filters']:
+            messages.error(request, _('请先设置过滤条件'))
+            return render(request, self.template_name, context)
+        if not form.is_valid():
+            return render(request, self.template_name, context)
+        for option, permission in (
+            ('include_tasks', 'netbox_rms.add_taskdetail'),
+            ('include_check_results', 'netbox_rms.add_resourcecheckresult'),
+        ):
+            if form.cleaned_data[option] and not request.user.has_perm(permission):
+                form.add_error(option, _('没有创建权限'))
+                return render(request, self.template_name, context)
+        
+        job = CloneOrdersJob.enqueue(
+            user=request.user,
+            filters=context['filters'],
+            **form.cleaned_data,
+        )
+        messages.success(request, _('已提交工单批量复制任务（{count} 个工单）').format(count=context['count']))
+        return redirect(job.get_absolute_url())
+
+
 # =============================================================================
 # TaskDetail 视图
 # =============================================================================
@@ -103,6 +203,11 @@ class TaskDetailView(generic.ObjectView):
     """执行任务详情详情视图"""
     
     queryset = TaskDetail.objects.select_related('service_order').prefetch_related('tags')
+    
+    def get_extra_context(self, request: HttpRequest, instance: 'TaskDetail') -> Dict[str, Any]:
+        return {
+            'transitions': instance.transitions.select_related('user')[:50],
+        }
 
 
 class TaskDetailEditView(generic.ObjectEditView):
@@ -189,6 +294,51 @@ class ResourceLedgerBulkDeleteView(generic.BulkDeleteView):
     table = ResourceLedgerTable
 
 
+# =============================================================================
+# TransmissionCircuit 视图
+# =============================================================================
+
+class TransmissionCircuitListView(generic.ObjectListView):
+    """传输电路列表视图"""
+    
+    queryset = TransmissionCircuit.objects.select_related('task', 'service_order').prefetch_related('tags')
+    filterset = TransmissionCircuitFilterSet
+    filterset_form = TransmissionCircuitFilterForm
+    table = TransmissionCircuitTable
+
+
+class TransmissionCircuitView(generic.ObjectView):
+    """传输电路详情视图"""
+    
+    queryset = TransmissionCircuit.objects.select_related('task', 'service_order').prefetch_related('tags')
+    
+    def get_extra_context(self, request: HttpRequest, instance: 'TransmissionCircuit') -> Dict[str, Any]:
+        return {
+            'port_assignments': instance.task.port_assignments.filter(circuit_code=instance.code),
+        }
+
+
+class TransmissionCircuitEditView(generic.ObjectEditView):
+    """传输电路编辑视图"""
+    
+    queryset = TransmissionCircuit.objects.all()
+    form = TransmissionCircuitForm
+
+
+class TransmissionCircuitDeleteView(generic.ObjectDeleteView):
+    """传输电路删除视图"""
+    
+    queryset = TransmissionCircuit.objects.all()
+
+
+class TransmissionCircuitBulkDeleteView(generic.BulkDeleteView):
+    """传输电路批量删除视图"""
+
+    queryset = TransmissionCircuit.objects.all()
+    filterset = TransmissionCircuitFilterSet
+    table = TransmissionCircuitTable
+
+
 # =============================================================================
 # ResourceCheckResult 视图
 # =============================================================================
@@ -204,3 +354,121 @@ class ResourceCheckResultDeleteView(generic.ObjectDeleteView):
     """资源核查结果删除视图"""
     
     queryset = ResourceCheckResult.objects.all()
+
+
+
+# =============================================================================
+# 统计分析视图
+# =============================================================================
+
+class DemandMatrixView(PermissionRequiredMixin, View):
+    """A-Z 站点对需求矩阵与热力图"""
+    
+    permission_required = 'netbox_rms.view_serviceorder'
+    template_name = 'netbox_rms/demand_matrix.html'
+    
+    def get(self, request: HttpRequest):
+        form = DemandMatrixFilterForm(request.GET or None)
+        metric = 'bandwidth_gbps'
+        limit = 40
+        if form.is_valid():
+            metric = form.cleaned_data['metric'] or metric
+            limit = form.cleaned_data['limit'] or limit
+        
+        matrix = None
+        heatmap = None
+        try:
+            matrix = demand.cached_demand_matrix(request.user, request.GET)
+            heatmap = demand.heatmap(matrix, metric=metric, limit=limit)
+        except ValidationError as e:
+            messages.error(request, e.messages[0] if e.messages else _('过滤参数无效'))
+        
+        return render(request, self.template_name, {
+            'form': form,
+            'matrix': matrix,
+            'heatmap': heatmap,
+            'metric': metric,
+        })
+
+
+class ColocationCapacityView(PermissionRequiredMixin, View):
+    """各机房托管设备汇总报表"""
+    
+    permission_required = 'netbox_rms.view_colocationdevice'
+    template_name = 'netbox_rms/colocation_capacity.html'
+    
+    def get(self, request: HttpRequest):
+        form = ColocationCapacityFilterForm(request.GET or None)
+        site_ids = []
+        if form.is_valid() and form.cleaned_data['site_id']:
+            site_ids = [site.pk for site in form.cleaned_data['site_id']]
+        
+        rows = colocation.site_capacity(ColocationDevice.objects.restrict(request.user, 'view'), site_ids)
+        totals = {
+            key: sum(row[key] for row in rows)
+            for key in (
+                'requested_devices', 'requested_units', 'requested_power',
+                'installed_devices', 'installed_units', 'installed_power',
+                'racks', 'rack_units',
+            )
+        }
+        
+        return render(request, self.template_name, {
+            'form': form,
+            'rows': rows,
+            'totals': totals,
+        })
+
+
+# =============================================================================
+# 计费视图
+# =============================================================================
+
+class BillingRunView(PermissionRequiredMixin, View):
+    """计费批次列表，提交计费计算任务"""
+    
+    permission_required = 'netbox_rms.view_billingrun'
+    template_name = 'netbox_rms/billing_runs.html'
+    
+    def _context(self, request: HttpRequest, form: BillingRunForm) -> Dict[str, Any]:
+        runs = BillingRun.objects.restrict(request.user, 'view')
+        run_id = request.GET.get('run', '')
+        selected = runs.filter(pk=run_id).first() if run_id.isdigit() else runs.first()
+        return {
+            'form': form,
+            'runs': runs[:24],
+            'selected': selected,
+            'totals': billing.tenant_totals(selected) if selected else [],
+        }
+    
+    def get(self, request: HttpRequest):
+        last_month = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        form = BillingRunForm(initial={'period': last_month})
+        return render(request, self.template_name, self._context(request, form))
+    
+    def post(self, request: HttpRequest):
+        form = BillingRunForm(request.POST)
+        if not request.user.has_perm('netbox_rms.add_billingrun'):
+            messages.error(request, _('没有计费计算权限'))
+            return render(request, self.template_name, self._context(request, form))
+        if not form.is_valid():
+            return render(request, self.template_name, self._context(request, form))
+        
+        job = BillingRunJob.enqueue(user=request.user, period=form.cleaned_data['period'].isoformat())
+        messages.success(request, _('已提交计费计算任务'))
+        return redirect(job.get_absolute_url())
+
+
+class BillingRunExportView(PermissionRequiredMixin, View):
+    """以流式 CSV 导出计费明细"""
+    
+    permission_required = 'netbox_rms.view_billingline'
+    
+    def get(self, request: HttpRequest, pk: int):
+        run = get_object_or_404(BillingRun.objects.restrict(request.user, 'view'), pk=pk)
+        response = StreamingHttpResponse(
+            billing.export_rows(run, BillingLine.objects.restrict(request.user, 'view')),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="billing-{run.period:%Y-%m}.csv"'
+        return response
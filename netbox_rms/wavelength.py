@@ -0,0 +1,278 @@
+"""
+NetBox RMS 波道分配
+
+在站点邻接图的每条链路（光缆段）上，用一个整数位图记录各波道占用情况
+（第 i 位表示第 i + 1 波），为传输专线核查计算“路由 + 全程同一波道”的分配方案，
+或给出“波道不满足”的结论。
+
+占用情况由在用电路推导：
+- 已完成 / 已确认的开通、变更任务反馈中的电路（停闭任务反馈中的电路视为已释放）；
+- 未拆除的资源台账中电路类资源快照里记录的波道号 (snapshot['channel'])。
+未记录波道号的在用电路按完成顺序在其最短路由上首次适应回放。
+同一站点对的电路只计算一次路由，占用位图缓存于拓扑、任务、台账命名空间下。
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import F
+
+from dcim.models import Site
+from netbox.plugins import get_plugin_config
+
+from . import cache, routing
+from .choices import (
+    BandwidthChoices, ExecutionStatusChoices, ResourceTypeChoices, TaskTypeChoices,
+    TransmissionUnavailableReasonChoices,
+)
+
+# 各带宽占用的相邻波道数：100G 相干波长在 50GHz 栅格上按两个相邻波道计
+BANDWIDTH_SLOTS: Dict[str, int] = {
+    BandwidthChoices.GE: 1,
+    BandwidthChoices.G2_5: 1,
+    BandwidthChoices.G10: 1,
+    BandwidthChoices.G100: 2,
+}
+
+# 分配策略
+FIRST_FIT = 'first_fit'
+MOST_USED = 'most_used'
+STRATEGIES = (FIRST_FIT, MOST_USED)
+
+Occupancy = Dict[routing.Link, int]
+
+
+def channel_count() -> int:
+    """每条光缆段的波道数（插件配置 wavelength_channels）"""
+    return get_plugin_config('netbox_rms', 'wavelength_channels')
+
+
+def slots_for(bandwidth: str) -> int:
+    return BANDWIDTH_SLOTS.get(bandwidth, 1)
+
+
+# =============================================================================
+# 位图工具
+# =============================================================================
+
+def run_starts(free: int, slots: int) -> int:
+    """返回位图：置位的位 i 表示第 i .. i + slots - 1 位均空闲"""
+    runs = free
+    for _shift in range(1, slots):
+        runs &= runs >> 1
+    return runs
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """按从低到高的顺序遍历置位的位"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def path_free(occupancy: Occupancy, path: List[int], full: int) -> int:
+    """路由全程均空闲的波道位图（波长连续性约束）"""
+    free = full
+    for a, b in zip(path, path[1:]):
+        free &= ~occupancy.get(routing.link_key(a, b), 0)
+        if not free:
+            break
+    return free
+
+
+# =============================================================================
+# 占用推导
+# =============================================================================
+
+def _resolve_site(value: Any, names: Dict[str, int], fallback: Optional[int]) -> Optional[int]:
+    """电路反馈中的站点为文本：依次按 ID、名称匹配，失败时使用工单核查信息中的站点"""
+    text = str(value or '').strip()
+    if text.isdigit():
+        return int(text)
+    return names.get(text.lower(), fallback)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def lit_circuits() -> List[Dict[str, Any]]:
+    """
+    在用电路列表（按完成顺序）
+
+    Returns:
+        [{'code', 'site_a_id', 'site_z_id', 'bandwidth', 'channel'}]
+    """
+    from .models import ResourceLedger, TaskDetail
+
+    names = {name.lower(): pk for pk, name in Site.objects.values_list('pk', 'name')}
+    circuits: Dict[str, Dict[str, Any]] = {}
+
+    tasks = TaskDetail.objects.filter(
+        execution_status__in=(ExecutionStatusChoices.COMPLETED, ExecutionStatusChoices.CONFIRMED),
+        feedback_data__transmission__has_key='circuits',
+    ).order_by(F('completed_at').asc(nulls_first=True), 'pk').values_list(
+        'task_type',
+        'feedback_data__transmission__circuits',
+        'service_order__check_data__site_a_id',
+        'service_order__check_data__site_z_id',
+    )
+    for task_type, feedback, order_site_a, order_site_z in tasks.iterator(chunk_size=2000):
+        for circuit in feedback or []:
+            code = str(circuit.get('code') or '').strip()
+            if not code:
+                continue
+            if task_type == TaskTypeChoices.DEACTIVATION:
+                circuits.pop(code, None)
+                continue
+            circuits[code] = {
+                'code': code,
+                'site_a_id': _resolve_site(circuit.get('site_a'), names, _as_int(order_site_a)),
+                'site_z_id': _resolve_site(circuit.get('site_z'), names, _as_int(order_site_z)),
+                'bandwidth': circuit.get('bandwidth') or '',
+                'channel': None,
+            }
+
+    # 台账快照中记录的波道号优先
+    ledger = ResourceLedger.objects.current().filter(
+        resource_type=ResourceTypeChoices.CIRCUIT,
+        snapshot__has_key='channel',
+    ).values_list('resource_id', 'snapshot')
+    for code, snapshot in ledger.iterator(chunk_size=2000):
+        channel = _as_int(snapshot.get('channel'))
+        if code in circuits:
+            circuits[code]['channel'] = channel
+        elif snapshot.get('site_a_id') and snapshot.get('site_z_id'):
+            circuits[code] = {
+                'code': code,
+                'site_a_id': _as_int(snapshot.get('site_a_id')),
+                'site_z_id': _as_int(snapshot.get('site_z_id')),
+                'bandwidth': snapshot.get('bandwidth') or '',
+                'channel': channel,
+            }
+
+    return list(circuits.values())
+
+
+def build_occupancy(graph: routing.SiteGraph, circuits: List[Dict[str, Any]], count: int) -> Occupancy:
+    """
+    将在用电路落到光缆段上
+
+    先放置记录了波道号的电路，再按顺序为其余电路在最短路由上首次适应分配。
+    """
+    occupancy: Occupancy = defaultdict(int)
+    full = (1 << count) - 1
+    routes: Dict[Tuple[int, int], Optional[List[int]]] = {}
+
+    def route(a: int, z: int) -> Optional[List[int]]:
+        key = routing.link_key(a, z)
+        if key not in routes:
+            shortest = routing.dijkstra(graph, *key)
+            routes[key] = shortest[1] if shortest else None
+        return routes[key]
+
+    for circuit in sorted(circuits, key=lambda c: c['channel'] is None):
+        a, z = circuit['site_a_id'], circuit['site_z_id']
+        if not a or not z or a == z:
+            continue
+        path = route(a, z)
+        if not path:
+            continue
+        slots = slots_for(circuit['bandwidth'])
+        start = circuit['channel'] - 1 if circuit['channel'] else None
+        if start is None or not 0 <= start <= count - slots:
+            starts = run_starts(path_free(occupancy, path, full), slots)
+            if not starts:
+                continue
+            start = (starts & -starts).bit_length() - 1
+        mask = ((1 << slots) - 1) << start
+        for a_site, z_site in zip(path, path[1:]):
+            occupancy[routing.link_key(a_site, z_site)] |= mask
+
+    return dict(occupancy)
+
+
+def get_occupancy(graph: routing.SiteGraph) -> Occupancy:
+    """获取（缓存的）各光缆段波道占用位图"""
+    count = channel_count()
+    return cache.get_or_compute(
+        (cache.NAMESPACE_TOPOLOGY, cache.NAMESPACE_TASKS, cache.NAMESPACE_LEDGER),
+        ('wavelength_occupancy', count),
+        lambda: build_occupancy(graph, lit_circuits(), count),
+    )
+
+
+# =============================================================================
+# 分配
+# =============================================================================
+
+def choose_start(starts: int, slots: int, usage: List[int], strategy: str) -> int:
+    """从可行起始波道中按策略选择"""
+    if strategy == MOST_USED:
+        return max(iter_bits(starts), key=lambda i: (sum(usage[i:i + slots]), -i))
+    return (starts & -starts).bit_length() - 1
+
+
+def assign(
+    site_a_id: int,
+    site_z_id: int,
+    bandwidth: str,
+    strategy: str = FIRST_FIT,
+    k: int = routing.DEFAULT_K,
+) -> Dict[str, Any]:
+    """
+    为 A、Z 站点间的新电路分配路由和波道
+
+    依次尝试 K 条最短路由，取第一条存在全程连续空闲波道的路由。
+
+    Args:
+        strategy: first_fit（最低可用波道）或 most_used（全网使用最多的可用波道，利于减少碎片）
+
+    Returns:
+        {
+            'available': bool,
+            'reason': None / 'no_route' / 'wavelength',
+            'route': 路由描述 / None,
+            'channels': [波道号, ...],
+            'spans': 路由经过的光缆段数,
+        }
+    """
+    graph = routing.get_graph()
+    count = channel_count()
+    full = (1 << count) - 1
+    slots = slots_for(bandwidth)
+    paths = routing.k_shortest_paths(graph, site_a_id, site_z_id, k)
+    if not paths:
+        return {'available': False, 'reason': 'no_route', 'route': None, 'channels': [], 'spans': 0}
+
+    occupancy = get_occupancy(graph)
+    usage: List[int] = []
+    if strategy == MOST_USED:
+        usage = [0] * count
+        for mask in occupancy.values():
+            for channel in iter_bits(mask):
+                usage[channel] += 1
+
+    for cost, path in paths:
+        starts = run_starts(path_free(occupancy, path, full), slots)
+        if starts:
+            start = choose_start(starts, slots, usage, strategy)
+            return {
+                'available': True,
+                'reason': None,
+                'route': routing.describe_path(graph, cost, path),
+                'channels': list(range(start + 1, start + slots + 1)),
+                'spans': len(path) - 1,
+            }
+
+    cost, path = paths[0]
+    return {
+        'available': False,
+        'reason': TransmissionUnavailableReasonChoices.WAVELENGTH,
+        'route': routing.describe_path(graph, cost, path),
+        'channels': [],
+        'spans': len(path) - 1,
+    }
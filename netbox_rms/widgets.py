@@ -0,0 +1,221 @@
+"""
+NetBox RMS 仪表盘小部件
+
+每个小部件只执行一次聚合查询，结果按用户缓存，相关对象保存/删除时通过
+命名空间版本号失效（见 signals.py）。
+"""
+import datetime
+from typing import Any, Dict, List
+
+from django import forms
+from django.db.models import Count, Exists, OuterRef, Q, Window
+from django.db.models.functions import TruncMonth
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from extras.dashboard.utils import register_widget
+from extras.dashboard.widgets import DashboardWidget, WidgetConfigForm
+
+from . import cache
+from .choices import ConfirmationStatusChoices, ExecutionStatusChoices, ResourceTypeChoices
+from .models import ServiceOrder, TaskDetail, ResourceLedger
+
+
+@register_widget
+class MyPendingTasksWidget(DashboardWidget):
+    """我的待办任务"""
+
+    default_title = _('我的待办任务')
+    description = _('分配给当前用户的待实施、待确认及逾期任务数量')
+    template_name = 'netbox_rms/widgets/my_tasks.html'
+    width = 4
+    height = 3
+
+    def render(self, request) -> str:
+        user = request.user
+
+        def compute() -> Dict[str, int]:
+            today = timezone.localdate()
+            return TaskDetail.objects.restrict(user, 'view').filter(assignee=user).aggregate(
+                pending=Count('pk', filter=Q(execution_status=ExecutionStatusChoices.PENDING)),
+                completed=Count('pk', filter=Q(execution_status=ExecutionStatusChoices.COMPLETED)),
+                overdue=Count('pk', filter=Q(
+                    execution_status=ExecutionStatusChoices.PENDING,
+                    service_order__deadline_date__lt=today,
+                )),
+            )
+
+        stats = cache.get_or_compute(
+            (cache.NAMESPACE_TASKS, cache.NAMESPACE_ORDERS),
+            ('widget.my_tasks', user.pk, timezone.localdate()),
+            compute,
+        )
+        return render_to_string(self.template_name, {
+            'stats': stats,
+            'user_id': user.pk,
+        })
+
+
+@register_widget
+class OverdueOrdersWidget(DashboardWidget):
+    """逾期工单"""
+
+    default_title = _('逾期工单')
+    description = _('已过计划开通时间且仍有待实施任务的工单')
+    template_name = 'netbox_rms/widgets/overdue_orders.html'
+    default_config = {
+        'max_items': 10,
+    }
+    width = 4
+    height = 4
+
+    class ConfigForm(WidgetConfigForm):
+        max_items = forms.IntegerField(
+            min_value=1,
+            max_value=50,
+            required=False,
+            label=_('最大显示数量'),
+        )
+
+    def render(self, request) -> str:
+        user = request.user
+        max_items = self.config.get('max_items') or 10
+
+        def compute() -> Dict[str, Any]:
+            today = timezone.localdate()
+            pending_tasks = TaskDetail.objects.filter(
+                service_order=OuterRef('pk'),
+                execution_status=ExecutionStatusChoices.PENDING,
+            )
+            # 窗口函数在 LIMIT 之前统计总数，一次查询同时取得总数与前 N 条
+            rows = ServiceOrder.objects.restrict(user, 'view').filter(
+                Exists(pending_tasks),
+                deadline_date__lt=today,
+            ).exclude(
+                confirmation_status=ConfirmationStatusChoices.CANCEL,
+            ).annotate(
+                total=Window(expression=Count('pk')),
+            ).order_by('deadline_date', 'pk').values_list(
+                'pk', 'order_no', 'deadline_date', 'total',
+            )[:max_items]
+
+            orders: List[Dict[str, Any]] = []
+            total = 0
+            for pk, order_no, deadline_date, total in rows:
+                orders.append({
+                    'pk': pk,
+                    'order_no': order_no,
+                    'deadline_date': deadline_date,
+                    'overdue_days': (today - deadline_date).days,
+                })
+            return {'orders': orders, 'total': total}
+
+        data = cache.get_or_compute(
+            (cache.NAMESPACE_TASKS, cache.NAMESPACE_ORDERS),
+            ('widget.overdue_orders', user.pk, max_items, timezone.localdate()),
+            compute,
+        )
+        return render_to_string(self.template_name, data)
+
+
+@register_widget
+class PendingCheckResultsWidget(DashboardWidget):
+    """待录入核查结果"""
+
+    default_title = _('待录入核查结果')
+    description = _('已指定核查业务类别但尚未录入核查结果的工单，按业务类别统计')
+    template_name = 'netbox_rms/widgets/pending_check_results.html'
+    width = 4
+    height = 3
+
+    def render(self, request) -> str:
+        user = request.user
+
+        def compute() -> List[Dict[str, Any]]:
+            rows = ServiceOrder.objects.restrict(user, 'view').exclude(
+                check_type='',
+            ).filter(
+                Q(check_result_obj__isnull=True) | Q(check_result_obj__check_result=''),
+            ).values('check_type').annotate(
+                count=Count('pk'),
+            ).order_by('check_type')
+            return list(rows)
+
+        rows = cache.get_or_compute(
+            (cache.NAMESPACE_ORDERS, cache.NAMESPACE_CHECK_RESULTS),
+            ('widget.pending_check_results', user.pk),
+            compute,
+        )
+        labels = dict(ServiceOrder._meta.get_field('check_type').flatchoices)
+        return render_to_string(self.template_name, {
+            'rows': [
+                {**row, 'label': labels.get(row['check_type'], row['check_type'])}
+                for row in rows
+            ],
+            'total': sum(row['count'] for row in rows),
+        })
+
+
+@register_widget
+class LedgerGrowthWidget(DashboardWidget):
+    """资源台账增长"""
+
+    default_title = _('资源台账增长')
+    description = _('近几个月每月新增的资源台账条目，按资源类型统计')
+    template_name = 'netbox_rms/widgets/ledger_growth.html'
+    default_config = {
+        'months': 6,
+    }
+    width = 4
+    height = 4
+
+    class ConfigForm(WidgetConfigForm):
+        months = forms.IntegerField(
+            min_value=1,
+            max_value=24,
+            required=False,
+            label=_('统计月数'),
+        )
+
+    def render(self, request) -> str:
+        user = request.user
+        months = self.config.get('months') or 6
+
+        def compute() -> List[Dict[str, Any]]:
+            # 起始月份：当前月向前推 months-1 个月的 1 日
+            today = timezone.localdate()
+            year, month = divmod(today.year * 12 + today.month - 1 - (months - 1), 12)
+            start = datetime.date(year, month + 1, 1)
+            rows = ResourceLedger.objects.restrict(user, 'view').filter(
+                created__date__gte=start,
+            ).annotate(
+                month=TruncMonth('created'),
+            ).values('month', 'resource_type').annotate(
+                count=Count('pk'),
+            ).order_by('month')
+
+            by_month: Dict[datetime.date, Dict[str, int]] = {}
+            for row in rows:
+                by_month.setdefault(row['month'].date(), {})[row['resource_type']] = row['count']
+            result = []
+            for i in range(months):
+                y, m = divmod(start.year * 12 + start.month - 1 + i, 12)
+                key = datetime.date(y, m + 1, 1)
+                counts = by_month.get(key, {})
+                result.append({
+                    'month': key,
+                    'counts': [counts.get(value, 0) for value, _label in ResourceTypeChoices.CHOICES],
+                    'total': sum(counts.values()),
+                })
+            return result
+
+        rows = cache.get_or_compute(
+            (cache.NAMESPACE_LEDGER,),
+            ('widget.ledger_growth', user.pk, months, timezone.localdate()),
+            compute,
+        )
+        return render_to_string(self.template_name, {
+            'rows': rows,
+            'resource_types': [label for _value, label in ResourceTypeChoices.CHOICES],
+        })
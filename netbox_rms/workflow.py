@@ -0,0 +1,240 @@
+"""
+NetBox RMS 执行任务工作流
+
+声明执行任务的状态机：
+
+    待实施 (pending) -> 已完成 (completed) -> 已确认 (confirmed)
+                        已完成 (completed) -> 待实施 (pending)   # 退回返工
+
+所有状态变化都经过守卫校验，并写入只追加的状态变更记录 (TaskTransition)。
+单个任务通过表单/API 保存时由模型 clean() 校验、信号处理器记录；
+批量流转通过 bulk_transition() 在一个事务内完成。
+"""
+import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .choices import ConfirmationStatusChoices, ExecutionStatusChoices
+
+# 新建任务允许的初始状态
+INITIAL_STATES: Tuple[str, ...] = (
+    ExecutionStatusChoices.PENDING,
+)
+
+# 状态 -> 允许流转到的状态
+TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    ExecutionStatusChoices.PENDING: (
+        ExecutionStatusChoices.COMPLETED,
+    ),
+    ExecutionStatusChoices.COMPLETED: (
+        ExecutionStatusChoices.CONFIRMED,
+        ExecutionStatusChoices.PENDING,
+    ),
+    ExecutionStatusChoices.CONFIRMED: (),
+}
+
+
+class TransitionError(ValidationError):
+    """状态流转不被允许"""
+    pass
+
+
+# =============================================================================
+# 守卫
+# =============================================================================
+
+def guard_order_not_cancelled(task) -> Optional[str]:
+    """已取消的工单不能再完成或确认任务"""
+    if task.service_order.confirmation_status == ConfirmationStatusChoices.CANCEL:
+        return _('所属工单已取消')
+    return None
+
+
+def guard_fiber_cores_available(task) -> Optional[str]:
+    """已建立纤芯台账的站点对，完成光缆光纤任务前须有足够的空闲纤芯"""
+    from . import fibercores
+
+    return fibercores.check_available(task)
+
+
+# 目标状态 -> 守卫函数列表；守卫返回错误信息或 None
+GUARDS: Dict[str, List[Callable]] = {
+    ExecutionStatusChoices.COMPLETED: [guard_order_not_cancelled, guard_fiber_cores_available],
+    ExecutionStatusChoices.CONFIRMED: [guard_order_not_cancelled],
+}
+
+
+def status_label(status: str) -> str:
+    """执行状态的显示名称"""
+    for value, label, *_color in ExecutionStatusChoices.CHOICES:
+        if value == status:
+            return label
+    return status
+
+
+def allowed_targets(source: Optional[str]) -> Tuple[str, ...]:
+    """获取可流转到的状态（source 为 None 表示新建任务）"""
+    if source is None:
+        return INITIAL_STATES
+    return TRANSITIONS.get(source, ())
+
+
+def check_transition(task, source: Optional[str], target: str) -> Optional[str]:
+    """
+    校验状态流转
+
+    Returns:
+        不允许时返回错误信息，允许时返回 None
+    """
+    if source == target:
+        return None
+    if target not in allowed_targets(source):
+        if source is None:
+            return _('新建任务的执行状态必须为：{targets}').format(
+                targets='、'.join(str(status_label(s)) for s in INITIAL_STATES),
+            )
+        return _('不允许从“{source}”变更为“{target}”').format(
+            source=status_label(source),
+            target=status_label(target),
+        )
+    for guard in GUARDS.get(target, []):
+        error = guard(task)
+        if error:
+            return error
+    return None
+
+
+def apply_timestamps(task, target: str, now: datetime.datetime) -> None:
+    """按目标状态维护完成/确认时间；退回待实施时清空"""
+    if target == ExecutionStatusChoices.COMPLETED:
+        task.completed_at = now
+        task.confirmed_at = None
+    elif target == ExecutionStatusChoices.CONFIRMED:
+        task.confirmed_at = now
+        if task.completed_at is None:
+            task.completed_at = now
+    else:
+        task.completed_at = None
+        task.confirmed_at = None
+
+
+# =============================================================================
+# 流转操作
+# =============================================================================
+
+def transition(task, target: str, user=None, comment: str = ''):
+    """
+    流转单个任务并保存（状态记录由信号处理器写入）
+    """
+    from .models import TaskDetail
+
+    source = TaskDetail.objects.filter(pk=task.pk).values_list('execution_status', flat=True).first()
+    error = check_transition(task, source, target)
+    if error:
+        raise TransitionError(error)
+    task.execution_status = target
+    task._transition_user = user
+    task._transition_comment = comment
+    task.save()
+    return task
+
+
+def bulk_transition(tasks: Sequence, target: str, user=None, comment: str = '') -> List:
+    """
+    批量流转任务
+
+    先校验全部任务，任一不允许则整体拒绝；校验通过后在一个事务内批量更新状态、
+    时间戳并批量写入状态变更记录。
+
+    Args:
+        tasks: TaskDetail 实例列表（建议 select_related('service_order')）
+        target: 目标状态
+        user: 操作人
+        comment: 说明
+
+    Returns:
+        实际发生状态变化的任务列表
+
+    Raises:
+        TransitionError: 错误信息按任务 ID 组织
+    """
+    from . import events, fibercores, ledger, outbox, ports
+    from .models import TaskDetail, TaskTransition
+
+    task_ids = [task.pk for task in tasks]
+    with transaction.atomic():
+        # 锁定任务行并读取当前状态，防止并发流转
+        current = dict(
+            TaskDetail.objects.select_for_update().filter(pk__in=task_ids).values_list('pk', 'execution_status')
+        )
+
+        errors = {}
+        changed = []
+        for task in tasks:
+            # 任务已删除或不存在时 source 为 None，不能按新建任务校验
+            if task.pk not in current:
+                errors[str(task.pk)] = [_('任务不存在')]
+                continue
+            source = current[task.pk]
+            error = check_transition(task, source, target)
+            if error:
+                errors[str(task.pk)] = [error]
+            elif source != target:
+                changed.append((task, source))
+        if errors:
+            raise TransitionError(errors)
+
+        now = timezone.now()
+        for task, _source in changed:
+            task.execution_status = target
+            task.last_updated = now
+            apply_timestamps(task, target, now)
+
+        TaskDetail.objects.bulk_update(
+            [task for task, _source in changed],
+            ['execution_status', 'completed_at', 'confirmed_at', 'last_updated'],
+        )
+        TaskTransition.objects.bulk_create([
+            TaskTransition(
+                task=task,
+                from_status=source,
+                to_status=target,
+                timestamp=now,
+                user=user,
+                comment=comment,
+            )
+            for task, source in changed
+        ])
+
+        # 批量更新不触发信号，在同一事务内同步纤芯、端口占用和台账生命周期，并登记事件（提交时按批分发一次）
+        for task, source in changed:
+            fibercores.on_status_change(task, source)
+            ports.on_status_change(task, source)
+            ledger.on_status_change(task, source)
+            events.emit(
+                events.TASK_STATUS_CHANGED,
+                task,
+                previous=source or '',
+                status=target,
+                user_id=user.pk if user else None,
+            )
+            events.emit(events.OBJECT_CHANGED, task)
+        if target == ExecutionStatusChoices.CONFIRMED:
+            outbox.record_task_confirmations(task.pk for task, _source in changed)
+
+    return [task for task, _source in changed]
+
+
+def status_choices_for(source: Optional[str]) -> Iterable[Tuple[str, str]]:
+    """表单使用：当前状态及其可流转状态的选项"""
+    allowed = set(allowed_targets(source))
+    if source is not None:
+        allowed.add(source)
+    return [
+        (value, label) for value, label, *_color in ExecutionStatusChoices.CHOICES
+        if value in allowed
+    ]